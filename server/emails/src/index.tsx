@@ -1,14 +1,56 @@
 import { render } from '@react-email/render'
 import { Command } from 'commander'
+import { createInterface } from 'node:readline'
 
 import emails from './emails'
 
+/**
+ * Long-lived mode: read one JSON request per line on stdin,
+ * `{"id": ..., "template": ..., "props": {...}}`, and write one JSON response
+ * per line on stdout, `{"id": ..., "html": ...}` or `{"id": ..., "error": ...}`.
+ */
+const serve = () => {
+  const lines = createInterface({ input: process.stdin })
+
+  const respond = (response: object) =>
+    process.stdout.write(JSON.stringify(response) + '\n')
+
+  lines.on('line', async (line: string) => {
+    let id = null
+    try {
+      const request = JSON.parse(line)
+      id = request.id
+      const TemplateComponent = emails[request.template]
+      if (!TemplateComponent) {
+        respond({ id, error: `Template ${request.template} not found` })
+        return
+      }
+      const html = await render(<TemplateComponent {...request.props} />)
+      respond({ id, html })
+    } catch (error) {
+      respond({ id, error: String(error) })
+    }
+  })
+  // Once the parent closes stdin, the process exits by itself
+  // after the renders in flight are written out.
+}
+
 const program = new Command()
 
 program
-  .argument('<template>', 'name of the email template')
-  .argument('<props>', 'props to pass to the email template, as a JSON string')
-  .action((template: string, props: string) => {
+  .argument('[template]', 'name of the email template')
+  .argument('[props]', 'props to pass to the email template, as a JSON string')
+  .option('--serve', 'render requests read from stdin, one JSON per line')
+  .action((template: string, props: string, options: { serve?: boolean }) => {
+    if (options.serve) {
+      serve()
+      return
+    }
+
+    if (!template || !props) {
+      program.help({ error: true })
+    }
+
     try {
       const parsedProps = JSON.parse(props)
       const TemplateComponent = emails[template]
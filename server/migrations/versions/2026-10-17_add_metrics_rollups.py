@@ -0,0 +1,68 @@
+"""Add metrics_rollups
+
+Revision ID: metrics_rollups_1017
+Revises: webhook_attempts_1019
+Create Date: 2026-10-17 00:00:00.000000
+
+Hourly aggregates of the orders, checkouts and cost events metrics,
+refreshed by the `metrics.refresh_rollups` cron.
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# Polar Custom Imports
+
+# revision identifiers, used by Alembic.
+revision = "metrics_rollups_1017"
+down_revision = "webhook_attempts_1019"
+branch_labels: tuple[str] | None = None
+depends_on: tuple[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "metrics_rollups",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("source", sa.String(), nullable=False),
+        sa.Column("organization_id", sa.Uuid(), nullable=False),
+        sa.Column("hour", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("product_id", sa.Uuid(), nullable=True),
+        sa.Column("billing_type", sa.String(), nullable=True),
+        sa.Column("one_time", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("orders", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("revenue", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("net_revenue", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("checkouts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "succeeded_checkouts", sa.Integer(), nullable=False, server_default="0"
+        ),
+        sa.Column("costs", sa.Numeric(), nullable=False, server_default="0"),
+        sa.ForeignKeyConstraint(
+            ["organization_id"],
+            ["organizations.id"],
+            name=op.f("metrics_rollups_organization_id_fkey"),
+            ondelete="cascade",
+        ),
+        sa.ForeignKeyConstraint(
+            ["product_id"],
+            ["products.id"],
+            name=op.f("metrics_rollups_product_id_fkey"),
+            ondelete="cascade",
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("metrics_rollups_pkey")),
+    )
+    op.create_index(
+        "ix_metrics_rollups_source_organization_id_hour",
+        "metrics_rollups",
+        ["source", "organization_id", "hour"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_metrics_rollups_source_organization_id_hour",
+        table_name="metrics_rollups",
+    )
+    op.drop_table("metrics_rollups")
@@ -0,0 +1,29 @@
+"""Add customer_meters.last_balanced_at
+
+Revision ID: cm_last_balanced_at_1018
+Revises: module_is_bonus_805
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# Polar Custom Imports
+
+# revision identifiers, used by Alembic.
+revision = "cm_last_balanced_at_1018"
+down_revision = "module_is_bonus_805"
+branch_labels: tuple[str] | None = None
+depends_on: tuple[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "customer_meters",
+        sa.Column("last_balanced_at", sa.TIMESTAMP(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("customer_meters", "last_balanced_at")
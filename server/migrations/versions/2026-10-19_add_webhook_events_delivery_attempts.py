@@ -0,0 +1,31 @@
+"""Add webhook_events.delivery_attempts
+
+Revision ID: webhook_attempts_1019
+Revises: cm_last_balanced_at_1018
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# Polar Custom Imports
+
+# revision identifiers, used by Alembic.
+revision = "webhook_attempts_1019"
+down_revision = "cm_last_balanced_at_1018"
+branch_labels: tuple[str] | None = None
+depends_on: tuple[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "webhook_events",
+        sa.Column(
+            "delivery_attempts", sa.Integer(), nullable=False, server_default="0"
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("webhook_events", "delivery_attempts")
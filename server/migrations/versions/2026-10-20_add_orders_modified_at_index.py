@@ -0,0 +1,33 @@
+"""Add partial index on orders.modified_at
+
+Revision ID: orders_modified_at_1020
+Revises: metrics_rollups_1017
+Create Date: 2026-10-20 00:00:00.000000
+
+The metrics rollups refresh recomputes the hours of the orders modified
+since its previous run. Only modified orders are indexed.
+
+"""
+
+from alembic import op
+
+# Polar Custom Imports
+
+# revision identifiers, used by Alembic.
+revision = "orders_modified_at_1020"
+down_revision = "metrics_rollups_1017"
+branch_labels: tuple[str] | None = None
+depends_on: tuple[str] | None = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_modified_at "
+            "ON orders (modified_at) WHERE modified_at IS NOT NULL"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_orders_modified_at")
@@ -14,6 +14,7 @@ from polar.backoffice import app as backoffice_app
 from polar.checkout import ip_geolocation
 from polar.checkout_link.app import app as checkout_link_redirect_app
 from polar.config import settings
+from polar.email.react import close_email_renderer_pool
 from polar.exception_handlers import add_exception_handlers
 from polar.health.endpoints import router as health_router
 from polar.kit.cors import CORSConfig, CORSMatcherMiddleware, Scope
@@ -219,6 +220,7 @@ async def lifespan(app: FastAPI) -> AsyncIterator[State]:
     stop_slo_metrics()
     stop_remote_write_pusher()
 
+    await close_email_renderer_pool()
     await redis.close(True)
     await async_engine.dispose()
     if async_read_engine is not async_engine:
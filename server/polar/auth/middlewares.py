@@ -1,3 +1,5 @@
+import time
+
 import logfire
 import structlog
 from fastapi import Request
@@ -11,7 +13,6 @@ from polar.customer_session.service import (
 from polar.customer_session.service import (
     customer_session as customer_session_service,
 )
-from polar.kit.utils import utc_now
 from polar.logging import Logger
 from polar.member_session.service import member_session as member_session_service
 from polar.models import (
@@ -23,23 +24,31 @@ from polar.models import (
     UserSession,
 )
 from polar.models.member_session import MEMBER_SESSION_TOKEN_PREFIX
-from polar.oauth2.constants import is_registration_token_prefix
+from polar.oauth2.constants import ACCESS_TOKEN_PREFIX, is_registration_token_prefix
 from polar.oauth2.exception_handlers import OAuth2Error, oauth2_error_exception_handler
 from polar.oauth2.exceptions import InvalidTokenError
 from polar.oauth2.service.oauth2_token import oauth2_token as oauth2_token_service
+from polar.observability import AUTH_RESOLUTION_DURATION_SECONDS
+from polar.organization_access_token.service import (
+    TOKEN_PREFIX as ORGANIZATION_ACCESS_TOKEN_PREFIX,
+)
 from polar.organization_access_token.service import (
     organization_access_token as organization_access_token_service,
 )
+from polar.personal_access_token.service import (
+    TOKEN_PREFIX as PERSONAL_ACCESS_TOKEN_PREFIX,
+)
 from polar.personal_access_token.service import (
     personal_access_token as personal_access_token_service,
 )
 from polar.postgres import AsyncSession
 from polar.sentry import set_sentry_user
-from polar.worker import enqueue_job
 
+from . import token_cache
 from .models import Anonymous, AuthSubject, Subject
 from .scope import Scope
 from .service import auth as auth_service
+from .token_cache import TokenKind
 
 log: Logger = structlog.get_logger(__name__)
 
@@ -70,11 +79,7 @@ async def get_personal_access_token(
     token = await personal_access_token_service.get_by_token(session, value)
 
     if token is not None:
-        enqueue_job(
-            "personal_access_token.record_usage",
-            personal_access_token_id=token.id,
-            last_used_at=utc_now().timestamp(),
-        )
+        await token_cache.record_usage(TokenKind.personal_access_token, token.id)
 
     return token
 
@@ -85,11 +90,7 @@ async def get_organization_access_token(
     token = await organization_access_token_service.get_by_token(session, value)
 
     if token is not None:
-        enqueue_job(
-            "organization_access_token.record_usage",
-            organization_access_token_id=token.id,
-            last_used_at=utc_now().timestamp(),
-        )
+        await token_cache.record_usage(TokenKind.organization_access_token, token.id)
 
     return token
 
@@ -104,10 +105,114 @@ async def get_member_session(session: AsyncSession, value: str) -> MemberSession
     return await member_session_service.get_by_token(session, value)
 
 
+async def _get_organization_access_token_auth_subject(
+    session: AsyncSession, value: str
+) -> AuthSubject[Subject] | None:
+    organization_access_token = await get_organization_access_token(session, value)
+    if organization_access_token is None:
+        return None
+    return AuthSubject(
+        organization_access_token.organization,
+        organization_access_token.scopes,
+        organization_access_token,
+    )
+
+
+async def _get_oauth2_token_auth_subject(
+    session: AsyncSession, value: str
+) -> AuthSubject[Subject] | None:
+    oauth2_token = await get_oauth2_token(session, value)
+    if oauth2_token is None:
+        return None
+    return AuthSubject(oauth2_token.sub, oauth2_token.scopes, oauth2_token)
+
+
+async def _get_personal_access_token_auth_subject(
+    session: AsyncSession, value: str
+) -> AuthSubject[Subject] | None:
+    personal_access_token = await get_personal_access_token(session, value)
+    if personal_access_token is None:
+        return None
+    return AuthSubject(
+        personal_access_token.user,
+        personal_access_token.scopes,
+        personal_access_token,
+    )
+
+
+_ACCESS_TOKEN_RESOLVERS = {
+    TokenKind.organization_access_token: _get_organization_access_token_auth_subject,
+    TokenKind.oauth2_token: _get_oauth2_token_auth_subject,
+    TokenKind.personal_access_token: _get_personal_access_token_auth_subject,
+}
+
+_OAUTH2_ACCESS_TOKEN_PREFIXES = tuple(ACCESS_TOKEN_PREFIX.values())
+
+
+def get_access_token_kind(value: str) -> TokenKind | None:
+    """Kind of an access token from its issued prefix, None if unprefixed."""
+    if value.startswith(ORGANIZATION_ACCESS_TOKEN_PREFIX):
+        return TokenKind.organization_access_token
+    if value.startswith(_OAUTH2_ACCESS_TOKEN_PREFIXES):
+        return TokenKind.oauth2_token
+    if value.startswith(PERSONAL_ACCESS_TOKEN_PREFIX):
+        return TokenKind.personal_access_token
+    return None
+
+
+async def get_access_token_auth_subject(
+    session: AsyncSession, value: str
+) -> AuthSubject[Subject]:
+    """
+    Resolve an access token bearer token.
+
+    Prefixed tokens are routed to the lookup of their kind. Legacy tokens,
+    issued without a prefix, try each kind of access token in turn.
+    """
+    kind = get_access_token_kind(value)
+    if kind is not None:
+        auth_subject = await _ACCESS_TOKEN_RESOLVERS[kind](session, value)
+        if auth_subject is None:
+            raise InvalidTokenError()
+        return auth_subject
+
+    for resolver in _ACCESS_TOKEN_RESOLVERS.values():
+        auth_subject = await resolver(session, value)
+        if auth_subject is not None:
+            return auth_subject
+
+    raise InvalidTokenError()
+
+
+def _get_token_type(token: str | None) -> str:
+    if token is None:
+        return "user_session"
+    if is_registration_token_prefix(token):
+        return "client_registration_token"
+    if token.startswith(MEMBER_SESSION_TOKEN_PREFIX):
+        return "member_session"
+    if token.startswith(CUSTOMER_SESSION_TOKEN_PREFIX):
+        return "customer_session"
+    kind = get_access_token_kind(token)
+    return kind.value if kind is not None else "legacy_access_token"
+
+
 async def get_auth_subject(
     request: Request, session: AsyncSession
 ) -> AuthSubject[Subject]:
     token = get_bearer_token(request)
+    start = time.perf_counter()
+    try:
+        return await _get_auth_subject(request, session, token)
+    finally:
+        AUTH_RESOLUTION_DURATION_SECONDS.labels(
+            token_type=_get_token_type(token)
+        ).observe(time.perf_counter() - start)
+
+
+async def _get_auth_subject(
+    request: Request, session: AsyncSession, token: str | None
+) -> AuthSubject[Subject]:
     if token is not None:
         if is_registration_token_prefix(token):
             return AuthSubject(Anonymous(), set(), None)
@@ -134,27 +239,7 @@ async def get_auth_subject(
                 )
             raise InvalidTokenError()
 
-        organization_access_token = await get_organization_access_token(session, token)
-        if organization_access_token:
-            return AuthSubject(
-                organization_access_token.organization,
-                organization_access_token.scopes,
-                organization_access_token,
-            )
-
-        oauth2_token = await get_oauth2_token(session, token)
-        if oauth2_token:
-            return AuthSubject(oauth2_token.sub, oauth2_token.scopes, oauth2_token)
-
-        personal_access_token = await get_personal_access_token(session, token)
-        if personal_access_token:
-            return AuthSubject(
-                personal_access_token.user,
-                personal_access_token.scopes,
-                personal_access_token,
-            )
-
-        raise InvalidTokenError()
+        return await get_access_token_auth_subject(session, token)
 
     user_session = await get_user_session(request, session)
     if user_session is not None:
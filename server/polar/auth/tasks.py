@@ -1,8 +1,15 @@
 import structlog
 
 from polar.logging import Logger
-from polar.worker import AsyncSessionMaker, CronTrigger, TaskPriority, actor
+from polar.worker import (
+    AsyncSessionMaker,
+    CronTrigger,
+    RedisMiddleware,
+    TaskPriority,
+    actor,
+)
 
+from . import token_cache
 from .service import auth as auth_service
 
 log: Logger = structlog.get_logger()
@@ -17,3 +24,16 @@ log: Logger = structlog.get_logger()
 async def auth_delete_expired() -> None:
     async with AsyncSessionMaker() as session:
         await auth_service.delete_expired(session)
+
+
+@actor(
+    actor_name="auth.flush_token_usage",
+    cron_trigger=CronTrigger(minute="*"),
+    priority=TaskPriority.LOW,
+    max_retries=0,
+)
+async def auth_flush_token_usage() -> None:
+    redis = RedisMiddleware.get()
+    async with AsyncSessionMaker() as session:
+        count = await token_cache.flush_usage(session, redis)
+    log.debug("auth.flush_token_usage", count=count)
@@ -0,0 +1,117 @@
+"""Coalesced usage of bearer tokens.
+
+Instead of one job per request, the last usage timestamp of each token is
+written to a Redis hash, throttled in-process, and flushed in bulk by the
+`auth.flush_token_usage` cron.
+"""
+
+import time
+from datetime import UTC, datetime
+from enum import StrEnum
+from uuid import UUID
+
+import structlog
+from redis import RedisError
+from sqlalchemy import update
+
+from polar.config import settings
+from polar.kit.utils import utc_now
+from polar.logging import Logger
+from polar.models import OrganizationAccessToken, PersonalAccessToken
+from polar.postgres import AsyncSession
+from polar.redis import Redis, get_app_redis
+
+log: Logger = structlog.get_logger()
+
+
+class TokenKind(StrEnum):
+    organization_access_token = "organization_access_token"
+    oauth2_token = "oauth2_token"
+    personal_access_token = "personal_access_token"
+
+
+_USAGE_MODELS: dict[TokenKind, type[OrganizationAccessToken | PersonalAccessToken]] = {
+    TokenKind.organization_access_token: OrganizationAccessToken,
+    TokenKind.personal_access_token: PersonalAccessToken,
+}
+
+
+def _get_usage_key(kind: TokenKind) -> str:
+    return f"auth:token_usage:{kind}"
+
+
+_last_recorded: dict[tuple[TokenKind, UUID], float] = {}
+
+
+async def record_usage(kind: TokenKind, token_id: UUID) -> None:
+    now = time.monotonic()
+    last_recorded = _last_recorded.get((kind, token_id))
+    if (
+        last_recorded is not None
+        and now - last_recorded < settings.AUTH_TOKEN_USAGE_RECORD_INTERVAL_SECONDS
+    ):
+        return
+
+    try:
+        await get_app_redis().hset(
+            _get_usage_key(kind), str(token_id), str(utc_now().timestamp())
+        )
+    except RedisError as e:
+        log.warning("auth.token_cache.redis_error", error=str(e))
+        return
+
+    if len(_last_recorded) >= settings.AUTH_TOKEN_USAGE_RECORD_MAXSIZE:
+        _last_recorded.clear()
+    _last_recorded[(kind, token_id)] = now
+
+
+_CLEAR_USAGE_SCRIPT = """
+local removed = 0
+for i = 1, #ARGV, 2 do
+    if redis.call("HGET", KEYS[1], ARGV[i]) == ARGV[i + 1] then
+        removed = removed + redis.call("HDEL", KEYS[1], ARGV[i])
+    end
+end
+return removed
+"""
+
+
+async def flush_usage(session: AsyncSession, redis: Redis) -> int:
+    """Write coalesced usage timestamps to the tokens, in one bulk UPDATE per kind.
+
+    Usages are only removed from Redis once committed, and only if they
+    weren't recorded again meanwhile: if the flush fails, the next one
+    picks them up.
+
+    Returns the number of tokens updated.
+    """
+    count = 0
+    for kind, model in _USAGE_MODELS.items():
+        usage_key = _get_usage_key(kind)
+        usages = await redis.hgetall(usage_key)
+        if not usages:
+            continue
+
+        await session.execute(
+            update(model),
+            [
+                {
+                    "id": UUID(token_id),
+                    "last_used_at": datetime.fromtimestamp(float(timestamp), tz=UTC),
+                }
+                for token_id, timestamp in usages.items()
+            ],
+        )
+        await session.commit()
+
+        await redis.eval(
+            _CLEAR_USAGE_SCRIPT,
+            1,
+            usage_key,
+            *(value for usage in usages.items() for value in usage),
+        )
+        count += len(usages)
+    return count
+
+
+__all__ = ["TokenKind", "flush_usage", "record_usage"]
@@ -77,6 +77,33 @@ class BenefitGrantRepository(
         )
         return await self.get_all(statement)
 
+    async def list_granted_by_benefit_after(
+        self,
+        benefit: Benefit,
+        *,
+        after: UUID | None = None,
+        limit: int,
+        options: Options = (),
+    ) -> Sequence[BenefitGrant]:
+        """
+        List a page of the granted grants of the benefit, ordered by ID,
+        starting after the given ID.
+        """
+        statement = (
+            self.get_base_statement()
+            .where(
+                BenefitGrant.benefit_id == benefit.id,
+                BenefitGrant.is_granted.is_(True),
+                BenefitGrant.deleted_at.is_(None),
+            )
+            .order_by(BenefitGrant.id.asc())
+            .limit(limit)
+            .options(*options)
+        )
+        if after is not None:
+            statement = statement.where(BenefitGrant.id > after)
+        return await self.get_all(statement)
+
     async def list_granted_by_customer(
         self,
         customer_id: UUID,
@@ -3,9 +3,11 @@ from collections.abc import Sequence
 from typing import Any, Literal, TypeVar, Unpack, overload
 from uuid import UUID
 
+import dramatiq
 import structlog
 from sqlalchemy import select
 from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from polar.customer.repository import CustomerRepository
 from polar.event.service import event as event_service
@@ -23,13 +25,15 @@ from polar.models.webhook_endpoint import WebhookEventType
 from polar.postgres import AsyncSession, sql
 from polar.redis import Redis
 from polar.webhook.service import webhook as webhook_service
-from polar.worker import enqueue_job
+from polar.worker import JobQueueManager, enqueue_job
 
 from ..registry import get_benefit_strategy
 from ..strategies import (
     BenefitActionRequiredError,
     BenefitGrantProperties,
     BenefitProperties,
+    BenefitRetriableError,
+    BenefitServiceProtocol,
 )
 from .repository import BenefitGrantRepository
 from .scope import scope_to_args
@@ -437,10 +441,76 @@ class BenefitGrantService(ResourceServiceReader[BenefitGrant]):
         if not await benefit_strategy.requires_update(benefit, previous_properties):
             return
 
+        enqueue_job("benefit.update_grants", benefit_id=benefit.id)
+
+    async def update_benefit_grants(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        benefit: Benefit,
+        *,
+        after: UUID | None = None,
+        limit: int,
+    ) -> builtins.list[UUID]:
+        """
+        Update a chunk of the granted grants of the benefit, ordered by ID.
+
+        The benefit strategy is shared by the whole chunk. Each grant is updated
+        in a savepoint: if it fails, its changes are rolled back and a
+        `benefit.update` job is enqueued for it, so it's retried on its own
+        without redoing the chunk.
+
+        Each grant is committed, and its jobs enqueued, as soon as it's updated:
+        if the chunk fails afterwards, the grants already updated, and whose
+        external side effects already happened, aren't rolled back.
+
+        Returns the IDs of the grants of the chunk.
+        """
         repository = BenefitGrantRepository.from_session(session)
-        grants = await repository.list_granted_by_benefit(benefit)
+        grants = await repository.list_granted_by_benefit_after(
+            benefit, after=after, limit=limit
+        )
+
+        grant_ids: builtins.list[UUID] = []
+        benefit_strategy = get_benefit_strategy(benefit.type, session, redis)
+        job_queue_manager = JobQueueManager.get()
         for grant in grants:
-            enqueue_job("benefit.update", benefit_grant_id=grant.id)
+            grant_id = grant.id
+            grant_ids.append(grant_id)
+            set_committed_value(grant, "benefit", benefit)
+            nested = await session.begin_nested()
+            try:
+                await self.update_benefit_grant(
+                    session, redis, grant, benefit_strategy=benefit_strategy
+                )
+            except BenefitRetriableError as e:
+                await nested.rollback()
+                log.warning(
+                    "Retriable error encountered while updating benefit",
+                    error=str(e),
+                    defer_seconds=e.defer_seconds,
+                    benefit_grant_id=str(grant_id),
+                )
+                enqueue_job(
+                    "benefit.update",
+                    benefit_grant_id=grant_id,
+                    delay=e.defer_milliseconds,
+                )
+            except Exception as e:
+                await nested.rollback()
+                log.exception(
+                    "Error encountered while updating benefit",
+                    error=str(e),
+                    benefit_grant_id=str(grant_id),
+                )
+                enqueue_job("benefit.update", benefit_grant_id=grant_id)
+            else:
+                await nested.commit()
+
+            await session.commit()
+            await job_queue_manager.flush(dramatiq.get_broker(), redis)
+
+        return grant_ids
 
     async def update_benefit_grant(
         self,
@@ -449,6 +519,10 @@ class BenefitGrantService(ResourceServiceReader[BenefitGrant]):
         grant: BenefitGrant,
         *,
         attempt: int = 1,
+        benefit_strategy: BenefitServiceProtocol[
+            BenefitProperties, BenefitGrantProperties
+        ]
+        | None = None,
     ) -> BenefitGrant:
         # Don't update revoked benefits
         if grant.is_revoked:
@@ -468,7 +542,8 @@ class BenefitGrantService(ResourceServiceReader[BenefitGrant]):
             member = await member_repository.get_by_id(grant.member_id)
 
         previous_properties = grant.properties
-        benefit_strategy = get_benefit_strategy(benefit.type, session, redis)
+        if benefit_strategy is None:
+            benefit_strategy = get_benefit_strategy(benefit.type, session, redis)
         try:
             properties = await benefit_strategy.grant(
                 benefit,
@@ -5,6 +5,7 @@ import structlog
 from dramatiq import Retry
 
 from polar.benefit.repository import BenefitRepository
+from polar.config import settings
 from polar.customer.repository import CustomerRepository
 from polar.exceptions import PolarTaskError
 from polar.logging import Logger
@@ -15,6 +16,7 @@ from polar.worker import (
     RedisMiddleware,
     TaskPriority,
     actor,
+    enqueue_job,
     get_retries,
 )
 
@@ -236,6 +238,36 @@ async def benefit_update(benefit_grant_id: uuid.UUID) -> None:
             raise Retry(delay=e.defer_milliseconds) from e
 
 
+@actor(actor_name="benefit.update_grants", priority=TaskPriority.MEDIUM)
+async def benefit_update_grants(
+    benefit_id: uuid.UUID, after: uuid.UUID | None = None
+) -> None:
+    async with AsyncSessionMaker() as session:
+        benefit_repository = BenefitRepository.from_session(session)
+        benefit = await benefit_repository.get_by_id(
+            benefit_id, options=benefit_repository.get_eager_options()
+        )
+        if benefit is None:
+            raise BenefitDoesNotExist(benefit_id)
+
+        chunk_size = settings.BENEFIT_GRANT_UPDATE_CHUNK_SIZE
+        grant_ids = await benefit_grant_service.update_benefit_grants(
+            session, RedisMiddleware.get(), benefit, after=after, limit=chunk_size
+        )
+        log.info(
+            "benefit.update_grants.progress",
+            benefit_id=str(benefit_id),
+            processed=len(grant_ids),
+            last_benefit_grant_id=str(grant_ids[-1]) if grant_ids else None,
+        )
+
+        # A full chunk: there may be more grants, continue after the last one
+        if len(grant_ids) == chunk_size:
+            enqueue_job(
+                "benefit.update_grants", benefit_id=benefit_id, after=grant_ids[-1]
+            )
+
+
 @actor(actor_name="benefit.enqueue_benefit_grant_cycles", priority=TaskPriority.MEDIUM)
 async def enqueue_benefit_grant_cycles(**scope: Unpack[BenefitGrantScopeArgs]) -> None:
     async with AsyncSessionMaker() as session:
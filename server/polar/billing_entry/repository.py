@@ -24,6 +24,19 @@ class BillingEntryRepository(
 ):
     model = BillingEntry
 
+    async def create_many(
+        self, billing_entries: Sequence[BillingEntry]
+    ) -> Sequence[BillingEntry]:
+        """
+        Insert several billing entries at once.
+
+        The ORM batches them into multi-row `INSERT ... RETURNING` statements,
+        instead of one round trip per entry.
+        """
+        self.session.add_all(billing_entries)
+        await self.session.flush()
+        return billing_entries
+
     async def update_order_item_id(
         self, billing_entries: Sequence[UUID], order_item_id: UUID
     ) -> None:
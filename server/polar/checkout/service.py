@@ -31,7 +31,7 @@ from polar.customer.repository import CustomerRepository
 from polar.customer_session.service import customer_session as customer_session_service
 from polar.discount.service import DiscountNotRedeemableError
 from polar.discount.service import discount as discount_service
-from polar.enums import PaymentProcessor, TaxBehavior
+from polar.enums import PaymentProcessor, TaxBehavior, TaxProcessor
 from polar.event.service import event as event_service
 from polar.event.system import (
     CheckoutCreatedMetadata,
@@ -48,7 +48,7 @@ from polar.exceptions import (
 )
 from polar.integrations.stripe.service import stripe as stripe_service
 from polar.integrations.stripe.utils import get_fingerprint
-from polar.kit.address import AddressInput
+from polar.kit.address import Address, AddressInput
 from polar.kit.crypto import generate_token
 from polar.kit.currency import get_presentment_currency
 from polar.kit.db.locking import is_lock_not_available_error
@@ -102,11 +102,14 @@ from polar.product.service import product as product_service
 from polar.subscription.repository import SubscriptionRepository
 from polar.subscription.service import subscription as subscription_service
 from polar.tax.calculation import (
+    TaxCalculation,
     TaxCalculationError,
     TaxCode,
+    calculate_hedged,
     get_tax_behavior_from_option,
     get_tax_service,
 )
+from polar.tax.calculation import cache as tax_quote_cache
 from polar.tax.tax_id import InvalidTaxID, TaxID, to_stripe_tax_id, validate_tax_id
 from polar.trial_redemption.service import trial_redemption as trial_redemption_service
 from polar.webhook.service import webhook as webhook_service
@@ -2194,26 +2197,22 @@ class CheckoutService:
                 session.add(checkout)
                 return checkout
 
-            tax_behavior = get_tax_behavior_from_option(
-                tax_behavior_option, addr
-            )
+            tax_behavior = get_tax_behavior_from_option(tax_behavior_option, addr)
+            # Prefer the checkout processor, falling back to the other ones
             tax_processor = checkout.tax_processor or settings.DEFAULT_TAX_PROCESSOR
-            tax_service = get_tax_service(tax_processor)
+            tax_processors = [
+                tax_processor,
+                *(p for p in settings.TAX_PROCESSORS if p != tax_processor),
+            ]
             try:
-                tax_calculation = await tax_service.calculate(
-                    checkout.id,
-                    checkout.currency,
-                    checkout.net_amount,
-                    tax_behavior,
-                    tax_code,
-                    addr,
-                    (
-                        [checkout.customer_tax_id]
-                        if checkout.customer_tax_id is not None
-                        else []
-                    ),
-                    customer_exempt=False,
+                tax_calculation, tax_processor = await self._calculate_tax(
+                    checkout,
+                    tax_processors,
+                    tax_behavior=tax_behavior,
+                    tax_code=tax_code,
+                    address=addr,
                 )
+                checkout.tax_processor = tax_processor
                 checkout.tax_amount = tax_calculation["amount"]
                 checkout.tax_behavior = tax_calculation["tax_behavior"]
                 checkout.net_amount = (
@@ -2236,6 +2235,52 @@ class CheckoutService:
 
         return checkout
 
+    async def _calculate_tax(
+        self,
+        checkout: Checkout,
+        tax_processors: Sequence[TaxProcessor],
+        *,
+        tax_behavior: TaxBehavior,
+        tax_code: TaxCode,
+        address: Address,
+    ) -> tuple[TaxCalculation, TaxProcessor]:
+        tax_ids = (
+            [checkout.customer_tax_id] if checkout.customer_tax_id is not None else []
+        )
+
+        cache_key: str | None = None
+        if settings.TAX_QUOTE_CACHE_ENABLED:
+            cache_key = tax_quote_cache.get_key(
+                identifier=checkout.id,
+                processors=tax_processors,
+                currency=checkout.currency,
+                amount=checkout.net_amount,
+                tax_behavior=tax_behavior,
+                tax_code=tax_code,
+                address=address,
+                tax_ids=tax_ids,
+                customer_exempt=False,
+            )
+            if (cached := await tax_quote_cache.get_quote(cache_key)) is not None:
+                return cached
+
+        tax_calculation, tax_processor = await calculate_hedged(
+            [(processor, get_tax_service(processor)) for processor in tax_processors],
+            identifier=checkout.id,
+            currency=checkout.currency,
+            amount=checkout.net_amount,
+            tax_behavior=tax_behavior,
+            tax_code=tax_code,
+            address=address,
+            tax_ids=tax_ids,
+            customer_exempt=False,
+        )
+
+        if cache_key is not None:
+            await tax_quote_cache.set_quote(cache_key, tax_calculation, tax_processor)
+
+        return tax_calculation, tax_processor
+
     def _get_ip_country(
         self,
         ip_geolocation_client: ip_geolocation.IPGeolocationClient | None,
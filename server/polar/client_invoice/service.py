@@ -10,7 +10,7 @@ import structlog
 
 from polar.auth.models import AuthSubject, Organization, User
 from polar.config import settings
-from polar.email.react import render_email_template
+from polar.email.react import render_email_template_async
 from polar.email.schemas import (
     ClientInvoiceEmail,
     ClientInvoiceEmailProps,
@@ -644,7 +644,7 @@ class ClientInvoiceService:
                 memo=invoice.memo,
             )
             email_obj = ClientInvoiceEmail(props=email_props)
-            html = render_email_template(EmailAdapter.validate_python(email_obj.model_dump()))
+            html = await render_email_template_async(EmailAdapter.validate_python(email_obj.model_dump()))
             enqueue_email(
                 **organization.email_from_reply,
                 to_email_addr=customer.email,
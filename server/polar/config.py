@@ -36,6 +36,13 @@ class EmailSender(StrEnum):
     resend = "resend"
 
 
+class MetricsSubscriptionsEngine(StrEnum):
+    range_join = "range_join"
+    sweep = "sweep"
+    compare = "compare"
+    """Serve `range_join` results, and log their differences with `sweep`."""
+
+
 def _validate_email_renderer_binary_path(value: Path) -> Path:
     if not value.exists() and not value.is_file():
         raise ValueError(
@@ -115,12 +122,22 @@ class Settings(BaseSettings):
     WEBHOOK_MAX_RETRIES: int = 10
     WEBHOOK_EVENT_RETENTION_PERIOD: timedelta = timedelta(days=30)
     WEBHOOK_FAILURE_THRESHOLD: int = 10
+    # Maximum time a delivery holds its endpoint's slot, if the worker dies mid-way
+    WEBHOOK_DELIVERY_LEASE_SECONDS: int = 60
+    # Endpoints opting out of ordered delivery, mapped to their concurrency
+    WEBHOOK_ENDPOINT_DELIVERY_CONCURRENCY: dict[UUID, int] = {}
 
     WORKER_DEFAULT_DEBOUNCE_MIN_THRESHOLD: timedelta = timedelta(seconds=15)
     WORKER_DEFAULT_DEBOUNCE_MAX_THRESHOLD: timedelta = timedelta(minutes=15)
 
     CUSTOMER_METER_UPDATE_DEBOUNCE_MIN_THRESHOLD: timedelta = timedelta(seconds=15)
     CUSTOMER_METER_UPDATE_DEBOUNCE_MAX_THRESHOLD: timedelta = timedelta(minutes=180)
+    # Fold only newly ingested events into customer meter balances when possible,
+    # instead of re-aggregating the whole meter window on each update
+    CUSTOMER_METER_INCREMENTAL_BALANCE: bool = True
+    # Upper bound between an event's ingestion timestamp and its commit: only a
+    # balance ran at least this long after its last event is extended incrementally
+    CUSTOMER_METER_INCREMENTAL_BALANCE_SETTLE_DELAY: timedelta = timedelta(seconds=10)
 
     SECRET: str = "super secret jwt secret"
     JWKS: JWKSFile = Field(default="./.jwks.json")
@@ -238,6 +255,11 @@ class Settings(BaseSettings):
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
 
+    # Event stream
+    EVENTSTREAM_SUBSCRIBER_BUFFER_SIZE: int = 256
+    EVENTSTREAM_RECONNECT_DELAY_SECONDS: float = 1.0
+    EVENTSTREAM_RECONNECT_MAX_DELAY_SECONDS: float = 30.0
+
     # Emails
     EMAIL_RENDERER_BINARY_PATH: Annotated[
         Path, AfterValidator(_validate_email_renderer_binary_path)
@@ -247,6 +269,16 @@ class Settings(BaseSettings):
         / "bin"
         / f"react-email-pkg{file_extension}"
     )
+    # Persistent renderer processes, shared by async callers
+    EMAIL_RENDERER_POOL_SIZE: int = 2
+    EMAIL_RENDERER_POOL_MAX_PENDING: int = 100
+    EMAIL_RENDERER_TIMEOUT_SECONDS: float = 10.0
+    EMAIL_RENDERER_MAX_RENDERS_PER_PROCESS: int = 1000
+    # Broadcasts are sent by several shards, each claiming pending sends
+    # in chunks, sending concurrently under a per-organization rate
+    EMAIL_BROADCAST_SEND_SHARDS: int = 4
+    EMAIL_BROADCAST_SEND_CONCURRENCY: int = 10
+    EMAIL_BROADCAST_SEND_RATE_PER_SECOND: int = 50
     EMAIL_SENDER: EmailSender = EmailSender.logger
     RESEND_API_KEY: str = ""
     RESEND_API_BASE_URL: str = "https://api.resend.com"
@@ -505,6 +537,62 @@ class Settings(BaseSettings):
     # wired up (single-tenant / development).
     PLATFORM_ORG_ID: UUID | None = None
 
+    # Resolved tiers are cached per organization: briefly in-process, then
+    # in Redis. Both layers are invalidated when a platform subscription
+    # changes; the in-process TTL bounds staleness across processes.
+    ENTITLEMENTS_TIER_CACHE_ENABLED: bool = True
+    ENTITLEMENTS_TIER_CACHE_LOCAL_TTL_SECONDS: float = 10.0
+    ENTITLEMENTS_TIER_CACHE_LOCAL_MAXSIZE: int = 10_000
+    ENTITLEMENTS_TIER_CACHE_REDIS_TTL_SECONDS: int = 300
+    QUOTAS_USAGE_CACHE_TTL_SECONDS: float = 15.0
+
+    # Bearer token usage timestamps are written to Redis at most once per
+    # interval per process, and flushed to the database every minute.
+    AUTH_TOKEN_USAGE_RECORD_INTERVAL_SECONDS: float = 30.0
+    AUTH_TOKEN_USAGE_RECORD_MAXSIZE: int = 100_000
+
+    # License key validation counters are buffered in Redis and flushed to
+    # the database every minute. The running usage total used to enforce
+    # `limit_usage` expires after being idle for the TTL.
+    LICENSE_KEY_USAGE_CACHE_TTL_SECONDS: int = 86_400
+    LICENSE_KEY_COUNTERS_FLUSH_BATCH_SIZE: int = 500
+
+    # When a benefit's properties change, its grants are updated in chunks of
+    # this size, one job per chunk. A retried chunk calls the benefit's
+    # external service again for its grants, so it's kept small.
+    BENEFIT_GRANT_UPDATE_CHUNK_SIZE: int = 50
+
+    # Engine computing the active subscriptions metrics (active subscriptions,
+    # MRR, ARPU...): joining every period to the subscriptions, or sweeping
+    # over the start and end of each subscription.
+    METRICS_SUBSCRIPTIONS_ENGINE: MetricsSubscriptionsEngine = (
+        MetricsSubscriptionsEngine.range_join
+    )
+
+    # Hourly rollups of the orders, checkouts and costs metrics, serving the
+    # days before the current one. Each refresh recomputes the hours of the
+    # checkouts of the lookback window, and the hours of the orders created or
+    # modified and of the cost events ingested since the previous refresh,
+    # minus the overlap.
+    METRICS_ROLLUPS_ENABLED: bool = False
+    METRICS_ROLLUPS_REFRESH_LOOKBACK_SECONDS: int = 3 * 86_400
+    METRICS_ROLLUPS_REFRESH_OVERLAP_SECONDS: int = 300
+
+    # Cache of metrics responses: briefly for ranges including the current day,
+    # longer for closed ranges, which only change on late corrections.
+    METRICS_CACHE_ENABLED: bool = True
+    METRICS_CACHE_TTL_SECONDS: int = 60
+    METRICS_CACHE_HISTORICAL_TTL_SECONDS: int = 3600
+
+    # Subscription cycle scheduler. In batch mode, due subscriptions are
+    # claimed in chunks and their cycle messages are spread over time so
+    # at most MAX_CYCLES_PER_SECOND run (0 = unlimited), booking at most
+    # DISPATCH_WINDOW_SECONDS ahead.
+    SUBSCRIPTION_SCHEDULER_BATCH_DISPATCH: bool = True
+    SUBSCRIPTION_SCHEDULER_BATCH_SIZE: int = 500
+    SUBSCRIPTION_SCHEDULER_MAX_CYCLES_PER_SECOND: float = 100.0
+    SUBSCRIPTION_SCHEDULER_DISPATCH_WINDOW_SECONDS: int = 60
+
     ORGANIZATION_SLUG_RESERVED_KEYWORDS: list[str] = [
         # Landing pages
         "benefits",
@@ -546,6 +634,14 @@ class Settings(BaseSettings):
     ]
 
     DEFAULT_TAX_PROCESSOR: TaxProcessor = TaxProcessor.stripe
+    # Processors tried in order to calculate tax; the next one is fired on a
+    # technical error or, if set, after the hedge delay without a result.
+    TAX_PROCESSORS: list[TaxProcessor] = [TaxProcessor.stripe]
+    TAX_RECORD_PROCESSOR: TaxProcessor = TaxProcessor.stripe
+    TAX_CALCULATION_HEDGE_DELAY_SECONDS: float | None = None
+    # Cache of the tax quotes of checkouts, recalculated on every update
+    TAX_QUOTE_CACHE_ENABLED: bool = True
+    TAX_QUOTE_CACHE_TTL_SECONDS: int = 60 * 10  # 10 minutes
 
     model_config = SettingsConfigDict(
         env_prefix="spaire_",
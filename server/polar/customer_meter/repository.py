@@ -85,6 +85,46 @@ class CustomerMeterRepository(
         )
         return await self.get_one_or_none(statement)
 
+    async def get_all_by_customers_and_meters_for_update(
+        self,
+        customer_ids: Sequence[UUID],
+        meter_ids: Sequence[UUID],
+    ) -> Sequence[CustomerMeter]:
+        """
+        Get all the CustomerMeter of the given customers and meters
+        with FOR UPDATE lock, skipping the ones already locked.
+
+        Batch counterpart of `get_by_customer_and_meter_for_update`: one locked
+        customer meter shouldn't hold back the whole batch, so callers are
+        expected to compare with `get_customer_meter_keys` and
+        retry the customers whose customer meters were skipped.
+        """
+        statement = (
+            self.get_base_statement()
+            .where(
+                CustomerMeter.customer_id.in_(customer_ids),
+                CustomerMeter.meter_id.in_(meter_ids),
+            )
+            .order_by(CustomerMeter.id)
+            .with_for_update(skip_locked=True, of=CustomerMeter)
+        )
+        return await self.get_all(statement)
+
+    async def get_customer_meter_keys(
+        self, customer_ids: Sequence[UUID], meter_ids: Sequence[UUID]
+    ) -> set[tuple[UUID, UUID]]:
+        """
+        Get the (customer_id, meter_id) pairs having a CustomerMeter,
+        without locking them.
+        """
+        statement = select(CustomerMeter.customer_id, CustomerMeter.meter_id).where(
+            CustomerMeter.deleted_at.is_(None),
+            CustomerMeter.customer_id.in_(customer_ids),
+            CustomerMeter.meter_id.in_(meter_ids),
+        )
+        result = await self.session.execute(statement)
+        return {(customer_id, meter_id) for customer_id, meter_id in result.all()}
+
     def get_readable_statement(
         self, auth_subject: AuthSubject[User | Organization]
     ) -> Select[tuple[CustomerMeter]]:
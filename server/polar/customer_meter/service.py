@@ -1,11 +1,28 @@
+import builtins
+import dataclasses
 import uuid
 from collections.abc import Sequence
-from datetime import datetime
+from datetime import UTC, datetime
 from decimal import Decimal
 from typing import Any
 
 import logfire
-from sqlalchemy import Float, Select, func, or_, select, union_all
+from sqlalchemy import (
+    TIMESTAMP,
+    ColumnElement,
+    Float,
+    Select,
+    String,
+    Uuid,
+    and_,
+    column,
+    func,
+    literal,
+    or_,
+    select,
+    union_all,
+    values,
+)
 from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import joinedload
 from sqlalchemy.orm.strategy_options import contains_eager
@@ -13,6 +30,7 @@ from sqlalchemy.orm.strategy_options import contains_eager
 from polar.auth.models import AuthSubject, Organization, User
 from polar.config import settings
 from polar.event.repository import EventRepository
+from polar.event.system import SystemEvent
 from polar.kit.db.locking import is_lock_not_available_error
 from polar.kit.math import non_negative_running_sum
 from polar.kit.pagination import PaginationParams
@@ -33,6 +51,9 @@ from polar.worker import enqueue_job
 from .repository import CustomerMeterRepository
 from .sorting import CustomerMeterSortProperty
 
+# Lower bound of the balance windows without meter reset or high-water mark
+_MIN_INGESTED_AT = datetime(1970, 1, 1, tzinfo=UTC)
+
 
 class CustomerMeterService:
     async def list(
@@ -185,6 +206,403 @@ class CustomerMeterService:
         if customer_meter.last_balanced_event_id == last_event.id:
             return customer_meter, False
 
+        await self._balance_customer_meter(
+            session, customer, meter, customer_meter, last_event
+        )
+
+        return await repository.update(customer_meter), True
+
+    async def update_customers(
+        self, session: AsyncSession, customers: Sequence[Customer]
+    ) -> set[uuid.UUID]:
+        """
+        Update the meters of several customers in one pass.
+
+        Batch counterpart of `update_customer`: the customer meters of all
+        the (customer, meter) pairs are locked with a single query, and the
+        latest event, usage and credits of each pair are retrieved with
+        grouped queries. Only the pairs with new events are balanced.
+
+        Customer meters locked by another transaction are skipped instead of
+        failing the whole batch: their customers are left untouched.
+
+        Returns the IDs of the skipped customers, to be retried.
+        """
+        if not customers:
+            return set()
+
+        meter_repository = MeterRepository.from_session(session)
+        meters = await meter_repository.get_all(
+            meter_repository.get_base_statement()
+            .where(
+                Meter.organization_id.in_({c.organization_id for c in customers}),
+                Meter.archived_at.is_(None),
+            )
+            .order_by(Meter.created_at.asc())
+        )
+        if not meters:
+            return set()
+
+        repository = CustomerMeterRepository.from_session(session)
+        customer_ids = [c.id for c in customers]
+        meter_ids = [m.id for m in meters]
+        customer_meters = await repository.get_all_by_customers_and_meters_for_update(
+            customer_ids, meter_ids
+        )
+        customer_meters_map = {
+            (cm.customer_id, cm.meter_id): cm for cm in customer_meters
+        }
+
+        existing_keys = await repository.get_customer_meter_keys(
+            customer_ids, meter_ids
+        )
+        locked_customer_ids = {
+            customer_id
+            for customer_id, meter_id in existing_keys
+            if (customer_id, meter_id) not in customer_meters_map
+        }
+        if locked_customer_ids:
+            logfire.warn(
+                "Could not obtain lock for customer meters update, will retry",
+                customer_ids=[str(customer_id) for customer_id in locked_customer_ids],
+            )
+            customers = [c for c in customers if c.id not in locked_customer_ids]
+
+        ingested_at_lower_bound = (
+            utc_now() - settings.CUSTOMER_METER_UPDATE_DEBOUNCE_MAX_THRESHOLD
+        )
+        with logfire.span("get_latest_events", customer_count=len(customers)):
+            last_events = await self._get_latest_current_window_events(
+                session, customers, meters, ingested_at_lower_bound
+            )
+
+        to_balance: list[tuple[Customer, Meter, CustomerMeter, Event]] = []
+        for customer in customers:
+            for meter in meters:
+                if meter.organization_id != customer.organization_id:
+                    continue
+
+                customer_meter = customer_meters_map.get((customer.id, meter.id))
+                if customer_meter is not None and customer_meter.activated_at is None:
+                    continue
+
+                last_event = last_events.get((customer.id, meter.id))
+
+                if customer_meter is None:
+                    customer_meter = await repository.create(
+                        CustomerMeter(
+                            customer=customer,
+                            meter=meter,
+                            activated_at=utc_now() if last_event is not None else None,
+                        )
+                    )
+
+                if last_event is None:
+                    continue
+
+                if customer_meter.last_balanced_event_id == last_event.id:
+                    continue
+
+                to_balance.append((customer, meter, customer_meter, last_event))
+
+        if to_balance:
+            with logfire.span("balance_customer_meters", pair_count=len(to_balance)):
+                await self._balance_customer_meters(session, to_balance)
+
+        await session.flush()
+
+        updated_customers = {customer.id for customer, *_ in to_balance}
+        for customer in customers:
+            if customer.id in updated_customers:
+                enqueue_job(
+                    "customer.webhook",
+                    WebhookEventType.customer_state_changed,
+                    customer.id,
+                )
+
+        return locked_customer_ids
+
+    async def _balance_customer_meters(
+        self,
+        session: AsyncSession,
+        to_balance: Sequence[tuple[Customer, Meter, CustomerMeter, Event]],
+    ) -> None:
+        """
+        Batch counterpart of `_balance_customer_meter`.
+
+        Each pair is balanced incrementally, under the same conditions as
+        `_update_balance_incrementally`, or fully recomputed. The meter resets
+        and high-water marks of all the pairs are retrieved with one query each,
+        then the usage and credits of all the customers of a meter
+        with one query each.
+        """
+        balanced_at = utc_now()
+
+        meter_resets = await self._get_latest_meter_resets(
+            session,
+            {customer.id for customer, *_ in to_balance},
+            {meter.id for _, meter, *_ in to_balance},
+        )
+        high_water_marks: dict[uuid.UUID, datetime] = {}
+        last_balanced_event_ids = {
+            customer_meter.last_balanced_event_id
+            for _, _, customer_meter, _ in to_balance
+            if customer_meter.last_balanced_event_id is not None
+        }
+        if settings.CUSTOMER_METER_INCREMENTAL_BALANCE and last_balanced_event_ids:
+            result = await session.execute(
+                select(Event.id, Event.ingested_at).where(
+                    Event.id.in_(last_balanced_event_ids)
+                )
+            )
+            high_water_marks = {
+                event_id: ingested_at for event_id, ingested_at in result
+            }
+
+        windows_by_meter: dict[uuid.UUID, list[_BalanceWindow]] = {}
+        meters_by_id: dict[uuid.UUID, Meter] = {}
+        for customer, meter, customer_meter, last_event in to_balance:
+            meter_reset = meter_resets.get((customer.id, meter.id))
+            high_water_mark = (
+                high_water_marks.get(customer_meter.last_balanced_event_id)
+                if customer_meter.last_balanced_event_id is not None
+                else None
+            )
+            incremental = (
+                high_water_mark is not None
+                and meter.aggregation.is_summable()
+                and customer_meter.last_balanced_at is not None
+                and customer_meter.last_balanced_at - high_water_mark
+                >= settings.CUSTOMER_METER_INCREMENTAL_BALANCE_SETTLE_DELAY
+                and (meter_reset is None or meter_reset <= high_water_mark)
+            )
+            meters_by_id[meter.id] = meter
+            windows_by_meter.setdefault(meter.id, []).append(
+                _BalanceWindow(
+                    customer=customer,
+                    customer_meter=customer_meter,
+                    last_event=last_event,
+                    ingested_from=meter_reset,
+                    ingested_after=high_water_mark if incremental else None,
+                )
+            )
+
+        for meter_id, windows in windows_by_meter.items():
+            meter = meters_by_id[meter_id]
+            usage_units = await self._get_usage_quantities(session, meter, windows)
+            credit_units = await self._get_credit_units(session, meter, windows)
+            for window in windows:
+                customer_meter = window.customer_meter
+                customer_units = Decimal(usage_units.get(window.customer.id, 0.0))
+                customer_credits = credit_units.get(window.customer.id, [])
+                if window.ingested_after is not None:
+                    customer_meter.consumed_units += customer_units
+                    customer_meter.credited_units = non_negative_running_sum(
+                        iter(customer_credits), initial=customer_meter.credited_units
+                    )
+                else:
+                    customer_meter.consumed_units = customer_units
+                    customer_meter.credited_units = non_negative_running_sum(
+                        iter(customer_credits)
+                    )
+                customer_meter.balance = (
+                    customer_meter.credited_units - customer_meter.consumed_units
+                )
+                customer_meter.last_balanced_event = window.last_event
+                customer_meter.last_balanced_at = balanced_at
+
+    async def _get_latest_meter_resets(
+        self,
+        session: AsyncSession,
+        customer_ids: set[uuid.UUID],
+        meter_ids: set[uuid.UUID],
+    ) -> dict[tuple[uuid.UUID, uuid.UUID], datetime]:
+        """
+        Batch counterpart of `EventRepository.get_latest_meter_reset`.
+
+        Returns a mapping from (customer_id, meter_id) to the ingestion time
+        of the latest meter reset event.
+        """
+        meter_id_column = Event.user_metadata["meter_id"].as_string()
+        statement = (
+            select(Event.customer_id, meter_id_column, Event.ingested_at)
+            .where(
+                Event.customer_id.in_(customer_ids),
+                Event.source == EventSource.system,
+                Event.name == SystemEvent.meter_reset,
+                meter_id_column.in_([str(meter_id) for meter_id in meter_ids]),
+            )
+            .distinct(Event.customer_id, meter_id_column)
+            .order_by(Event.customer_id, meter_id_column, Event.timestamp.desc())
+        )
+        result = await session.execute(statement)
+        return {
+            (customer_id, uuid.UUID(meter_id)): ingested_at
+            for customer_id, meter_id, ingested_at in result.all()
+        }
+
+    def _get_balance_windows_clause(self, windows: Any) -> ColumnElement[bool]:
+        return and_(
+            Event.ingested_at >= windows.c.ingested_from,
+            Event.ingested_at > windows.c.ingested_after,
+            Event.ingested_at <= windows.c.ingested_until,
+        )
+
+    def _get_balance_windows(
+        self, windows: Sequence["_BalanceWindow"], *, by_external_id: bool = False
+    ) -> Any:
+        """
+        Build a VALUES clause of the bounds of each window, to join the events on.
+
+        Windows without bound get sentinel values, so the clause stays sargable.
+        """
+        timestamp_type = TIMESTAMP(timezone=True)
+        return values(
+            column("customer_id", Uuid),
+            column("customer_key", String if by_external_id else Uuid),
+            column("ingested_from", timestamp_type),
+            column("ingested_after", timestamp_type),
+            column("ingested_until", timestamp_type),
+            name="external_windows" if by_external_id else "windows",
+        ).data(
+            [
+                (
+                    window.customer.id,
+                    window.customer.external_id
+                    if by_external_id
+                    else window.customer.id,
+                    window.ingested_from or _MIN_INGESTED_AT,
+                    window.ingested_after or _MIN_INGESTED_AT,
+                    window.last_event.ingested_at,
+                )
+                for window in windows
+                if not by_external_id or window.customer.external_id is not None
+            ]
+        )
+
+    async def _get_usage_quantities(
+        self,
+        session: AsyncSession,
+        meter: Meter,
+        windows: Sequence["_BalanceWindow"],
+    ) -> dict[uuid.UUID, float]:
+        """
+        Batch counterpart of `_get_usage_quantity`, aggregating the usage of
+        all the given windows of a meter in a single grouped query.
+
+        Returns a mapping from customer ID to usage quantity.
+        """
+        event_repository = EventRepository.from_session(session)
+        summable = meter.aggregation.is_summable()
+        value_column = (
+            meter.aggregation.get_sql_column(Event)
+            if summable
+            else self._get_raw_aggregation_column(meter)
+        ).label("value")
+
+        branches: list[Select[Any]] = []
+        for by_external_id in (False, True):
+            if by_external_id and all(w.customer.external_id is None for w in windows):
+                continue
+            bounds = self._get_balance_windows(windows, by_external_id=by_external_id)
+            customer_column = (
+                Event.external_customer_id if by_external_id else Event.customer_id
+            )
+            meter_clause = (
+                event_repository.get_meter_clause(meter)
+                if by_external_id
+                else or_(
+                    event_repository.get_meter_clause(meter),
+                    event_repository.get_meter_system_clause(meter),
+                )
+            )
+            branch = (
+                select(bounds.c.customer_id, value_column)
+                .select_from(Event)
+                .join(bounds, customer_column == bounds.c.customer_key)
+                .where(
+                    Event.organization_id == meter.organization_id,
+                    Event.source == EventSource.user,
+                    self._get_balance_windows_clause(bounds),
+                    meter_clause,
+                )
+            )
+            if summable:
+                branch = branch.group_by(bounds.c.customer_id)
+            branches.append(branch)
+
+        union_subquery = union_all(*branches).subquery()
+        outer_agg = (
+            func.sum(union_subquery.c.value)
+            if summable
+            else self._get_outer_aggregation(meter, union_subquery.c.value)
+        )
+        result = await session.execute(
+            select(union_subquery.c.customer_id, func.coalesce(outer_agg, 0)).group_by(
+                union_subquery.c.customer_id
+            )
+        )
+        return {customer_id: float(units or 0) for customer_id, units in result.all()}
+
+    async def _get_credit_units(
+        self,
+        session: AsyncSession,
+        meter: Meter,
+        windows: Sequence["_BalanceWindow"],
+    ) -> dict[uuid.UUID, builtins.list[int]]:
+        """
+        Batch counterpart of `_get_credit_events`, retrieving the credited units
+        of all the given windows of a meter in a single query.
+
+        Returns a mapping from customer ID to credited units, ordered by timestamp.
+        """
+        event_repository = EventRepository.from_session(session)
+        bounds = self._get_balance_windows(windows)
+        statement = (
+            select(bounds.c.customer_id, Event.user_metadata["units"].as_integer())
+            .select_from(Event)
+            .join(bounds, Event.customer_id == bounds.c.customer_key)
+            .where(
+                Event.organization_id == meter.organization_id,
+                Event.is_meter_credit.is_(True),
+                self._get_balance_windows_clause(bounds),
+                or_(
+                    event_repository.get_meter_clause(meter),
+                    event_repository.get_meter_system_clause(meter),
+                ),
+            )
+            .order_by(Event.timestamp.asc())
+        )
+        result = await session.execute(statement)
+        credit_units: dict[uuid.UUID, builtins.list[int]] = {}
+        for customer_id, units in result.all():
+            credit_units.setdefault(customer_id, []).append(units)
+        return credit_units
+
+    async def _balance_customer_meter(
+        self,
+        session: AsyncSession,
+        customer: Customer,
+        meter: Meter,
+        customer_meter: CustomerMeter,
+        last_event: Event,
+    ) -> None:
+        """
+        Compute the consumed units, credited units and balance of a customer meter
+        up to `last_event`, and mark it as the last balanced event.
+        """
+        balanced_at = utc_now()
+
+        if settings.CUSTOMER_METER_INCREMENTAL_BALANCE:
+            with logfire.span("update_balance.incremental"):
+                balanced = await self._update_balance_incrementally(
+                    session, customer, meter, customer_meter, last_event
+                )
+            if balanced:
+                customer_meter.last_balanced_event = last_event
+                customer_meter.last_balanced_at = balanced_at
+                return
+
         event_repository = EventRepository.from_session(session)
 
         with logfire.span("get_usage.old"):
@@ -241,8 +659,85 @@ class CustomerMeterService:
             customer_meter.credited_units - customer_meter.consumed_units
         )
         customer_meter.last_balanced_event = last_event
+        customer_meter.last_balanced_at = balanced_at
 
-        return await repository.update(customer_meter), True
+    async def _update_balance_incrementally(
+        self,
+        session: AsyncSession,
+        customer: Customer,
+        meter: Meter,
+        customer_meter: CustomerMeter,
+        last_event: Event,
+    ) -> bool:
+        """
+        Fold the events ingested since the last balanced event into the
+        customer meter balance, instead of re-aggregating the whole meter window.
+
+        The last balanced event acts as a high-water mark: only events ingested
+        after it, and up to `last_event`, are aggregated and added to the
+        stored consumed and credited units.
+
+        Events are timestamped at ingestion but may be committed later, so the
+        previous balance may have missed events ingested before its mark. It's
+        only trusted if it ran `CUSTOMER_METER_INCREMENTAL_BALANCE_SETTLE_DELAY`
+        after the mark, so that those events were committed by then.
+
+        Returns `False` when the balance can't be updated incrementally and needs
+        a full recompute: the customer meter was never balanced, or balanced too
+        soon after its mark, the aggregation isn't summable (MAX, MIN, AVG,
+        UNIQUE) or the meter was reset since.
+        """
+        if customer_meter.last_balanced_event_id is None:
+            return False
+
+        if not meter.aggregation.is_summable():
+            return False
+
+        high_water_mark = await session.scalar(
+            select(Event.ingested_at).where(
+                Event.id == customer_meter.last_balanced_event_id
+            )
+        )
+        if high_water_mark is None:
+            return False
+
+        if (
+            customer_meter.last_balanced_at is None
+            or customer_meter.last_balanced_at - high_water_mark
+            < settings.CUSTOMER_METER_INCREMENTAL_BALANCE_SETTLE_DELAY
+        ):
+            return False
+
+        event_repository = EventRepository.from_session(session)
+        meter_reset_event = await event_repository.get_latest_meter_reset(
+            customer, meter.id
+        )
+        if (
+            meter_reset_event is not None
+            and meter_reset_event.ingested_at > high_water_mark
+        ):
+            return False
+
+        ingested_at_range = (high_water_mark, last_event.ingested_at)
+
+        usage_units = await self._get_usage_quantity(
+            session, customer, meter, ingested_at_range=ingested_at_range
+        )
+        customer_meter.consumed_units += Decimal(usage_units)
+
+        credit_events = await self._get_credit_events(
+            customer, meter, event_repository, ingested_at_range=ingested_at_range
+        )
+        customer_meter.credited_units = non_negative_running_sum(
+            (event.user_metadata["units"] for event in credit_events),
+            initial=customer_meter.credited_units,
+        )
+
+        customer_meter.balance = (
+            customer_meter.credited_units - customer_meter.consumed_units
+        )
+
+        return True
 
     async def get_rollover_units(
         self, session: AsyncSession, customer: Customer, meter: Meter
@@ -332,6 +827,139 @@ class CustomerMeterService:
             )
             return result.scalar_one_or_none()
 
+    async def _get_latest_current_window_events(
+        self,
+        session: AsyncSession,
+        customers: Sequence[Customer],
+        meters: Sequence[Meter],
+        ingested_at_lower_bound: datetime,
+    ) -> dict[tuple[uuid.UUID, uuid.UUID], Event]:
+        """
+        Get the most recent event of each (customer, meter) pair,
+        in a single query.
+
+        Batch counterpart of `_get_latest_current_window_event`. There is no need
+        to look for meter resets: a reset is itself a meter event, so the latest
+        event is always in the current meter window.
+
+        Returns a mapping from (customer_id, meter_id) to the latest event.
+        """
+        event_repository = EventRepository.from_session(session)
+
+        branches: list[Select[Any]] = []
+        for meter in meters:
+            meter_customers = [
+                c for c in customers if c.organization_id == meter.organization_id
+            ]
+            if not meter_customers:
+                continue
+
+            columns = (
+                literal(meter.id, Uuid).label("meter_id"),
+                Event.id.label("event_id"),
+                Event.customer_id,
+                Event.external_customer_id,
+                Event.ingested_at,
+            )
+            branches.append(
+                select(*columns).where(
+                    Event.organization_id == meter.organization_id,
+                    Event.ingested_at >= ingested_at_lower_bound,
+                    Event.customer_id.in_([c.id for c in meter_customers]),
+                    or_(
+                        event_repository.get_meter_clause(meter),
+                        event_repository.get_meter_system_clause(meter),
+                    ),
+                )
+            )
+
+            external_ids = [
+                c.external_id for c in meter_customers if c.external_id is not None
+            ]
+            if external_ids:
+                branches.append(
+                    select(*columns).where(
+                        Event.organization_id == meter.organization_id,
+                        Event.ingested_at >= ingested_at_lower_bound,
+                        Event.external_customer_id.in_(external_ids),
+                        event_repository.get_meter_clause(meter),
+                    )
+                )
+
+        if not branches:
+            return {}
+
+        union_subquery = union_all(*branches).subquery()
+        statement = (
+            select(
+                union_subquery.c.meter_id,
+                union_subquery.c.event_id,
+                union_subquery.c.customer_id,
+                union_subquery.c.external_customer_id,
+                union_subquery.c.ingested_at,
+            )
+            .distinct(
+                union_subquery.c.meter_id,
+                union_subquery.c.customer_id,
+                union_subquery.c.external_customer_id,
+            )
+            .order_by(
+                union_subquery.c.meter_id,
+                union_subquery.c.customer_id,
+                union_subquery.c.external_customer_id,
+                union_subquery.c.ingested_at.desc(),
+            )
+        )
+        result = await session.execute(statement)
+
+        customers_by_id = {c.id: c for c in customers}
+        customers_by_external_id = {
+            (c.organization_id, c.external_id): c
+            for c in customers
+            if c.external_id is not None
+        }
+        meters_by_id = {m.id: m for m in meters}
+
+        latest: dict[tuple[uuid.UUID, uuid.UUID], tuple[datetime, uuid.UUID]] = {}
+        for (
+            meter_id,
+            event_id,
+            customer_id,
+            external_customer_id,
+            ingested_at,
+        ) in result.all():
+            meter = meters_by_id[meter_id]
+            matching_customers = [
+                customer
+                for customer in (
+                    customers_by_id.get(customer_id),
+                    customers_by_external_id.get(
+                        (meter.organization_id, external_customer_id)
+                    ),
+                )
+                if customer is not None
+            ]
+            for customer in matching_customers:
+                key = (customer.id, meter_id)
+                if key not in latest or ingested_at > latest[key][0]:
+                    latest[key] = (ingested_at, event_id)
+
+        if not latest:
+            return {}
+
+        events = await event_repository.get_all(
+            event_repository.get_base_statement().where(
+                Event.id.in_({event_id for _, event_id in latest.values()})
+            )
+        )
+        events_by_id = {event.id: event for event in events}
+
+        return {
+            key: events_by_id[event_id]
+            for key, (_, event_id) in latest.items()
+            if event_id in events_by_id
+        }
+
     async def _get_latest_current_window_event_new(
         self,
         session: AsyncSession,
@@ -424,12 +1052,25 @@ class CustomerMeterService:
         meter: Meter,
         meter_reset_event: Event | None,
         by_external_id: bool = False,
+        ingested_at_range: tuple[datetime, datetime] | None = None,
     ) -> Select[tuple[Event]]:
-        """Build statement for events by customer_id or external_id (no LIMIT)."""
+        """
+        Build statement for events by customer_id or external_id (no LIMIT).
+
+        If `ingested_at_range` is set, only events ingested after its lower bound
+        (exclusive) and up to its upper bound (inclusive) are selected.
+        """
         statement = event_repository.get_base_statement().where(
             Event.organization_id == meter.organization_id,
         )
 
+        if ingested_at_range is not None:
+            ingested_after, ingested_until = ingested_at_range
+            statement = statement.where(
+                Event.ingested_at > ingested_after,
+                Event.ingested_at <= ingested_until,
+            )
+
         if by_external_id:
             statement = statement.where(
                 Event.external_customer_id == customer.external_id
@@ -472,7 +1113,12 @@ class CustomerMeterService:
         return statement.order_by(Event.ingested_at.desc()).limit(1)
 
     async def _get_usage_quantity(
-        self, session: AsyncSession, customer: Customer, meter: Meter
+        self,
+        session: AsyncSession,
+        customer: Customer,
+        meter: Meter,
+        *,
+        ingested_at_range: tuple[datetime, datetime] | None = None,
     ) -> float:
         """
         Get the aggregated usage quantity for a customer's meter.
@@ -482,6 +1128,9 @@ class CustomerMeterService:
         (COUNT, SUM), we aggregate each branch and sum the results. For
         non-summable aggregations (MAX, MIN, AVG, UNIQUE), we aggregate over
         the raw values from the union.
+
+        If `ingested_at_range` is set, only the events ingested in this range
+        are aggregated.
         """
         event_repository = EventRepository.from_session(session)
         meter_reset_event = await event_repository.get_latest_meter_reset(
@@ -491,7 +1140,12 @@ class CustomerMeterService:
         agg_column = func.coalesce(meter.aggregation.get_sql_column(Event), 0)
 
         by_customer_id = self._build_events_statement(
-            event_repository, customer, meter, meter_reset_event, by_external_id=False
+            event_repository,
+            customer,
+            meter,
+            meter_reset_event,
+            by_external_id=False,
+            ingested_at_range=ingested_at_range,
         ).where(Event.source == EventSource.user)
 
         if customer.external_id is None:
@@ -499,7 +1153,12 @@ class CustomerMeterService:
             return result or 0.0
 
         by_external_id = self._build_events_statement(
-            event_repository, customer, meter, meter_reset_event, by_external_id=True
+            event_repository,
+            customer,
+            meter,
+            meter_reset_event,
+            by_external_id=True,
+            ingested_at_range=ingested_at_range,
         ).where(Event.source == EventSource.user)
 
         if meter.aggregation.is_summable():
@@ -556,12 +1215,17 @@ class CustomerMeterService:
         customer: Customer,
         meter: Meter,
         event_repository: EventRepository,
+        *,
+        ingested_at_range: tuple[datetime, datetime] | None = None,
     ) -> Sequence[Event]:
         """
         Get credit events for a customer's meter.
 
         System events (meter.credited, meter.reset) are always created with
         customer_id, never external_customer_id, so no UNION is needed.
+
+        If `ingested_at_range` is set, only the events ingested in this range
+        are returned.
         """
         meter_reset_event = await event_repository.get_latest_meter_reset(
             customer, meter.id
@@ -574,6 +1238,7 @@ class CustomerMeterService:
                 meter,
                 meter_reset_event,
                 by_external_id=False,
+                ingested_at_range=ingested_at_range,
             )
             .where(Event.is_meter_credit.is_(True))
             .order_by(Event.timestamp.asc())
@@ -651,4 +1316,21 @@ class CustomerMeterService:
         return await event_repository.get_all(statement)
 
 
+@dataclasses.dataclass(slots=True)
+class _BalanceWindow:
+    """
+    Events window to balance a customer meter on, for `update_customers`.
+
+    `ingested_from` is the ingestion time of the latest meter reset, if any.
+    `ingested_after` is the high-water mark of an incremental balance,
+    `None` for a full recompute.
+    """
+
+    customer: Customer
+    customer_meter: CustomerMeter
+    last_event: Event
+    ingested_from: datetime | None
+    ingested_after: datetime | None
+
+
 customer_meter = CustomerMeterService()
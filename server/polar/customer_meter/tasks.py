@@ -5,7 +5,14 @@ from opentelemetry import trace
 from polar.config import settings
 from polar.customer.repository import CustomerRepository
 from polar.exceptions import PolarTaskError
-from polar.worker import AsyncSessionMaker, TaskPriority, actor
+from polar.models import Customer
+from polar.worker import (
+    AsyncSessionMaker,
+    TaskPriority,
+    actor,
+    enqueue_job,
+    get_debounced_items,
+)
 
 from .service import customer_meter as customer_meter_service
 
@@ -48,3 +55,59 @@ async def update_customer(customer_id: uuid.UUID) -> None:
         span.set_attribute("organization_id", str(customer.organization_id))
 
         await customer_meter_service.update_customer(session, customer)
+
+
+def _update_customers_debounce_keys(customer_ids: list[uuid.UUID]) -> list[str]:
+    return [
+        f"customer_meter.update_customers:{customer_id}" for customer_id in customer_ids
+    ]
+
+
+@actor(
+    actor_name="customer_meter.update_customers",
+    priority=TaskPriority.LOW,
+    max_retries=1,
+    min_backoff=30_000,
+    debounce_keys=_update_customers_debounce_keys,
+    debounce_min_threshold=int(
+        settings.CUSTOMER_METER_UPDATE_DEBOUNCE_MIN_THRESHOLD.total_seconds()
+    ),
+    debounce_max_threshold=int(
+        settings.CUSTOMER_METER_UPDATE_DEBOUNCE_MAX_THRESHOLD.total_seconds()
+    ),
+)
+async def update_customers(customer_ids: list[uuid.UUID]) -> None:
+    # Customers are debounced one by one: only update the ones
+    # not enqueued again in another message since this one.
+    debounced_keys = get_debounced_items()
+    if debounced_keys is not None:
+        owned_keys = set(debounced_keys)
+        customer_ids = [
+            customer_id
+            for customer_id, key in zip(
+                customer_ids, _update_customers_debounce_keys(customer_ids)
+            )
+            if key in owned_keys
+        ]
+
+    async with AsyncSessionMaker() as session:
+        repository = CustomerRepository.from_session(session)
+        customers = await repository.get_all(
+            repository.get_base_statement()
+            .where(Customer.id.in_(customer_ids))
+            .order_by(Customer.id)
+        )
+
+        span = trace.get_current_span()
+        span.set_attribute(
+            "organization_ids",
+            list({str(customer.organization_id) for customer in customers}),
+        )
+
+        locked_customer_ids = await customer_meter_service.update_customers(
+            session, customers
+        )
+
+    # Retry the customers whose meters are being updated concurrently
+    if locked_customer_ids:
+        enqueue_job("customer_meter.update_customers", sorted(locked_customer_ids))
@@ -26,6 +26,7 @@ from polar.license_key.service import license_key as license_key_service
 from polar.models import LicenseKey, LicenseKeyActivation
 from polar.openapi import APITag
 from polar.postgres import get_db_session
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
 from .. import auth
@@ -100,6 +101,7 @@ async def get(
 async def validate(
     validate: LicenseKeyValidate,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> LicenseKey:
     """
      Validate a license key.
@@ -115,7 +117,7 @@ async def validate(
         key=validate.key,
     )
     return await license_key_service.validate(
-        session, license_key=license_key, validate=validate
+        session, redis, license_key=license_key, validate=validate
     )
 
 
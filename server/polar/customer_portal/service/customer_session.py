@@ -12,7 +12,7 @@ from polar.customer_portal.repository.customer_session_code import (
     CustomerSessionCodeRepository,
 )
 from polar.customer_session.service import customer_session as customer_session_service
-from polar.email.react import render_email_template
+from polar.email.react import render_email_template_async
 from polar.email.schemas import CustomerSessionCodeEmail, CustomerSessionCodeProps
 from polar.email.sender import enqueue_email
 from polar.exceptions import PolarError
@@ -189,7 +189,7 @@ class CustomerSessionService:
         delta = customer_session_code.expires_at - utc_now()
         code_lifetime_minutes = int(ceil(delta.seconds / 60))
 
-        body = render_email_template(
+        body = await render_email_template_async(
             CustomerSessionCodeEmail(
                 props=CustomerSessionCodeProps.model_validate(
                     {
@@ -19,7 +19,7 @@ are NOT self-contained and still get the marketing chrome.
 
 import re
 
-from polar.email.react import render_email_template
+from polar.email.react import render_email_template_async
 from polar.email.schemas import MarketingEmail, MarketingEmailProps
 
 
@@ -80,7 +80,7 @@ def force_light_color_scheme(html: str) -> str:
     return html
 
 
-def finalize_email_html(
+async def finalize_email_html(
     content_html: str,
     *,
     unsubscribe_url: str,
@@ -100,7 +100,7 @@ def finalize_email_html(
         return force_light_color_scheme(content_html).replace(
             "{{unsubscribe_url}}", unsubscribe_url
         )
-    return render_email_template(
+    return await render_email_template_async(
         MarketingEmail(
             props=MarketingEmailProps(
                 organization_name=organization_name,
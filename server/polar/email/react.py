@@ -1,12 +1,25 @@
+import asyncio
+import itertools
+import json
 import re
 import subprocess
-from typing import TYPE_CHECKING
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import structlog
 
 from polar.config import settings
+from polar.logging import Logger
 
 if TYPE_CHECKING:
     from .schemas import Email
 
+log: Logger = structlog.get_logger()
+
+
+class EmailRendererError(Exception):
+    pass
+
 
 def _transform_avatar_urls_for_email(props_json: str) -> str:
     """Transform logo.dev avatar URLs to use monogram fallback instead of 404."""
@@ -17,15 +30,17 @@ def _transform_avatar_urls_for_email(props_json: str) -> str:
     )
 
 
-def render_email_template(email: "Email") -> str:
+def _get_props_json(email: "Email") -> str:
     props_json = email.props.model_dump_json()
-    props_json = _transform_avatar_urls_for_email(props_json)
+    return _transform_avatar_urls_for_email(props_json)
 
+
+def render_email_template(email: "Email") -> str:
     process = subprocess.Popen(
         [
             settings.EMAIL_RENDERER_BINARY_PATH,
             email.template,
-            props_json,
+            _get_props_json(email),
         ],
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
@@ -36,4 +51,235 @@ def render_email_template(email: "Email") -> str:
     return stdout.decode("utf-8")
 
 
-__all__ = ["render_email_template"]
+# Rendered emails are written on a single line: allow large ones
+_STREAM_LIMIT = 32 * 1024 * 1024
+
+
+class _RendererProcess:
+    """
+    A renderer process started in serve mode.
+
+    Requests and responses are line-delimited JSON, matched by ID,
+    so several renders can be in flight on the same process.
+    """
+
+    def __init__(self, binary_path: Path) -> None:
+        self._binary_path = binary_path
+        self._process: asyncio.subprocess.Process | None = None
+        self._reader: asyncio.Task[None] | None = None
+        self._pending: dict[int, asyncio.Future[str]] = {}
+        self._ids = itertools.count()
+        self.renders = 0
+
+    @property
+    def alive(self) -> bool:
+        return (
+            self._process is not None
+            and self._process.returncode is None
+            and self._reader is not None
+            and not self._reader.done()
+        )
+
+    async def start(self) -> None:
+        self._process = await asyncio.create_subprocess_exec(
+            self._binary_path,
+            "--serve",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=_STREAM_LIMIT,
+        )
+        self._reader = asyncio.create_task(self._read())
+        self.renders = 0
+        log.debug("Started email renderer process", pid=self._process.pid)
+
+    async def stop(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._process is not None and self._process.returncode is None:
+            self._process.kill()
+            await self._process.wait()
+        self._fail_pending(EmailRendererError("Email renderer process stopped"))
+
+    async def retire(self, timeout: float) -> None:
+        """
+        Stop the process gracefully: closing its input lets it finish
+        the renders in flight, then exit.
+        """
+        if self._process is None or self._process.stdin is None:
+            return
+        self._process.stdin.close()
+        try:
+            await asyncio.wait_for(self._process.wait(), timeout)
+        except TimeoutError:
+            pass
+        await self.stop()
+
+    async def render(self, template: str, props_json: str, timeout: float) -> str:
+        assert self._process is not None
+        assert self._process.stdin is not None
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self.renders += 1
+
+        # Props are already serialized: splice them instead of decoding them
+        request = (
+            f'{{"id": {request_id}, "template": {json.dumps(template)}, '
+            f'"props": {props_json}}}\n'
+        )
+        try:
+            self._process.stdin.write(request.encode("utf-8"))
+            await self._process.stdin.drain()
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _read(self) -> None:
+        assert self._process is not None
+        assert self._process.stdout is not None
+        try:
+            while line := await self._process.stdout.readline():
+                response: dict[str, Any] = json.loads(line)
+                future = self._pending.get(response["id"])
+                if future is None or future.done():
+                    continue
+                if "error" in response:
+                    future.set_exception(EmailRendererError(response["error"]))
+                else:
+                    future.set_result(response["html"])
+        except (ValueError, KeyError) as e:
+            log.warning("Invalid email renderer response", error=str(e))
+        finally:
+            self._fail_pending(EmailRendererError("Email renderer process exited"))
+
+    def _fail_pending(self, exception: Exception) -> None:
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(exception)
+        self._pending.clear()
+
+
+class EmailRendererPool:
+    """
+    Pool of persistent renderer processes.
+
+    Render requests go through a bounded queue, consumed by a fixed number of
+    workers per process: when the queue is full, callers wait.
+    A process is restarted when it dies, times out,
+    or after `max_renders_per_process` renders.
+    """
+
+    def __init__(
+        self,
+        *,
+        binary_path: Path = settings.EMAIL_RENDERER_BINARY_PATH,
+        size: int = settings.EMAIL_RENDERER_POOL_SIZE,
+        max_pending: int = settings.EMAIL_RENDERER_POOL_MAX_PENDING,
+        timeout: float = settings.EMAIL_RENDERER_TIMEOUT_SECONDS,
+        max_renders_per_process: int = settings.EMAIL_RENDERER_MAX_RENDERS_PER_PROCESS,
+        concurrency_per_process: int = 4,
+    ) -> None:
+        self.loop = asyncio.get_running_loop()
+        self._timeout = timeout
+        self._max_renders_per_process = max_renders_per_process
+        self._binary_path = binary_path
+        self._queue: asyncio.Queue[tuple[str, str, asyncio.Future[str]]] = (
+            asyncio.Queue(max_pending)
+        )
+        self._processes = [_RendererProcess(binary_path) for _ in range(size)]
+        self._retiring: set[asyncio.Task[None]] = set()
+        self._locks = [asyncio.Lock() for _ in range(size)]
+        self._workers = [
+            asyncio.create_task(self._work(index))
+            for index in range(size)
+            for _ in range(concurrency_per_process)
+        ]
+
+    async def render(self, template: str, props_json: str) -> str:
+        future: asyncio.Future[str] = self.loop.create_future()
+        await self._queue.put((template, props_json, future))
+        return await future
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        for process in self._processes:
+            await process.stop()
+        for task in self._retiring:
+            task.cancel()
+
+    async def _get_process(self, index: int) -> _RendererProcess:
+        async with self._locks[index]:
+            process = self._processes[index]
+            if process.renders >= self._max_renders_per_process:
+                log.debug("Recycling email renderer process")
+                retiring = asyncio.create_task(process.retire(self._timeout))
+                self._retiring.add(retiring)
+                retiring.add_done_callback(self._retiring.discard)
+                process = self._processes[index] = _RendererProcess(self._binary_path)
+            if not process.alive:
+                await process.stop()
+                await process.start()
+        return process
+
+    async def _work(self, index: int) -> None:
+        while True:
+            template, props_json, future = await self._queue.get()
+            try:
+                if future.done():
+                    continue
+                process = await self._get_process(index)
+                try:
+                    html = await process.render(template, props_json, self._timeout)
+                except TimeoutError:
+                    log.warning("Email renderer timed out, restarting it")
+                    await process.stop()
+                    raise EmailRendererError("Email renderer timed out")
+                future.set_result(html)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+
+_pool: EmailRendererPool | None = None
+
+
+def _get_pool() -> EmailRendererPool:
+    global _pool
+    # Pools are bound to the event loop they were created in
+    if _pool is None or _pool.loop is not asyncio.get_running_loop():
+        _pool = EmailRendererPool()
+    return _pool
+
+
+async def render_email_template_async(email: "Email") -> str:
+    """
+    Render an email template through the pool of persistent renderer processes.
+
+    Unlike `render_email_template`, it doesn't spawn a process per email
+    nor block the event loop.
+    """
+    return await _get_pool().render(email.template, _get_props_json(email))
+
+
+async def close_email_renderer_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+__all__ = [
+    "EmailRendererError",
+    "EmailRendererPool",
+    "close_email_renderer_pool",
+    "render_email_template",
+    "render_email_template_async",
+]
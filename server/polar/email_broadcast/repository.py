@@ -1,10 +1,24 @@
 from datetime import date, datetime, timedelta
+from typing import Any
 from uuid import UUID
 
-from sqlalchemy import Date, Select, cast, func, select, update
+from sqlalchemy import (
+    ColumnElement,
+    Date,
+    Select,
+    case,
+    cast,
+    func,
+    literal,
+    null,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
 
 from polar.auth.models import AuthSubject, Organization, User, is_organization, is_user
 from polar.kit.repository import RepositoryBase, RepositorySoftDeletionMixin
+from polar.kit.utils import utc_now
 from polar.models import UserOrganization
 from polar.models.email_broadcast import EmailBroadcast, EmailBroadcastStatus
 from polar.models.email_broadcast_ab_test import EmailBroadcastABTest
@@ -52,6 +66,81 @@ class EmailBroadcastRepository(
         result = await self.session.execute(statement)
         return list(result.scalars().all())
 
+    async def create_sends_from_audience(
+        self,
+        broadcast_id: UUID,
+        audience: Select[tuple[UUID]],
+        *,
+        ab_slice_pct: int | None = None,
+    ) -> int:
+        """Materialize pending send rows for an audience, in a single query.
+
+        `audience` selects subscriber IDs; rows are inserted with
+        `INSERT … SELECT` so subscribers are never loaded in Python. With
+        `ab_slice_pct`, a random slice of the audience (at least 2) is split
+        between variants 'a' and 'b'; the remainder keeps a null variant
+        until the winner is picked.
+
+        Returns the number of send rows of the broadcast.
+        """
+        audience_subquery = audience.distinct().subquery()
+        subscriber_id = audience_subquery.c[0]
+
+        variant: ColumnElement[Any] = null()
+        if ab_slice_pct is not None:
+            ranked = select(
+                subscriber_id.label("subscriber_id"),
+                func.row_number().over(order_by=func.random()).label("rank"),
+                func.count().over().label("total"),
+            ).subquery()
+            slice_size = func.least(
+                ranked.c.total,
+                func.greatest(2, func.floor(ranked.c.total * ab_slice_pct / 100.0)),
+            )
+            variant = case(
+                (ranked.c.rank <= func.floor(slice_size / 2), literal("a")),
+                (ranked.c.rank <= slice_size, literal("b")),
+                else_=null(),
+            )
+            subscriber_id = ranked.c.subscriber_id
+
+        now = utc_now()
+        statement = (
+            insert(EmailBroadcastSend)
+            .from_select(
+                [
+                    "id",
+                    "created_at",
+                    "broadcast_id",
+                    "subscriber_id",
+                    "status",
+                    "variant",
+                    "open_count",
+                    "click_count",
+                ],
+                select(
+                    func.gen_random_uuid(),
+                    literal(now),
+                    literal(broadcast_id),
+                    subscriber_id,
+                    literal(EmailBroadcastSendStatus.pending.value),
+                    variant,
+                    literal(0),
+                    literal(0),
+                ),
+            )
+            .on_conflict_do_nothing(
+                constraint="email_broadcast_sends_broadcast_sub_key"
+            )
+        )
+        await self.session.execute(statement)
+
+        count_statement = select(func.count(EmailBroadcastSend.id)).where(
+            EmailBroadcastSend.broadcast_id == broadcast_id,
+            EmailBroadcastSend.deleted_at.is_(None),
+        )
+        return (await self.session.execute(count_statement)).scalar_one()
+
     async def get_analytics_counts_for_broadcasts(
         self, broadcast_ids: list[UUID]
     ) -> dict[UUID, dict[str, int]]:
@@ -1,8 +1,9 @@
-import random
 from collections.abc import Sequence
 from datetime import datetime, timedelta
 from uuid import UUID
 
+from sqlalchemy import Select, select
+
 from polar.auth.models import AuthSubject, Organization, User
 from polar.entitlements.service import entitlements as entitlements_service
 from polar.exceptions import PolarError
@@ -10,11 +11,8 @@ from polar.kit.pagination import PaginationParams
 from polar.kit.utils import utc_now
 from polar.models.email_broadcast import EmailBroadcast, EmailBroadcastStatus
 from polar.models.email_broadcast_ab_test import EmailBroadcastABTest
-from polar.models.email_broadcast_send import (
-    EmailBroadcastSend,
-    EmailBroadcastSendStatus,
-)
-from polar.models.email_subscriber import EmailSubscriber
+from polar.models.email_broadcast_send import EmailBroadcastSendStatus
+from polar.models.email_subscriber import EmailSubscriber, EmailSubscriberStatus
 from polar.postgres import AsyncReadSession, AsyncSession
 from polar.worker import enqueue_job
 
@@ -388,44 +386,28 @@ class EmailBroadcastService:
         repository = EmailBroadcastRepository.from_session(session)
 
         # Audience precedence: inline filter_rules → saved segment → all active.
+        # Each source compiles to a select of subscriber IDs, materialized
+        # into send rows by the database without loading subscribers.
+        audience: Select[tuple[UUID]] | None
         if broadcast.filter_rules:
-            from polar.email_subscriber.service import (
-                email_subscriber as subscriber_service,
-            )
+            from polar.email_subscriber.repository import build_filter_query
 
-            subscribers = await subscriber_service.resolve_filter_subscribers(
-                session,
-                organization_id=broadcast.organization_id,
-                filter_rules=broadcast.filter_rules,
-            )
+            filter_subquery = build_filter_query(
+                broadcast.organization_id, broadcast.filter_rules
+            ).subquery()
+            audience = select(filter_subquery.c.id)
         elif broadcast.segment_id is not None:
-            from polar.email_segment.service import email_segment as segment_service
+            from polar.email_segment.repository import EmailSegmentRepository
             from polar.models.email_segment import EmailSegment
 
             segment = await session.get(EmailSegment, broadcast.segment_id)
             if segment is not None:
-                subscriber_ids = await segment_service.get_subscriber_ids(
-                    session, segment
-                )
-                subscribers = []
-                for sid in subscriber_ids:
-                    sub = await session.get(EmailSubscriber, sid)
-                    if sub is not None:
-                        subscribers.append(sub)
+                segment_repository = EmailSegmentRepository.from_session(session)
+                audience = segment_repository.get_subscriber_ids_statement(segment)
             else:
-                subscribers = await repository.get_active_subscribers_for_org(
-                    broadcast.organization_id
-                )
+                audience = self._get_active_audience(broadcast.organization_id)
         else:
-            subscribers = await repository.get_active_subscribers_for_org(
-                broadcast.organization_id
-            )
-
-        if not subscribers:
-            broadcast.status = EmailBroadcastStatus.sent
-            broadcast.sent_at = utc_now()
-            broadcast.total_recipients = 0
-            return await repository.update(broadcast)
+            audience = self._get_active_audience(broadcast.organization_id)
 
         # Did the user configure an A/B test? If so, only the test slice gets
         # variant labels right now; the remainder stays variant=null and is
@@ -434,61 +416,46 @@ class EmailBroadcastService:
         ab_test = await ab_repo.get_by_broadcast(broadcast.id)
         ab_active = ab_test is not None and ab_test.winner_picked_at is None
 
+        total_recipients = 0
+        if audience is not None:
+            total_recipients = await repository.create_sends_from_audience(
+                broadcast.id,
+                audience,
+                ab_slice_pct=(
+                    ab_test.slice_pct if ab_active and ab_test is not None else None
+                ),
+            )
+
+        if total_recipients == 0:
+            broadcast.status = EmailBroadcastStatus.sent
+            broadcast.sent_at = utc_now()
+            broadcast.total_recipients = 0
+            return await repository.update(broadcast)
+
         if ab_active and ab_test is not None:
-            shuffled = list(subscribers)
-            random.shuffle(shuffled)
-            slice_size = max(2, int(len(shuffled) * (ab_test.slice_pct / 100)))
-            slice_size = min(slice_size, len(shuffled))
-            test_slice = shuffled[:slice_size]
-            remainder = shuffled[slice_size:]
-            half = len(test_slice) // 2
-            for i, subscriber in enumerate(test_slice):
-                variant = "a" if i < half else "b"
-                session.add(
-                    EmailBroadcastSend(
-                        broadcast_id=broadcast.id,
-                        subscriber_id=subscriber.id,
-                        status=EmailBroadcastSendStatus.pending,
-                        variant=variant,
-                    )
-                )
-            for subscriber in remainder:
-                session.add(
-                    EmailBroadcastSend(
-                        broadcast_id=broadcast.id,
-                        subscriber_id=subscriber.id,
-                        status=EmailBroadcastSendStatus.pending,
-                        variant=None,
-                    )
-                )
             ab_test.test_sent_at = utc_now()
-        else:
-            for subscriber in subscribers:
-                session.add(
-                    EmailBroadcastSend(
-                        broadcast_id=broadcast.id,
-                        subscriber_id=subscriber.id,
-                        status=EmailBroadcastSendStatus.pending,
-                    )
-                )
 
         broadcast.status = EmailBroadcastStatus.sending
-        broadcast.total_recipients = len(subscribers)
+        broadcast.total_recipients = total_recipients
         await repository.update(broadcast)
 
-        # Flush to persist send records
-        await session.flush()
-
         # Worker dispatch. For A/B we only release the test slice now; the
         # winner-picker cron releases the remainder once it has data.
-        enqueue_job(
-            "email_broadcast.send_emails",
-            broadcast_id=broadcast.id,
-            variant_filter="ab_test_only" if ab_active else None,
+        from .tasks import enqueue_send_emails
+
+        enqueue_send_emails(
+            broadcast.id, variant_filter="ab_test_only" if ab_active else None
         )
 
         return broadcast
 
+    def _get_active_audience(self, organization_id: UUID) -> Select[tuple[UUID]]:
+        return select(EmailSubscriber.id).where(
+            EmailSubscriber.organization_id == organization_id,
+            EmailSubscriber.status == EmailSubscriberStatus.active,
+            EmailSubscriber.deleted_at.is_(None),
+        )
+
     async def schedule(
         self,
         session: AsyncSession,
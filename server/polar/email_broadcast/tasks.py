@@ -1,9 +1,13 @@
+import asyncio
+import time
+from collections.abc import Coroutine
 from typing import Any
 from uuid import UUID, uuid4
 
 import structlog
-from sqlalchemy import select
+from sqlalchemy import Select, select
 
+from polar.config import settings
 from polar.email.compose import finalize_email_html
 from polar.email.personalize import build_variables
 from polar.email.personalize import render as personalize
@@ -18,9 +22,11 @@ from polar.models.email_broadcast_send import (
 )
 from polar.models.email_subscriber import EmailSubscriber
 from polar.models.organization import Organization
+from polar.redis import Redis
 from polar.worker import (
     AsyncSessionMaker,
     CronTrigger,
+    RedisMiddleware,
     TaskPriority,
     actor,
     enqueue_job,
@@ -29,7 +35,7 @@ from polar.worker import (
 log = structlog.get_logger()
 
 
-def _render_broadcast_html(
+async def _render_broadcast_html(
     broadcast: EmailBroadcast,
     organization: Organization | None,
     *,
@@ -50,7 +56,7 @@ def _render_broadcast_html(
         # otherwise wipe it as an unknown token.
         personalize_vars = {**personalize_vars, "unsubscribe_url": unsubscribe_url}
         body_html = personalize(body_html, personalize_vars, html=True)
-    return finalize_email_html(
+    return await finalize_email_html(
         body_html,
         unsubscribe_url=unsubscribe_url,
         organization_name=organization.name if organization else broadcast.sender_name,
@@ -85,7 +91,7 @@ async def send_broadcast_email(
         personalize_vars = build_variables(
             subscriber=subscriber, custom_fields=custom_fields
         )
-    wrapped_html = _render_broadcast_html(
+    wrapped_html = await _render_broadcast_html(
         broadcast,
         organization,
         unsubscribe_url=unsubscribe_url,
@@ -131,6 +137,69 @@ async def send_broadcast_email(
     )
 
 
+# Pending sends claimed, prefetched and committed together by a shard.
+SEND_CHUNK_SIZE = 500
+
+
+def enqueue_send_emails(
+    broadcast_id: UUID, variant_filter: str | None = None
+) -> None:
+    """Dispatch the sender shards of a broadcast.
+
+    Shards claim disjoint chunks of pending sends, so they can run in
+    parallel on several workers.
+    """
+    for _ in range(settings.EMAIL_BROADCAST_SEND_SHARDS):
+        enqueue_job(
+            "email_broadcast.send_emails",
+            broadcast_id=broadcast_id,
+            variant_filter=variant_filter,
+        )
+
+
+async def _wait_send_rate(redis: Redis, organization_id: UUID) -> None:
+    """Block until the organization is under its broadcast send rate.
+
+    Fixed one-second windows counted in Redis, so the rate holds across
+    every shard and worker sending for the organization.
+    """
+    rate = settings.EMAIL_BROADCAST_SEND_RATE_PER_SECOND
+    while True:
+        window = int(time.time())
+        key = f"email_broadcast:send_rate:{organization_id}:{window}"
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.incr(key)
+            pipe.expire(key, 2)
+            count, _ = await pipe.execute()
+        if count <= rate:
+            return
+        await asyncio.sleep(max(window + 1 - time.time(), 0))
+
+
+def _claim_statement(
+    broadcast_id: UUID, variant_filter: str | None
+) -> Select[tuple[EmailBroadcastSend]]:
+    statement = (
+        select(EmailBroadcastSend)
+        .where(
+            EmailBroadcastSend.broadcast_id == broadcast_id,
+            EmailBroadcastSend.status == EmailBroadcastSendStatus.pending,
+        )
+        .order_by(EmailBroadcastSend.id)
+        .limit(SEND_CHUNK_SIZE)
+        # Rows claimed by another shard are skipped, not waited for.
+        .with_for_update(skip_locked=True)
+    )
+    if variant_filter == "ab_test_only":
+        statement = statement.where(EmailBroadcastSend.variant.in_(["a", "b"]))
+    elif variant_filter == "remainder":
+        # The remainder gets sent the winning variant's subject. Skip
+        # rows that don't have a variant yet (winner not picked) and
+        # rows already handled in the initial test slice (status != pending).
+        statement = statement.where(EmailBroadcastSend.variant.is_not(None))
+    return statement
+
+
 @actor(actor_name="email_broadcast.send_emails", priority=TaskPriority.MEDIUM)
 async def send_emails(
     broadcast_id: UUID, variant_filter: str | None = None
@@ -144,7 +213,18 @@ async def send_emails(
         a winner).
       - "remainder": only rows with a variant set by the winner-picker
         (i.e. excludes the test slice that already went out).
+
+    Several invocations run as shards (see `enqueue_send_emails`). Each one
+    claims chunks of pending sends with `FOR UPDATE SKIP LOCKED`, sends them
+    concurrently and commits the chunk, so progress survives a retry and
+    no transaction spans the whole audience.
     """
+    from polar.email_sequence.custom_fields import list_fields_many
+    from polar.email_subscriber.unsubscribe_token import build_unsubscribe_url
+
+    redis = RedisMiddleware.get()
+    semaphore = asyncio.Semaphore(settings.EMAIL_BROADCAST_SEND_CONCURRENCY)
+
     async with AsyncSessionMaker() as session:
         broadcast = await session.get(EmailBroadcast, broadcast_id)
         if broadcast is None or broadcast.status != EmailBroadcastStatus.sending:
@@ -168,74 +248,84 @@ async def send_emails(
         )
         ab_test = (await session.execute(ab_stmt)).scalar_one_or_none()
 
-        statement = select(EmailBroadcastSend).where(
-            EmailBroadcastSend.broadcast_id == broadcast_id,
-            EmailBroadcastSend.status == EmailBroadcastSendStatus.pending,
-        )
-        if variant_filter == "ab_test_only":
-            statement = statement.where(EmailBroadcastSend.variant.in_(["a", "b"]))
-        elif variant_filter == "remainder":
-            # The remainder gets sent the winning variant's subject. Skip
-            # rows that don't have a variant yet (winner not picked) and
-            # rows already handled in the initial test slice (status != pending).
-            statement = statement.where(EmailBroadcastSend.variant.is_not(None))
-        result = await session.execute(statement)
-        sends = result.scalars().all()
-
-        for send in sends:
-            subscriber = await session.get(EmailSubscriber, send.subscriber_id)
-            if subscriber is None:
-                send.status = EmailBroadcastSendStatus.failed
-                continue
-
+        async def _send(
+            send: EmailBroadcastSend,
+            subscriber: EmailSubscriber,
+            custom_fields: dict[str, str | None],
+        ) -> None:
             subject_override: str | None = None
             if ab_test is not None and send.variant == "b":
                 subject_override = ab_test.subject_b
 
-            try:
-                from polar.email_subscriber.unsubscribe_token import (
-                    build_unsubscribe_url,
-                )
-
-                unsubscribe_url = build_unsubscribe_url(send.subscriber_id)
-                # Load custom fields for ``{{custom.X}}`` substitution.
-                from polar.email_sequence.custom_fields import list_fields
-
-                custom_fields = await list_fields(session, subscriber.id)
-                resend_email_id = await send_broadcast_email(
-                    broadcast,
-                    organization,
-                    to_email=subscriber.email,
-                    unsubscribe_url=unsubscribe_url,
-                    subject_override=subject_override,
-                    send_id=send.id,
-                    variant=send.variant,
-                    subscriber=subscriber,
-                    custom_fields=custom_fields,
-                )
-                send.status = EmailBroadcastSendStatus.sent
-                send.sent_at = utc_now()
-                if resend_email_id:
-                    send.resend_email_id = resend_email_id
-                # Flush makes the row visible within this session, and
-                # narrows the post-commit visibility gap for the webhook
-                # worker (another process) — though only the per-batch
-                # commit makes it truly readable cross-process. The
-                # deferred-resolve queue in the webhook handler closes
-                # the remaining race when a sub-second Resend event
-                # lands before the batch commits.
-                await session.flush()
-            except Exception:
-                log.exception(
-                    "email_broadcast.send_failed",
-                    broadcast_id=str(broadcast_id),
-                    subscriber_id=str(send.subscriber_id),
-                )
-                send.status = EmailBroadcastSendStatus.failed
+            async with semaphore:
+                await _wait_send_rate(redis, organization.id)
+                try:
+                    resend_email_id = await send_broadcast_email(
+                        broadcast,
+                        organization,
+                        to_email=subscriber.email,
+                        unsubscribe_url=build_unsubscribe_url(send.subscriber_id),
+                        subject_override=subject_override,
+                        send_id=send.id,
+                        variant=send.variant,
+                        subscriber=subscriber,
+                        custom_fields=custom_fields,
+                    )
+                except Exception:
+                    log.exception(
+                        "email_broadcast.send_failed",
+                        broadcast_id=str(broadcast_id),
+                        subscriber_id=str(send.subscriber_id),
+                    )
+                    send.status = EmailBroadcastSendStatus.failed
+                    return
+
+            send.status = EmailBroadcastSendStatus.sent
+            send.sent_at = utc_now()
+            if resend_email_id:
+                send.resend_email_id = resend_email_id
+
+        claim_statement = _claim_statement(broadcast_id, variant_filter)
+        while True:
+            sends = (await session.execute(claim_statement)).scalars().all()
+            if not sends:
+                break
+
+            subscriber_ids = [send.subscriber_id for send in sends]
+            subscribers_result = await session.execute(
+                select(EmailSubscriber).where(EmailSubscriber.id.in_(subscriber_ids))
+            )
+            subscribers = {
+                subscriber.id: subscriber
+                for subscriber in subscribers_result.scalars().all()
+            }
+            # Custom fields drive ``{{custom.X}}`` substitution.
+            custom_fields = await list_fields_many(session, list(subscribers))
+
+            tasks: list[Coroutine[Any, Any, None]] = []
+            for send in sends:
+                subscriber = subscribers.get(send.subscriber_id)
+                if subscriber is None:
+                    send.status = EmailBroadcastSendStatus.failed
+                    continue
+                tasks.append(_send(send, subscriber, custom_fields[subscriber.id]))
+            await asyncio.gather(*tasks)
+
+            # Releases the claimed rows and makes them readable by the
+            # Resend webhook worker. The deferred-resolve queue in the
+            # webhook handler closes the race when a sub-second Resend
+            # event lands before the chunk commits.
+            await session.commit()
+
+            # Stop early if the broadcast was cancelled in the meantime.
+            await session.refresh(broadcast)
+            if broadcast.status != EmailBroadcastStatus.sending:
+                return
 
         # Only mark the broadcast finished when there's nothing left pending.
         # During an A/B test the remainder stays pending until the cron job
-        # releases it.
+        # releases it. Rows still claimed by another shard count as pending:
+        # the last shard to finish marks the broadcast.
         remaining_stmt = select(EmailBroadcastSend.id).where(
             EmailBroadcastSend.broadcast_id == broadcast_id,
             EmailBroadcastSend.status == EmailBroadcastSendStatus.pending,
@@ -534,8 +624,4 @@ async def pick_ab_winner(ab_test_id: UUID) -> None:
 
         # Release the remainder. The send worker will only pick up rows that
         # are still pending and now have a non-null variant.
-        enqueue_job(
-            "email_broadcast.send_emails",
-            broadcast_id=ab_test.broadcast_id,
-            variant_filter="remainder",
-        )
+        enqueue_send_emails(ab_test.broadcast_id, variant_filter="remainder")
@@ -121,6 +121,19 @@ class EmailSegmentRepository(
         self, segment: EmailSegment
     ) -> list[UUID]:
         """Get subscriber IDs matching a segment."""
+        statement = self.get_subscriber_ids_statement(segment)
+        if statement is None:
+            return []
+        result = await self.session.execute(statement)
+        return list(result.scalars().all())
+
+    def get_subscriber_ids_statement(
+        self, segment: EmailSegment
+    ) -> Select[tuple[UUID]] | None:
+        """Select the subscriber IDs matching a segment, without running it.
+
+        Returns None for segment types that never match anyone.
+        """
         if segment.type == EmailSegmentType.all:
             statement = select(EmailSubscriber.id).where(
                 EmailSubscriber.organization_id == segment.organization_id,
@@ -175,10 +188,9 @@ class EmailSegmentRepository(
                 EmailSubscriber.deleted_at.is_(None),
             )
         else:
-            return []
+            return None
 
-        result = await self.session.execute(statement)
-        return list(result.scalars().all())
+        return statement
 
     async def get_manual_segment_subscriber_ids(
         self, segment_id: UUID
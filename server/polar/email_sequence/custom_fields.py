@@ -9,6 +9,7 @@ land alongside the editor exposing a `custom_field` rule.
 
 from __future__ import annotations
 
+from collections.abc import Sequence
 from uuid import UUID
 
 from sqlalchemy import select
@@ -103,6 +104,36 @@ async def list_fields(
     return {row[0]: row[1] for row in result.all()}
 
 
+async def list_fields_many(
+    session: AsyncSession, subscriber_ids: Sequence[UUID]
+) -> dict[UUID, dict[str, str | None]]:
+    """Bulk `list_fields`: one query for a batch of subscribers.
+
+    Every requested subscriber gets an entry, empty when it has no field.
+    """
+    fields: dict[UUID, dict[str, str | None]] = {
+        subscriber_id: {} for subscriber_id in subscriber_ids
+    }
+    if not fields:
+        return fields
+    statement = (
+        select(
+            EmailSubscriberCustomField.subscriber_id,
+            EmailSubscriberCustomField.key,
+            EmailSubscriberCustomField.value,
+        )
+        .where(
+            EmailSubscriberCustomField.subscriber_id.in_(fields.keys()),
+            EmailSubscriberCustomField.deleted_at.is_(None),
+        )
+        .order_by(EmailSubscriberCustomField.key.asc())
+    )
+    result = await session.execute(statement)
+    for subscriber_id, key, value in result.all():
+        fields[subscriber_id][key] = value
+    return fields
+
+
 async def delete_field(
     session: AsyncSession, subscriber_id: UUID, key: str
 ) -> None:
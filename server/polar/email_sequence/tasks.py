@@ -67,7 +67,7 @@ async def send_test_step(step_id: UUID, to_email: str) -> None:
             step.content_html or "<p>No content</p>", personalize_vars, html=True
         )
         subject_text = personalize(step.subject or "", personalize_vars, html=False)
-        wrapped_html = finalize_email_html(
+        wrapped_html = await finalize_email_html(
             body_html,
             unsubscribe_url=unsubscribe_url,
             organization_name=organization.name if organization else step.sender_name,
@@ -527,7 +527,7 @@ async def _send_email_step(
             step.subject or "", personalize_vars, html=False
         )
 
-        wrapped_html = finalize_email_html(
+        wrapped_html = await finalize_email_html(
             body_html,
             unsubscribe_url=unsubscribe_url,
             organization_name=organization.name if organization else step.sender_name,
@@ -618,7 +618,7 @@ async def _send_inline(
 
     unsubscribe_url = build_unsubscribe_url(enrollment.subscriber_id)
     try:
-        wrapped_html = finalize_email_html(
+        wrapped_html = await finalize_email_html(
             content_html.replace("{{unsubscribe_url}}", unsubscribe_url),
             unsubscribe_url=unsubscribe_url,
             organization_name=organization.name if organization else sender_name,
@@ -1,5 +1,7 @@
 import csv
 import io
+from collections.abc import Iterator
+from typing import BinaryIO
 from uuid import UUID
 
 from fastapi import Depends, File, HTTPException, Query, UploadFile
@@ -418,6 +420,41 @@ _CSV_MAX_BYTES = 5 * 1024 * 1024
 _CSV_MAX_ROWS = 100_000
 
 
+def _csv_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=(
+            f"CSV is over {_CSV_MAX_BYTES // 1024 // 1024} MB. "
+            "Split the file or remove unused columns."
+        ),
+    )
+
+
+def _iter_csv_lines(file: BinaryIO) -> Iterator[str]:
+    """Decode an uploaded CSV line by line, enforcing the size limit.
+
+    The upload size isn't always known up front, so the bytes are counted
+    as they're read. Excel exports tend to ship UTF-8-with-BOM or cp1252:
+    we prefer UTF-8 and fall back to latin-1 for the rest of the file once
+    a line doesn't decode, so we never raise on a stray smart-quote.
+    """
+    read_bytes = 0
+    encoding = "utf-8-sig"
+    for line in file:
+        read_bytes += len(line)
+        if read_bytes > _CSV_MAX_BYTES:
+            raise _csv_too_large()
+        try:
+            text = line.decode(encoding)
+        except UnicodeDecodeError:
+            encoding = "latin-1"
+            text = line.decode(encoding, errors="replace")
+        else:
+            if encoding == "utf-8-sig":
+                encoding = "utf-8"
+        yield text
+
+
 @router.post(
     "/import-csv",
     response_model=EmailSubscriberBulkResult,
@@ -448,26 +485,12 @@ async def import_email_subscribers_csv(
     entry, so the UI can render "row 14: missing email" instead of a
     single opaque skip count.
     """
-    raw = await file.read()
-    if len(raw) > _CSV_MAX_BYTES:
-        raise HTTPException(
-            status_code=413,
-            detail=(
-                f"CSV is over {_CSV_MAX_BYTES // 1024 // 1024} MB. "
-                "Split the file or remove unused columns."
-            ),
-        )
+    if file.size is not None and file.size > _CSV_MAX_BYTES:
+        raise _csv_too_large()
 
-    # Decode tolerantly — Excel exports tend to ship UTF-8-with-BOM or
-    # cp1252; we prefer UTF-8 and fall back to latin-1 so we never raise
-    # on a stray smart-quote.
-    text: str
-    try:
-        text = raw.decode("utf-8-sig")
-    except UnicodeDecodeError:
-        text = raw.decode("latin-1", errors="replace")
-
-    reader = csv.DictReader(io.StringIO(text))
+    # Stream the upload line by line instead of decoding it whole.
+    lines = _iter_csv_lines(file.file)
+    reader = csv.DictReader(lines)
     if reader.fieldnames is None:
         raise HTTPException(
             status_code=400, detail="CSV is empty or missing a header row."
@@ -499,38 +522,41 @@ async def import_email_subscribers_csv(
         or field_lookup.get("display_name")
     )
 
-    rows: list[tuple[str, str | None]] = []
     errors: list[EmailSubscriberImportRowError] = []
-    for i, row in enumerate(reader, start=2):  # start=2 because row 1 is the header
-        if i - 1 > _CSV_MAX_ROWS:
-            raise HTTPException(
-                status_code=413,
-                detail=f"CSV exceeds the {_CSV_MAX_ROWS:,}-row import limit.",
-            )
-        email = (row.get(email_field) or "").strip()
-        name = (
-            (row.get(name_field) or "").strip()
-            if name_field is not None
-            else ""
-        ) or None
-        if not email:
-            errors.append(
-                EmailSubscriberImportRowError(row=i, message="Missing email.")
-            )
-            continue
-        if "@" not in email:
-            errors.append(
-                EmailSubscriberImportRowError(
-                    row=i, message=f"Doesn't look like an email address: {email}"
+
+    def _iter_rows() -> Iterator[tuple[str, str | None]]:
+        # start=2 because row 1 is the header
+        for i, row in enumerate(reader, start=2):
+            if i - 1 > _CSV_MAX_ROWS:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"CSV exceeds the {_CSV_MAX_ROWS:,}-row import limit.",
                 )
-            )
-            continue
-        rows.append((email, name))
+            email = (row.get(email_field) or "").strip()
+            name = (
+                (row.get(name_field) or "").strip()
+                if name_field is not None
+                else ""
+            ) or None
+            if not email:
+                errors.append(
+                    EmailSubscriberImportRowError(row=i, message="Missing email.")
+                )
+                continue
+            if "@" not in email:
+                errors.append(
+                    EmailSubscriberImportRowError(
+                        row=i, message=f"Doesn't look like an email address: {email}"
+                    )
+                )
+                continue
+            yield email, name
 
+    # Rows are consumed lazily by bulk_create, before any write.
     counts = await email_subscriber_service.bulk_create(
         session,
         organization_id=organization_id,
-        rows=rows,
+        rows=_iter_rows(),
         import_source=import_source or (file.filename or "csv-import"),
     )
     return EmailSubscriberBulkResult(
@@ -1,7 +1,23 @@
+from collections.abc import Sequence
+from dataclasses import dataclass
 from datetime import date, timedelta
+from typing import Any
 from uuid import UUID
 
-from sqlalchemy import Date, Select, cast, func, or_, select
+from sqlalchemy import (
+    Date,
+    Select,
+    String,
+    Uuid,
+    cast,
+    column,
+    func,
+    or_,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert
 
 from polar.auth.models import AuthSubject, Organization, User, is_organization, is_user
 from polar.kit.repository import (
@@ -17,6 +33,20 @@ from polar.models.email_subscriber import (
     EmailSubscriberStatus,
 )
 
+# Rows per statement when importing subscribers: keeps bind parameters
+# well under Postgres' limit of 32767 per statement.
+IMPORT_CHUNK_SIZE = 1000
+
+
+@dataclass(slots=True)
+class ImportMatch:
+    """Existing subscriber matched by email during an import."""
+
+    id: UUID
+    name: str | None
+    status: str
+    is_buyer: bool
+
 
 # JSON shape that the audience builder serializes:
 #   {"all": [{"field": "source", "op": "is", "value": "manual"}, ...]}
@@ -168,24 +198,95 @@ class EmailSubscriberRepository(
         )
         return await self.get_one_or_none(statement)
 
-    async def list_by_emails_and_organization(
-        self, emails: list[str], organization_id: UUID
-    ) -> list[EmailSubscriber]:
+    async def get_import_matches(
+        self, emails: Sequence[str], organization_id: UUID
+    ) -> dict[str, "ImportMatch"]:
         """Batch lookup of subscribers in this org whose lowercased email is
         in the given set. Used by bulk_create to differentiate "new" from
-        "existing-and-reactivated" in a single round-trip rather than
-        N round-trips with the modified_at heuristic the audit (#44 / fix-
-        list #44) flagged as unreliable.
+        "existing-and-reactivated" without a round-trip per row.
+
+        Only loads the columns the classification needs, keyed by
+        lowercased email, so large imports don't hydrate ORM objects.
         """
-        if not emails:
-            return []
-        normalized = sorted({e.lower().strip() for e in emails if e})
-        statement = self.get_base_statement().where(
-            EmailSubscriber.organization_id == organization_id,
-            EmailSubscriber.deleted_at.is_(None),
-            func.lower(EmailSubscriber.email).in_(normalized),
-        )
-        return await self.get_all(statement)
+        matches: dict[str, ImportMatch] = {}
+        for i in range(0, len(emails), IMPORT_CHUNK_SIZE):
+            chunk = emails[i : i + IMPORT_CHUNK_SIZE]
+            statement = select(
+                EmailSubscriber.id,
+                func.lower(EmailSubscriber.email),
+                EmailSubscriber.name,
+                EmailSubscriber.status,
+                EmailSubscriber.source,
+                EmailSubscriber.customer_id,
+            ).where(
+                EmailSubscriber.organization_id == organization_id,
+                EmailSubscriber.deleted_at.is_(None),
+                func.lower(EmailSubscriber.email).in_(chunk),
+            )
+            result = await self.session.execute(statement)
+            for id, email, name, status, source, customer_id in result.all():
+                matches[email] = ImportMatch(
+                    id=id,
+                    name=name,
+                    status=status,
+                    is_buyer=(
+                        customer_id is not None
+                        or source == EmailSubscriberSource.purchase
+                    ),
+                )
+        return matches
+
+    async def insert_many(self, values: Sequence[dict[str, Any]]) -> list[UUID]:
+        """Insert subscribers with multi-row INSERT statements.
+
+        Returns the IDs of the inserted rows. Rows conflicting with an
+        existing one, e.g. inserted concurrently, are skipped.
+        """
+        ids: list[UUID] = []
+        for i in range(0, len(values), IMPORT_CHUNK_SIZE):
+            statement = (
+                insert(EmailSubscriber)
+                .values(values[i : i + IMPORT_CHUNK_SIZE])
+                .on_conflict_do_nothing()
+                .returning(EmailSubscriber.id)
+            )
+            result = await self.session.execute(statement)
+            ids.extend(result.scalars().all())
+        return ids
+
+    async def reactivate_many(
+        self, ids: Sequence[UUID], names: dict[UUID, str]
+    ) -> None:
+        """Reactivate subscribers and backfill missing names, set-based.
+
+        `ids` are flipped back to active; `names` maps subscriber IDs to a
+        name applied only where the row has none.
+        """
+        now = utc_now()
+        for i in range(0, len(ids), IMPORT_CHUNK_SIZE):
+            await self.session.execute(
+                update(EmailSubscriber)
+                .where(EmailSubscriber.id.in_(ids[i : i + IMPORT_CHUNK_SIZE]))
+                .values(
+                    status=EmailSubscriberStatus.active,
+                    unsubscribed_at=None,
+                    modified_at=now,
+                )
+            )
+
+        name_items = list(names.items())
+        for i in range(0, len(name_items), IMPORT_CHUNK_SIZE):
+            names_values = values(
+                column("id", Uuid), column("name", String), name="import_names"
+            ).data(name_items[i : i + IMPORT_CHUNK_SIZE])
+            await self.session.execute(
+                update(EmailSubscriber)
+                .where(
+                    EmailSubscriber.id == names_values.c.id,
+                    or_(EmailSubscriber.name.is_(None), EmailSubscriber.name == ""),
+                )
+                .values(name=names_values.c.name, modified_at=now)
+            )
 
     async def count_by_organization(self, organization_id: UUID) -> int:
         """All active subscribers, buyers included. Used for dashboard
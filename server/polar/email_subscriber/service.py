@@ -1,4 +1,5 @@
-from collections.abc import Sequence
+from collections.abc import Iterable, Sequence
+from typing import Any
 from uuid import UUID
 
 from sqlalchemy import asc, desc
@@ -7,7 +8,7 @@ from polar.auth.models import AuthSubject, Organization, User
 from polar.entitlements.service import entitlements as entitlements_service
 from polar.kit.pagination import PaginationParams
 from polar.kit.sorting import Sorting
-from polar.kit.utils import utc_now
+from polar.kit.utils import generate_uuid, utc_now
 from polar.models.email_subscriber import (
     EmailSubscriber,
     EmailSubscriberSource,
@@ -356,7 +357,7 @@ class EmailSubscriberService:
         session: AsyncSession,
         *,
         organization_id: UUID,
-        rows: list[tuple[str, str | None]],
+        rows: Iterable[tuple[str, str | None]],
         source: str = EmailSubscriberSource.import_,
         import_source: str | None = None,
     ) -> dict[str, int]:
@@ -375,61 +376,86 @@ class EmailSubscriberService:
         That always returned True for fresh rows because RecordModel sets
         modified_at on every update including the just-after-insert flush,
         making the count meaningless. We now pre-fetch the org's existing
-        emails in one round-trip and classify deterministically.
+        emails and classify deterministically.
+
+        Writes are set-based: new rows go through multi-row INSERTs, and
+        reactivations / name backfills through bulk UPDATEs, so imports of
+        hundreds of thousands of contacts don't round-trip per row.
+        `rows` can be any iterable, e.g. a CSV reader consumed lazily.
         """
         # Normalize + dedupe rows up front; track skips for malformed input.
-        cleaned: list[tuple[str, str | None]] = []
-        seen_in_input: set[str] = set()
+        cleaned: dict[str, str | None] = {}
         skipped = 0
         for email, name in rows:
             email_norm = (email or "").strip().lower()
             if not email_norm or "@" not in email_norm:
                 skipped += 1
                 continue
-            if email_norm in seen_in_input:
+            if email_norm in cleaned:
                 # Duplicate within the same import — count as skipped so the
                 # final number matches what actually got processed.
                 skipped += 1
                 continue
-            seen_in_input.add(email_norm)
-            cleaned.append((email_norm, name))
+            cleaned[email_norm] = name
 
         if not cleaned:
             return {"created": 0, "updated": 0, "skipped": skipped}
 
         repository = EmailSubscriberRepository.from_session(session)
-        existing_rows = await repository.list_by_emails_and_organization(
-            [e for e, _ in cleaned], organization_id
+        existing_by_email = await repository.get_import_matches(
+            list(cleaned), organization_id
         )
-        existing_by_email = {r.email.lower(): r for r in existing_rows}
 
         # Pre-check the tier's email_subscribers cap before doing any
-        # writes. PR 24 enforces the cap per-row inside self.create() —
-        # that catches over-limit imports row-by-row but leaves the
-        # creator with a partial-success state ("imported 4,952 of
-        # 50,000"). Counting up-front lets us refuse the entire import
-        # with one clear error.
+        # writes, so an over-limit import is refused as a whole with one
+        # clear error instead of leaving the creator with a partial-success
+        # state ("imported 4,952 of 50,000").
         #
         # Cap-affecting rows are NEW marketing inserts AND reactivations of
         # marketing rows. Imports are always marketing contacts (no
         # customer link), so new rows count. Reactivating a *buyer* row
         # (linked to a customer) does NOT count — buyers are uncapped —
         # so we skip those, mirroring create()'s buyer-aware gate.
+        new_values: list[dict[str, Any]] = []
+        reactivated_ids: list[UUID] = []
+        backfilled_names: dict[UUID, str] = {}
         becoming_active = 0
-        for email_norm, _ in cleaned:
+        now = utc_now()
+        for email_norm, name in cleaned.items():
             existing = existing_by_email.get(email_norm)
             if existing is None:
+                new_values.append(
+                    {
+                        "id": generate_uuid(),
+                        "created_at": now,
+                        "organization_id": organization_id,
+                        "email": email_norm,
+                        "name": name,
+                        "status": EmailSubscriberStatus.active,
+                        "source": source,
+                        "import_source": import_source,
+                    }
+                )
                 becoming_active += 1
-            elif existing.status in (
+                continue
+
+            # Pre-existing row: classify as updated if reactivation or
+            # name-backfill happens, otherwise it's a no-op skip.
+            mutated = False
+            if existing.status in (
                 EmailSubscriberStatus.unsubscribed,
                 EmailSubscriberStatus.archived,
             ):
-                existing_is_buyer = (
-                    existing.customer_id is not None
-                    or existing.source == EmailSubscriberSource.purchase
-                )
-                if not existing_is_buyer:
+                reactivated_ids.append(existing.id)
+                if not existing.is_buyer:
                     becoming_active += 1
+                mutated = True
+            if name and not existing.name:
+                backfilled_names[existing.id] = name
+                mutated = True
+            if not mutated:
+                skipped += 1
+
         if becoming_active > 0:
             current_active = await repository.count_marketing_subscribers(
                 organization_id
@@ -446,41 +472,13 @@ class EmailSubscriberService:
                 current=current_active + becoming_active - 1,
             )
 
-        created = 0
-        updated = 0
-        for email_norm, name in cleaned:
-            existing = existing_by_email.get(email_norm)
-            if existing is None:
-                # New row.
-                await self.create(
-                    session,
-                    organization_id=organization_id,
-                    email=email_norm,
-                    name=name,
-                    source=source,
-                    import_source=import_source,
-                )
-                created += 1
-                continue
+        created_ids = await repository.insert_many(new_values)
+        await repository.reactivate_many(reactivated_ids, backfilled_names)
 
-            # Pre-existing row: classify as updated if reactivation or
-            # name-backfill happens, otherwise it's a no-op skip.
-            mutated = False
-            if existing.status in (
-                EmailSubscriberStatus.unsubscribed,
-                EmailSubscriberStatus.archived,
-            ):
-                existing.status = EmailSubscriberStatus.active
-                existing.unsubscribed_at = None
-                mutated = True
-            if name and not existing.name:
-                existing.name = name
-                mutated = True
-            if mutated:
-                await repository.update(existing)
-                updated += 1
-            else:
-                skipped += 1
+        created = len(created_ids)
+        # Rows inserted concurrently by another request were skipped.
+        skipped += len(new_values) - created
+        updated = len(set(reactivated_ids) | set(backfilled_names))
         return {"created": created, "updated": updated, "skipped": skipped}
 
     async def preview_filter(
@@ -6,7 +6,7 @@ from sqlalchemy.orm import joinedload
 
 from polar.auth.models import AuthSubject
 from polar.config import settings
-from polar.email.react import render_email_template
+from polar.email.react import render_email_template_async
 from polar.email.schemas import EmailUpdateEmail, EmailUpdateProps
 from polar.email.sender import enqueue_email
 from polar.exceptions import PolarError, SpaireRequestValidationError
@@ -80,7 +80,7 @@ class EmailUpdateService(ResourceServiceReader[EmailVerification]):
 
         email = email_update_record.email
         url_params = {"token": token, **extra_url_params}
-        body = render_email_template(
+        body = await render_email_template_async(
             EmailUpdateEmail(
                 props=EmailUpdateProps(
                     email=email,
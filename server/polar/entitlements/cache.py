@@ -0,0 +1,118 @@
+"""Cache of resolved organization tiers.
+
+Resolving a tier takes three queries (platform customer, active
+subscription, product), and entitlement guards run on most write paths,
+sometimes several times per request. Resolved tiers are cached in two
+layers:
+
+1. An in-process LRU with a short TTL, absorbing repeated lookups within
+   a request or a burst of requests.
+2. Redis, shared by every API and worker process.
+
+Both layers are invalidated when a platform subscription changes (see
+`polar.platform.fee_sync`). Other processes only drop their in-process
+entry when it expires, so the local TTL bounds how stale a tier can be.
+"""
+
+import time
+from collections import OrderedDict
+from uuid import UUID
+
+import structlog
+from redis import RedisError
+
+from polar.config import settings
+from polar.logging import Logger
+from polar.observability import CACHE_LOOKUPS_TOTAL
+from polar.redis import get_app_redis
+
+from .tiers import TierKey
+
+log: Logger = structlog.get_logger()
+
+_CACHE_NAME = "entitlements_tier"
+
+
+def _get_key(organization_id: UUID) -> str:
+    return f"entitlements:tier:{organization_id}"
+
+
+class TierCache:
+    def __init__(
+        self,
+        *,
+        local_ttl: float = settings.ENTITLEMENTS_TIER_CACHE_LOCAL_TTL_SECONDS,
+        local_maxsize: int = settings.ENTITLEMENTS_TIER_CACHE_LOCAL_MAXSIZE,
+        redis_ttl: int = settings.ENTITLEMENTS_TIER_CACHE_REDIS_TTL_SECONDS,
+    ) -> None:
+        self._local_ttl = local_ttl
+        self._local_maxsize = local_maxsize
+        self._redis_ttl = redis_ttl
+        self._local: OrderedDict[UUID, tuple[float, TierKey]] = OrderedDict()
+
+    async def get(self, organization_id: UUID) -> TierKey | None:
+        tier = self._get_local(organization_id)
+        if tier is not None:
+            CACHE_LOOKUPS_TOTAL.labels(cache=_CACHE_NAME, result="local_hit").inc()
+            return tier
+
+        try:
+            value = await get_app_redis().get(_get_key(organization_id))
+        except RedisError as e:
+            log.warning("entitlements.tier_cache.redis_error", error=str(e))
+            value = None
+
+        if value is not None:
+            try:
+                tier = TierKey(value)
+            except ValueError:
+                tier = None
+        if tier is None:
+            CACHE_LOOKUPS_TOTAL.labels(cache=_CACHE_NAME, result="miss").inc()
+            return None
+
+        CACHE_LOOKUPS_TOTAL.labels(cache=_CACHE_NAME, result="redis_hit").inc()
+        self._set_local(organization_id, tier)
+        return tier
+
+    async def set(self, organization_id: UUID, tier: TierKey) -> None:
+        self._set_local(organization_id, tier)
+        try:
+            await get_app_redis().set(
+                _get_key(organization_id), tier.value, ex=self._redis_ttl
+            )
+        except RedisError as e:
+            log.warning("entitlements.tier_cache.redis_error", error=str(e))
+
+    async def invalidate(self, organization_id: UUID) -> None:
+        self._local.pop(organization_id, None)
+        try:
+            await get_app_redis().delete(_get_key(organization_id))
+        except RedisError as e:
+            log.warning("entitlements.tier_cache.redis_error", error=str(e))
+
+    def clear_local(self) -> None:
+        self._local.clear()
+
+    def _get_local(self, organization_id: UUID) -> TierKey | None:
+        entry = self._local.get(organization_id)
+        if entry is None:
+            return None
+        expires_at, tier = entry
+        if expires_at <= time.monotonic():
+            del self._local[organization_id]
+            return None
+        self._local.move_to_end(organization_id)
+        return tier
+
+    def _set_local(self, organization_id: UUID, tier: TierKey) -> None:
+        self._local[organization_id] = (time.monotonic() + self._local_ttl, tier)
+        self._local.move_to_end(organization_id)
+        while len(self._local) > self._local_maxsize:
+            self._local.popitem(last=False)
+
+
+tier_cache = TierCache()
+
+
+__all__ = ["TierCache", "tier_cache"]
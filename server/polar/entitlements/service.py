@@ -15,10 +15,13 @@ Resolution path:
 4. Find that Customer's most recent active or trialing Subscription.
 5. Read the Product's user_metadata.tier to determine the tier.
 6. Any miss along the way returns legacy entitlements.
+
+Steps 3-5 are cached per organization, see `cache.py`.
 """
 
 from uuid import UUID
 
+from polar.config import settings
 from polar.models import Product
 from polar.platform.repository import (
     platform_customer_repository,
@@ -27,6 +30,7 @@ from polar.platform.repository import (
 from polar.platform.service import platform as platform_service
 from polar.postgres import AsyncReadSession
 
+from .cache import tier_cache
 from .exceptions import FeatureNotInPlanError, TierLimitReachedError
 from .tiers import (
     PAID_TIERS,
@@ -59,6 +63,27 @@ class EntitlementsService:
         if platform_service.is_platform_organization(organization_id):
             return TierKey.unmanaged
 
+        if not settings.ENTITLEMENTS_TIER_CACHE_ENABLED:
+            return await self._resolve_tier(session, organization_id)
+
+        tier = await tier_cache.get(organization_id)
+        if tier is None:
+            tier = await self._resolve_tier(session, organization_id)
+            await tier_cache.set(organization_id, tier)
+        return tier
+
+    async def invalidate_tier(self, organization_id: UUID) -> None:
+        """Drop the cached tier of the organization.
+
+        Call it whenever the organization's platform subscription changes.
+        """
+        await tier_cache.invalidate(organization_id)
+
+    async def _resolve_tier(
+        self,
+        session: AsyncReadSession,
+        organization_id: UUID,
+    ) -> TierKey:
         platform_org_id = platform_service.get_id()
 
         # From here on this is a real creator on a configured platform. Any
@@ -1,3 +1,4 @@
+import itertools
 import uuid
 from collections import defaultdict, deque
 from collections.abc import Callable, Sequence
@@ -9,9 +10,11 @@ import logfire
 import structlog
 from opentelemetry import trace
 from sqlalchemy import (
+    ColumnElement,
     Select,
     String,
     UnaryExpression,
+    and_,
     asc,
     cast,
     desc,
@@ -36,6 +39,7 @@ from polar.kit.utils import utc_now
 from polar.logging import Logger
 from polar.member.repository import MemberRepository
 from polar.meter.filter import Filter
+from polar.meter.matcher import get_meter_matcher
 from polar.meter.repository import MeterRepository
 from polar.models import (
     Customer,
@@ -64,10 +68,11 @@ from .schemas import (
     StatisticsPeriod,
 )
 from .sorting import EventNamesSortProperty, EventSortProperty
-from .system import SystemEvent
 
 log: Logger = structlog.get_logger()
 
+UPDATE_CUSTOMER_METERS_BATCH_SIZE = 100
+
 
 class EventError(PolarError): ...
 
@@ -542,9 +547,6 @@ class EventService:
             session, member_ids_in_batch
         )
 
-        event_type_repository = EventTypeRepository.from_session(session)
-        event_types_cache: dict[tuple[str, uuid.UUID], uuid.UUID] = {}
-
         batch_external_id_map: dict[str, uuid.UUID] = {}
         for event_create in ingest.events:
             if event_create.external_id is not None:
@@ -565,12 +567,13 @@ class EventService:
         with logfire.span("topological_sort", event_count=len(event_metadata)):
             sorted_metadata = _topological_sort_events(event_metadata)
 
-        # Process events in sorted order
-        events: list[dict[str, Any]] = []
+        # Validate events in sorted order, so errors are reported in the same order
         errors: list[ValidationError] = []
-        processed_events: dict[uuid.UUID, dict[str, Any]] = {}
+        validated_events: dict[int, uuid.UUID] = {}
+        validation_errors: dict[int, list[ValidationError]] = {}
+        external_parents: set[tuple[uuid.UUID, str]] = set()
 
-        with logfire.span("process_events", event_count=len(sorted_metadata)):
+        with logfire.span("validate_events", event_count=len(sorted_metadata)):
             for metadata in sorted_metadata:
                 index = metadata["index"]
                 event_create = ingest.events[index]
@@ -583,45 +586,81 @@ class EventService:
                         validate_customer_id(index, event_create.customer_id)
                         if event_create.member_id is not None:
                             validate_member_id(index, event_create.member_id)
-
-                    parent_event: Event | None = None
-                    parent_id_in_batch: uuid.UUID | None = None
-                    if event_create.parent_id is not None:
-                        parent_event, parent_id_in_batch = await self._resolve_parent(
-                            session,
-                            index,
-                            event_create.parent_id,
-                            organization_id,
-                            batch_external_id_map,
-                        )
-
-                    event_label_cache_key = (event_create.name, organization_id)
-                    if event_label_cache_key not in event_types_cache:
-                        event_type = await event_type_repository.get_or_create(
-                            event_create.name, organization_id
-                        )
-                        event_types_cache[event_label_cache_key] = event_type.id
-                    event_type_id = event_types_cache[event_label_cache_key]
                 except EventIngestValidationError as e:
-                    errors.extend(e.errors)
+                    validation_errors[index] = e.errors
                     continue
-                else:
-                    event_dict = event_create.model_dump(
-                        exclude={"organization_id", "parent_id"}, by_alias=True
-                    )
-                    event_dict["source"] = EventSource.user
-                    event_dict["organization_id"] = organization_id
-                    event_dict["event_type_id"] = event_type_id
 
-                    if event_create.external_id is not None:
-                        event_dict["id"] = batch_external_id_map[
-                            event_create.external_id
-                        ]
+                validated_events[index] = organization_id
+                if (
+                    event_create.parent_id is not None
+                    and event_create.parent_id not in batch_external_id_map
+                ):
+                    external_parents.add((organization_id, event_create.parent_id))
+
+        with logfire.span("resolve_parents", parent_count=len(external_parents)):
+            resolved_parents = await self._resolve_parents(session, external_parents)
+
+        valid_events: list[tuple[int, uuid.UUID]] = []
+        for metadata in sorted_metadata:
+            index = metadata["index"]
+            if index in validation_errors:
+                errors.extend(validation_errors[index])
+                continue
+
+            organization_id = validated_events[index]
+            parent_id = ingest.events[index].parent_id
+            if (
+                parent_id is not None
+                and parent_id not in batch_external_id_map
+                and (organization_id, parent_id) not in resolved_parents
+            ):
+                errors.append(
+                    {
+                        "type": "parent_id",
+                        "msg": "Parent event not found.",
+                        "loc": ("body", "events", index, "parent_id"),
+                        "input": parent_id,
+                    }
+                )
+                continue
+
+            valid_events.append((index, organization_id))
+
+        if len(errors) > 0:
+            raise SpaireRequestValidationError(errors)
 
-                    if parent_event is not None:
-                        event_dict["parent_id"] = parent_event.id
-                        event_dict["root_id"] = parent_event.root_id or parent_event.id
-                    elif parent_id_in_batch is not None:
+        event_type_repository = EventTypeRepository.from_session(session)
+        with logfire.span("resolve_event_types"):
+            event_types = await event_type_repository.get_or_create_many(
+                (ingest.events[index].name, organization_id)
+                for index, organization_id in valid_events
+            )
+
+        # Build events in sorted order, so parents come before their children
+        events: list[dict[str, Any]] = []
+        processed_events: dict[uuid.UUID, dict[str, Any]] = {}
+
+        with logfire.span("process_events", event_count=len(valid_events)):
+            for index, organization_id in valid_events:
+                event_create = ingest.events[index]
+
+                event_dict = event_create.model_dump(
+                    exclude={"organization_id", "parent_id"}, by_alias=True
+                )
+                event_dict["source"] = EventSource.user
+                event_dict["organization_id"] = organization_id
+                event_dict["event_type_id"] = event_types[
+                    (event_create.name, organization_id)
+                ]
+
+                if event_create.external_id is not None:
+                    event_dict["id"] = batch_external_id_map[event_create.external_id]
+
+                if event_create.parent_id is not None:
+                    if event_create.parent_id in batch_external_id_map:
+                        parent_id_in_batch = batch_external_id_map[
+                            event_create.parent_id
+                        ]
                         event_dict["parent_id"] = parent_id_in_batch
                         # Parent was already processed, look it up
                         parent_dict = processed_events.get(parent_id_in_batch)
@@ -629,13 +668,16 @@ class EventService:
                             event_dict["root_id"] = parent_dict.get(
                                 "root_id", parent_id_in_batch
                             )
+                    else:
+                        parent_event_id, parent_root_id = resolved_parents[
+                            (organization_id, event_create.parent_id)
+                        ]
+                        event_dict["parent_id"] = parent_event_id
+                        event_dict["root_id"] = parent_root_id
 
-                    events.append(event_dict)
-                    if event_dict.get("id"):
-                        processed_events[event_dict["id"]] = event_dict
-
-        if len(errors) > 0:
-            raise SpaireRequestValidationError(errors)
+                events.append(event_dict)
+                if event_dict.get("id"):
+                    processed_events[event_dict["id"]] = event_dict
 
         repository = EventRepository.from_session(session)
         with logfire.span("insert_batch", event_count=len(events)):
@@ -781,8 +823,11 @@ class EventService:
             session, repository, event_ids, customers
         )
 
-        for customer in customers:
-            enqueue_job("customer_meter.update_customer", customer.id)
+        for customer_ids in itertools.batched(
+            sorted(customer.id for customer in customers),
+            UPDATE_CUSTOMER_METERS_BATCH_SIZE,
+        ):
+            enqueue_job("customer_meter.update_customers", list(customer_ids))
 
         await ingest_events(events)
 
@@ -812,6 +857,8 @@ class EventService:
                 )
             )
 
+            matcher = get_meter_matcher(org_id, meters)
+
             with logfire.span(
                 "match_meters",
                 org_id=str(org_id),
@@ -819,35 +866,24 @@ class EventService:
                 meter_count=len(meters),
             ):
                 for event in org_events:
-                    for meter in meters:
-                        if self._event_matches_meter(event, meter):
-                            meter_event_rows.append(
-                                {
-                                    "meter_id": meter.id,
-                                    "event_id": event.id,
-                                    "customer_id": event.customer_id,
-                                    "external_customer_id": event.external_customer_id,
-                                    "organization_id": event.organization_id,
-                                    "ingested_at": event.ingested_at,
-                                    "timestamp": event.timestamp,
-                                }
-                            )
+                    for meter_id in matcher.match(event):
+                        meter_event_rows.append(
+                            {
+                                "meter_id": meter_id,
+                                "event_id": event.id,
+                                "customer_id": event.customer_id,
+                                "external_customer_id": event.external_customer_id,
+                                "organization_id": event.organization_id,
+                                "ingested_at": event.ingested_at,
+                                "timestamp": event.timestamp,
+                            }
+                        )
 
         if meter_event_rows:
             await session.execute(
                 insert(MeterEvent).values(meter_event_rows).on_conflict_do_nothing()
             )
 
-    def _event_matches_meter(self, event: Event, meter: Meter) -> bool:
-        if (
-            event.source == EventSource.system
-            and event.name in (SystemEvent.meter_credited, SystemEvent.meter_reset)
-            and event.user_metadata.get("meter_id") == str(meter.id)
-        ):
-            return True
-
-        return meter.filter.matches(event) and meter.aggregation.matches(event)
-
     async def _activate_matching_customer_meters(
         self,
         session: AsyncSession,
@@ -1035,57 +1071,73 @@ class EventService:
 
         return _validate_member_id
 
-    async def _resolve_parent(
+    async def _resolve_parents(
         self,
         session: AsyncSession,
-        index: int,
-        parent_id: str,
-        organization_id: uuid.UUID,
-        batch_external_id_map: dict[str, uuid.UUID],
-    ) -> tuple[Event | None, uuid.UUID | None]:
+        parents: set[tuple[uuid.UUID, str]],
+    ) -> dict[tuple[uuid.UUID, str], tuple[uuid.UUID, uuid.UUID]]:
         """
-        Resolve and return the parent event.
-        Returns a tuple of (parent_event_from_db, parent_id_from_batch).
-        Only one of these will be set - if the parent is in the current batch,
-        parent_id_from_batch will be set. Otherwise, parent_event_from_db will be set.
+        Resolve parent events referenced from outside the current batch.
+
+        Parents are referenced by (organization_id, parent_id), where parent_id
+        is either the event ID or its external_id. All of them are looked up
+        in a single query.
+
+        Returns a mapping from the reference to a tuple of (parent_id, root_id).
+        Unresolved references are absent from the mapping.
         """
-        # Check if parent is in current batch
-        if parent_id in batch_external_id_map:
-            return None, batch_external_id_map[parent_id]
-
-        # Look up parent in database by ID or external_id
-        try:
-            parent_uuid = uuid.UUID(parent_id)
-        except ValueError:
-            parent_uuid = None
-
-        if parent_uuid:
-            statement = select(Event).where(
-                Event.organization_id == organization_id,
-                or_(Event.id == parent_uuid, Event.external_id == parent_id),
-            )
-        else:
-            statement = select(Event).where(
-                Event.organization_id == organization_id,
-                Event.external_id == parent_id,
+        if not parents:
+            return {}
+
+        references_by_organization: dict[uuid.UUID, set[str]] = defaultdict(set)
+        for organization_id, parent_id in parents:
+            references_by_organization[organization_id].add(parent_id)
+
+        clauses = []
+        for organization_id, references in references_by_organization.items():
+            parent_uuids: set[uuid.UUID] = set()
+            for reference in references:
+                try:
+                    parent_uuids.add(uuid.UUID(reference))
+                except ValueError:
+                    pass
+            reference_clause: ColumnElement[bool] = Event.external_id.in_(references)
+            if parent_uuids:
+                reference_clause = or_(Event.id.in_(parent_uuids), reference_clause)
+            clauses.append(
+                and_(Event.organization_id == organization_id, reference_clause)
             )
 
+        statement = select(
+            Event.id, Event.external_id, Event.organization_id, Event.root_id
+        ).where(or_(*clauses))
         result = await session.execute(statement)
-        parent_event = result.scalar_one_or_none()
-
-        if parent_event is not None:
-            return parent_event, None
 
-        raise EventIngestValidationError(
-            [
-                {
-                    "type": "parent_id",
-                    "msg": "Parent event not found.",
-                    "loc": ("body", "events", index, "parent_id"),
-                    "input": parent_id,
-                }
-            ]
-        )
+        by_id: dict[tuple[uuid.UUID, uuid.UUID], tuple[uuid.UUID, uuid.UUID]] = {}
+        by_external_id: dict[tuple[uuid.UUID, str], tuple[uuid.UUID, uuid.UUID]] = {}
+        for event_id, external_id, organization_id, root_id in result.all():
+            resolved = (event_id, root_id or event_id)
+            by_id[(organization_id, event_id)] = resolved
+            if external_id is not None:
+                by_external_id[(organization_id, external_id)] = resolved
+
+        resolved_parents: dict[tuple[uuid.UUID, str], tuple[uuid.UUID, uuid.UUID]] = {}
+        for organization_id, parent_id in parents:
+            try:
+                parent_uuid: uuid.UUID | None = uuid.UUID(parent_id)
+            except ValueError:
+                parent_uuid = None
+
+            if parent_uuid is not None and (organization_id, parent_uuid) in by_id:
+                resolved_parents[(organization_id, parent_id)] = by_id[
+                    (organization_id, parent_uuid)
+                ]
+            elif (organization_id, parent_id) in by_external_id:
+                resolved_parents[(organization_id, parent_id)] = by_external_id[
+                    (organization_id, parent_id)
+                ]
+
+        return resolved_parents
 
 
 event = EventService()
@@ -1,11 +1,14 @@
+from collections.abc import Iterable
 from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import Select, func, select
+from sqlalchemy import Select, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 
 from polar.auth.models import AuthSubject, Organization, User, is_organization, is_user
 from polar.kit.repository import RepositoryBase, RepositoryIDMixin
+from polar.kit.utils import generate_uuid, utc_now
 from polar.models import Event, EventType, UserOrganization
 from polar.models.event import EventSource
 
@@ -103,3 +106,58 @@ class EventTypeRepository(
                 return existing
             raise
         return event_type
+
+    async def get_or_create_many(
+        self, keys: Iterable[tuple[str, UUID]]
+    ) -> dict[tuple[str, UUID], UUID]:
+        """
+        Resolve the IDs of event types for several (name, organization_id) pairs,
+        creating the missing ones.
+
+        Existing and newly created event types are returned by a single statement:
+        a data-modifying CTE inserts the missing rows while the outer query reads
+        the pre-existing ones. Pairs that still can't be resolved, typically because
+        of a concurrent insert, fall back to `get_or_create`.
+        """
+        unique_keys = list(dict.fromkeys(keys))
+        if not unique_keys:
+            return {}
+
+        now = utc_now()
+        inserted = (
+            insert(EventType)
+            .values(
+                [
+                    {
+                        "id": generate_uuid(),
+                        "created_at": now,
+                        "name": name,
+                        "label": name,
+                        "organization_id": organization_id,
+                    }
+                    for name, organization_id in unique_keys
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=["name", "organization_id"])
+            .returning(EventType.id, EventType.name, EventType.organization_id)
+            .cte("inserted_event_types")
+        )
+        statement = select(
+            inserted.c.id, inserted.c.name, inserted.c.organization_id
+        ).union_all(
+            select(EventType.id, EventType.name, EventType.organization_id).where(
+                tuple_(EventType.name, EventType.organization_id).in_(unique_keys),
+                EventType.deleted_at.is_(None),
+            )
+        )
+        result = await self.session.execute(statement)
+        event_types = {
+            (name, organization_id): id for id, name, organization_id in result.all()
+        }
+
+        for name, organization_id in unique_keys:
+            if (name, organization_id) not in event_types:
+                event_type = await self.get_or_create(name, organization_id)
+                event_types[(name, organization_id)] = event_type.id
+
+        return event_types
@@ -4,7 +4,6 @@ from typing import Any
 
 import structlog
 from fastapi import Depends, Request
-from redis.exceptions import ConnectionError
 from sse_starlette.sse import EventSourceResponse
 from uvicorn import Server
 
@@ -16,6 +15,7 @@ from polar.postgres import AsyncSession, get_db_session
 from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
+from .hub import get_eventstream_hub
 from .service import Receivers
 
 router = APIRouter(prefix="/stream", tags=["stream"], include_in_schema=False)
@@ -53,33 +53,25 @@ async def subscribe(
     request: Request,
     on_iteration: Callable[[], Awaitable[None]] | None = None,
 ) -> AsyncGenerator[Any, Any]:
-    async with redis.pubsub() as pubsub:
-        await pubsub.subscribe(*channels)
-
+    hub = get_eventstream_hub(redis)
+    async with hub.subscribe(channels) as subscription:
         while not _uvicorn_should_exit():
             if await request.is_disconnected():
-                await pubsub.close()
                 break
 
             if on_iteration is not None:
                 await on_iteration()
 
-            try:
-                message = await pubsub.get_message(
-                    ignore_subscribe_messages=True,
-                    # Waits for up to 10s for a new message
-                    timeout=10.0,
-                )
-
-                if message is not None:
-                    log.info("redis.pubsub", message=message["data"])
-                    yield message["data"]
-            except asyncio.CancelledError as e:
-                await pubsub.close()
-                raise e
-            except ConnectionError as e:
-                await pubsub.close()
-                raise e
+            # Waits for up to 10s for a new message
+            data = await subscription.get(timeout=10.0)
+
+            # Slow consumer: end the stream so the client reconnects
+            if subscription.dropped:
+                break
+
+            if data is not None:
+                log.info("redis.pubsub", message=data)
+                yield data
 
 
 @router.get("/user")
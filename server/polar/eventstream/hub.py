@@ -0,0 +1,210 @@
+"""
+Per-process fan-out of the event stream Redis channels.
+
+Every SSE client used to open its own Redis pub/sub connection. The hub holds
+a single pub/sub connection per process instead, subscribed to the union of
+the channels its clients listen to. Channels are reference-counted: the hub
+subscribes to a channel when its first client arrives and unsubscribes when
+the last one leaves. When no client is connected, the connection is closed.
+If the connection fails, the hub reconnects with an exponential backoff.
+
+Messages are fanned out to a bounded in-memory buffer per client. A client
+whose buffer is full is dropped: its stream ends, and the browser's
+`EventSource` reconnects, instead of the hub buffering without bound.
+"""
+
+import asyncio
+import contextlib
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+import structlog
+from redis.exceptions import ConnectionError
+
+from polar.config import settings
+from polar.logging import Logger
+from polar.redis import Redis
+
+log: Logger = structlog.get_logger()
+
+
+class _Dropped:
+    pass
+
+
+_DROPPED = _Dropped()
+
+
+class EventStreamSubscription:
+    __slots__ = ("_queue", "channels", "dropped")
+
+    def __init__(self, channels: Sequence[str], buffer_size: int) -> None:
+        self.channels = tuple(channels)
+        self.dropped = False
+        self._queue: asyncio.Queue[Any] = asyncio.Queue(buffer_size + 1)
+
+    async def get(self, timeout: float) -> Any | None:
+        """
+        Wait for the next message, up to `timeout` seconds.
+
+        Returns `None` if no message arrived in time, or if the subscription
+        was dropped; in which case `dropped` is set.
+        """
+        try:
+            data = await asyncio.wait_for(self._queue.get(), timeout)
+        except TimeoutError:
+            return None
+        if data is _DROPPED:
+            return None
+        return data
+
+    def _put(self, data: Any) -> bool:
+        # The last slot is reserved for the drop marker
+        if self._queue.qsize() >= self._queue.maxsize - 1:
+            return False
+        self._queue.put_nowait(data)
+        return True
+
+    def _drop(self) -> None:
+        self.dropped = True
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(_DROPPED)
+
+
+class EventStreamHub:
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        buffer_size: int = settings.EVENTSTREAM_SUBSCRIBER_BUFFER_SIZE,
+        reconnect_delay: float = settings.EVENTSTREAM_RECONNECT_DELAY_SECONDS,
+        reconnect_max_delay: float = settings.EVENTSTREAM_RECONNECT_MAX_DELAY_SECONDS,
+    ) -> None:
+        self.redis = redis
+        self._buffer_size = buffer_size
+        self._reconnect_delay = reconnect_delay
+        self._reconnect_max_delay = reconnect_max_delay
+        self._subscriptions: dict[str, set[EventStreamSubscription]] = {}
+        self._pubsub: Any | None = None
+        self._listener: asyncio.Task[None] | None = None
+
+    @property
+    def channels(self) -> set[str]:
+        return set(self._subscriptions)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(
+        self, channels: Sequence[str]
+    ) -> AsyncIterator[EventStreamSubscription]:
+        subscription = EventStreamSubscription(channels, self._buffer_size)
+        await self._add(subscription)
+        try:
+            yield subscription
+        finally:
+            await self._remove(subscription)
+
+    async def _add(self, subscription: EventStreamSubscription) -> None:
+        new_channels: list[str] = []
+        for channel in subscription.channels:
+            subscriptions = self._subscriptions.setdefault(channel, set())
+            if not subscriptions:
+                new_channels.append(channel)
+            subscriptions.add(subscription)
+
+        if self._listener is None or self._listener.done():
+            # The listener subscribes to every registered channel on start
+            self._listener = asyncio.create_task(self._listen())
+        elif new_channels and self._pubsub is not None:
+            await self._pubsub.subscribe(*new_channels)
+
+    async def _remove(self, subscription: EventStreamSubscription) -> None:
+        stale_channels: list[str] = []
+        for channel in subscription.channels:
+            subscriptions = self._subscriptions.get(channel)
+            if subscriptions is None:
+                continue
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[channel]
+                stale_channels.append(channel)
+
+        if not self._subscriptions:
+            await self._stop()
+        elif stale_channels and self._pubsub is not None:
+            try:
+                await self._pubsub.unsubscribe(*stale_channels)
+            except ConnectionError:
+                # The listener will resubscribe to the live channels only
+                pass
+
+    async def _stop(self) -> None:
+        listener = self._listener
+        self._listener = None
+        if listener is not None and not listener.done():
+            listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await listener
+
+    async def _listen(self) -> None:
+        reconnect_delay = self._reconnect_delay
+        while self._subscriptions:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    self._pubsub = pubsub
+                    await pubsub.subscribe(*self._subscriptions)
+                    reconnect_delay = self._reconnect_delay
+                    while True:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True, timeout=10.0
+                        )
+                        if message is not None:
+                            self._dispatch(message["channel"], message["data"])
+            except ConnectionError as e:
+                log.warning(
+                    "eventstream.hub.connection_error",
+                    error=str(e),
+                    reconnect_delay=reconnect_delay,
+                )
+            except Exception as e:
+                log.exception(
+                    "eventstream.hub.listener_error",
+                    error=str(e),
+                    reconnect_delay=reconnect_delay,
+                )
+            finally:
+                self._pubsub = None
+
+            # The listener must outlive any error, or clients would wait forever
+            await asyncio.sleep(reconnect_delay)
+            reconnect_delay = min(reconnect_delay * 2, self._reconnect_max_delay)
+
+    def _dispatch(self, channel: str | bytes, data: Any) -> None:
+        if isinstance(channel, bytes):
+            channel = channel.decode("utf-8")
+
+        for subscription in list(self._subscriptions.get(channel, ())):
+            if subscription.dropped:
+                continue
+            if not subscription._put(data):
+                log.warning(
+                    "eventstream.hub.slow_consumer_dropped",
+                    channels=subscription.channels,
+                )
+                subscription._drop()
+
+
+_hub: EventStreamHub | None = None
+
+
+def get_eventstream_hub(redis: Redis) -> EventStreamHub:
+    """
+    Return the hub of the current process for the given Redis client.
+    """
+    global _hub
+    if _hub is None or _hub.redis is not redis:
+        _hub = EventStreamHub(redis)
+    return _hub
+
+
+__all__ = ["EventStreamHub", "EventStreamSubscription", "get_eventstream_hub"]
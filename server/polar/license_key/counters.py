@@ -0,0 +1,219 @@
+"""
+Write-coalesced validation counters of license keys.
+
+Validating a license key bumps its `validations`, `last_validated_at` and,
+optionally, `usage`. Doing it with a row UPDATE on every validation makes
+popular keys hot rows, so the increments are buffered in Redis instead:
+
+* `license_key:{id}:pending`: hash of the increments not yet written to the
+  database, flushed in bulk by the `license_key.flush_counters` cron;
+* `license_key:{id}:usage`: the key's total usage, seeded from the database,
+  so `limit_usage` is enforced by an atomic check-and-increment across
+  concurrent validations.
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from uuid import UUID
+
+import structlog
+from sqlalchemy import bindparam, func, update
+
+from polar.config import settings
+from polar.logging import Logger
+from polar.models import LicenseKey
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+
+log: Logger = structlog.get_logger()
+
+PENDING_KEY = "license_key:pending"
+"""Set of license keys with pending increments."""
+
+_VALIDATE_SCRIPT = """
+local pending_key, usage_key, pending_set_key = KEYS[1], KEYS[2], KEYS[3]
+local license_key_id, now = ARGV[1], ARGV[2]
+local increment, limit = tonumber(ARGV[3]), tonumber(ARGV[4])
+local stored_usage, usage_ttl = tonumber(ARGV[5]), tonumber(ARGV[6])
+
+local usage = redis.call("GET", usage_key)
+if usage then
+    usage = tonumber(usage)
+else
+    usage = stored_usage + tonumber(redis.call("HGET", pending_key, "usage") or "0")
+end
+
+if increment ~= 0 then
+    -- Negative increments give usages back, and are never limited
+    if increment > 0 and limit >= 0 and usage + increment > limit then
+        return {0, usage, 0}
+    end
+    usage = usage + increment
+    redis.call("SET", usage_key, usage, "EX", usage_ttl)
+    redis.call("HINCRBY", pending_key, "usage", increment)
+end
+
+local validations = redis.call("HINCRBY", pending_key, "validations", 1)
+redis.call("HSET", pending_key, "last_validated_at", now)
+redis.call("SADD", pending_set_key, license_key_id)
+
+return {1, usage, validations}
+"""
+
+
+_CLEAR_PENDING_SCRIPT = """
+local pending_key, pending_set_key = KEYS[1], KEYS[2]
+local license_key_id = ARGV[1]
+local validations, usage = tonumber(ARGV[2]), tonumber(ARGV[3])
+
+if redis.call("EXISTS", pending_key) == 1 then
+    local remaining = redis.call("HINCRBY", pending_key, "validations", -validations)
+    -- The usage may have been reset in the meantime
+    if usage ~= 0 and redis.call("HEXISTS", pending_key, "usage") == 1 then
+        redis.call("HINCRBY", pending_key, "usage", -usage)
+    end
+    -- Validated again since the flush read it: keep the new increments
+    if remaining > 0 then
+        return 0
+    end
+    redis.call("DEL", pending_key)
+end
+
+redis.call("SREM", pending_set_key, license_key_id)
+return 1
+"""
+
+
+def _get_pending_key(license_key_id: UUID | str) -> str:
+    return f"license_key:{license_key_id}:pending"
+
+
+def _get_usage_key(license_key_id: UUID | str) -> str:
+    return f"license_key:{license_key_id}:usage"
+
+
+@dataclass(slots=True)
+class ValidationResult:
+    allowed: bool
+    usage: int
+    """Total usage, including pending increments."""
+    pending_validations: int
+
+
+async def record_validation(
+    redis: Redis, license_key: LicenseKey, increment_usage: int | None = None
+) -> ValidationResult:
+    """
+    Record a validation of the license key, incrementing its usage.
+
+    Returns a result with `allowed=False`, without recording anything,
+    if the usage increment would exceed the key's `limit_usage`.
+    """
+    limit = license_key.limit_usage if license_key.limit_usage else -1
+    allowed, usage, validations = await redis.eval(
+        _VALIDATE_SCRIPT,
+        3,
+        _get_pending_key(license_key.id),
+        _get_usage_key(license_key.id),
+        PENDING_KEY,
+        str(license_key.id),
+        time.time(),
+        increment_usage or 0,
+        limit,
+        license_key.usage,
+        settings.LICENSE_KEY_USAGE_CACHE_TTL_SECONDS,
+    )
+    return ValidationResult(
+        allowed=bool(allowed), usage=int(usage), pending_validations=int(validations)
+    )
+
+
+async def reset_usage(redis: Redis, license_key_id: UUID) -> None:
+    """
+    Drop the buffered usage of the license key, after its usage or limit has been
+    set directly, so it's seeded again from the database.
+    """
+    async with redis.pipeline(transaction=True) as pipe:
+        await pipe.hdel(_get_pending_key(license_key_id), "usage")
+        await pipe.delete(_get_usage_key(license_key_id))
+        await pipe.execute()
+
+
+async def flush(session: AsyncSession, redis: Redis) -> int:
+    """
+    Write the pending increments to the database, in one bulk UPDATE per batch.
+
+    Increments are only removed from Redis once committed, and only those that
+    were flushed: validations recorded meanwhile are kept, and if the flush
+    fails, the next one picks everything up again.
+
+    Returns the number of license keys updated.
+    """
+    license_key_ids = sorted(await redis.smembers(PENDING_KEY))
+    batch_size = settings.LICENSE_KEY_COUNTERS_FLUSH_BATCH_SIZE
+
+    count = 0
+    for i in range(0, len(license_key_ids), batch_size):
+        batch = license_key_ids[i : i + batch_size]
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for license_key_id in batch:
+                await pipe.hgetall(_get_pending_key(license_key_id))
+            results = await pipe.execute()
+
+        parameters = []
+        for license_key_id, pending in zip(batch, results, strict=True):
+            if not pending:
+                continue
+            parameters.append(
+                {
+                    "b_id": UUID(license_key_id),
+                    "b_validations": int(pending.get("validations", 0)),
+                    "b_usage": int(pending.get("usage", 0)),
+                    "b_last_validated_at": datetime.fromtimestamp(
+                        float(pending["last_validated_at"]), tz=UTC
+                    ),
+                }
+            )
+
+        if parameters:
+            statement = (
+                update(LicenseKey)
+                .where(LicenseKey.id == bindparam("b_id"))
+                .values(
+                    validations=LicenseKey.validations + bindparam("b_validations"),
+                    usage=LicenseKey.usage + bindparam("b_usage"),
+                    last_validated_at=func.greatest(
+                        LicenseKey.last_validated_at, bindparam("b_last_validated_at")
+                    ),
+                )
+            )
+            connection = await session.connection()
+            await connection.execute(statement, parameters)
+            await session.commit()
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for license_key_id, pending in zip(batch, results, strict=True):
+                await pipe.eval(
+                    _CLEAR_PENDING_SCRIPT,
+                    2,
+                    _get_pending_key(license_key_id),
+                    PENDING_KEY,
+                    license_key_id,
+                    pending.get("validations", 0),
+                    pending.get("usage", 0),
+                )
+            await pipe.execute()
+        count += len(parameters)
+
+    log.debug("license_key.counters.flushed", count=count)
+    return count
+
+
+__all__ = [
+    "ValidationResult",
+    "flush",
+    "record_validation",
+    "reset_usage",
+]
@@ -10,6 +10,7 @@ from polar.models import LicenseKey, LicenseKeyActivation
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
 from polar.postgres import get_db_read_session, get_db_session
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
 from . import auth
@@ -104,13 +105,16 @@ async def update(
     id: UUID4,
     updates: LicenseKeyUpdate,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> LicenseKey:
     """Update a license key."""
     lk = await license_key_service.get(session, auth_subject, id)
     if not lk:
         raise ResourceNotFound()
 
-    updated = await license_key_service.update(session, license_key=lk, updates=updates)
+    updated = await license_key_service.update(
+        session, redis, license_key=lk, updates=updates
+    )
     return updated
 
 
@@ -154,6 +158,7 @@ async def validate(
     auth_subject: auth.LicenseKeysWrite,
     validate: LicenseKeyValidate,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> LicenseKey:
     """Validate a license key."""
     repository = LicenseKeyRepository.from_session(session)
@@ -168,7 +173,7 @@ async def validate(
         raise ResourceNotFound()
 
     return await license_key_service.validate(
-        session, license_key=license_key, validate=validate
+        session, redis, license_key=license_key, validate=validate
     )
 
 
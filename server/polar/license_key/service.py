@@ -5,6 +5,7 @@ from uuid import UUID
 import structlog
 from sqlalchemy import Select, func, select
 from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from polar.auth.models import AuthSubject, Customer, Member
 from polar.benefit.strategies.license_keys.properties import (
@@ -22,7 +23,9 @@ from polar.models import (
     User,
 )
 from polar.postgres import AsyncReadSession, AsyncSession
+from polar.redis import Redis
 
+from . import counters
 from .repository import LicenseKeyRepository
 from .schemas import (
     LicenseKeyActivate,
@@ -131,6 +134,7 @@ class LicenseKeyService:
     async def update(
         self,
         session: AsyncSession,
+        redis: Redis,
         *,
         license_key: LicenseKey,
         updates: LicenseKeyUpdate,
@@ -141,11 +145,16 @@ class LicenseKeyService:
 
         session.add(license_key)
         await session.flush()
+
+        if "usage" in update_dict:
+            await counters.reset_usage(redis, license_key.id)
+
         return license_key
 
     async def validate(
         self,
         session: AsyncSession,
+        redis: Redis,
         *,
         license_key: LicenseKey,
         validate: LicenseKeyValidate,
@@ -188,18 +197,28 @@ class LicenseKeyService:
             )
             raise ResourceNotFound("License key does not match given user.")
 
-        if validate.increment_usage and license_key.limit_usage:
-            remaining = license_key.limit_usage - license_key.usage
-            if validate.increment_usage > remaining:
-                bound_logger.info(
-                    "license_key.validate.insufficient_usage",
-                    usage_remaining=remaining,
-                    usage_requested=validate.increment_usage,
-                )
-                raise BadRequest(f"License key only has {remaining} more usages.")
-
-        license_key.mark_validated(increment_usage=validate.increment_usage)
-        session.add(license_key)
+        result = await counters.record_validation(
+            redis, license_key, validate.increment_usage
+        )
+        if not result.allowed:
+            assert license_key.limit_usage is not None
+            remaining = max(license_key.limit_usage - result.usage, 0)
+            bound_logger.info(
+                "license_key.validate.insufficient_usage",
+                usage_remaining=remaining,
+                usage_requested=validate.increment_usage,
+            )
+            raise BadRequest(f"License key only has {remaining} more usages.")
+
+        # Counters are buffered and written in bulk: reflect them on the
+        # returned key without marking it as modified.
+        set_committed_value(
+            license_key,
+            "validations",
+            license_key.validations + result.pending_validations,
+        )
+        set_committed_value(license_key, "usage", result.usage)
+        set_committed_value(license_key, "last_validated_at", utc_now())
         bound_logger.info("license_key.validate")
         return license_key
 
@@ -0,0 +1,26 @@
+import structlog
+
+from polar.logging import Logger
+from polar.worker import (
+    AsyncSessionMaker,
+    CronTrigger,
+    RedisMiddleware,
+    TaskPriority,
+    actor,
+)
+
+from . import counters
+
+log: Logger = structlog.get_logger()
+
+
+@actor(
+    actor_name="license_key.flush_counters",
+    cron_trigger=CronTrigger(minute="*"),
+    priority=TaskPriority.LOW,
+    max_retries=0,
+)
+async def license_key_flush_counters() -> None:
+    redis = RedisMiddleware.get()
+    async with AsyncSessionMaker() as session:
+        await counters.flush(session, redis)
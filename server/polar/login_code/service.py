@@ -8,7 +8,7 @@ from sqlalchemy import select
 from sqlalchemy.orm import joinedload
 
 from polar.config import settings
-from polar.email.react import render_email_template
+from polar.email.react import render_email_template_async
 from polar.email.schemas import LoginCodeEmail, LoginCodeProps
 from polar.email.sender import enqueue_email
 from polar.exceptions import PolarError
@@ -67,7 +67,7 @@ class LoginCodeService:
 
         email = login_code.email
         subject = "Sign in to Spaire"
-        body = render_email_template(
+        body = await render_email_template_async(
             LoginCodeEmail(
                 props=LoginCodeProps(
                     email=email,
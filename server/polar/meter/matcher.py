@@ -0,0 +1,275 @@
+"""
+In-process matching of events against the meters of an organization.
+
+`Meter.filter.matches` and `Meter.aggregation.matches` re-walk the filter tree
+and re-resolve metadata properties for every (event, meter) pair.
+`MeterMatcher` compiles the meters of an organization once:
+
+* each filter clause becomes a closure with its operator and expected value
+  resolved upfront;
+* meters whose filter requires a specific event name are indexed by that name,
+  so an event is only tested against meters it can possibly match;
+* the properties of an event are resolved once and shared by every meter
+  tested against it.
+
+The matching semantics are exactly the ones of `Filter.matches` and
+`Aggregation.matches`.
+"""
+
+import operator
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from datetime import datetime
+from typing import Any
+
+from polar.event.system import SystemEvent
+from polar.kit.metadata import get_nested_metadata_value
+from polar.models import Event, Meter
+from polar.models.event import EventSource
+
+from .aggregation import PropertyAggregation
+from .filter import Filter, FilterClause, FilterConjunction, FilterOperator
+
+_SYSTEM_METER_EVENTS = (SystemEvent.meter_credited, SystemEvent.meter_reset)
+_EVENT_PROPERTIES = ("name", "source", "timestamp")
+
+
+class _EventProperties(dict[str, Any]):
+    """
+    Lazily resolved properties of an event.
+
+    Each property is resolved at most once per event, whatever the number
+    of clauses referencing it.
+    """
+
+    def __init__(self, event: Event) -> None:
+        super().__init__()
+        self.event = event
+
+    def __missing__(self, property: str) -> Any:
+        if property == "name":
+            value: Any = self.event.name
+        elif property == "source":
+            value = self.event.source
+        elif property == "timestamp":
+            value = int(self.event.timestamp.timestamp())
+        else:
+            value = get_nested_metadata_value(self.event.user_metadata, property)
+        self[property] = value
+        return value
+
+
+type _Predicate = Callable[[_EventProperties], bool]
+
+
+def _always(properties: _EventProperties) -> bool:
+    return True
+
+
+def _never(properties: _EventProperties) -> bool:
+    return False
+
+
+_COMPARISON_OPERATORS: dict[FilterOperator, Callable[[Any, Any], Any]] = {
+    FilterOperator.eq: operator.eq,
+    FilterOperator.ne: operator.ne,
+    FilterOperator.gt: operator.gt,
+    FilterOperator.gte: operator.ge,
+    FilterOperator.lt: operator.lt,
+    FilterOperator.lte: operator.le,
+}
+
+
+def _compile_clause(clause: FilterClause) -> _Predicate:
+    property = clause.property
+    expected = clause.value
+
+    if property in ("name", "source") and not isinstance(expected, str):
+        return _never
+    if property == "timestamp" and not isinstance(expected, int):
+        return _never
+
+    if clause.operator in (FilterOperator.like, FilterOperator.not_like):
+        expected_str = str(expected)
+        negate = clause.operator == FilterOperator.not_like
+
+        def _like(properties: _EventProperties) -> bool:
+            actual = properties[property]
+            if actual is None:
+                return False
+            return (expected_str in str(actual)) is not negate
+
+        return _like
+
+    compare = _COMPARISON_OPERATORS[clause.operator]
+
+    def _compare(properties: _EventProperties) -> bool:
+        actual = properties[property]
+        if actual is None:
+            return False
+        try:
+            return bool(compare(actual, expected))
+        except TypeError:
+            return False
+
+    return _compare
+
+
+def _compile_filter(filter: Filter) -> _Predicate:
+    predicates = [
+        _compile_filter(clause)
+        if isinstance(clause, Filter)
+        else _compile_clause(clause)
+        for clause in filter.clauses
+    ]
+    if not predicates:
+        return _always
+    if len(predicates) == 1:
+        return predicates[0]
+
+    if filter.conjunction == FilterConjunction.and_:
+
+        def _and(properties: _EventProperties) -> bool:
+            return all(predicate(properties) for predicate in predicates)
+
+        return _and
+
+    def _or(properties: _EventProperties) -> bool:
+        return any(predicate(properties) for predicate in predicates)
+
+    return _or
+
+
+def _compile_aggregation(meter: Meter) -> _Predicate:
+    aggregation = meter.aggregation
+    if (
+        not isinstance(aggregation, PropertyAggregation)
+        or aggregation.property in _EVENT_PROPERTIES
+    ):
+        return _always
+
+    property = aggregation.property
+
+    def _numeric(properties: _EventProperties) -> bool:
+        return isinstance(properties[property], int | float)
+
+    return _numeric
+
+
+def _get_required_name(filter: Filter) -> str | None:
+    """
+    Return the event name a filter requires, if any.
+
+    That's the case when the filter is a conjunction with a `name eq` clause
+    at its top level: events with any other name can't match it.
+    """
+    if filter.conjunction != FilterConjunction.and_:
+        return None
+    for clause in filter.clauses:
+        if (
+            isinstance(clause, FilterClause)
+            and clause.property == "name"
+            and clause.operator == FilterOperator.eq
+            and isinstance(clause.value, str)
+        ):
+            return clause.value
+    return None
+
+
+class _CompiledMeter:
+    __slots__ = ("aggregation", "filter", "id")
+
+    def __init__(self, meter: Meter) -> None:
+        self.id = meter.id
+        self.filter = _compile_filter(meter.filter)
+        self.aggregation = _compile_aggregation(meter)
+
+    def matches(self, properties: _EventProperties) -> bool:
+        return self.filter(properties) and self.aggregation(properties)
+
+
+class MeterMatcher:
+    def __init__(self, meters: Sequence[Meter]) -> None:
+        self._meters_by_name: dict[str, list[_CompiledMeter]] = {}
+        self._unindexed_meters: list[_CompiledMeter] = []
+        self._system_meters: dict[str, uuid.UUID] = {}
+
+        for meter in meters:
+            compiled_meter = _CompiledMeter(meter)
+            self._system_meters[str(meter.id)] = meter.id
+            required_name = _get_required_name(meter.filter)
+            if required_name is None:
+                self._unindexed_meters.append(compiled_meter)
+            else:
+                self._meters_by_name.setdefault(required_name, []).append(
+                    compiled_meter
+                )
+
+    def match(self, event: Event) -> list[uuid.UUID]:
+        """
+        Return the IDs of the meters matching the event.
+        """
+        matching_meter_ids: list[uuid.UUID] = []
+
+        if event.source == EventSource.system and event.name in _SYSTEM_METER_EVENTS:
+            meter_id = event.user_metadata.get("meter_id")
+            if isinstance(meter_id, str) and meter_id in self._system_meters:
+                matching_meter_ids.append(self._system_meters[meter_id])
+
+        properties = _EventProperties(event)
+        for candidates in (
+            self._meters_by_name.get(event.name, ()),
+            self._unindexed_meters,
+        ):
+            for compiled_meter in candidates:
+                if compiled_meter.id in matching_meter_ids:
+                    continue
+                if compiled_meter.matches(properties):
+                    matching_meter_ids.append(compiled_meter.id)
+
+        return matching_meter_ids
+
+
+type _MeterSignature = tuple[tuple[uuid.UUID, datetime | None], ...]
+
+_MAX_CACHED_MATCHERS = 1024
+_matchers: OrderedDict[uuid.UUID, tuple[_MeterSignature, MeterMatcher]] = OrderedDict()
+
+
+def _get_signature(meters: Sequence[Meter]) -> _MeterSignature:
+    return tuple(
+        sorted((meter.id, meter.modified_at or meter.created_at) for meter in meters)
+    )
+
+
+def get_meter_matcher(
+    organization_id: uuid.UUID, meters: Sequence[Meter]
+) -> MeterMatcher:
+    """
+    Return the compiled matcher for the active meters of an organization.
+
+    Matchers are cached per organization. The cached matcher is reused as long
+    as the given meters are the same ones, with the same modification date,
+    as the ones it was compiled from; so changes made by other processes are
+    picked up as well.
+    """
+    signature = _get_signature(meters)
+    cached = _matchers.get(organization_id)
+    if cached is not None and cached[0] == signature:
+        _matchers.move_to_end(organization_id)
+        return cached[1]
+
+    matcher = MeterMatcher(meters)
+    _matchers[organization_id] = (signature, matcher)
+    _matchers.move_to_end(organization_id)
+    while len(_matchers) > _MAX_CACHED_MATCHERS:
+        _matchers.popitem(last=False)
+    return matcher
+
+
+def invalidate_meter_matcher(organization_id: uuid.UUID) -> None:
+    _matchers.pop(organization_id, None)
+
+
+__all__ = ["MeterMatcher", "get_meter_matcher", "invalidate_meter_matcher"]
@@ -4,6 +4,7 @@ from datetime import UTC, datetime
 from typing import Any
 from zoneinfo import ZoneInfo
 
+import dramatiq
 from sqlalchemy import (
     ColumnElement,
     ColumnExpressionArgument,
@@ -18,6 +19,7 @@ from sqlalchemy import (
     or_,
     select,
     text,
+    tuple_,
 )
 from sqlalchemy.orm import joinedload
 
@@ -41,20 +43,27 @@ from polar.models import (
     MeterEvent,
     Product,
     ProductPriceMeteredUnit,
-    SubscriptionProductPrice,
 )
 from polar.organization.resolver import get_payload_organization
 from polar.postgres import AsyncReadSession, AsyncSession
+from polar.redis import Redis
 from polar.subscription.repository import (
     CustomerSubscriptionProductPrice,
     SubscriptionProductPriceRepository,
 )
-from polar.worker import enqueue_job, make_bulk_job_delay_calculator
+from polar.worker import (
+    JobQueueManager,
+    enqueue_job,
+    make_bulk_job_delay_calculator,
+)
 
+from .matcher import invalidate_meter_matcher
 from .repository import MeterRepository
 from .schemas import MeterCreate, MeterQuantities, MeterQuantity, MeterUpdate
 from .sorting import MeterSortProperty
 
+BILLING_ENTRIES_CHUNK_SIZE = 1000
+
 
 class MeterService:
     async def list(
@@ -153,6 +162,7 @@ class MeterService:
         )
 
         enqueue_job("meter.backfill_events", meter.id)
+        invalidate_meter_matcher(meter.organization_id)
 
         return meter
 
@@ -198,7 +208,10 @@ class MeterService:
             else:
                 meter = await self.unarchive(session, meter)
 
-        return await repository.update(meter, update_dict=update_dict)
+        meter = await repository.update(meter, update_dict=update_dict)
+        invalidate_meter_matcher(meter.organization_id)
+
+        return meter
 
     async def archive(self, session: AsyncSession, meter: Meter) -> Meter:
         # Check if meter is attached to any active ProductPriceMeteredUnit
@@ -247,13 +260,17 @@ class MeterService:
             )
 
         repository = MeterRepository.from_session(session)
-        return await repository.update(
+        meter = await repository.update(
             meter, update_dict={"archived_at": datetime.now(UTC)}
         )
+        invalidate_meter_matcher(meter.organization_id)
+
+        return meter
 
     async def unarchive(self, session: AsyncSession, meter: Meter) -> Meter:
         repository = MeterRepository.from_session(session)
         meter = await repository.update(meter, update_dict={"archived_at": None})
+        invalidate_meter_matcher(meter.organization_id)
 
         event_repository = EventRepository.from_session(session)
         customer_repository = CustomerRepository.from_session(session)
@@ -493,23 +510,29 @@ class MeterService:
             enqueue_job("meter.billing_entries", meter.id, delay=calculate_delay(index))
             index += 1
 
-    async def _create_subscription_holder_billing_entry(
-        self,
-        session: AsyncSession,
-        event: Event,
-        customer: "Customer",
-        subscription_product_price: SubscriptionProductPrice,
-    ) -> BillingEntry:
-        billing_entry_repository = BillingEntryRepository.from_session(session)
-        return await billing_entry_repository.create(
-            BillingEntry.from_metered_event(customer, subscription_product_price, event)
-        )
-
     async def create_billing_entries(
-        self, session: AsyncSession, meter: Meter
+        self, session: AsyncSession, redis: Redis, meter: Meter
     ) -> Sequence[BillingEntry]:
+        """
+        Create the billing entries of the meter events ingested since the last run.
+
+        Events are processed in chunks of `BILLING_ENTRIES_CHUNK_SIZE`: for each
+        chunk, the subscription prices of its customers are fetched in bulk,
+        the entries are inserted at once and `meter.last_billed_event` is
+        advanced and committed. If the task is interrupted, the next run
+        resumes after the last committed chunk.
+
+        The meters of the subscriptions billed in a chunk are updated right after
+        its commit: the jobs are flushed with it, so they're not lost if a later
+        chunk fails.
+        """
         event_repository = EventRepository.from_session(session)
-        statement = (
+        billing_entry_repository = BillingEntryRepository.from_session(session)
+        subscription_product_price_repository = (
+            SubscriptionProductPriceRepository.from_session(session)
+        )
+
+        base_statement = (
             event_repository.get_base_statement()
             .join(MeterEvent, MeterEvent.event_id == Event.id)
             .where(
@@ -527,64 +550,83 @@ class MeterService:
                     ),
                 ),
             )
-            .order_by(MeterEvent.ingested_at.asc())
+            # Tie-break on event ID, so chunk boundaries are stable
+            # even when events share the same ingestion timestamp
+            .order_by(MeterEvent.ingested_at.asc(), MeterEvent.event_id.asc())
+            .limit(BILLING_ENTRIES_CHUNK_SIZE)
             .options(joinedload(Event.customer))
         )
-        last_billed_event = meter.last_billed_event
-        if last_billed_event is not None:
-            statement = statement.where(
-                MeterEvent.ingested_at > last_billed_event.ingested_at
-            )
 
-        subscription_product_price_repository = (
-            SubscriptionProductPriceRepository.from_session(session)
-        )
-        customer_price_map: dict[
-            uuid.UUID, CustomerSubscriptionProductPrice | None
-        ] = {}
+        customer_price_map: dict[uuid.UUID, CustomerSubscriptionProductPrice] = {}
+        resolved_customer_ids: set[uuid.UUID] = set()
 
         entries: list[BillingEntry] = []
-        updated_subscriptions: set[uuid.UUID] = set()
-        last_event: Event | None = None
-        async for event in event_repository.stream(statement):
-            last_event = event
-            customer = event.customer
-            assert customer is not None
-
-            # Retrieve the paying customer and subscription product price
-            try:
-                customer_price = customer_price_map[customer.id]
-            except KeyError:
-                customer_price = await subscription_product_price_repository.get_by_customer_and_meter(
-                    customer.id, meter.id
+        job_queue_manager = JobQueueManager.get()
+        while True:
+            statement = base_statement
+            last_billed_event = meter.last_billed_event
+            if last_billed_event is not None:
+                statement = statement.where(
+                    tuple_(MeterEvent.ingested_at, MeterEvent.event_id)
+                    > tuple_(last_billed_event.ingested_at, last_billed_event.id)
                 )
-                customer_price_map[customer.id] = customer_price
 
-            if customer_price is None:
-                continue
-
-            # Get the paying customer (billing manager) from the subscription
-            paying_customer = (
-                customer_price.subscription_product_price.subscription.customer
+            events = await event_repository.get_all(statement)
+            if not events:
+                break
+
+            # Retrieve the paying customers and subscription product prices
+            unresolved_customer_ids = list(
+                {
+                    event.customer.id
+                    for event in events
+                    if event.customer is not None
+                    and event.customer.id not in resolved_customer_ids
+                }
             )
-
-            entry = await self._create_subscription_holder_billing_entry(
-                session,
-                event,
-                paying_customer,
-                customer_price.subscription_product_price,
+            customer_price_map.update(
+                await subscription_product_price_repository.get_by_customers_and_meter(
+                    unresolved_customer_ids, meter.id
+                )
             )
-            entries.append(entry)
-            if entry.subscription is not None:
-                updated_subscriptions.add(entry.subscription.id)
+            resolved_customer_ids.update(unresolved_customer_ids)
+
+            chunk_entries: list[BillingEntry] = []
+            updated_subscriptions: set[uuid.UUID] = set()
+            for event in events:
+                customer = event.customer
+                assert customer is not None
+
+                customer_price = customer_price_map.get(customer.id)
+                if customer_price is None:
+                    continue
+
+                # Get the paying customer (billing manager) from the subscription
+                subscription_product_price = customer_price.subscription_product_price
+                chunk_entries.append(
+                    BillingEntry.from_metered_event(
+                        subscription_product_price.subscription.customer,
+                        subscription_product_price,
+                        event,
+                    )
+                )
+                updated_subscriptions.add(subscription_product_price.subscription_id)
 
-        meter.last_billed_event = (
-            last_event if last_event is not None else last_billed_event
-        )
-        session.add(meter)
+            if chunk_entries:
+                await billing_entry_repository.create_many(chunk_entries)
+                entries.extend(chunk_entries)
+
+            meter.last_billed_event = events[-1]
+            session.add(meter)
+
+            for subscription_id in updated_subscriptions:
+                enqueue_job("subscription.update_meters", subscription_id)
+
+            await session.commit()
+            await job_queue_manager.flush(dramatiq.get_broker(), redis)
 
-        for subscription_id in updated_subscriptions:
-            enqueue_job("subscription.update_meters", subscription_id)
+            if len(events) < BILLING_ENTRIES_CHUNK_SIZE:
+                break
 
         return entries
 
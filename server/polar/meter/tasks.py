@@ -6,12 +6,18 @@ from sqlalchemy import select
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import joinedload
 
-from polar.event.service import event as event_service
 from polar.exceptions import PolarTaskError
+from polar.meter.matcher import MeterMatcher
 from polar.meter.repository import MeterRepository
 from polar.meter.service import meter as meter_service
 from polar.models import Event, Meter, MeterEvent
-from polar.worker import AsyncSessionMaker, TaskPriority, actor, enqueue_job
+from polar.worker import (
+    AsyncSessionMaker,
+    RedisMiddleware,
+    TaskPriority,
+    actor,
+    enqueue_job,
+)
 
 
 class MeterTaskError(PolarTaskError): ...
@@ -52,7 +58,9 @@ async def meter_billing_entries(meter_id: uuid.UUID) -> None:
         if meter.archived_at is not None:
             return
 
-        await meter_service.create_billing_entries(session, meter)
+        await meter_service.create_billing_entries(
+            session, RedisMiddleware.get(), meter
+        )
 
 
 BACKFILL_BATCH_SIZE = 1000
@@ -87,6 +95,7 @@ async def meter_backfill_events(
         if not events:
             return
 
+        matcher = MeterMatcher([meter])
         meter_event_rows = [
             {
                 "meter_id": meter.id,
@@ -98,7 +107,7 @@ async def meter_backfill_events(
                 "timestamp": event.timestamp,
             }
             for event in events
-            if event_service._event_matches_meter(event, meter)
+            if meter.id in matcher.match(event)
         ]
 
         if meter_event_rows:
@@ -0,0 +1,106 @@
+"""Cache of metrics responses.
+
+Dashboards request the same metrics over and over, so responses are cached in
+Redis, keyed by the organizations they cover rather than by the requester, and
+by all the request parameters. Ranges including the current day are only
+cached for `METRICS_CACHE_TTL_SECONDS`, closed ranges for
+`METRICS_CACHE_HISTORICAL_TTL_SECONDS`.
+"""
+
+import hashlib
+import json
+import uuid
+from collections.abc import Sequence
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+import structlog
+from pydantic import ValidationError
+from redis import RedisError
+
+from polar.config import settings
+from polar.kit.time_queries import TimeInterval
+from polar.logging import Logger
+from polar.models.product import ProductBillingType
+from polar.observability import CACHE_LOOKUPS_TOTAL
+from polar.redis import get_app_redis
+
+from .schemas import MetricsResponse
+
+log: Logger = structlog.get_logger()
+
+_CACHE_NAME = "metrics"
+
+
+def _sorted(values: Sequence[object] | None) -> list[str] | None:
+    return None if values is None else sorted({str(v) for v in values})
+
+
+def get_key(
+    *,
+    organization_ids: Sequence[uuid.UUID],
+    start_date: date,
+    end_date: date,
+    timezone: ZoneInfo,
+    interval: TimeInterval,
+    product_id: Sequence[uuid.UUID] | None,
+    billing_type: Sequence[ProductBillingType] | None,
+    customer_id: Sequence[uuid.UUID] | None,
+    metrics: Sequence[str] | None,
+    tinybird_read: bool,
+) -> str:
+    parameters = {
+        "organization_ids": _sorted(organization_ids),
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "timezone": timezone.key,
+        "interval": interval.value,
+        "product_id": _sorted(product_id),
+        "billing_type": _sorted(billing_type),
+        "customer_id": _sorted(customer_id),
+        "metrics": _sorted(metrics),
+        "tinybird_read": tinybird_read,
+    }
+    digest = hashlib.sha256(json.dumps(parameters, sort_keys=True).encode()).hexdigest()
+    return f"metrics:response:{digest}"
+
+
+def get_ttl(end_date: date, timezone: ZoneInfo) -> int:
+    if end_date >= datetime.now(tz=timezone).date():
+        return settings.METRICS_CACHE_TTL_SECONDS
+    return settings.METRICS_CACHE_HISTORICAL_TTL_SECONDS
+
+
+async def get_response(key: str) -> MetricsResponse | None:
+    try:
+        value = await get_app_redis().get(key)
+    except RedisError as e:
+        log.warning("metrics.cache.redis_error", error=str(e))
+        value = None
+
+    response: MetricsResponse | None = None
+    if value is not None:
+        try:
+            response = MetricsResponse.model_validate_json(value)
+        except ValidationError:
+            response = None
+
+    CACHE_LOOKUPS_TOTAL.labels(
+        cache=_CACHE_NAME, result="miss" if response is None else "hit"
+    ).inc()
+    return response
+
+
+async def set_response(key: str, response: MetricsResponse, ttl: int) -> None:
+    try:
+        await get_app_redis().set(key, response.model_dump_json(), ex=ttl)
+    except RedisError as e:
+        log.warning("metrics.cache.redis_error", error=str(e))
+
+
+__all__ = [
+    "get_key",
+    "get_response",
+    "get_ttl",
+    "set_response",
+]
@@ -1,12 +1,16 @@
 import uuid
 from collections.abc import Generator, Sequence
 from datetime import UTC, datetime, timedelta
+from decimal import Decimal
 from enum import StrEnum
-from typing import TYPE_CHECKING, Protocol, cast
+from typing import TYPE_CHECKING, Any, Protocol, cast
 
 from sqlalchemy import (
     CTE,
+    BigInteger,
     ColumnElement,
+    Float,
+    Integer,
     Select,
     SQLColumnExpression,
     and_,
@@ -16,6 +20,8 @@ from sqlalchemy import (
     literal,
     or_,
     select,
+    type_coerce,
+    union_all,
 )
 from sqlalchemy.dialects.postgresql import TIMESTAMP
 
@@ -27,6 +33,8 @@ from polar.models import (
     CheckoutProduct,
     Customer,
     Event,
+    MetricsRollup,
+    MetricsRollupSource,
     Order,
     Organization,
     Product,
@@ -34,6 +42,7 @@ from polar.models import (
     User,
     UserOrganization,
 )
+from polar.models.checkout import CheckoutStatus
 from polar.models.product import ProductBillingType
 
 if TYPE_CHECKING:
@@ -138,7 +147,6 @@ def get_orders_metrics_cte(
     customer_id: Sequence[uuid.UUID] | None = None,
 ) -> CTE:
     start_timestamp, end_timestamp = bounds
-    timestamp_column: ColumnElement[datetime] = timestamp_series.c.timestamp
 
     readable_orders_statement = _get_readable_orders_statement(
         auth_subject,
@@ -207,6 +215,20 @@ def get_orders_metrics_cte(
         .group_by(day_column)
     )
 
+    return _get_orders_periods_cte(
+        timestamp_series, metrics, daily_metrics, historical_baseline
+    )
+
+
+def _get_orders_periods_cte(
+    timestamp_series: CTE,
+    metrics: list["type[SQLMetric]"],
+    daily_metrics: CTE,
+    historical_baseline: CTE | None,
+) -> CTE:
+    timestamp_column: ColumnElement[datetime] = timestamp_series.c.timestamp
+    cumulative_metrics = ["cumulative_revenue", "net_cumulative_revenue"]
+
     # Build from clause with conditional cross join
     from_clause = timestamp_series.join(
         daily_metrics,
@@ -332,6 +354,248 @@ def get_active_subscriptions_cte(
     )
 
 
+# Metrics of the active subscriptions query which are a sum, over the
+# subscriptions active in the period, of a value which doesn't depend on the
+# period. The sweep engine evaluates their expression once per subscription.
+SWEEP_ADDITIVE_METRICS = {
+    "active_subscriptions",
+    "committed_subscriptions",
+    "monthly_recurring_revenue",
+    "committed_monthly_recurring_revenue",
+}
+
+
+def get_active_subscriptions_sweep_cte(
+    timestamp_series: CTE,
+    interval: TimeInterval,
+    auth_subject: AuthSubject[User | Organization],
+    metrics: list["type[SQLMetric]"],
+    now: datetime,
+    *,
+    bounds: tuple[datetime, datetime],
+    organization_id: Sequence[uuid.UUID] | None = None,
+    product_id: Sequence[uuid.UUID] | None = None,
+    billing_type: Sequence[ProductBillingType] | None = None,
+    customer_id: Sequence[uuid.UUID] | None = None,
+) -> CTE:
+    """
+    Sweep-line equivalent of `get_active_subscriptions_cte`.
+
+    Instead of joining every period to every subscription, each subscription
+    emits a +value delta in the period it starts and a -value delta in the
+    period it ends. The value of a period is the running sum of the deltas up
+    to it, so the cost grows with the number of subscriptions, not with
+    periods × subscriptions.
+
+    Subscriptions started before the first period are accounted for in it.
+    Distinct customers, needed by the average revenue per user, are swept
+    over the merged intervals of their subscriptions.
+    """
+    from .metrics import MonthlyRecurringRevenueMetric
+
+    start_timestamp, end_timestamp = bounds
+    timestamp_column: ColumnElement[datetime] = timestamp_series.c.timestamp
+    bucket_column = interval.sql_date_trunc(timestamp_column)
+
+    readable_subscriptions_statement = _get_readable_subscriptions_statement(
+        auth_subject,
+        organization_id=organization_id,
+        product_id=product_id,
+        billing_type=billing_type,
+        customer_id=customer_id,
+    )
+
+    query_metrics = [
+        metric for metric in metrics if metric.query == MetricQuery.active_subscriptions
+    ]
+    additive_metrics = [
+        metric for metric in query_metrics if metric.slug in SWEEP_ADDITIVE_METRICS
+    ]
+    query_slugs = {metric.slug for metric in query_metrics}
+    with_new_subscriptions = "new_subscriptions" in query_slugs
+    with_customers = "average_revenue_per_user" in query_slugs
+
+    start_bucket = interval.sql_date_trunc(
+        cast(SQLColumnExpression[datetime], Subscription.started_at)
+    )
+    end_bucket = interval.sql_date_trunc(
+        cast(
+            SQLColumnExpression[datetime],
+            func.coalesce(Subscription.ended_at, Subscription.ends_at),
+        )
+    )
+
+    # One row per subscription active in at least one period, with the value
+    # of each additive metric for this subscription alone
+    subscription_columns = [
+        metric.get_sql_expression(start_bucket, interval, now).label(metric.slug)
+        for metric in additive_metrics
+    ]
+    if with_customers:
+        subscription_columns.append(
+            MonthlyRecurringRevenueMetric.get_sql_expression(
+                start_bucket, interval, now
+            ).label("customers_revenue")
+        )
+    subscriptions = cte(
+        select(
+            Subscription.customer_id,
+            start_bucket.label("start_bucket"),
+            end_bucket.label("end_bucket"),
+            *subscription_columns,
+        )
+        .where(
+            Subscription.id.in_(readable_subscriptions_statement),
+            # Filter to only include subscriptions that overlap with the original bounds
+            or_(
+                Subscription.started_at.is_(None),
+                Subscription.started_at <= end_timestamp,
+            ),
+            or_(
+                func.coalesce(Subscription.ended_at, Subscription.ends_at).is_(None),
+                func.coalesce(Subscription.ended_at, Subscription.ends_at)
+                >= start_timestamp,
+            ),
+            # Subscriptions ending in the period they start are never active
+            or_(
+                start_bucket.is_(None),
+                end_bucket.is_(None),
+                start_bucket < end_bucket,
+            ),
+        )
+        .group_by(Subscription.id)
+    )
+
+    first_bucket = select(func.min(bucket_column)).scalar_subquery()
+    delta_columns = [c.name for c in subscription_columns]
+    if with_new_subscriptions:
+        delta_columns.append("new_subscriptions")
+    if with_customers:
+        delta_columns.append("customers")
+
+    def _deltas(
+        bucket: ColumnElement[datetime], **values: ColumnElement[int]
+    ) -> Select[Any]:
+        return select(
+            # GREATEST ignores NULL: subscriptions without start begin in the first bucket
+            func.greatest(bucket, first_bucket).label("bucket"),
+            *(values.get(name, literal(0)).label(name) for name in delta_columns),
+        )
+
+    deltas_statements: list[Select[Any]] = [
+        _deltas(
+            subscriptions.c.start_bucket,
+            **{c.name: subscriptions.c[c.name] for c in subscription_columns},
+            new_subscriptions=case(
+                (subscriptions.c.start_bucket >= first_bucket, 1), else_=0
+            ),
+        ),
+        _deltas(
+            subscriptions.c.end_bucket,
+            **{c.name: -subscriptions.c[c.name] for c in subscription_columns},
+        ).where(subscriptions.c.end_bucket.is_not(None)),
+    ]
+
+    if with_customers:
+        # Merge the overlapping subscriptions of each customer into islands,
+        # so each customer counts once in every period they're active in
+        lower = func.coalesce(
+            subscriptions.c.start_bucket,
+            func.cast(literal("-infinity"), TIMESTAMP(timezone=True)),
+        )
+        upper = func.coalesce(
+            subscriptions.c.end_bucket,
+            func.cast(literal("infinity"), TIMESTAMP(timezone=True)),
+        )
+        ordered = select(
+            subscriptions.c.customer_id,
+            lower.label("lower"),
+            upper.label("upper"),
+            func.max(upper)
+            .over(
+                partition_by=subscriptions.c.customer_id,
+                order_by=(lower, upper),
+                rows=(None, -1),
+            )
+            .label("previous_upper"),
+        ).subquery()
+        numbered = select(
+            ordered.c.customer_id,
+            ordered.c.lower,
+            ordered.c.upper,
+            func.sum(
+                case(
+                    (
+                        or_(
+                            ordered.c.previous_upper.is_(None),
+                            ordered.c.lower > ordered.c.previous_upper,
+                        ),
+                        1,
+                    ),
+                    else_=0,
+                )
+            )
+            .over(
+                partition_by=ordered.c.customer_id,
+                order_by=(ordered.c.lower, ordered.c.upper),
+            )
+            .label("island"),
+        ).subquery()
+        islands = cte(
+            select(
+                func.min(numbered.c.lower).label("lower"),
+                func.max(numbered.c.upper).label("upper"),
+            ).group_by(numbered.c.customer_id, numbered.c.island)
+        )
+        # Islands without end have an infinite upper bound, never reached
+        deltas_statements.append(_deltas(islands.c.lower, customers=literal(1)))
+        deltas_statements.append(_deltas(islands.c.upper, customers=literal(-1)))
+
+    deltas = union_all(*deltas_statements).subquery()
+    bucket_deltas = cte(
+        select(
+            deltas.c.bucket,
+            *(func.sum(deltas.c[name]).label(name) for name in delta_columns),
+        ).group_by(deltas.c.bucket)
+    )
+
+    def _running_sum(name: str) -> ColumnElement[int]:
+        return func.coalesce(
+            func.sum(bucket_deltas.c[name]).over(order_by=timestamp_column), 0
+        )
+
+    columns: list[ColumnElement[int] | ColumnElement[float]] = []
+    for metric in query_metrics:
+        if metric.slug in SWEEP_ADDITIVE_METRICS:
+            column = _running_sum(metric.slug)
+        elif metric.slug == "new_subscriptions":
+            column = func.coalesce(bucket_deltas.c.new_subscriptions, 0)
+        elif metric.slug == "average_revenue_per_user":
+            customers = _running_sum("customers")
+            column = func.cast(
+                case(
+                    (customers == 0, 0),
+                    else_=_running_sum("customers_revenue") / customers,
+                ),
+                Integer,
+            )
+        else:
+            raise NotImplementedError(metric.slug)
+        columns.append(column.label(metric.slug))
+
+    return cte(
+        select(timestamp_column.label("timestamp"), *columns)
+        .select_from(
+            timestamp_series.join(
+                bucket_deltas,
+                onclause=bucket_deltas.c.bucket == bucket_column,
+                isouter=True,
+            )
+        )
+        .order_by(timestamp_column.asc())
+    )
+
+
 def _get_readable_subscriptions_statement(
     auth_subject: AuthSubject[User | Organization],
     *,
@@ -381,22 +645,7 @@ def _get_readable_subscriptions_statement(
 CHECKOUT_OPENED_AT_CUTOFF = datetime(2026, 1, 22, 12, 13, 0, tzinfo=UTC)
 
 
-def get_checkouts_cte(
-    timestamp_series: CTE,
-    interval: TimeInterval,
-    auth_subject: AuthSubject[User | Organization],
-    metrics: list["type[SQLMetric]"],
-    now: datetime,
-    *,
-    bounds: tuple[datetime, datetime],
-    organization_id: Sequence[uuid.UUID] | None = None,
-    product_id: Sequence[uuid.UUID] | None = None,
-    billing_type: Sequence[ProductBillingType] | None = None,
-    customer_id: Sequence[uuid.UUID] | None = None,
-) -> CTE:
-    start_timestamp, end_timestamp = bounds
-    timestamp_column: ColumnElement[datetime] = timestamp_series.c.timestamp
-
+def _get_checkout_effective_timestamp() -> ColumnElement[datetime]:
     # `opened_at` tracks when the checkout page was first viewed by a customer
     # which excludes premature API checkout sessions that were never visited
     opened_at_column = func.cast(
@@ -406,7 +655,7 @@ def get_checkouts_cte(
     # Conditional effective_timestamp based on cutoff date:
     # - Before cutoff: Use COALESCE(opened_at, created_at) for historical data
     # - After cutoff: Use opened_at directly (NULL means not opened, should be excluded)
-    effective_timestamp = case(
+    return case(
         (
             Checkout.created_at < CHECKOUT_OPENED_AT_CUTOFF,
             func.coalesce(opened_at_column, Checkout.created_at),
@@ -414,6 +663,24 @@ def get_checkouts_cte(
         else_=opened_at_column,
     )
 
+
+def get_checkouts_cte(
+    timestamp_series: CTE,
+    interval: TimeInterval,
+    auth_subject: AuthSubject[User | Organization],
+    metrics: list["type[SQLMetric]"],
+    now: datetime,
+    *,
+    bounds: tuple[datetime, datetime],
+    organization_id: Sequence[uuid.UUID] | None = None,
+    product_id: Sequence[uuid.UUID] | None = None,
+    billing_type: Sequence[ProductBillingType] | None = None,
+    customer_id: Sequence[uuid.UUID] | None = None,
+) -> CTE:
+    start_timestamp, end_timestamp = bounds
+    timestamp_column: ColumnElement[datetime] = timestamp_series.c.timestamp
+    effective_timestamp = _get_checkout_effective_timestamp()
+
     readable_checkouts_statement = (
         select(Checkout.id)
         .join(CheckoutProduct, CheckoutProduct.checkout_id == Checkout.id)
@@ -759,6 +1026,438 @@ def get_events_metrics_cte(
     )
 
 
+def get_rollups_cutoff(now: datetime) -> datetime:
+    """
+    Start of the current UTC day: rollups serve the hours before it, and the hours
+    after it are read from the source tables.
+    """
+    return now.astimezone(UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _get_rollup_hour(
+    column: SQLColumnExpression[datetime],
+) -> ColumnElement[datetime]:
+    return func.date_trunc("hour", column, "UTC", type_=TIMESTAMP(timezone=True))
+
+
+def _get_readable_organizations_clauses(
+    column: SQLColumnExpression[uuid.UUID],
+    auth_subject: AuthSubject[User | Organization],
+    organization_id: Sequence[uuid.UUID] | None,
+) -> list[ColumnElement[bool]]:
+    clauses: list[ColumnElement[bool]] = []
+    if is_user(auth_subject):
+        clauses.append(
+            column.in_(
+                select(UserOrganization.organization_id).where(
+                    UserOrganization.user_id == auth_subject.subject.id,
+                    UserOrganization.deleted_at.is_(None),
+                )
+            )
+        )
+    elif is_organization(auth_subject):
+        clauses.append(column == auth_subject.subject.id)
+
+    if organization_id is not None:
+        clauses.append(column.in_(organization_id))
+
+    return clauses
+
+
+def get_orders_rollup_statement() -> Select[
+    tuple[
+        uuid.UUID, datetime, uuid.UUID | None, ProductBillingType, bool, int, int, int
+    ]
+]:
+    """Paid orders, aggregated per organization, UTC hour and product."""
+    hour = _get_rollup_hour(Order.created_at)
+    billing_type = Product.billing_type
+    one_time = Order.subscription_id.is_(None)
+    return (
+        select(
+            Product.organization_id.label("organization_id"),
+            hour.label("hour"),
+            Order.product_id.label("product_id"),
+            billing_type.label("billing_type"),
+            one_time.label("one_time"),
+            func.count(Order.id).label("orders"),
+            func.coalesce(func.sum(Order.net_amount), 0).label("revenue"),
+            func.coalesce(func.sum(Order.payout_amount), 0).label("net_revenue"),
+        )
+        .join(Product, onclause=Order.product_id == Product.id)
+        .where(Order.paid.is_(True))
+        .group_by(
+            Product.organization_id, hour, Order.product_id, billing_type, one_time
+        )
+    )
+
+
+def get_checkouts_rollup_statement() -> Select[tuple[uuid.UUID, datetime, int, int]]:
+    """Opened checkouts, aggregated per organization and UTC hour."""
+    effective_timestamp = _get_checkout_effective_timestamp()
+    hour = _get_rollup_hour(effective_timestamp)
+    return (
+        select(
+            Checkout.organization_id.label("organization_id"),
+            hour.label("hour"),
+            func.count(Checkout.id).label("checkouts"),
+            func.count(Checkout.id)
+            .filter(Checkout.status == CheckoutStatus.succeeded)
+            .label("succeeded_checkouts"),
+        )
+        .where(
+            effective_timestamp.is_not(None),
+            Checkout.id.in_(select(CheckoutProduct.checkout_id)),
+        )
+        .group_by(Checkout.organization_id, hour)
+    )
+
+
+def get_events_rollup_statement() -> Select[tuple[uuid.UUID, datetime, Decimal]]:
+    """Cost events, aggregated per organization and UTC hour."""
+    hour = _get_rollup_hour(Event.timestamp)
+    return (
+        select(
+            Event.organization_id.label("organization_id"),
+            hour.label("hour"),
+            func.sum(Event.user_metadata["_cost"]["amount"].as_numeric(17, 12)).label(
+                "costs"
+            ),
+        )
+        .where(Event.user_metadata["_cost"].is_not(None))
+        .group_by(Event.organization_id, hour)
+    )
+
+
+ORDERS_ROLLUP_METRICS = {
+    "orders",
+    "revenue",
+    "net_revenue",
+    "cumulative_revenue",
+    "net_cumulative_revenue",
+    "average_order_value",
+    "net_average_order_value",
+    "one_time_products",
+    "one_time_products_revenue",
+    "one_time_products_net_revenue",
+}
+CHECKOUTS_ROLLUP_METRICS = {"checkouts", "succeeded_checkouts", "checkouts_conversion"}
+EVENTS_ROLLUP_METRICS = {"costs", "cumulative_costs"}
+
+
+def get_orders_rollup_metrics_cte(
+    timestamp_series: CTE,
+    interval: TimeInterval,
+    auth_subject: AuthSubject[User | Organization],
+    metrics: list["type[SQLMetric]"],
+    now: datetime,
+    *,
+    bounds: tuple[datetime, datetime],
+    organization_id: Sequence[uuid.UUID] | None = None,
+    product_id: Sequence[uuid.UUID] | None = None,
+    billing_type: Sequence[ProductBillingType] | None = None,
+    customer_id: Sequence[uuid.UUID] | None = None,
+) -> CTE:
+    """
+    Same as `get_orders_metrics_cte` for the `ORDERS_ROLLUP_METRICS`, reading
+    the hourly rollups before the current UTC day.
+    """
+    assert customer_id is None, "Rollups aren't split by customer"
+    start_timestamp, end_timestamp = bounds
+    cutoff = get_rollups_cutoff(now)
+
+    rollups_statement = select(
+        MetricsRollup.hour,
+        MetricsRollup.one_time,
+        MetricsRollup.orders,
+        MetricsRollup.revenue,
+        MetricsRollup.net_revenue,
+    ).where(
+        MetricsRollup.source == MetricsRollupSource.orders,
+        MetricsRollup.hour < cutoff,
+        MetricsRollup.hour <= end_timestamp,
+        *_get_readable_organizations_clauses(
+            MetricsRollup.organization_id, auth_subject, organization_id
+        ),
+    )
+    current_statement = get_orders_rollup_statement().where(
+        Order.created_at >= cutoff,
+        Order.created_at <= end_timestamp,
+        *_get_readable_organizations_clauses(
+            Product.organization_id, auth_subject, organization_id
+        ),
+    )
+    if product_id is not None:
+        rollups_statement = rollups_statement.where(
+            MetricsRollup.product_id.in_(product_id)
+        )
+        current_statement = current_statement.where(Order.product_id.in_(product_id))
+    if billing_type is not None:
+        rollups_statement = rollups_statement.where(
+            MetricsRollup.billing_type.in_(billing_type)
+        )
+        current_statement = current_statement.where(
+            Product.billing_type.in_(billing_type)
+        )
+
+    current_hours = current_statement.subquery()
+    hours = union_all(
+        rollups_statement,
+        select(
+            current_hours.c.hour,
+            current_hours.c.one_time,
+            current_hours.c.orders,
+            current_hours.c.revenue,
+            current_hours.c.net_revenue,
+        ),
+    ).subquery()
+
+    orders = func.sum(hours.c.orders)
+    revenue = func.sum(hours.c.revenue)
+    net_revenue = func.sum(hours.c.net_revenue)
+    expressions: dict[str, ColumnElement[Any]] = {
+        "orders": orders,
+        "revenue": revenue,
+        "net_revenue": net_revenue,
+        "cumulative_revenue": revenue,
+        "net_cumulative_revenue": net_revenue,
+        "average_order_value": func.cast(
+            func.ceil(revenue / func.nullif(orders, 0)), Integer
+        ),
+        "net_average_order_value": func.cast(
+            func.ceil(net_revenue / func.nullif(orders, 0)), Integer
+        ),
+        "one_time_products": orders.filter(hours.c.one_time),
+        "one_time_products_revenue": revenue.filter(hours.c.one_time),
+        "one_time_products_net_revenue": net_revenue.filter(hours.c.one_time),
+    }
+
+    historical_baseline = None
+    if any(m.slug in {"cumulative_revenue", "net_cumulative_revenue"} for m in metrics):
+        historical_baseline = cte(
+            select(
+                func.coalesce(revenue, 0).label("hist_cumulative_revenue"),
+                func.coalesce(net_revenue, 0).label("hist_net_cumulative_revenue"),
+            ).where(hours.c.hour < start_timestamp)
+        )
+
+    day_column = interval.sql_date_trunc(hours.c.hour)
+    daily_metrics = cte(
+        select(
+            day_column.label("day"),
+            *[
+                func.coalesce(expressions[metric.slug], 0).label(metric.slug)
+                for metric in metrics
+                if metric.query == MetricQuery.orders
+            ],
+        )
+        .where(hours.c.hour >= start_timestamp)
+        .group_by(day_column)
+    )
+
+    return _get_orders_periods_cte(
+        timestamp_series, metrics, daily_metrics, historical_baseline
+    )
+
+
+def get_checkouts_rollup_metrics_cte(
+    timestamp_series: CTE,
+    interval: TimeInterval,
+    auth_subject: AuthSubject[User | Organization],
+    metrics: list["type[SQLMetric]"],
+    now: datetime,
+    *,
+    bounds: tuple[datetime, datetime],
+    organization_id: Sequence[uuid.UUID] | None = None,
+    product_id: Sequence[uuid.UUID] | None = None,
+    billing_type: Sequence[ProductBillingType] | None = None,
+    customer_id: Sequence[uuid.UUID] | None = None,
+) -> CTE:
+    """
+    Same as `get_checkouts_cte` for the `CHECKOUTS_ROLLUP_METRICS`, reading
+    the hourly rollups before the current UTC day.
+    """
+    assert product_id is None, "Checkouts rollups aren't split by product"
+    assert billing_type is None, "Checkouts rollups aren't split by billing type"
+    assert customer_id is None, "Checkouts rollups aren't split by customer"
+    start_timestamp, end_timestamp = bounds
+    timestamp_column: ColumnElement[datetime] = timestamp_series.c.timestamp
+    cutoff = get_rollups_cutoff(now)
+
+    effective_timestamp = _get_checkout_effective_timestamp()
+    current_hours = (
+        get_checkouts_rollup_statement()
+        .where(
+            Checkout.created_at
+            >= cutoff - timedelta(seconds=settings.CHECKOUT_TTL_SECONDS),
+            effective_timestamp >= cutoff,
+            effective_timestamp <= end_timestamp,
+            *_get_readable_organizations_clauses(
+                Checkout.organization_id, auth_subject, organization_id
+            ),
+        )
+        .subquery()
+    )
+    hours = union_all(
+        select(
+            MetricsRollup.hour,
+            MetricsRollup.checkouts,
+            MetricsRollup.succeeded_checkouts,
+        ).where(
+            MetricsRollup.source == MetricsRollupSource.checkouts,
+            MetricsRollup.hour < cutoff,
+            MetricsRollup.hour >= start_timestamp,
+            MetricsRollup.hour <= end_timestamp,
+            *_get_readable_organizations_clauses(
+                MetricsRollup.organization_id, auth_subject, organization_id
+            ),
+        ),
+        select(
+            current_hours.c.hour,
+            current_hours.c.checkouts,
+            current_hours.c.succeeded_checkouts,
+        ),
+    ).subquery()
+
+    # Cast back the sums to integers, to divide them like the counts
+    checkouts = func.cast(func.sum(hours.c.checkouts), BigInteger)
+    succeeded_checkouts = func.cast(func.sum(hours.c.succeeded_checkouts), BigInteger)
+    expressions: dict[str, ColumnElement[Any]] = {
+        "checkouts": checkouts,
+        "succeeded_checkouts": succeeded_checkouts,
+        "checkouts_conversion": type_coerce(
+            case(
+                (checkouts == 0, 0),
+                else_=succeeded_checkouts / checkouts,
+            ),
+            Float,
+        ),
+    }
+
+    day_column = interval.sql_date_trunc(hours.c.hour)
+    daily_metrics = cte(
+        select(
+            day_column.label("day"),
+            *[
+                expressions[metric.slug].label(metric.slug)
+                for metric in metrics
+                if metric.query == MetricQuery.checkouts
+            ],
+        )
+        .where(hours.c.hour >= start_timestamp)
+        .group_by(day_column)
+    )
+
+    return cte(
+        select(
+            timestamp_column.label("timestamp"),
+            *[
+                func.coalesce(getattr(daily_metrics.c, metric.slug), 0).label(
+                    metric.slug
+                )
+                for metric in metrics
+                if metric.query == MetricQuery.checkouts
+            ],
+        )
+        .select_from(
+            timestamp_series.join(
+                daily_metrics,
+                onclause=daily_metrics.c.day == timestamp_column,
+                isouter=True,
+            )
+        )
+        .order_by(timestamp_column.asc())
+    )
+
+
+def get_events_rollup_metrics_cte(
+    timestamp_series: CTE,
+    interval: TimeInterval,
+    auth_subject: AuthSubject[User | Organization],
+    metrics: list["type[SQLMetric]"],
+    now: datetime,
+    *,
+    bounds: tuple[datetime, datetime],
+    organization_id: Sequence[uuid.UUID] | None = None,
+    customer_id: Sequence[uuid.UUID] | None = None,
+    product_id: Sequence[uuid.UUID] | None = None,
+    billing_type: Sequence[ProductBillingType] | None = None,
+) -> CTE:
+    """
+    Same as `get_events_metrics_cte` for the `EVENTS_ROLLUP_METRICS`, reading
+    the hourly rollups before the current UTC day.
+    """
+    assert customer_id is None, "Rollups aren't split by customer"
+    start_timestamp, end_timestamp = bounds
+    timestamp_column: ColumnElement[datetime] = timestamp_series.c.timestamp
+    cutoff = get_rollups_cutoff(now)
+
+    current_hours = (
+        get_events_rollup_statement()
+        .where(
+            Event.timestamp >= cutoff,
+            Event.timestamp >= start_timestamp,
+            Event.timestamp <= end_timestamp,
+            *_get_readable_organizations_clauses(
+                Event.organization_id, auth_subject, organization_id
+            ),
+        )
+        .subquery()
+    )
+    hours = union_all(
+        select(MetricsRollup.hour, MetricsRollup.costs).where(
+            MetricsRollup.source == MetricsRollupSource.events,
+            MetricsRollup.hour < cutoff,
+            MetricsRollup.hour >= start_timestamp,
+            MetricsRollup.hour <= end_timestamp,
+            *_get_readable_organizations_clauses(
+                MetricsRollup.organization_id, auth_subject, organization_id
+            ),
+        ),
+        select(current_hours.c.hour, current_hours.c.costs),
+    ).subquery()
+
+    day_column = interval.sql_date_trunc(hours.c.hour)
+    daily_metrics = cte(
+        select(
+            day_column.label("day"),
+            *[
+                func.coalesce(func.sum(hours.c.costs), 0).label(metric.slug)
+                for metric in metrics
+                if metric.query == MetricQuery.events
+            ],
+        ).group_by(day_column)
+    )
+
+    return cte(
+        select(
+            timestamp_column.label("timestamp"),
+            *[
+                (
+                    func.coalesce(
+                        func.sum(getattr(daily_metrics.c, metric.slug)).over(
+                            order_by=timestamp_column
+                        ),
+                        0,
+                    )
+                    if metric.slug == "cumulative_costs"
+                    else func.coalesce(getattr(daily_metrics.c, metric.slug), 0)
+                ).label(metric.slug)
+                for metric in metrics
+                if metric.query == MetricQuery.events
+            ],
+        )
+        .select_from(
+            timestamp_series.join(
+                daily_metrics,
+                onclause=daily_metrics.c.day == timestamp_column,
+                isouter=True,
+            )
+        )
+        .order_by(timestamp_column.asc())
+    )
+
+
 QUERIES: list[QueryCallable] = [
     get_orders_metrics_cte,
     get_active_subscriptions_cte,
@@ -777,3 +1476,10 @@ QUERY_TO_FUNCTION: dict[MetricQuery, QueryCallable] = {
     MetricQuery.churned_subscriptions: get_churned_subscriptions_cte,
     MetricQuery.events: get_events_metrics_cte,
 }
+
+# Mapping from query function to its rollup variant, and the metrics it serves
+ROLLUP_QUERIES: dict[QueryCallable, tuple[QueryCallable, set[str]]] = {
+    get_orders_metrics_cte: (get_orders_rollup_metrics_cte, ORDERS_ROLLUP_METRICS),
+    get_checkouts_cte: (get_checkouts_rollup_metrics_cte, CHECKOUTS_ROLLUP_METRICS),
+    get_events_metrics_cte: (get_events_rollup_metrics_cte, EVENTS_ROLLUP_METRICS),
+}
@@ -0,0 +1,229 @@
+"""
+Hourly rollups of the orders, checkouts and costs metrics.
+
+The `metrics.refresh_rollups` cron aggregates the source tables per
+organization and UTC hour into `metrics_rollups`, so metrics over the days
+before the current one don't scan the source rows; see the `*_rollup_metrics_cte`
+queries.
+
+Each refresh starts from the watermark of the previous one, stored in Redis:
+
+* orders change after their creation (payment, refund...), so the hours of
+  the orders created or modified since the watermark are recomputed;
+* checkouts are opened after their creation, so the hours of the last
+  `METRICS_ROLLUPS_REFRESH_LOOKBACK_SECONDS` are recomputed, using the
+  indexed creation dates;
+* events are immutable but may be ingested with a past timestamp, so the hours
+  of the events ingested since the watermark are recomputed.
+
+Without a watermark, the rollups are rebuilt from scratch. The rollups are
+only served when the watermark is past the start of the current UTC day, i.e.
+when they cover all the days before it.
+"""
+
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import structlog
+from redis import RedisError
+from sqlalchemy import (
+    Select,
+    and_,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+
+from polar.config import settings
+from polar.kit.utils import utc_now
+from polar.logging import Logger
+from polar.models import (
+    Checkout,
+    Event,
+    MetricsRollup,
+    MetricsRollupSource,
+    Order,
+    Product,
+)
+from polar.postgres import AsyncSession
+from polar.redis import Redis, get_app_redis
+
+from .queries import (
+    get_checkouts_rollup_statement,
+    get_events_rollup_statement,
+    get_orders_rollup_statement,
+    get_rollups_cutoff,
+)
+
+log: Logger = structlog.get_logger()
+
+WATERMARK_KEY = "metrics:rollups:watermark"
+
+
+async def get_watermark(redis: Redis) -> datetime | None:
+    value = await redis.get(WATERMARK_KEY)
+    if value is None:
+        return None
+    return datetime.fromtimestamp(float(value), tz=UTC)
+
+
+async def set_watermark(redis: Redis, watermark: datetime) -> None:
+    await redis.set(WATERMARK_KEY, str(watermark.timestamp()))
+
+
+async def is_fresh(now: datetime) -> bool:
+    """Whether the rollups cover all the hours before the current UTC day."""
+    try:
+        watermark = await get_watermark(get_app_redis())
+    except RedisError as e:
+        log.warning("metrics.rollups.redis_error", error=str(e))
+        return False
+    return watermark is not None and watermark >= get_rollups_cutoff(now)
+
+
+async def refresh(session: AsyncSession, redis: Redis) -> datetime:
+    """
+    Recompute the rollups changed since the last refresh.
+
+    Returns the new watermark, to be set once the session is committed.
+    """
+    watermark = utc_now()
+    previous_watermark = await get_watermark(redis)
+
+    since: datetime | None = None
+    changed_since: datetime | None = None
+    if previous_watermark is not None:
+        since = (
+            previous_watermark
+            - timedelta(seconds=settings.METRICS_ROLLUPS_REFRESH_LOOKBACK_SECONDS)
+        ).replace(minute=0, second=0, microsecond=0)
+        changed_since = previous_watermark - timedelta(
+            seconds=settings.METRICS_ROLLUPS_REFRESH_OVERLAP_SECONDS
+        )
+
+    await _refresh_orders(session, changed_since)
+    await _refresh_checkouts(session, since)
+    await _refresh_events(session, changed_since)
+
+    log.info(
+        "metrics.rollups.refreshed",
+        previous_watermark=previous_watermark,
+        watermark=watermark,
+    )
+    return watermark
+
+
+async def _refresh_orders(session: AsyncSession, since: datetime | None) -> None:
+    delete_statement = delete(MetricsRollup).where(
+        MetricsRollup.source == MetricsRollupSource.orders
+    )
+    statement = get_orders_rollup_statement()
+    if since is not None:
+        hour = func.date_trunc(
+            "hour", Order.created_at, "UTC", type_=TIMESTAMP(timezone=True)
+        )
+        dirty_hours = (
+            select(Product.organization_id.label("organization_id"), hour.label("hour"))
+            .join(Product, onclause=Order.product_id == Product.id)
+            .where(or_(Order.created_at >= since, Order.modified_at >= since))
+            .group_by(Product.organization_id, hour)
+            .subquery()
+        )
+        delete_statement = delete_statement.where(
+            tuple_(MetricsRollup.organization_id, MetricsRollup.hour).in_(
+                select(dirty_hours.c.organization_id, dirty_hours.c.hour)
+            )
+        )
+        statement = statement.join(
+            dirty_hours,
+            onclause=and_(
+                Product.organization_id == dirty_hours.c.organization_id,
+                Order.created_at >= dirty_hours.c.hour,
+                Order.created_at < dirty_hours.c.hour + timedelta(hours=1),
+            ),
+        )
+
+    await session.execute(delete_statement)
+    await _insert(session, MetricsRollupSource.orders, statement)
+
+
+async def _refresh_checkouts(session: AsyncSession, since: datetime | None) -> None:
+    delete_statement = delete(MetricsRollup).where(
+        MetricsRollup.source == MetricsRollupSource.checkouts
+    )
+    statement = get_checkouts_rollup_statement()
+    if since is not None:
+        delete_statement = delete_statement.where(MetricsRollup.hour >= since)
+        # A checkout is opened before it expires, so at most a TTL after its creation
+        statement = statement.where(
+            Checkout.created_at
+            >= since - timedelta(seconds=settings.CHECKOUT_TTL_SECONDS),
+        )
+        # The checkouts created in the TTL before `since` only complete the hours
+        # after it: the hours before it are partial, keep their existing rollups.
+        subquery = statement.subquery()
+        statement = select(subquery).where(subquery.c.hour >= since)
+
+    await session.execute(delete_statement)
+    await _insert(session, MetricsRollupSource.checkouts, statement)
+
+
+async def _refresh_events(session: AsyncSession, since: datetime | None) -> None:
+    delete_statement = delete(MetricsRollup).where(
+        MetricsRollup.source == MetricsRollupSource.events
+    )
+    statement = get_events_rollup_statement()
+    if since is not None:
+        hour = func.date_trunc(
+            "hour", Event.timestamp, "UTC", type_=TIMESTAMP(timezone=True)
+        )
+        dirty_hours = (
+            select(Event.organization_id.label("organization_id"), hour.label("hour"))
+            .where(
+                Event.ingested_at >= since,
+                Event.user_metadata["_cost"].is_not(None),
+            )
+            .group_by(Event.organization_id, hour)
+            .subquery()
+        )
+        delete_statement = delete_statement.where(
+            tuple_(MetricsRollup.organization_id, MetricsRollup.hour).in_(
+                select(dirty_hours.c.organization_id, dirty_hours.c.hour)
+            )
+        )
+        statement = statement.join(
+            dirty_hours,
+            onclause=and_(
+                Event.organization_id == dirty_hours.c.organization_id,
+                Event.timestamp >= dirty_hours.c.hour,
+                Event.timestamp < dirty_hours.c.hour + timedelta(hours=1),
+            ),
+        )
+
+    await session.execute(delete_statement)
+    await _insert(session, MetricsRollupSource.events, statement)
+
+
+async def _insert(
+    session: AsyncSession, source: MetricsRollupSource, statement: Select[Any]
+) -> None:
+    subquery = statement.subquery()
+    await session.execute(
+        insert(MetricsRollup).from_select(
+            ["id", "source", *subquery.c.keys()],
+            select(func.gen_random_uuid(), literal(source.value), *subquery.c),
+        )
+    )
+
+
+__all__ = [
+    "get_watermark",
+    "is_fresh",
+    "refresh",
+    "set_watermark",
+]
@@ -1,20 +1,23 @@
 import asyncio
 import uuid
 from collections.abc import Sequence
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, cast
 from zoneinfo import ZoneInfo
 
 import logfire
 import structlog
-from sqlalchemy import ColumnElement, FromClause, select, text
+from sqlalchemy import CTE, ColumnElement, FromClause, select, text
 
 from polar.auth.models import AuthSubject, is_organization, is_user
-from polar.config import settings
+from polar.config import MetricsSubscriptionsEngine, settings
 from polar.kit.time_queries import TimeInterval, get_timestamp_series_cte
 from polar.models import Organization, User, UserOrganization
 from polar.models.product import ProductBillingType
 from polar.postgres import AsyncReadSession, AsyncSession
 
+from . import cache, rollups
 from .metrics import (
     METRICS,
     METRICS_POST_COMPUTE,
@@ -27,8 +30,12 @@ from .metrics import (
 from .queries import (
     QUERIES,
     QUERY_TO_FUNCTION,
+    ROLLUP_QUERIES,
     MetricQuery,
     QueryCallable,
+    get_active_subscriptions_cte,
+    get_active_subscriptions_sweep_cte,
+    get_checkouts_cte,
 )
 from .queries_tinybird import (
     TinybirdQuery,
@@ -123,13 +130,62 @@ def _get_filtered_queries(
     Filter the QUERIES list to only include the query functions needed.
     """
     if required_queries is None:
-        return list(QUERIES)
+        query_fns = list(QUERIES)
+    else:
+        query_fns = [
+            query_fn
+            for query_type, query_fn in QUERY_TO_FUNCTION.items()
+            if query_type in required_queries
+        ]
+
+    if settings.METRICS_SUBSCRIPTIONS_ENGINE == MetricsSubscriptionsEngine.sweep:
+        query_fns = [
+            get_active_subscriptions_sweep_cte
+            if query_fn is get_active_subscriptions_cte
+            else query_fn
+            for query_fn in query_fns
+        ]
+
+    return query_fns
+
+
+def _get_rollup_queries(
+    query_fns: list[QueryCallable],
+    metrics: list[type[SQLMetric]],
+    *,
+    product_id: Sequence[uuid.UUID] | None,
+    billing_type: Sequence[ProductBillingType] | None,
+) -> list[QueryCallable]:
+    """
+    Swap the query functions for their rollup variant, when it serves all their
+    requested metrics and filters.
+    """
+    rollup_query_fns: list[QueryCallable] = []
+    for query_fn in query_fns:
+        rollup = ROLLUP_QUERIES.get(query_fn)
+        if rollup is None or (
+            query_fn is get_checkouts_cte
+            and (product_id is not None or billing_type is not None)
+        ):
+            rollup_query_fns.append(query_fn)
+            continue
+
+        rollup_query_fn, rollup_metrics = rollup
+        query_metrics = {
+            m.slug for m in metrics if QUERY_TO_FUNCTION[m.query] is query_fn
+        }
+        rollup_query_fns.append(
+            rollup_query_fn if query_metrics <= rollup_metrics else query_fn
+        )
+    return rollup_query_fns
+
 
-    return [
-        query_fn
-        for query_type, query_fn in QUERY_TO_FUNCTION.items()
-        if query_type in required_queries
-    ]
+def _is_hour_aligned(*timestamps: datetime) -> bool:
+    """Whether the timezone of the timestamps is a whole number of hours from UTC."""
+    return all(
+        (timestamp.utcoffset() or timedelta()).total_seconds() % 3600 == 0
+        for timestamp in timestamps
+    )
 
 
 def _get_filtered_metrics(
@@ -179,6 +235,49 @@ def _get_filtered_all_metrics(
     return [m for m in METRICS if m.slug in metrics]
 
 
+class _PeriodValues(dict[str, Any]):
+    """Metric values of a period row, readable as attributes like `MetricsPeriod`."""
+
+    def __getattr__(self, name: str) -> Any:
+        return self.get(name)
+
+
+def _to_number(value: Any) -> Any:
+    # Coerce numeric columns like `MetricsPeriod` validation does
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+def _build_period(
+    period_dict: dict[str, Any],
+    meta_metrics: Sequence[type[MetaMetric]],
+    requested_slugs: set[str],
+) -> MetricsPeriod:
+    """
+    Compute the meta metrics of a period row, and build the period with the
+    requested metrics.
+
+    Meta metrics are computed in order over a plain mapping, so each of them can
+    depend on the previous ones without validating the period in between.
+    """
+    values = _PeriodValues({k: _to_number(v) for k, v in period_dict.items()})
+    for meta_metric in meta_metrics:
+        values[meta_metric.slug] = 0
+    for meta_metric in meta_metrics:
+        computed = meta_metric.compute_from_period(cast(MetricsPeriod, values))
+        values[meta_metric.slug] = computed
+        period_dict[meta_metric.slug] = computed
+
+    return MetricsPeriod.model_validate(
+        {
+            k: v
+            for k, v in period_dict.items()
+            if k == "timestamp" or k in requested_slugs
+        }
+    )
+
+
 class MetricsService:
     async def _get_tinybird_enabled_org(
         self,
@@ -336,6 +435,44 @@ class MetricsService:
             }
         )
 
+    async def _log_subscriptions_engine_comparison(
+        self,
+        session: AsyncSession | AsyncReadSession,
+        periods: Sequence[MetricsPeriod],
+        sweep_query: CTE,
+        metrics: Sequence[type[SQLMetric]],
+    ) -> None:
+        slugs = [m.slug for m in metrics if m.query == MetricQuery.active_subscriptions]
+        result = await session.execute(
+            select(sweep_query).order_by(sweep_query.c.timestamp.asc())
+        )
+
+        mismatches: list[dict[str, object]] = []
+        for i, (period, row) in enumerate(zip(periods, result.all())):
+            sweep_period = row._asdict()
+            for slug in slugs:
+                range_join_val = getattr(period, slug, None)
+                sweep_val = sweep_period.get(slug)
+                if range_join_val is not None and range_join_val != sweep_val:
+                    mismatches.append(
+                        {
+                            "period": i,
+                            "timestamp": str(period.timestamp),
+                            "slug": slug,
+                            "range_join": range_join_val,
+                            "sweep": sweep_val,
+                        }
+                    )
+
+        with logfire.span(
+            "metrics.subscriptions_engine.comparison",
+            periods=len(periods),
+            has_diff=len(mismatches) > 0,
+            mismatches=mismatches,
+            mismatch_count=len(mismatches),
+        ):
+            pass
+
     def _log_tinybird_comparison(
         self,
         organization_id: uuid.UUID,
@@ -393,21 +530,9 @@ class MetricsService:
                 if tb_val is not None:
                     period_dict[slug] = tb_val
 
-            temp_dict = dict(period_dict)
-            for meta_metric in filtered_post_compute:
-                temp_dict[meta_metric.slug] = 0
-            for meta_metric in filtered_post_compute:
-                temp_period = MetricsPeriod.model_validate(temp_dict)
-                computed = meta_metric.compute_from_period(temp_period)
-                temp_dict[meta_metric.slug] = computed
-                period_dict[meta_metric.slug] = computed
-
-            filtered = {
-                k: v
-                for k, v in period_dict.items()
-                if k == "timestamp" or k in requested_slugs
-            }
-            periods.append(MetricsPeriod.model_validate(filtered))
+            periods.append(
+                _build_period(period_dict, filtered_post_compute, requested_slugs)
+            )
 
         tb_by_slug = {m.slug: m for m in METRICS_TINYBIRD_SETTLEMENT}
         sql_by_slug = {m.slug: m for m in METRICS_SQL}
@@ -433,6 +558,29 @@ class MetricsService:
             }
         )
 
+    async def _get_readable_organization_ids(
+        self,
+        session: AsyncSession | AsyncReadSession,
+        auth_subject: AuthSubject[User | Organization],
+        organization_id: Sequence[uuid.UUID] | None,
+    ) -> list[uuid.UUID]:
+        organization_ids: set[uuid.UUID] = set()
+        if is_organization(auth_subject):
+            organization_ids = {auth_subject.subject.id}
+        elif is_user(auth_subject):
+            result = await session.execute(
+                select(UserOrganization.organization_id).where(
+                    UserOrganization.user_id == auth_subject.subject.id,
+                    UserOrganization.deleted_at.is_(None),
+                )
+            )
+            organization_ids = set(result.scalars().all())
+
+        if organization_id is not None:
+            organization_ids &= set(organization_id)
+
+        return sorted(organization_ids)
+
     async def get_metrics(
         self,
         session: AsyncSession | AsyncReadSession,
@@ -469,6 +617,126 @@ class MetricsService:
         elif interval == TimeInterval.year:
             start_timestamp = start_timestamp.replace(month=1, day=1)
 
+        org = await self._get_tinybird_enabled_org(
+            session, auth_subject, organization_id
+        )
+        tinybird_compare = org is not None and org.feature_settings.get(
+            "tinybird_compare", True
+        )
+        tinybird_read = org is not None and org.feature_settings.get(
+            "tinybird_read", False
+        )
+
+        # Responses depend on `now`: only cache the ones computed at request time
+        cache_key: str | None = None
+        if settings.METRICS_CACHE_ENABLED and now is None:
+            cache_key = cache.get_key(
+                organization_ids=await self._get_readable_organization_ids(
+                    session, auth_subject, organization_id
+                ),
+                start_date=start_date,
+                end_date=end_date,
+                timezone=timezone,
+                interval=interval,
+                product_id=product_id,
+                billing_type=billing_type,
+                customer_id=customer_id,
+                metrics=metrics,
+                tinybird_read=tinybird_read and not tinybird_compare,
+            )
+            cached_response = await cache.get_response(cache_key)
+            if cached_response is not None:
+                return cached_response
+
+        # Query Tinybird while streaming the Postgres results
+        tinybird_task: asyncio.Task[MetricsResponse] | None = None
+        if org is not None:
+            tinybird_task = asyncio.create_task(
+                self._get_metrics_from_tinybird(
+                    auth_subject,
+                    start_timestamp=start_timestamp,
+                    end_timestamp=end_timestamp,
+                    original_start_timestamp=original_start_timestamp,
+                    original_end_timestamp=original_end_timestamp,
+                    timezone=timezone,
+                    interval=interval,
+                    organization_id=organization_id,
+                    product_id=product_id,
+                    billing_type=billing_type,
+                    customer_id=customer_id,
+                    metrics=metrics,
+                    now=now,
+                )
+            )
+
+        try:
+            pg_response = await self._get_metrics_from_postgres(
+                session,
+                auth_subject,
+                start_timestamp=start_timestamp,
+                end_timestamp=end_timestamp,
+                original_start_timestamp=original_start_timestamp,
+                original_end_timestamp=original_end_timestamp,
+                timezone=timezone,
+                interval=interval,
+                organization_id=organization_id,
+                product_id=product_id,
+                billing_type=billing_type,
+                customer_id=customer_id,
+                metrics=metrics,
+                now=now,
+            )
+        except BaseException:
+            if tinybird_task is not None:
+                tinybird_task.cancel()
+            raise
+
+        response = pg_response
+        if org is not None and tinybird_task is not None:
+            try:
+                tb_response = await tinybird_task
+            except Exception as e:
+                log.error(
+                    "tinybird.metrics.query.failed",
+                    organization_id=str(org.id),
+                    error=str(e),
+                )
+                # Don't cache the Postgres fallback as a Tinybird read response
+                if tinybird_read and not tinybird_compare:
+                    cache_key = None
+            else:
+                if tinybird_compare:
+                    self._log_tinybird_comparison(org.id, pg_response, tb_response)
+                elif tinybird_read:
+                    response = self._merge_tinybird_over_pg(
+                        pg_response, tb_response, metrics
+                    )
+
+        if cache_key is not None:
+            await cache.set_response(
+                cache_key, response, cache.get_ttl(end_date, timezone)
+            )
+
+        return response
+
+    async def _get_metrics_from_postgres(
+        self,
+        session: AsyncSession | AsyncReadSession,
+        auth_subject: AuthSubject[User | Organization],
+        *,
+        start_timestamp: datetime,
+        end_timestamp: datetime,
+        original_start_timestamp: datetime,
+        original_end_timestamp: datetime,
+        timezone: ZoneInfo,
+        interval: TimeInterval,
+        organization_id: Sequence[uuid.UUID] | None = None,
+        product_id: Sequence[uuid.UUID] | None = None,
+        billing_type: Sequence[ProductBillingType] | None = None,
+        customer_id: Sequence[uuid.UUID] | None = None,
+        metrics: Sequence[str] | None = None,
+        now: datetime | None = None,
+    ) -> MetricsResponse:
         timestamp_series = get_timestamp_series_cte(
             start_timestamp, end_timestamp, interval
         )
@@ -481,6 +749,20 @@ class MetricsService:
         filtered_post_compute = _get_filtered_post_compute_metrics(metrics)
         filtered_all_metrics = _get_filtered_all_metrics(metrics)
 
+        # Rollups are bucketed by UTC hours, and aren't split by customer
+        if (
+            settings.METRICS_ROLLUPS_ENABLED
+            and customer_id is None
+            and _is_hour_aligned(start_timestamp, end_timestamp)
+            and await rollups.is_fresh(now or datetime.now(tz=timezone))
+        ):
+            filtered_query_fns = _get_rollup_queries(
+                filtered_query_fns,
+                filtered_metrics_sql,
+                product_id=product_id,
+                billing_type=billing_type,
+            )
+
         with logfire.span(
             "Build metrics query",
             metrics=metrics,
@@ -489,8 +771,9 @@ class MetricsService:
             else None,
             num_query_functions=len(filtered_query_fns),
         ):
-            queries = [
-                query_fn(
+
+            def _build_query(query_fn: QueryCallable) -> CTE:
+                return query_fn(
                     timestamp_series,
                     interval,
                     auth_subject,
@@ -502,8 +785,8 @@ class MetricsService:
                     billing_type=billing_type,
                     customer_id=customer_id,
                 )
-                for query_fn in filtered_query_fns
-            ]
+
+            queries = [_build_query(query_fn) for query_fn in filtered_query_fns]
 
         from_query: FromClause = timestamp_series
         for query in queries:
@@ -524,8 +807,8 @@ class MetricsService:
         periods: list[MetricsPeriod] = []
         with logfire.span(
             "Stream and process metrics query",
-            start_date=str(start_date),
-            end_date=str(end_date),
+            start_date=str(original_start_timestamp.date()),
+            end_date=str(original_end_timestamp.date()),
             metrics=metrics,
         ):
             result = await session.stream(
@@ -540,46 +823,40 @@ class MetricsService:
             with logfire.span("Fetch and process rows"):
                 async for row in result:
                     row_count += 1
-                    period_dict = row._asdict()
-
-                    # Compute meta metrics with cascading dependencies
-                    # Each metric can depend on previously computed metrics
-                    temp_period_dict = dict(period_dict)
-
-                    # Initialize all computed metrics to 0 first to satisfy Pydantic schema
-                    for meta_metric in filtered_post_compute:
-                        temp_period_dict[meta_metric.slug] = 0
-
-                    # Now compute each metric, updating the dict as we go
-                    # This allows later metrics to depend on earlier computed metrics
-                    for meta_metric in filtered_post_compute:
-                        temp_period = MetricsPeriod.model_validate(temp_period_dict)
-                        computed_value = meta_metric.compute_from_period(temp_period)
-                        temp_period_dict[meta_metric.slug] = computed_value
-                        period_dict[meta_metric.slug] = computed_value
-
-                    # Filter to only include explicitly requested metrics (not dependencies)
-                    # Always include timestamp
-                    filtered_period_dict = {
-                        k: v
-                        for k, v in period_dict.items()
-                        if k == "timestamp" or k in requested_slugs
-                    }
-
-                    periods.append(MetricsPeriod.model_validate(filtered_period_dict))
+                    periods.append(
+                        _build_period(
+                            row._asdict(), filtered_post_compute, requested_slugs
+                        )
+                    )
 
             logfire.info("Processed {row_count} rows", row_count=row_count)
 
+        if (
+            settings.METRICS_SUBSCRIPTIONS_ENGINE == MetricsSubscriptionsEngine.compare
+            and get_active_subscriptions_cte in filtered_query_fns
+        ):
+            try:
+                await self._log_subscriptions_engine_comparison(
+                    session,
+                    periods,
+                    _build_query(get_active_subscriptions_sweep_cte),
+                    filtered_metrics_sql,
+                )
+            except Exception as e:
+                log.error(
+                    "metrics.subscriptions_engine.comparison.failed", error=str(e)
+                )
+
         totals: dict[str, int | float] = {}
         with logfire.span(
             "Get cumulative metrics",
-            start_date=str(start_date),
-            end_date=str(end_date),
+            start_date=str(original_start_timestamp.date()),
+            end_date=str(original_end_timestamp.date()),
         ):
             for metric in filtered_all_metrics:
                 totals[metric.slug] = metric.get_cumulative(periods)
 
-        pg_response = MetricsResponse.model_validate(
+        return MetricsResponse.model_validate(
             {
                 "periods": periods,
                 "totals": totals,
@@ -587,47 +864,5 @@ class MetricsService:
             }
         )
 
-        org = await self._get_tinybird_enabled_org(
-            session, auth_subject, organization_id
-        )
-        if org is None:
-            return pg_response
-
-        tinybird_compare = org.feature_settings.get("tinybird_compare", True)
-        tinybird_read = org.feature_settings.get("tinybird_read", False)
-
-        try:
-            tb_response = await self._get_metrics_from_tinybird(
-                auth_subject,
-                start_timestamp=start_timestamp,
-                end_timestamp=end_timestamp,
-                original_start_timestamp=original_start_timestamp,
-                original_end_timestamp=original_end_timestamp,
-                timezone=timezone,
-                interval=interval,
-                organization_id=organization_id,
-                product_id=product_id,
-                billing_type=billing_type,
-                customer_id=customer_id,
-                metrics=metrics,
-                now=now,
-            )
-        except Exception as e:
-            log.error(
-                "tinybird.metrics.query.failed",
-                organization_id=str(org.id),
-                error=str(e),
-            )
-            return pg_response
-
-        if tinybird_compare:
-            self._log_tinybird_comparison(org.id, pg_response, tb_response)
-            return pg_response
-
-        if tinybird_read:
-            return self._merge_tinybird_over_pg(pg_response, tb_response, metrics)
-
-        return pg_response
-
 
 metrics = MetricsService()
@@ -0,0 +1,31 @@
+import structlog
+
+from polar.config import settings
+from polar.logging import Logger
+from polar.worker import (
+    AsyncSessionMaker,
+    CronTrigger,
+    RedisMiddleware,
+    TaskPriority,
+    actor,
+)
+
+from . import rollups
+
+log: Logger = structlog.get_logger()
+
+
+@actor(
+    actor_name="metrics.refresh_rollups",
+    cron_trigger=CronTrigger(minute="*/15"),
+    priority=TaskPriority.LOW,
+    max_retries=0,
+)
+async def metrics_refresh_rollups() -> None:
+    if not settings.METRICS_ROLLUPS_ENABLED:
+        return
+
+    redis = RedisMiddleware.get()
+    async with AsyncSessionMaker() as session:
+        watermark = await rollups.refresh(session, redis)
+    await rollups.set_watermark(redis, watermark)
@@ -83,6 +83,7 @@ from .member import Member, MemberRole
 from .member_session import MemberSession
 from .meter import Meter
 from .meter_event import MeterEvent
+from .metrics_rollup import MetricsRollup, MetricsRollupSource
 from .notification import Notification
 from .notification_recipient import NotificationRecipient
 from .oauth2_authorization_code import OAuth2AuthorizationCode
@@ -226,6 +227,8 @@ __all__ = [
     "MemberSession",
     "Meter",
     "MeterEvent",
+    "MetricsRollup",
+    "MetricsRollupSource",
     "Model",
     "Notification",
     "NotificationRecipient",
@@ -0,0 +1,71 @@
+from datetime import datetime
+from decimal import Decimal
+from enum import StrEnum
+from uuid import UUID
+
+from sqlalchemy import (
+    TIMESTAMP,
+    BigInteger,
+    Boolean,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    Uuid,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from polar.kit.db.models import Model
+from polar.kit.extensions.sqlalchemy.types import StringEnum
+from polar.kit.utils import generate_uuid
+
+from .product import ProductBillingType
+
+
+class MetricsRollupSource(StrEnum):
+    orders = "orders"
+    checkouts = "checkouts"
+    events = "events"
+
+
+class MetricsRollup(Model):
+    """
+    Aggregates of a metrics source over one UTC hour.
+
+    Orders are further split by product, billing type and whether they're
+    one-time purchases, so the product and billing type filters can be served.
+    """
+
+    __tablename__ = "metrics_rollups"
+    __table_args__ = (
+        Index(
+            "ix_metrics_rollups_source_organization_id_hour",
+            "source",
+            "organization_id",
+            "hour",
+        ),
+    )
+
+    id: Mapped[UUID] = mapped_column(Uuid, primary_key=True, default=generate_uuid)
+    source: Mapped[MetricsRollupSource] = mapped_column(
+        StringEnum(MetricsRollupSource), nullable=False
+    )
+    organization_id: Mapped[UUID] = mapped_column(
+        Uuid, ForeignKey("organizations.id", ondelete="cascade"), nullable=False
+    )
+    hour: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+
+    product_id: Mapped[UUID | None] = mapped_column(
+        Uuid, ForeignKey("products.id", ondelete="cascade"), nullable=True
+    )
+    billing_type: Mapped[ProductBillingType | None] = mapped_column(
+        StringEnum(ProductBillingType), nullable=True
+    )
+    one_time: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+
+    orders: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    revenue: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    net_revenue: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    checkouts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    succeeded_checkouts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    costs: Mapped[Decimal] = mapped_column(Numeric, nullable=False, default=0)
@@ -95,6 +95,12 @@ class Order(CustomFieldDataMixin, MetadataMixin, RecordModel):
             "search_vector",
             postgresql_using="gin",
         ),
+        # Orders modified since the last metrics rollups refresh
+        Index(
+            "ix_orders_modified_at",
+            "modified_at",
+            postgresql_where="modified_at IS NOT NULL",
+        ),
     )
 
     search_vector: Mapped[str] = mapped_column(TSVECTOR, nullable=True, deferred=True)
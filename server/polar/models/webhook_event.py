@@ -40,6 +40,15 @@ class WebhookEvent(RecordModel):
     skipped: Mapped[bool] = mapped_column(
         Boolean, nullable=False, default=False, server_default="false"
     )
+    delivery_attempts: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    """
+    Number of delivery attempts, across all the send messages of the event.
+
+    An event waiting for its turn is dispatched again by a new message,
+    so the retries of the message alone don't account for all the attempts.
+    """
     type: Mapped[WebhookEventType] = mapped_column(
         StringEnum(WebhookEventType), nullable=False, index=True
     )
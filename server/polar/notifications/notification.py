@@ -1,17 +1,20 @@
 from abc import abstractmethod
 from datetime import datetime
 from enum import StrEnum
-from typing import Annotated, Literal
+from typing import TYPE_CHECKING, Annotated, Literal
 
 import pycountry
 from pydantic import UUID4, BaseModel, Discriminator, computed_field
 
 from polar.config import settings
-from polar.email.react import render_email_template
+from polar.email.react import render_email_template, render_email_template_async
 from polar.kit.currency import format_currency
 from polar.kit.schemas import Schema
 from polar.models.order import OrderBillingReasonInternal
 
+if TYPE_CHECKING:
+    from polar.email.schemas import Email
+
 
 class NotificationType(StrEnum):
     maintainer_new_paid_subscription = "MaintainerNewPaidSubscriptionNotification"
@@ -35,15 +38,19 @@ class NotificationPayloadBase(BaseModel):
         pass
 
     def render(self) -> tuple[str, str]:
+        return self.subject(), render_email_template(self._get_email())
+
+    async def render_async(self) -> tuple[str, str]:
+        return self.subject(), await render_email_template_async(self._get_email())
+
+    def _get_email(self) -> "Email":
         from polar.email.schemas import EmailAdapter
 
-        return self.subject(), render_email_template(
-            EmailAdapter.validate_python(
-                {
-                    "template": self.template_name(),
-                    "props": self,
-                }
-            )
+        return EmailAdapter.validate_python(
+            {
+                "template": self.template_name(),
+                "props": self,
+            }
         )
 
 
@@ -18,7 +18,7 @@ async def notifications_send(notification_id: UUID) -> None:
             return
 
         notification_type = notifications.parse_payload(notif)
-        (subject, body) = notification_type.render()
+        (subject, body) = await notification_type.render_async()
 
         enqueue_email(
             to_email_addr=notif.user.email, subject=subject, html_content=body
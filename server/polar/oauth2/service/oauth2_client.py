@@ -6,7 +6,7 @@ from sqlalchemy import select
 from sqlalchemy.orm import joinedload
 
 from polar.auth.models import AuthSubject
-from polar.email.react import render_email_template
+from polar.email.react import render_email_template_async
 from polar.email.schemas import OAuth2LeakedClientEmail, OAuth2LeakedClientProps
 from polar.email.sender import enqueue_email
 from polar.enums import TokenType
@@ -91,7 +91,7 @@ class OAuth2ClientService(ResourceServiceReader[OAuth2Client]):
 
         if client.user is not None:
             email = client.user.email
-            body = render_email_template(
+            body = await render_email_template_async(
                 OAuth2LeakedClientEmail(
                     props=OAuth2LeakedClientProps(
                         email=email,
@@ -6,7 +6,7 @@ from sqlalchemy import select
 from sqlalchemy.orm import joinedload
 
 from polar.config import settings
-from polar.email.react import render_email_template
+from polar.email.react import render_email_template_async
 from polar.email.schemas import OAuth2LeakedTokenEmail, OAuth2LeakedTokenProps
 from polar.email.sender import enqueue_email
 from polar.enums import TokenType
@@ -100,7 +100,7 @@ class OAuth2TokenService(ResourceServiceReader[OAuth2Token]):
         oauth2_client = oauth2_token.client
 
         for recipient in recipients:
-            body = render_email_template(
+            body = await render_email_template_async(
                 OAuth2LeakedTokenEmail(
                     props=OAuth2LeakedTokenProps(
                         email=recipient,
@@ -1,3 +1,5 @@
+from polar.observability.auth_metrics import AUTH_RESOLUTION_DURATION_SECONDS
+from polar.observability.cache_metrics import CACHE_LOOKUPS_TOTAL
 from polar.observability.checkout_metrics import (
     CHECKOUT_CREATED_TOTAL,
     CHECKOUT_SUCCEEDED_TOTAL,
@@ -16,8 +18,16 @@ from polar.observability.metrics import (
     TASK_RETRIES,
     register_gc_metrics,
 )
+from polar.observability.tax_metrics import (
+    TAX_CALCULATION_HEDGES_TOTAL,
+    TAX_CALCULATIONS_TOTAL,
+)
 
 __all__ = [
+    # Auth metrics (API server)
+    "AUTH_RESOLUTION_DURATION_SECONDS",
+    # Cache metrics
+    "CACHE_LOOKUPS_TOTAL",
     # Checkout metrics (anomaly detection)
     "CHECKOUT_CREATED_TOTAL",
     "CHECKOUT_SUCCEEDED_TOTAL",
@@ -33,5 +43,8 @@ __all__ = [
     "TASK_DURATION",
     "TASK_EXECUTIONS",
     "TASK_RETRIES",
+    # Tax metrics
+    "TAX_CALCULATIONS_TOTAL",
+    "TAX_CALCULATION_HEDGES_TOTAL",
     "register_gc_metrics",
 ]
@@ -0,0 +1,26 @@
+"""
+Metrics of request authentication.
+
+Metrics:
+- polar_auth_resolution_duration_seconds: Histogram of the time spent
+  resolving the authenticated subject of a request, by token type
+"""
+
+import os
+
+from polar.config import settings
+
+# Setup multiprocess prometheus directory before importing prometheus_client
+# This enables metrics to be shared across API server processes
+prometheus_dir = settings.WORKER_PROMETHEUS_DIR
+prometheus_dir.mkdir(parents=True, exist_ok=True)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", str(prometheus_dir))
+
+from prometheus_client import Histogram  # noqa: E402
+
+AUTH_RESOLUTION_DURATION_SECONDS = Histogram(
+    "polar_auth_resolution_duration_seconds",
+    "Authenticated subject resolution duration in seconds",
+    ["token_type"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
@@ -0,0 +1,25 @@
+"""
+Metrics of the application-level caches.
+
+Metrics:
+- polar_cache_lookups_total: Counter of cache lookups, by cache and result
+  (e.g. `local_hit`, `redis_hit`, `hit` or `miss`)
+"""
+
+import os
+
+from polar.config import settings
+
+# Setup multiprocess prometheus directory before importing prometheus_client
+# This enables metrics to be shared across API server processes
+prometheus_dir = settings.WORKER_PROMETHEUS_DIR
+prometheus_dir.mkdir(parents=True, exist_ok=True)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", str(prometheus_dir))
+
+from prometheus_client import Counter  # noqa: E402
+
+CACHE_LOOKUPS_TOTAL = Counter(
+    "polar_cache_lookups_total",
+    "Total number of cache lookups",
+    ["cache", "result"],
+)
@@ -0,0 +1,34 @@
+"""
+Tax calculation metrics.
+
+Metrics:
+- polar_tax_calculations_total: Counter of successful tax calculations, by
+  processor and whether it was the first processor tried (`primary`) or a
+  fallback (`fallback`)
+- polar_tax_calculation_hedges_total: Counter of fallback processors fired
+  because the previous one was slower than the hedge delay
+"""
+
+import os
+
+from polar.config import settings
+
+# Setup multiprocess prometheus directory before importing prometheus_client
+# This enables metrics to be shared across API server processes
+prometheus_dir = settings.WORKER_PROMETHEUS_DIR
+prometheus_dir.mkdir(parents=True, exist_ok=True)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", str(prometheus_dir))
+
+from prometheus_client import Counter  # noqa: E402
+
+TAX_CALCULATIONS_TOTAL = Counter(
+    "polar_tax_calculations_total",
+    "Total number of successful tax calculations",
+    ["processor", "attempt"],
+)
+
+TAX_CALCULATION_HEDGES_TOTAL = Counter(
+    "polar_tax_calculation_hedges_total",
+    "Total number of fallback tax processors fired after the hedge delay",
+    ["processor"],
+)
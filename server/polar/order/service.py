@@ -21,7 +21,7 @@ from polar.customer_portal.schemas.order import (
     CustomerOrderUpdate,
 )
 from polar.customer_session.service import customer_session as customer_session_service
-from polar.email.react import render_email_template
+from polar.email.react import render_email_template_async
 from polar.email.schemas import EmailAdapter
 from polar.email.sender import Attachment, enqueue_email
 from polar.enums import PaymentProcessor, TaxBehavior
@@ -1522,7 +1522,7 @@ class OrderService:
                 {"remote_url": invoice.url, "filename": order.invoice_filename}
             ]
 
-        body = render_email_template(email)
+        body = await render_email_template_async(email)
         enqueue_email(
             **organization.email_from_reply,
             to_email_addr=customer.email,
@@ -1644,7 +1644,7 @@ class OrderService:
             )
             subject = f"Your Spaire {plan_name} receipt"
 
-        body = render_email_template(email)
+        body = await render_email_template_async(email)
         enqueue_email(
             **organization.email_from_reply,
             to_email_addr=recipient,
@@ -9,7 +9,7 @@ from polar.account.service import account as account_service
 from polar.auth.models import is_anonymous, is_user
 from polar.auth.scope import Scope
 from polar.config import settings
-from polar.email.react import render_email_template
+from polar.email.react import render_email_template_async
 from polar.email.schemas import OrganizationInviteEmail, OrganizationInviteProps
 from polar.email.sender import enqueue_email
 from polar.entitlements.service import entitlements as entitlements_service
@@ -483,7 +483,7 @@ async def invite_member(
 
     # Send invitation email
     email = invite_body.email
-    body = render_email_template(
+    body = await render_email_template_async(
         OrganizationInviteEmail(
             props=OrganizationInviteProps(
                 email=email,
@@ -4,7 +4,7 @@ import structlog
 from sqlalchemy.orm import joinedload
 
 from polar.account.repository import AccountRepository
-from polar.email.react import render_email_template
+from polar.email.react import render_email_template_async
 from polar.email.schemas import (
     OrganizationReviewedEmail,
     OrganizationReviewedProps,
@@ -130,7 +130,7 @@ async def organization_under_review(organization_id: uuid.UUID) -> None:
             enqueue_email(
                 to_email_addr=admin_user.email,
                 subject="Congrats on your first sale 🎉",
-                html_content=render_email_template(email),
+                html_content=await render_email_template_async(email),
             )
 
 
@@ -163,7 +163,7 @@ async def organization_reviewed(
                 enqueue_email(
                     to_email_addr=admin_user.email,
                     subject="Your organization review is complete",
-                    html_content=render_email_template(email),
+                    html_content=await render_email_template_async(email),
                 )
 
 
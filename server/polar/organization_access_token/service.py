@@ -8,7 +8,7 @@ from sqlalchemy import UnaryExpression, asc, desc
 
 from polar.auth.models import AuthSubject, Organization, is_user
 from polar.config import settings
-from polar.email.react import render_email_template
+from polar.email.react import render_email_template_async
 from polar.email.schemas import (
     OrganizationAccessTokenLeakedEmail,
     OrganizationAccessTokenLeakedProps,
@@ -181,7 +181,7 @@ class OrganizationAccessTokenService:
         )
         for organization_member in organization_members:
             email = organization_member.user.email
-            body = render_email_template(
+            body = await render_email_template_async(
                 OrganizationAccessTokenLeakedEmail(
                     props=OrganizationAccessTokenLeakedProps(
                         email=email,
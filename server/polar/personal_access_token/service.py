@@ -8,7 +8,7 @@ from sqlalchemy.orm import contains_eager
 
 from polar.auth.models import AuthSubject
 from polar.config import settings
-from polar.email.react import render_email_template
+from polar.email.react import render_email_template_async
 from polar.email.schemas import (
     PersonalAccessTokenLeakedEmail,
     PersonalAccessTokenLeakedProps,
@@ -109,7 +109,7 @@ class PersonalAccessTokenService(ResourceServiceReader[PersonalAccessToken]):
 
         email = personal_access_token.user.email
 
-        body = render_email_template(
+        body = await render_email_template_async(
             PersonalAccessTokenLeakedEmail(
                 props=PersonalAccessTokenLeakedProps(
                     email=email,
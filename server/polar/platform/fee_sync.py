@@ -218,7 +218,8 @@ async def maybe_enqueue_sync_from_subscription(
     session: AsyncSession, subscription: Subscription
 ) -> None:
     """If `subscription` is a platform-org subscription (Spaire selling to
-    a creator), enqueue a fee sync for that creator org. Otherwise a no-op.
+    a creator), drop the creator org's cached tier and enqueue a fee sync
+    for it. Otherwise a no-op.
 
     Called from subscription/service.py after subscription state changes
     so creator orgs that upgrade or downgrade through the normal checkout
@@ -226,6 +227,9 @@ async def maybe_enqueue_sync_from_subscription(
     """
     creator_org_id = await _platform_creator_org_id(session, subscription)
     if creator_org_id is not None:
+        # The sync task invalidates again once this transaction is
+        # committed, in case a concurrent read cached the previous tier.
+        await entitlements_service.invalidate_tier(creator_org_id)
         enqueue_sync(creator_org_id)
 
 
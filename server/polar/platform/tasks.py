@@ -3,6 +3,7 @@ import uuid
 import structlog
 from sqlalchemy import select
 
+from polar.entitlements.service import entitlements as entitlements_service
 from polar.exceptions import PolarTaskError
 from polar.integrations.resend import domains as resend_domains
 from polar.kit.utils import utc_now
@@ -36,6 +37,8 @@ async def platform_fee_sync_task(organization_id: uuid.UUID) -> None:
       - the account is manually locked (`platform_fee_locked_at` set), or
       - the values already match the tier list rate.
     """
+    # The subscription change is committed by now: resolve the tier afresh.
+    await entitlements_service.invalidate_tier(organization_id)
     async with AsyncSessionMaker() as session:
         result = await platform_fee_sync.sync_by_organization_id(
             session, organization_id
@@ -26,6 +26,22 @@ class QuotaNotificationRepository(RepositoryBase[QuotaNotification]):
         )
         return await self.get_one_or_none(statement)
 
+    async def get_keys_for_organization(
+        self, organization_id: UUID
+    ) -> set[tuple[str, int, str]]:
+        """`(quota_key, threshold, period_key)` of every notification
+        already recorded for the organization."""
+        statement = select(
+            QuotaNotification.quota_key,
+            QuotaNotification.threshold,
+            QuotaNotification.period_key,
+        ).where(QuotaNotification.organization_id == organization_id)
+        result = await self.session.execute(statement)
+        return {
+            (quota_key, threshold, period_key)
+            for quota_key, threshold, period_key in result.all()
+        }
+
     async def delete_lifetime_for(
         self,
         *,
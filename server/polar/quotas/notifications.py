@@ -138,8 +138,10 @@ async def check_organization(
     repository = quota_notification_repository(session)
     counters = {"notified": 0, "already_sent": 0, "cleared": 0, "below": 0}
 
-    for quota in QuotaKey:
-        usage = await quotas.get_usage(session, organization.id, quota)
+    all_usage = await quotas.get_all_usage(session, organization.id, cached=False)
+    sent = await repository.get_keys_for_organization(organization.id)
+
+    for quota, usage in all_usage.items():
         if usage.limit is None:
             # Unlimited tier — no thresholds to cross.
             counters["below"] += 1
@@ -154,14 +156,9 @@ async def check_organization(
         definition = get_definition(quota)
 
         for threshold in _THRESHOLDS:
-            existing = await repository.get_by_key(
-                organization_id=organization.id,
-                quota_key=quota.value,
-                threshold=threshold,
-                period_key=period_key,
-            )
+            already_sent = (quota.value, threshold, period_key) in sent
             if percent >= threshold:
-                if existing is not None:
+                if already_sent:
                     counters["already_sent"] += 1
                     continue
                 await _notify(session, organization, usage, threshold, period_key)
@@ -172,7 +169,7 @@ async def check_organization(
                 # naturally via period_key rollover.
                 if (
                     definition.scope == "lifetime"
-                    and existing is not None
+                    and already_sent
                 ):
                     await repository.delete_lifetime_for(
                         organization_id=organization.id,
@@ -1,14 +1,16 @@
+from collections.abc import Sequence
 from datetime import UTC, datetime
+from typing import Any
 from uuid import UUID
 
-from sqlalchemy import Float, cast, func, select
+from sqlalchemy import ColumnElement, Float, and_, cast, func, select
 
 from polar.kit.repository import RepositoryBase
 from polar.models import Event
 from polar.models.event import EventSource
 from polar.postgres import AsyncReadSession
 
-from .definitions import QuotaDefinition
+from .definitions import QuotaDefinition, QuotaKey
 
 
 def _start_of_current_month_utc() -> datetime:
@@ -37,34 +39,61 @@ class _QuotaEventRepository(RepositoryBase[Event]):
           as a float and sums it.
         - Scope `monthly` restricts events to the current UTC calendar month.
         """
-        base = select().where(
+        usage = await self.get_quotas_usage_storage_units(
+            organization_id=organization_id, definitions=[definition]
+        )
+        return usage[definition.key]
+
+    async def get_quotas_usage_storage_units(
+        self,
+        *,
+        organization_id: UUID,
+        definitions: Sequence[QuotaDefinition],
+    ) -> dict[QuotaKey, int]:
+        """Bulk `get_quota_usage_storage_units`: aggregate the usage of
+        several quotas in a single pass over the organization's events,
+        one filtered aggregate per quota.
+        """
+        if not definitions:
+            return {}
+
+        month_start = _start_of_current_month_utc()
+        columns: list[ColumnElement[Any]] = []
+        for definition in definitions:
+            condition = Event.name == definition.event_name
+            if definition.scope == "monthly":
+                condition = and_(condition, Event.timestamp >= month_start)
+
+            column: ColumnElement[Any]
+            if definition.aggregation == "count":
+                column = func.count(Event.id).filter(condition)
+            else:
+                assert definition.aggregation_property is not None
+                value = cast(
+                    Event.user_metadata[definition.aggregation_property].astext,
+                    Float,
+                )
+                column = func.coalesce(func.sum(value).filter(condition), 0)
+            columns.append(column)
+
+        statement = select(*columns).where(
             Event.organization_id == organization_id,
-            Event.name == definition.event_name,
+            Event.name.in_({definition.event_name for definition in definitions}),
             # Use system events only — these are emitted by Spaire's own
             # producers (file uploads, mux webhooks, email sender). User-
             # submitted events with the same name should not be counted.
             Event.source == EventSource.system,
         )
 
-        if definition.scope == "monthly":
-            base = base.where(Event.timestamp >= _start_of_current_month_utc())
-
-        if definition.aggregation == "count":
-            statement = base.with_only_columns(func.count(Event.id))
-        else:
-            assert definition.aggregation_property is not None
-            value = cast(
-                Event.user_metadata[definition.aggregation_property].astext,
-                Float,
-            )
-            statement = base.with_only_columns(func.coalesce(func.sum(value), 0))
-
         result = await self.session.execute(statement)
-        raw = result.scalar_one() or 0
+        row = result.one()
         # Clamp at zero. Producers can emit negative deltas (e.g. file
         # delete), but the running total dropping below zero would be a
         # producer bug and must never let a creator "earn" extra quota.
-        return max(int(raw), 0)
+        return {
+            definition.key: max(int(raw or 0), 0)
+            for definition, raw in zip(definitions, row, strict=True)
+        }
 
 
 def quota_event_repository(session: AsyncReadSession) -> _QuotaEventRepository:
@@ -27,14 +27,17 @@ Enforcement policy (block vs. overage-bill) is a downstream decision —
 this service only reports facts.
 """
 
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from uuid import UUID
 
+from polar.config import settings
 from polar.entitlements.service import entitlements as entitlements_service
 from polar.entitlements.tiers import TierEntitlements
 from polar.postgres import AsyncReadSession
 
-from .definitions import QuotaKey, get_definition
+from .definitions import QuotaKey, all_quotas, get_definition
 from .repository import quota_event_repository
 
 
@@ -96,7 +99,38 @@ def _limit_for(entitlements: TierEntitlements, quota: QuotaKey) -> int | None:
     return mapping[quota]
 
 
+def _build_usage(quota: QuotaKey, limit: int | None, used_storage: int) -> QuotaUsage:
+    definition = get_definition(quota)
+    used_display = used_storage // definition.storage_units_per_display_unit
+
+    remaining_display: int | None
+    if limit is None:
+        remaining_display = None
+    else:
+        remaining_display = max(limit - used_display, 0)
+
+    return QuotaUsage(
+        quota=quota,
+        limit=limit,
+        used=used_display,
+        remaining=remaining_display,
+        used_storage_units=used_storage,
+        used_exact=round(used_storage / definition.storage_units_per_display_unit, 2),
+    )
+
+
+_USAGE_CACHE_MAXSIZE = 10_000
+
+
 class QuotasService:
+    def __init__(self) -> None:
+        # Short-lived per-process cache of `get_all_usage` snapshots, so
+        # dashboard widgets polling the usage endpoint don't re-aggregate
+        # events on every render. The check path never reads from it.
+        self._usage_cache: OrderedDict[
+            UUID, tuple[float, dict[QuotaKey, QuotaUsage]]
+        ] = OrderedDict()
+
     async def get_usage(
         self,
         session: AsyncReadSession,
@@ -113,34 +147,51 @@ class QuotasService:
         used_storage = await repository.get_quota_usage_storage_units(
             organization_id=organization_id, definition=definition
         )
-        used_display = used_storage // definition.storage_units_per_display_unit
-
-        remaining_display: int | None
-        if limit_display is None:
-            remaining_display = None
-        else:
-            remaining_display = max(limit_display - used_display, 0)
-
-        return QuotaUsage(
-            quota=quota,
-            limit=limit_display,
-            used=used_display,
-            remaining=remaining_display,
-            used_storage_units=used_storage,
-            used_exact=round(
-                used_storage / definition.storage_units_per_display_unit, 2
-            ),
-        )
+        return _build_usage(quota, limit_display, used_storage)
 
     async def get_all_usage(
         self,
         session: AsyncReadSession,
         organization_id: UUID,
+        *,
+        cached: bool = True,
     ) -> dict[QuotaKey, QuotaUsage]:
-        result: dict[QuotaKey, QuotaUsage] = {}
-        for quota in QuotaKey:
-            result[quota] = await self.get_usage(session, organization_id, quota)
-        return result
+        """Usage of every quota for the organization, from one entitlements
+        lookup and one aggregate query over its events.
+
+        Snapshots are cached in-process for `QUOTAS_USAGE_CACHE_TTL_SECONDS`;
+        pass `cached=False` when the caller acts on the numbers.
+        """
+        if cached:
+            entry = self._usage_cache.get(organization_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._usage_cache.move_to_end(organization_id)
+                return dict(entry[1])
+
+        entitlements = await entitlements_service.get_for_organization(
+            session, organization_id
+        )
+        repository = quota_event_repository(session)
+        used_storage = await repository.get_quotas_usage_storage_units(
+            organization_id=organization_id, definitions=all_quotas()
+        )
+        result = {
+            quota: _build_usage(
+                quota, _limit_for(entitlements, quota), used_storage[quota]
+            )
+            for quota in QuotaKey
+        }
+
+        ttl = settings.QUOTAS_USAGE_CACHE_TTL_SECONDS
+        if ttl > 0:
+            self._usage_cache[organization_id] = (time.monotonic() + ttl, result)
+            self._usage_cache.move_to_end(organization_id)
+            while len(self._usage_cache) > _USAGE_CACHE_MAXSIZE:
+                self._usage_cache.popitem(last=False)
+        return dict(result)
+
+    def clear_usage_cache(self) -> None:
+        self._usage_cache.clear()
 
     async def check(
         self,
@@ -33,6 +33,22 @@ def create_redis(process_name: ProcessName, max_connections: int = 20) -> Redis:
     )
 
 
+_app_redis: Redis | None = None
+
+
+def get_app_redis() -> Redis:
+    """
+    Return the Redis client of the process-wide caches.
+
+    It's lazily created on first use, for code paths without access
+    to the request or worker client.
+    """
+    global _app_redis
+    if _app_redis is None:
+        _app_redis = create_redis("app")
+    return _app_redis
+
+
 async def get_redis(request: Request) -> Redis:
     return request.state.redis
 
@@ -42,5 +58,6 @@ __all__ = [
     "REDIS_RETRY_ON_ERRROR",
     "Redis",
     "create_redis",
+    "get_app_redis",
     "get_redis",
 ]
@@ -291,6 +291,115 @@ class SubscriptionProductPriceRepository(
 
         return await self._get_seat_subscription_price(customer_id, meter_id)
 
+    async def get_by_customers_and_meter(
+        self, customer_ids: Sequence[UUID], meter_id: UUID
+    ) -> dict[UUID, CustomerSubscriptionProductPrice]:
+        """
+        Bulk version of `get_by_customer_and_meter`.
+
+        Resolves the paying customer and subscription product price of several
+        customers in two queries: one for direct subscriptions, one for seats.
+        Customers without a matching subscription are absent from the result.
+        """
+        if not customer_ids:
+            return {}
+
+        results = await self._get_direct_subscription_prices(customer_ids, meter_id)
+
+        seat_customer_ids = [
+            customer_id for customer_id in customer_ids if customer_id not in results
+        ]
+        if seat_customer_ids:
+            results.update(
+                await self._get_seat_subscription_prices(seat_customer_ids, meter_id)
+            )
+
+        return results
+
+    async def _get_direct_subscription_prices(
+        self, customer_ids: Sequence[UUID], meter_id: UUID
+    ) -> dict[UUID, CustomerSubscriptionProductPrice]:
+        statement = (
+            self.get_base_statement()
+            .join(
+                ProductPrice,
+                SubscriptionProductPrice.product_price_id == ProductPrice.id,
+            )
+            .join(
+                Subscription,
+                Subscription.id == SubscriptionProductPrice.subscription_id,
+            )
+            .where(
+                ProductPrice.is_metered.is_(True),
+                ProductPriceMeteredUnit.meter_id == meter_id,
+                Subscription.billable.is_(True),
+                Subscription.customer_id.in_(customer_ids),
+            )
+            # In case customer has several subscriptions, take the earliest one
+            .distinct(Subscription.customer_id)
+            .order_by(Subscription.customer_id, Subscription.started_at.asc())
+            .options(
+                contains_eager(SubscriptionProductPrice.product_price),
+                contains_eager(SubscriptionProductPrice.subscription).joinedload(
+                    Subscription.customer
+                ),
+            )
+        )
+
+        return {
+            subscription_product_price.subscription.customer_id: (
+                CustomerSubscriptionProductPrice(
+                    customer_id=subscription_product_price.subscription.customer_id,
+                    subscription_product_price=subscription_product_price,
+                )
+            )
+            for subscription_product_price in await self.get_all(statement)
+        }
+
+    async def _get_seat_subscription_prices(
+        self, customer_ids: Sequence[UUID], meter_id: UUID
+    ) -> dict[UUID, CustomerSubscriptionProductPrice]:
+        statement = (
+            select(CustomerSeat)
+            .where(
+                CustomerSeat.customer_id.in_(customer_ids),
+                CustomerSeat.status == SeatStatus.claimed,
+            )
+            .options(
+                joinedload(CustomerSeat.subscription).options(
+                    joinedload(Subscription.customer),
+                    joinedload(Subscription.subscription_product_prices).options(
+                        joinedload(SubscriptionProductPrice.product_price),
+                        joinedload(SubscriptionProductPrice.subscription),
+                    ),
+                )
+            )
+        )
+        result = await self.session.execute(statement)
+
+        results: dict[UUID, CustomerSubscriptionProductPrice] = {}
+        seen_customer_ids: set[UUID] = set()
+        for seat in result.scalars().unique().all():
+            # Like `_get_active_seat_for_customer`, only consider one seat per customer
+            if seat.customer_id is None or seat.customer_id in seen_customer_ids:
+                continue
+            seen_customer_ids.add(seat.customer_id)
+
+            if seat.subscription is None:
+                continue
+            metered_price = self._find_metered_price_in_subscription(
+                seat.subscription, meter_id
+            )
+            if metered_price is None:
+                continue
+
+            results[seat.customer_id] = CustomerSubscriptionProductPrice(
+                customer_id=seat.subscription.customer_id,
+                subscription_product_price=metered_price,
+            )
+
+        return results
+
     async def _get_direct_subscription_price(
         self, customer_id: UUID, meter_id: UUID
     ) -> CustomerSubscriptionProductPrice | None:
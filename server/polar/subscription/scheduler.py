@@ -1,11 +1,17 @@
 import datetime
+import itertools
+import time
+import uuid
+from collections.abc import Sequence
 
 import dramatiq
 import structlog
 from apscheduler.job import Job
 from apscheduler.jobstores.base import BaseJobStore
 from apscheduler.triggers.date import DateTrigger
-from sqlalchemy import Select, or_, select, update
+from dramatiq.brokers.redis import RedisBroker
+from dramatiq.common import dq_name
+from sqlalchemy import Select, Update, or_, select, update
 from sqlalchemy.orm import Session
 
 from polar.config import settings
@@ -16,16 +22,64 @@ from polar.postgres import create_sync_engine
 
 log: Logger = structlog.get_logger()
 
+BATCH_JOB_ID = "subscriptions:cycle:batch"
+
+
+class DispatchPacer:
+    """
+    Books dispatch slots so that at most `rate` cycles start per second,
+    never more than `window` seconds ahead of now.
+
+    A `rate` of 0 or less disables pacing.
+    """
+
+    def __init__(self, rate: float, window: float) -> None:
+        self.rate = rate
+        self.window = window
+        self._next_slot = 0.0
+
+    def capacity(self, now: float) -> int | None:
+        """Number of slots that can still be booked, None when unlimited."""
+        if self.rate <= 0:
+            return None
+        start = max(self._next_slot, now)
+        # Tolerate float drift from accumulating slot intervals
+        return max(int((now + self.window - start) * self.rate + 1e-6), 0)
+
+    def resume_at(self) -> float:
+        """Timestamp at which at least one slot frees up."""
+        return self._next_slot - self.window + 1 / self.rate
+
+    def book(self, count: int, now: float) -> list[int | None]:
+        """Book `count` consecutive slots and return their delays in ms."""
+        if self.rate <= 0:
+            return [None] * count
+        interval = 1 / self.rate
+        start = max(self._next_slot, now)
+        self._next_slot = start + count * interval
+        return [
+            round((start + i * interval - now) * 1000) or None for i in range(count)
+        ]
+
 
 class SubscriptionJobStore(BaseJobStore):
     """
     A custom job store for APScheduler that uses our subscription data to trigger
-    cycle jobs based on subscription dates
+    cycle jobs based on subscription dates.
+
+    In batch mode, due subscriptions are surfaced as a single job; removing it
+    claims them in chunks and enqueues their cycle messages in bulk, paced
+    by `DispatchPacer`.
     """
 
     def __init__(self, executor: str = "default") -> None:
         self.engine = create_sync_engine("scheduler")
         self.executor = executor
+        self.batch = settings.SUBSCRIPTION_SCHEDULER_BATCH_DISPATCH
+        self.pacer = DispatchPacer(
+            settings.SUBSCRIPTION_SCHEDULER_MAX_CYCLES_PER_SECOND,
+            settings.SUBSCRIPTION_SCHEDULER_DISPATCH_WINDOW_SECONDS,
+        )
 
     def shutdown(self) -> None:
         self.engine.dispose()
@@ -38,6 +92,17 @@ class SubscriptionJobStore(BaseJobStore):
         statement = self._get_base_statement().where(
             Subscription.current_period_end <= now,
         )
+        if self.batch:
+            if self.pacer.capacity(time.time()) == 0:
+                return []
+            with self.engine.connect() as connection:
+                result = connection.execute(
+                    statement.with_only_columns(Subscription.id).limit(1)
+                )
+                if result.scalar_one_or_none() is None:
+                    return []
+            return [self._build_job(BATCH_JOB_ID, now)]
+
         jobs = self._list_jobs_from_statement(statement)
         log.debug("Due jobs", count=len(jobs))
         return jobs
@@ -51,8 +116,20 @@ class SubscriptionJobStore(BaseJobStore):
         with self.engine.connect() as connection:
             result = connection.execute(statement)
             next_run_time = result.scalar_one_or_none()
-            log.debug("Next run time", next_run_time=next_run_time)
-            return next_run_time
+
+        # Don't wake up before the pacer has free slots again
+        if (
+            self.batch
+            and next_run_time is not None
+            and self.pacer.capacity(time.time()) == 0
+        ):
+            next_run_time = max(
+                next_run_time,
+                datetime.datetime.fromtimestamp(self.pacer.resume_at(), datetime.UTC),
+            )
+
+        log.debug("Next run time", next_run_time=next_run_time)
+        return next_run_time
 
     def get_all_jobs(self) -> list[Job]:
         statement = self._get_base_statement()
@@ -61,6 +138,10 @@ class SubscriptionJobStore(BaseJobStore):
         return jobs
 
     def remove_job(self, job_id: str) -> None:
+        if job_id == BATCH_JOB_ID:
+            self._dispatch_due(utc_now())
+            return
+
         subscription_id = job_id.split(":")[-1]
         statement = (
             update(Subscription)
@@ -81,6 +162,89 @@ class SubscriptionJobStore(BaseJobStore):
     def remove_all_jobs(self) -> None:
         raise RuntimeError("This job store does not support managing jobs directly.")
 
+    def _dispatch_due(self, now: datetime.datetime) -> int:
+        """
+        Claim due subscriptions chunk by chunk and enqueue their cycle messages,
+        until there are none left or the pacer is fully booked.
+        """
+        batch_size = settings.SUBSCRIPTION_SCHEDULER_BATCH_SIZE
+        dispatched = 0
+        while True:
+            timestamp = time.time()
+            capacity = self.pacer.capacity(timestamp)
+            limit = batch_size if capacity is None else min(batch_size, capacity)
+            if limit <= 0:
+                break
+
+            with self.engine.begin() as connection:
+                result = connection.execute(self._get_claim_statement(now, limit))
+                subscription_ids: list[uuid.UUID] = list(result.scalars().all())
+
+            if subscription_ids:
+                delays = self.pacer.book(len(subscription_ids), timestamp)
+                self._enqueue_cycles(subscription_ids, delays)
+                dispatched += len(subscription_ids)
+
+            if len(subscription_ids) < limit:
+                break
+
+        log.info("Dispatched subscription cycles", count=dispatched)
+        return dispatched
+
+    def _enqueue_cycles(
+        self, subscription_ids: Sequence[uuid.UUID], delays: Sequence[int | None]
+    ) -> None:
+        broker = dramatiq.get_broker()
+        assert isinstance(broker, RedisBroker)
+        actor = broker.get_actor("subscription.cycle")
+
+        queue_messages: dict[str, list[tuple[str, bytes]]] = {}
+        current_millis = int(time.time() * 1000)
+        for subscription_id, delay in zip(subscription_ids, delays, strict=True):
+            redis_message_id = str(uuid.uuid4())
+            message = actor.message_with_options(
+                kwargs={"subscription_id": str(subscription_id)},
+                redis_message_id=redis_message_id,
+            )
+            if delay is not None:
+                message = message.copy(
+                    queue_name=dq_name(message.queue_name),
+                    options={**message.options, "eta": current_millis + delay},
+                )
+            queue_messages.setdefault(message.queue_name, []).append(
+                (redis_message_id, message.encode())
+            )
+
+        # Same layout as the broker's own enqueue: message payloads in the
+        # queue hash, message ids pushed on the queue list.
+        with broker.client.pipeline(transaction=False) as pipe:
+            for queue_name, messages in queue_messages.items():
+                for batch in itertools.batched(messages, 100):
+                    pipe.hset(
+                        f"{broker.namespace}:{queue_name}.msgs", mapping=dict(batch)
+                    )
+                    pipe.rpush(
+                        f"{broker.namespace}:{queue_name}",
+                        *(message_id for message_id, _ in batch),
+                    )
+            pipe.execute()
+
+    def _build_job(self, job_id: str, run_date: datetime.datetime) -> Job:
+        trigger = DateTrigger(run_date, datetime.UTC)
+        job_kwargs = {
+            **(self._scheduler._job_defaults if self._scheduler else {}),
+            "trigger": trigger,
+            "executor": self.executor,
+            "func": lambda: None,
+            "args": (),
+            "kwargs": {},
+            "id": job_id,
+            "name": None,
+            "next_run_time": trigger.run_date,
+            "misfire_grace_time": None,
+        }
+        return Job(self._scheduler, **job_kwargs)
+
     def _list_jobs_from_statement(
         self, statement: Select[tuple[Subscription]]
     ) -> list[Job]:
@@ -93,23 +257,29 @@ class SubscriptionJobStore(BaseJobStore):
             )
             for result in results.yield_per(250):
                 subscription_id, current_period_end = result._tuple()
-                trigger = DateTrigger(current_period_end, datetime.UTC)
-                job_kwargs = {
-                    **(self._scheduler._job_defaults if self._scheduler else {}),
-                    "trigger": trigger,
-                    "executor": self.executor,
-                    "func": lambda: None,
-                    "args": (),
-                    "kwargs": {},
-                    "id": f"subscriptions:cycle:{subscription_id}",
-                    "name": None,
-                    "next_run_time": trigger.run_date,
-                    "misfire_grace_time": None,
-                }
-                job = Job(self._scheduler, **job_kwargs)
-                jobs.append(job)
+                assert current_period_end is not None
+                jobs.append(
+                    self._build_job(
+                        f"subscriptions:cycle:{subscription_id}", current_period_end
+                    )
+                )
         return jobs
 
+    def _get_claim_statement(self, now: datetime.datetime, limit: int) -> Update:
+        due_ids = (
+            self._get_base_statement()
+            .where(Subscription.current_period_end <= now)
+            .with_only_columns(Subscription.id)
+            .limit(limit)
+            .with_for_update(of=Subscription, skip_locked=True)
+        )
+        return (
+            update(Subscription)
+            .where(Subscription.id.in_(due_ids))
+            .values(scheduler_locked_at=now)
+            .returning(Subscription.id)
+        )
+
     def _get_base_statement(self) -> Select[tuple[Subscription]]:
         statement = (
             select(Subscription)
@@ -23,7 +23,7 @@ from polar.customer_seat.service import seat_service
 from polar.customer_session.service import customer_session as customer_session_service
 from polar.discount.repository import DiscountRedemptionRepository
 from polar.discount.service import discount as discount_service
-from polar.email.react import render_email_template
+from polar.email.react import render_email_template_async
 from polar.email.schemas import EmailAdapter
 from polar.email.sender import enqueue_email
 from polar.enums import (
@@ -2464,7 +2464,7 @@ class SubscriptionService:
             }
         )
 
-        body = render_email_template(email)
+        body = await render_email_template_async(email)
 
         subject = subject_template.format(product=product)
 
@@ -2613,7 +2613,7 @@ class SubscriptionService:
                 },
             }
         )
-        body = render_email_template(email)
+        body = await render_email_template_async(email)
         enqueue_email(
             to_email_addr=recipient,
             subject=title,
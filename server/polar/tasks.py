@@ -25,8 +25,10 @@ from polar.integrations.chargeback_stop import tasks as chargeback_stop
 from polar.integrations.loops import tasks as loops
 from polar.integrations.resend import tasks as resend
 from polar.integrations.stripe import tasks as stripe
+from polar.license_key import tasks as license_key
 from polar.masterclass_architect import tasks as masterclass_architect
 from polar.meter import tasks as meter
+from polar.metrics import tasks as metrics
 from polar.notifications import tasks as notifications
 from polar.order import tasks as order
 from polar.organization import tasks as organization
@@ -67,9 +69,11 @@ __all__ = [
     "eventstream",
     "external_event",
     "form",
+    "license_key",
     "loops",
     "masterclass_architect",
     "meter",
+    "metrics",
     "notifications",
     "order",
     "organization",
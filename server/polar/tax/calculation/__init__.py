@@ -1,4 +1,6 @@
+import asyncio
 import uuid
+from collections.abc import Sequence
 from datetime import datetime
 
 import structlog
@@ -8,6 +10,7 @@ from polar.enums import TaxBehavior, TaxBehaviorOption, TaxProcessor
 from polar.kit.address import Address
 from polar.kit.utils import utc_now
 from polar.logging import Logger
+from polar.observability import TAX_CALCULATION_HEDGES_TOTAL, TAX_CALCULATIONS_TOTAL
 
 from ..tax_id import TaxID
 from .base import (
@@ -63,6 +66,91 @@ def get_tax_behavior_from_option(
             )
 
 
+async def calculate_hedged(
+    services: Sequence[tuple[TaxProcessor, TaxServiceProtocol]],
+    *,
+    identifier: uuid.UUID | str,
+    currency: str,
+    amount: int,
+    tax_behavior: TaxBehavior,
+    tax_code: TaxCode,
+    address: Address,
+    tax_ids: list[TaxID],
+    customer_exempt: bool,
+) -> tuple[TaxCalculation, TaxProcessor]:
+    """Calculate tax with the first of the given processors to succeed.
+
+    The next processor is fired when the running ones fail with a technical
+    error or, if `TAX_CALCULATION_HEDGE_DELAY_SECONDS` is set, when they didn't
+    return after this delay. The first result wins and the other calls are
+    cancelled. Logical errors are raised right away, as the other processors
+    would reject the same input.
+
+    Raises:
+        TaxCalculationTechnicalError: If all tax processors fail to calculate tax.
+    """
+    hedge_delay = settings.TAX_CALCULATION_HEDGE_DELAY_SECONDS
+    remaining = list(services)
+    pending: dict[asyncio.Task[TaxCalculation], tuple[TaxProcessor, str]] = {}
+
+    def _fire_next() -> None:
+        processor, service = remaining.pop(0)
+        attempt = "fallback" if len(remaining) < len(services) - 1 else "primary"
+        log.debug("Attempting tax calculation with processor", processor=processor)
+        task = asyncio.create_task(
+            service.calculate(
+                identifier,
+                currency,
+                amount,
+                tax_behavior,
+                tax_code,
+                address,
+                tax_ids,
+                customer_exempt=customer_exempt,
+            )
+        )
+        pending[task] = (processor, attempt)
+
+    try:
+        while remaining or pending:
+            if not pending:
+                _fire_next()
+
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=hedge_delay if remaining else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+
+            # Too slow: fire the next processor alongside
+            if not done:
+                TAX_CALCULATION_HEDGES_TOTAL.labels(processor=remaining[0][0]).inc()
+                _fire_next()
+                continue
+
+            for task in done:
+                processor, attempt = pending.pop(task)
+                try:
+                    result = task.result()
+                except TaxCalculationTechnicalError as e:
+                    log.warning(
+                        "Tax calculation failed with technical error, trying next processor",
+                        processor=processor,
+                        error=str(e),
+                    )
+                    continue
+                log.debug("Tax calculation succeeded", processor=processor)
+                TAX_CALCULATIONS_TOTAL.labels(
+                    processor=processor, attempt=attempt
+                ).inc()
+                return result, processor
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise TaxCalculationTechnicalError("All tax processors failed to calculate tax")
+
+
 _BACKFILL_REFERENCE_PREFIX = "backfill_"
 
 
@@ -81,8 +169,8 @@ class TaxCalculationService:
         """Calculate tax for the given parameters.
 
         Tries to calculate tax using the configured tax processors in order. If a
-        processor fails with a technical error, it will try the next one until all
-        processors have been tried.
+        processor fails with a technical error, or is slower than the hedge delay,
+        it will try the next one until all processors have been tried.
 
         Args:
             identifier: Unique identifier for this tax calculation.
@@ -100,34 +188,20 @@ class TaxCalculationService:
         Raises:
             TaxCalculationTechnicalError: If all tax processors fail to calculate tax.
         """
-        for processor in settings.TAX_PROCESSORS:
-            log.debug("Attempting tax calculation with processor", processor=processor)
-            tax_processor_service = _get_tax_service(processor)
-            try:
-                result = await tax_processor_service.calculate(
-                    identifier=identifier,
-                    currency=currency,
-                    amount=amount,
-                    tax_behavior=get_tax_behavior_from_option(tax_behavior, address),
-                    tax_code=tax_code,
-                    address=address,
-                    tax_ids=tax_ids,
-                    customer_exempt=customer_exempt,
-                )
-                log.debug(
-                    "Tax calculation succeeded",
-                    processor=processor,
-                )
-                return result, processor
-            except TaxCalculationTechnicalError as e:
-                log.warning(
-                    "Tax calculation failed with technical error, trying next processor",
-                    processor=processor,
-                    error=str(e),
-                )
-                continue
-
-        raise TaxCalculationTechnicalError("All tax processors failed to calculate tax")
+        return await calculate_hedged(
+            [
+                (processor, _get_tax_service(processor))
+                for processor in settings.TAX_PROCESSORS
+            ],
+            identifier=identifier,
+            currency=currency,
+            amount=amount,
+            tax_behavior=get_tax_behavior_from_option(tax_behavior, address),
+            tax_code=tax_code,
+            address=address,
+            tax_ids=tax_ids,
+            customer_exempt=customer_exempt,
+        )
 
     async def record(
         self,
@@ -206,6 +280,7 @@ class TaxCalculationService:
 tax_calculation = TaxCalculationService()
 
 __all__ = [
+    "calculate_hedged",
     "CalculationExpiredError",
     "get_tax_behavior_from_option",
     "get_tax_service",
@@ -0,0 +1,105 @@
+"""Cache of the tax quotes of checkouts.
+
+Tax is recalculated on every checkout update with a billing address, most of
+them not changing the tax inputs, e.g. while the customer types their name.
+Quotes are cached in Redis for `TAX_QUOTE_CACHE_TTL_SECONDS`, keyed by the
+checkout, since the calculation references it, and by its normalized inputs.
+"""
+
+import hashlib
+import json
+import uuid
+from collections.abc import Sequence
+
+import structlog
+from redis import RedisError
+
+from polar.config import settings
+from polar.enums import TaxBehavior, TaxProcessor
+from polar.kit.address import Address
+from polar.logging import Logger
+from polar.observability import CACHE_LOOKUPS_TOTAL
+from polar.redis import get_app_redis
+
+from ..tax_id import TaxID
+from .base import TaxabilityReason, TaxCalculation, TaxCode
+
+log: Logger = structlog.get_logger()
+
+_CACHE_NAME = "tax_quote"
+
+
+def _normalize(value: str | None) -> str | None:
+    return None if value is None else " ".join(value.split()).upper()
+
+
+def get_key(
+    *,
+    identifier: uuid.UUID | str,
+    processors: Sequence[TaxProcessor],
+    currency: str,
+    amount: int,
+    tax_behavior: TaxBehavior,
+    tax_code: TaxCode,
+    address: Address,
+    tax_ids: Sequence[TaxID],
+    customer_exempt: bool,
+) -> str:
+    parameters = {
+        "identifier": str(identifier),
+        "processors": [str(processor) for processor in processors],
+        "currency": currency.lower(),
+        "amount": amount,
+        "tax_behavior": str(tax_behavior),
+        "tax_code": str(tax_code),
+        "address": {
+            field: _normalize(value)
+            for field, value in address.model_dump(mode="json").items()
+        },
+        "tax_ids": sorted(
+            f"{tax_id_format}:{_normalize(number)}" for number, tax_id_format in tax_ids
+        ),
+        "customer_exempt": customer_exempt,
+    }
+    digest = hashlib.sha256(json.dumps(parameters, sort_keys=True).encode()).hexdigest()
+    return f"tax:quote:{digest}"
+
+
+async def get_quote(key: str) -> tuple[TaxCalculation, TaxProcessor] | None:
+    try:
+        value = await get_app_redis().get(key)
+    except RedisError as e:
+        log.warning("tax.quote_cache.redis_error", error=str(e))
+        value = None
+
+    CACHE_LOOKUPS_TOTAL.labels(
+        cache=_CACHE_NAME, result="miss" if value is None else "hit"
+    ).inc()
+    if value is None:
+        return None
+
+    data = json.loads(value)
+    calculation: TaxCalculation = data["calculation"]
+    calculation["tax_behavior"] = TaxBehavior(calculation["tax_behavior"])
+    if calculation["taxability_reason"] is not None:
+        calculation["taxability_reason"] = TaxabilityReason(
+            calculation["taxability_reason"]
+        )
+    return calculation, TaxProcessor(data["processor"])
+
+
+async def set_quote(
+    key: str, calculation: TaxCalculation, processor: TaxProcessor
+) -> None:
+    value = json.dumps({"calculation": calculation, "processor": processor})
+    try:
+        await get_app_redis().set(key, value, ex=settings.TAX_QUOTE_CACHE_TTL_SECONDS)
+    except RedisError as e:
+        log.warning("tax.quote_cache.redis_error", error=str(e))
+
+
+__all__ = [
+    "get_key",
+    "get_quote",
+    "set_quote",
+]
@@ -0,0 +1,148 @@
+"""
+Per-endpoint ordered delivery of webhook events.
+
+Events of an endpoint are delivered in creation order, with a single delivery
+in flight at a time. Each endpoint has two Redis sorted sets:
+
+* `pending`: events waiting for their turn, scored by creation time;
+* `inflight`: events being delivered, scored by the expiration of their lease,
+  so a slot held by a dead worker is eventually reclaimed.
+
+A send task first tries to acquire a slot for its event. If it's not the
+event's turn, the event stays in `pending` and the task ends: when a delivery
+completes, it releases its slot and dispatches the next pending events.
+This way, ordering doesn't require polling the database or retrying.
+
+Endpoints listed in `WEBHOOK_ENDPOINT_DELIVERY_CONCURRENCY` opt out of strict
+ordering and can have several deliveries in flight.
+"""
+
+import time
+from uuid import UUID
+
+from polar.config import settings
+from polar.models import WebhookEvent
+from polar.redis import Redis
+
+ENDPOINTS_KEY = "webhook_delivery:endpoints"
+"""
+Set of endpoints with pending events, swept periodically to recover
+from lost dispatches.
+"""
+
+_ACQUIRE_SCRIPT = """
+local pending_key, inflight_key, endpoints_key = KEYS[1], KEYS[2], KEYS[3]
+local event_id, score, now = ARGV[1], ARGV[2], ARGV[3]
+local lease_expiration, concurrency, endpoint_id = ARGV[4], tonumber(ARGV[5]), ARGV[6]
+
+redis.call("ZREMRANGEBYSCORE", inflight_key, "-inf", now)
+
+-- Duplicate message of an event being delivered
+if redis.call("ZSCORE", inflight_key, event_id) then
+    return 0
+end
+
+redis.call("ZADD", pending_key, "NX", score, event_id)
+
+local acquired = 0
+local free_slots = concurrency - redis.call("ZCARD", inflight_key)
+if free_slots > 0 and redis.call("ZRANK", pending_key, event_id) < free_slots then
+    redis.call("ZREM", pending_key, event_id)
+    redis.call("ZADD", inflight_key, lease_expiration, event_id)
+    acquired = 1
+end
+
+if redis.call("ZCARD", pending_key) > 0 then
+    redis.call("SADD", endpoints_key, endpoint_id)
+else
+    redis.call("SREM", endpoints_key, endpoint_id)
+end
+
+return acquired
+"""
+
+_RELEASE_SCRIPT = """
+local pending_key, inflight_key, endpoints_key = KEYS[1], KEYS[2], KEYS[3]
+local event_id, now, concurrency, endpoint_id = ARGV[1], ARGV[2], tonumber(ARGV[3]), ARGV[4]
+
+if event_id ~= "" then
+    redis.call("ZREM", inflight_key, event_id)
+    redis.call("ZREM", pending_key, event_id)
+end
+redis.call("ZREMRANGEBYSCORE", inflight_key, "-inf", now)
+
+if redis.call("ZCARD", pending_key) == 0 then
+    redis.call("SREM", endpoints_key, endpoint_id)
+    return {}
+end
+
+local free_slots = concurrency - redis.call("ZCARD", inflight_key)
+if free_slots <= 0 then
+    return {}
+end
+return redis.call("ZRANGE", pending_key, 0, free_slots - 1)
+"""
+
+
+def _get_keys(endpoint_id: UUID) -> list[str]:
+    return [
+        f"webhook_delivery:{endpoint_id}:pending",
+        f"webhook_delivery:{endpoint_id}:inflight",
+        ENDPOINTS_KEY,
+    ]
+
+
+def get_endpoint_concurrency(endpoint_id: UUID) -> int:
+    return settings.WEBHOOK_ENDPOINT_DELIVERY_CONCURRENCY.get(endpoint_id, 1)
+
+
+async def acquire(redis: Redis, event: WebhookEvent) -> bool:
+    """
+    Try to acquire a delivery slot for the event.
+
+    Returns `False` if earlier events of the endpoint have to be delivered
+    first. The event is then kept pending, and will be dispatched
+    when its turn comes.
+    """
+    now = time.time()
+    result = await redis.eval(
+        _ACQUIRE_SCRIPT,
+        3,
+        *_get_keys(event.webhook_endpoint_id),
+        str(event.id),
+        event.created_at.timestamp(),
+        now,
+        now + settings.WEBHOOK_DELIVERY_LEASE_SECONDS,
+        get_endpoint_concurrency(event.webhook_endpoint_id),
+        str(event.webhook_endpoint_id),
+    )
+    return bool(result)
+
+
+async def release(
+    redis: Redis, endpoint_id: UUID, event_id: UUID | None = None
+) -> list[UUID]:
+    """
+    Release the slot of an event, or remove it from the pending events.
+
+    Returns the pending events that can now be dispatched.
+    Without an event, only returns them, which is useful to recover
+    from lost dispatches.
+    """
+    result = await redis.eval(
+        _RELEASE_SCRIPT,
+        3,
+        *_get_keys(endpoint_id),
+        str(event_id) if event_id is not None else "",
+        time.time(),
+        get_endpoint_concurrency(endpoint_id),
+        str(endpoint_id),
+    )
+    return [UUID(value) for value in result]
+
+
+async def get_pending_endpoints(redis: Redis) -> list[UUID]:
+    return [UUID(value) for value in await redis.smembers(ENDPOINTS_KEY)]
+
+
+__all__ = ["acquire", "get_endpoint_concurrency", "get_pending_endpoints", "release"]
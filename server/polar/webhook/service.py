@@ -1,3 +1,4 @@
+import asyncio
 import datetime
 import json
 from collections.abc import Sequence
@@ -5,7 +6,7 @@ from typing import Literal, cast, overload
 from uuid import UUID
 
 import structlog
-from sqlalchemy import CursorResult, String, desc, func, or_, select, text, update
+from sqlalchemy import CursorResult, String, desc, or_, select, text, update
 from sqlalchemy import cast as sql_cast
 from sqlalchemy.orm import joinedload
 
@@ -14,7 +15,7 @@ from polar.checkout.eventstream import CheckoutEvent, publish_checkout_event
 from polar.checkout.repository import CheckoutRepository
 from polar.config import settings
 from polar.customer.schemas.state import CustomerState
-from polar.email.react import render_email_template
+from polar.email.react import render_email_template_async
 from polar.email.schemas import EmailAdapter
 from polar.email.sender import enqueue_email
 from polar.exceptions import PolarError, ResourceNotFound
@@ -375,52 +376,31 @@ class WebhookService:
                 organization = user_organizations[0].organization
                 dashboard_url = f"{settings.FRONTEND_BASE_URL}/dashboard/{organization.slug}/settings/webhooks"
 
-                for user_org in user_organizations:
-                    user = user_org.user
-                    email = EmailAdapter.validate_python(
+                emails = [
+                    EmailAdapter.validate_python(
                         {
                             "template": "webhook_endpoint_disabled",
                             "props": {
-                                "email": user.email,
+                                "email": user_org.user.email,
                                 "organization": organization,
                                 "webhook_endpoint_url": endpoint.url,
                                 "dashboard_url": dashboard_url,
                             },
                         }
                     )
+                    for user_org in user_organizations
+                ]
+                bodies = await asyncio.gather(
+                    *(render_email_template_async(email) for email in emails)
+                )
 
-                    body = render_email_template(email)
-
+                for user_org, body in zip(user_organizations, bodies, strict=True):
                     enqueue_email(
-                        to_email_addr=user.email,
+                        to_email_addr=user_org.user.email,
                         subject=f"Webhook endpoint disabled for {organization.name}",
                         html_content=body,
                     )
 
-    async def is_latest_event(self, session: AsyncSession, event: WebhookEvent) -> bool:
-        age_limit = utc_now() - datetime.timedelta(minutes=1)
-        statement = (
-            select(func.count(WebhookEvent.id))
-            .join(
-                WebhookDelivery,
-                WebhookDelivery.webhook_event_id == WebhookEvent.id,
-                isouter=True,
-            )
-            .where(
-                WebhookEvent.deleted_at.is_(None),
-                WebhookEvent.webhook_endpoint_id == event.webhook_endpoint_id,
-                WebhookEvent.id != event.id,  # Not the current event
-                WebhookDelivery.id.is_(None),  # Not delivered yet
-                WebhookEvent.created_at
-                < event.created_at,  # Older than the current event
-                WebhookEvent.created_at >= age_limit,  # Not too old
-            )
-            .limit(1)
-        )
-        res = await session.execute(statement)
-        count = res.scalar_one()
-        return count == 0
-
     @overload
     async def send(
         self,
@@ -13,18 +13,23 @@ from polar.config import Environment, settings
 from polar.kit.db.postgres import AsyncSession
 from polar.kit.utils import utc_now
 from polar.logging import Logger
+from polar.models import WebhookEvent
 from polar.models.webhook_delivery import WebhookDelivery
+from polar.redis import Redis
 from polar.webhook.repository import WebhookEventRepository
 from polar.worker import (
     AsyncSessionMaker,
     HTTPXMiddleware,
+    RedisMiddleware,
     TaskPriority,
     TaskQueue,
     actor,
     can_retry,
     enqueue_job,
+    get_retries,
 )
 
+from . import delivery_queue
 from .service import webhook as webhook_service
 
 log: Logger = structlog.get_logger()
@@ -72,32 +77,71 @@ async def _webhook_event_send(
         webhook_endpoint_id=event.webhook_endpoint_id,
     )
 
+    redis = RedisMiddleware.get()
+
     if not event.webhook_endpoint.enabled:
         bound_log.info("Webhook endpoint is disabled, skipping")
         event.skipped = True
         session.add(event)
+        await _dispatch_next_events(redis, event.webhook_endpoint_id, event.id)
         return
 
     if event.payload is None:
         bound_log.info("Archived event, skipping")
+        await _dispatch_next_events(redis, event.webhook_endpoint_id, event.id)
         return
 
     if event.succeeded and not redeliver:
         bound_log.info("Event already succeeded, skipping")
+        await _dispatch_next_events(redis, event.webhook_endpoint_id, event.id)
         return
 
-    if not await webhook_service.is_latest_event(session, event):
-        log.info(
-            "Earlier events need to be delivered first, retrying later",
-            id=event.id,
-            type=event.type,
-            webhook_endpoint_id=event.webhook_endpoint_id,
-        )
-        raise Retry()
+    # Manual redeliveries are not ordered, and get a fresh set of attempts
+    if redeliver:
+        if get_retries() == 0:
+            event.delivery_attempts = 0
+        return await _deliver_webhook_event(session, event, event.payload)
+
+    if not await delivery_queue.acquire(redis, event):
+        bound_log.info("Earlier events need to be delivered first, queued")
+        return
+
+    try:
+        await _deliver_webhook_event(session, event, event.payload)
+    except BaseException:
+        # Free the slot for the retry. Jobs enqueued by a failed task are
+        # discarded: if the next events get the slot first, they're dispatched
+        # by `webhook_event.dispatch_pending`.
+        await delivery_queue.release(redis, event.webhook_endpoint_id, event.id)
+        raise
+    else:
+        await _dispatch_next_events(redis, event.webhook_endpoint_id, event.id)
+
+
+async def _dispatch_next_events(
+    redis: Redis, webhook_endpoint_id: UUID, webhook_event_id: UUID | None = None
+) -> None:
+    next_event_ids = await delivery_queue.release(
+        redis, webhook_endpoint_id, webhook_event_id
+    )
+    for next_event_id in next_event_ids:
+        enqueue_job("webhook_event.send", webhook_event_id=next_event_id)
+
+
+async def _deliver_webhook_event(
+    session: AsyncSession, event: WebhookEvent, payload: str
+) -> None:
+    webhook_event_id = event.id
+    bound_log = log.bind(
+        id=webhook_event_id,
+        type=event.type,
+        webhook_endpoint_id=event.webhook_endpoint_id,
+    )
 
     if event.skipped:
         event.skipped = False
-        session.add(event)
+    event.delivery_attempts += 1
+    session.add(event)
 
     ts = utc_now()
 
@@ -107,7 +151,7 @@ async def _webhook_event_send(
 
     # Sign the payload
     wh = StandardWebhook(b64secret)
-    signature = wh.sign(str(event.id), ts, event.payload)
+    signature = wh.sign(str(event.id), ts, payload)
 
     headers: Mapping[str, str] = {
         "user-agent": "spairehq.com webhooks",
@@ -121,6 +165,11 @@ async def _webhook_event_send(
         webhook_event_id=webhook_event_id, webhook_endpoint_id=event.webhook_endpoint_id
     )
 
+    # Everything needed for the delivery is loaded: end the transaction,
+    # so the database connection goes back to the pool while we wait for the
+    # endpoint. The outcome is recorded in a short transaction afterwards.
+    await session.commit()
+
     client = HTTPXMiddleware.get()
     try:
         # In development, don't send webhooks for real
@@ -131,7 +180,7 @@ async def _webhook_event_send(
         else:
             response = await client.post(
                 event.webhook_endpoint.url,
-                content=event.payload,
+                content=payload,
                 headers=headers,
                 timeout=10.0,
             )
@@ -167,7 +216,7 @@ async def _webhook_event_send(
             delivery.response = str(e)
 
         # Permanent failure
-        if not can_retry():
+        if not can_retry() or event.delivery_attempts > settings.WEBHOOK_MAX_RETRIES:
             event.succeeded = False
             enqueue_job("webhook_event.failed", webhook_event_id=webhook_event_id)
         # Retry
@@ -210,6 +259,22 @@ async def webhook_event_archive() -> None:
         )
 
 
+@actor(
+    actor_name="webhook_event.dispatch_pending",
+    cron_trigger=CronTrigger(minute="*"),
+    priority=TaskPriority.LOW,
+)
+async def webhook_event_dispatch_pending() -> None:
+    """
+    Dispatch pending events of endpoints with a free delivery slot.
+
+    Recovers from dispatches lost when a worker died during a delivery.
+    """
+    redis = RedisMiddleware.get()
+    for webhook_endpoint_id in await delivery_queue.get_pending_endpoints(redis):
+        await _dispatch_next_events(redis, webhook_endpoint_id)
+
+
 @actor(actor_name="webhook_event.publish", priority=TaskPriority.MEDIUM)
 async def webhook_event_publish(webhook_event_id: UUID, organization_id: UUID) -> None:
     """
@@ -13,6 +13,7 @@ from polar.config import settings
 from polar.observability import metrics as _prometheus_metrics
 
 from ._broker import get_broker
+from ._debounce import get_debounced_keys
 from ._encoder import JSONEncoder
 from ._enqueue import (
     BulkJobDelayCalculator,
@@ -54,6 +55,16 @@ def can_retry() -> bool:
     return get_retries() < message.options["max_retries"]
 
 
+def get_debounced_items() -> list[str] | None:
+    """
+    Get the items owned by the current message, for actors debounced per item
+    with the `debounce_keys` option, or `None` if the actor isn't.
+    """
+    message = middleware.CurrentMessage.get_current_message()
+    assert message is not None
+    return get_debounced_keys(message)
+
+
 broker = get_broker()
 dramatiq.set_broker(broker)
 dramatiq.set_encoder(JSONEncoder(broker))
@@ -117,6 +128,7 @@ __all__ = [
     "can_retry",
     "enqueue_events",
     "enqueue_job",
+    "get_debounced_items",
     "get_retries",
     "make_bulk_job_delay_calculator",
 ]
@@ -16,6 +16,7 @@ from polar.logfire import instrument_httpx
 from polar.logging import Logger
 
 from ._debounce import DebounceMiddleware
+from ._email_renderer import EmailRendererMiddleware
 from ._health import HealthMiddleware
 from ._httpx import HTTPXMiddleware
 from ._metrics import PrometheusMiddleware
@@ -149,6 +150,7 @@ def get_broker() -> dramatiq.Broker:
         SQLAlchemyMiddleware(),
         RedisMiddleware(),
         HTTPXMiddleware(),
+        EmailRendererMiddleware(),
         HealthMiddleware(),
         scheduler_middleware,
         # Observability (outer layer for message processing)
@@ -1,4 +1,4 @@
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
 from datetime import UTC, datetime, timedelta
 from typing import TYPE_CHECKING, Any, Never
 
@@ -35,13 +35,15 @@ def now_timestamp() -> int:
     return int(datetime.now(UTC).timestamp())
 
 
-async def set_debounce_key(
-    redis: RedisAsyncIO,
+def get_debounce_key(
     actor: dramatiq.Actor[Any, Any],
-    message_id: str,
     args: tuple["JSONSerializable", ...],
     kwargs: dict[str, "JSONSerializable"],
 ) -> tuple[str, int] | None:
+    """
+    Compute the debounce key and the minimum delay, in milliseconds,
+    of a message, if its actor is debounced.
+    """
     debounce_key_factory: Callable[..., str] | None = actor.options.get("debounce_key")
     if debounce_key_factory is None:
         return None
@@ -54,21 +56,86 @@ async def set_debounce_key(
         )
         * 1000
     )
+    return key, delay
+
 
+def get_debounce_keys(
+    actor: dramatiq.Actor[Any, Any],
+    args: tuple["JSONSerializable", ...],
+    kwargs: dict[str, "JSONSerializable"],
+) -> tuple[list[str], int] | None:
+    """
+    Compute the debounce keys and the minimum delay, in milliseconds,
+    of a message, if its actor is debounced per item.
+
+    Such actors take several items, e.g. customers, and have one debounce key
+    per item, as if each item was sent in its own debounced message. When the
+    message is processed, it only owns the keys not enqueued again since;
+    the actor retrieves them with `get_debounced_keys`.
+    """
+    debounce_keys_factory: Callable[..., list[str]] | None = actor.options.get(
+        "debounce_keys"
+    )
+    if debounce_keys_factory is None:
+        return None
+
+    keys = [
+        f"{DEBOUNCE_KEY_PREFIX}{key}" for key in debounce_keys_factory(*args, **kwargs)
+    ]
+    delay: int = (
+        actor.options.get(
+            "debounce_min_threshold",
+            int(settings.WORKER_DEFAULT_DEBOUNCE_MIN_THRESHOLD.total_seconds()),
+        )
+        * 1000
+    )
+    return keys, delay
+
+
+async def set_debounce_keys(
+    redis: RedisAsyncIO, debounce_keys: Iterable[tuple[str, str]]
+) -> None:
+    """
+    Register debounce keys, given as `(key, message_id)` pairs,
+    in a single transaction.
+
+    Keys are set in order, so if a key appears several times,
+    the last message becomes its owner.
+    """
+    debounce_keys = list(debounce_keys)
+    if not debounce_keys:
+        return
+
+    timestamp = now_timestamp()
     async with redis.pipeline(transaction=True) as pipe:
-        # Always keep the oldest timestamp, if it exists
-        await pipe.hsetnx(key, "enqueue_timestamp", now_timestamp())
-        # Change owner to current message_id
-        await pipe.hset(key, "message_id", message_id)
-        # Set task as non-executed
-        await pipe.hset(key, "executed", 0)
-        # Set TTL to avoid keys being stuck in Redis
-        await pipe.expire(key, DEBOUNCE_KEY_TTL)
+        for key, message_id in debounce_keys:
+            # Always keep the oldest timestamp, if it exists
+            await pipe.hsetnx(key, "enqueue_timestamp", timestamp)
+            # Change owner to current message_id
+            await pipe.hset(key, "message_id", message_id)
+            # Set task as non-executed
+            await pipe.hset(key, "executed", 0)
+            # Set TTL to avoid keys being stuck in Redis
+            await pipe.expire(key, DEBOUNCE_KEY_TTL)
         await pipe.execute()
 
-    log.debug("Set debounce key", key=key, delay=delay)
+    log.debug("Set debounce keys", count=len(debounce_keys))
 
-    return key, delay
+
+async def set_debounce_key(
+    redis: RedisAsyncIO,
+    actor: dramatiq.Actor[Any, Any],
+    message_id: str,
+    args: tuple["JSONSerializable", ...],
+    kwargs: dict[str, "JSONSerializable"],
+) -> tuple[str, int] | None:
+    debounce = get_debounce_key(actor, args, kwargs)
+    if debounce is None:
+        return None
+
+    key, _ = debounce
+    await set_debounce_keys(redis, [(key, message_id)])
+    return debounce
 
 
 class DebounceMiddleware(dramatiq.Middleware):
@@ -81,15 +148,28 @@ class DebounceMiddleware(dramatiq.Middleware):
 
     @property
     def actor_options(self) -> set[str]:
-        return {"debounce_key", "debounce_min_threshold", "debounce_max_threshold"}
+        return {
+            "debounce_key",
+            "debounce_keys",
+            "debounce_min_threshold",
+            "debounce_max_threshold",
+        }
 
     @property
     def ephemeral_options(self) -> set[str]:
-        return {"debounce_enqueue_timestamp"}
+        return {
+            "debounce_enqueue_timestamp",
+            "debounce_owned_keys",
+            "debounce_max_threshold_keys",
+        }
 
     def before_process_message(
         self, broker: dramatiq.Broker, message: dramatiq.MessageProxy
     ) -> None:
+        if message.options.get("debounce_keys") is not None:
+            self._before_process_debounce_keys(broker, message)
+            return
+
         debounce_key = message.options.get("debounce_key")
         if debounce_key is None:
             return
@@ -134,11 +214,83 @@ class DebounceMiddleware(dramatiq.Middleware):
         )
         self._skip_debounced(message)
 
+    def _before_process_debounce_keys(
+        self, broker: dramatiq.Broker, message: dramatiq.MessageProxy
+    ) -> None:
+        """
+        Same checks as for a single debounce key, but for each key:
+        the message is only skipped if it owns none of them.
+        """
+        debounce_keys: list[str] = message.options["debounce_keys"]
+
+        with self._redis.pipeline(transaction=False) as pipe:
+            for debounce_key in debounce_keys:
+                pipe.hgetall(debounce_key)
+            debounce_datas: list[dict[bytes, bytes]] = pipe.execute()
+
+        max_threshold = self._get_debounce_max_threshold(broker, message)
+        owned_keys: list[str] = []
+        max_threshold_keys: list[str] = []
+        for debounce_key, debounce_data in zip(debounce_keys, debounce_datas):
+            if not debounce_data:
+                owned_keys.append(debounce_key)
+            elif int(debounce_data.get(b"executed", 0)):
+                continue
+            elif debounce_data[b"message_id"].decode("utf-8") == message.message_id:
+                owned_keys.append(debounce_key)
+            elif (
+                int(debounce_data[b"enqueue_timestamp"]) + max_threshold
+                < now_timestamp()
+            ):
+                owned_keys.append(debounce_key)
+                max_threshold_keys.append(debounce_key)
+
+        if not owned_keys:
+            log.info(
+                "All debounce keys owned by other messages, skipping",
+                debounce_keys_count=len(debounce_keys),
+            )
+            self._skip_debounced(message)
+
+        message.options["debounce_owned_keys"] = owned_keys
+        message.options["debounce_max_threshold_keys"] = max_threshold_keys
+
+    def _after_process_debounce_keys(
+        self, message: dramatiq.MessageProxy, exception: BaseException | None
+    ) -> None:
+        owned_keys: list[str] = message.options.pop("debounce_owned_keys", [])
+        max_threshold_keys: list[str] = message.options.pop(
+            "debounce_max_threshold_keys", []
+        )
+
+        # Keys may have been enqueued again while processing, e.g. by the
+        # message itself: only mark as executed the ones it still owns.
+        with self._redis.pipeline(transaction=False) as pipe:
+            for debounce_key in owned_keys:
+                pipe.hget(debounce_key, "message_id")
+            owners: list[bytes | None] = pipe.execute()
+
+        with self._redis.pipeline(transaction=True) as pipe:
+            for debounce_key, owner in zip(owned_keys, owners):
+                if debounce_key in max_threshold_keys:
+                    pipe.hset(debounce_key, "enqueue_timestamp", now_timestamp())
+                    pipe.expire(debounce_key, DEBOUNCE_KEY_TTL)
+                elif (
+                    exception is None
+                    and owner is not None
+                    and owner.decode("utf-8") == message.message_id
+                ):
+                    pipe.hset(debounce_key, "executed", 1)
+                    pipe.hdel(debounce_key, "enqueue_timestamp")
+            pipe.execute()
+
     def after_skip_message(
         self, broker: dramatiq.Broker, message: dramatiq.MessageProxy
     ) -> None:
         message.options.pop("debounce_enqueue_timestamp", None)
         message.options.pop("debounce_max_threshold_execution", None)
+        message.options.pop("debounce_owned_keys", None)
+        message.options.pop("debounce_max_threshold_keys", None)
 
     def after_process_message(
         self,
@@ -148,6 +300,10 @@ class DebounceMiddleware(dramatiq.Middleware):
         result: Any = None,
         exception: BaseException | None = None,
     ) -> None:
+        if message.options.get("debounce_keys") is not None:
+            self._after_process_debounce_keys(message, exception)
+            return
+
         debounce_key = message.options.get("debounce_key")
         if debounce_key is None:
             return
@@ -194,4 +350,26 @@ class DebounceMiddleware(dramatiq.Middleware):
         raise dramatiq.middleware.SkipMessage()
 
 
-__all__ = ["DebounceMiddleware", "set_debounce_key"]
+def get_debounced_keys(
+    message: dramatiq.Message[Any] | dramatiq.MessageProxy,
+) -> list[str] | None:
+    """
+    Get the debounce keys, without prefix, owned by a message debounced per item,
+    or `None` if the message isn't debounced per item.
+    """
+    if message.options.get("debounce_keys") is None:
+        return None
+    return [
+        key.removeprefix(DEBOUNCE_KEY_PREFIX)
+        for key in message.options.get("debounce_owned_keys", [])
+    ]
+
+
+__all__ = [
+    "DebounceMiddleware",
+    "get_debounce_key",
+    "get_debounce_keys",
+    "get_debounced_keys",
+    "set_debounce_key",
+    "set_debounce_keys",
+]
@@ -0,0 +1,28 @@
+import dramatiq
+import structlog
+from dramatiq.asyncio import get_event_loop_thread
+
+from polar.email.react import close_email_renderer_pool
+from polar.logging import Logger
+
+log: Logger = structlog.get_logger()
+
+
+async def _close_pool() -> None:
+    await close_email_renderer_pool()
+    log.info("Closed email renderer pool")
+
+
+class EmailRendererMiddleware(dramatiq.Middleware):
+    """
+    Middleware stopping the persistent email renderer processes on shutdown.
+
+    The pool is lazily started by the first email rendered by a task.
+    """
+
+    def after_worker_shutdown(
+        self, broker: dramatiq.Broker, worker: dramatiq.Worker
+    ) -> None:
+        event_loop_thread = get_event_loop_thread()
+        assert event_loop_thread is not None
+        event_loop_thread.run_coroutine(_close_pool())
@@ -5,16 +5,22 @@ import time
 import uuid
 from collections import defaultdict
 from collections.abc import AsyncIterator, Callable, Iterable, Mapping
-from typing import Any, Self
+from typing import TYPE_CHECKING, Any, Self
 
 import dramatiq
+import redis.asyncio
 import structlog
 from dramatiq.common import dq_name
 
 from polar.logging import Logger
 from polar.redis import Redis
 
-from ._debounce import set_debounce_key
+from ._debounce import get_debounce_key, get_debounce_keys, set_debounce_keys
+
+if TYPE_CHECKING:
+    RedisPipeline = redis.asyncio.client.Pipeline[str]
+else:
+    RedisPipeline = redis.asyncio.client.Pipeline
 
 log: Logger = structlog.get_logger()
 
@@ -75,6 +81,7 @@ class JobQueueManager:
 
         queue_messages = defaultdict[str, list[tuple[str, Any]]](list)
         all_messages: list[tuple[str, Any]] = []
+        debounce_keys: list[tuple[str, str]] = []
 
         for actor_name, args, kwargs, delay in self._enqueued_jobs:
             fn: dramatiq.Actor[Any, Any] = broker.get_actor(actor_name)
@@ -87,13 +94,20 @@ class JobQueueManager:
                 redis_message_id=redis_message_id,
             )
 
-            # Set debounce key if any
-            debounce = await set_debounce_key(
-                redis, fn, message.message_id, args, kwargs
-            )
+            # Compute debounce key(s) if any, registered in bulk below
+            debounce_delay: int | None = None
+            debounce = get_debounce_key(fn, args, kwargs)
             if debounce is not None:
                 key, debounce_delay = debounce
+                debounce_keys.append((key, message.message_id))
                 message = message.copy(options={**message.options, "debounce_key": key})
+            elif (item_debounce := get_debounce_keys(fn, args, kwargs)) is not None:
+                keys, debounce_delay = item_debounce
+                debounce_keys.extend((key, message.message_id) for key in keys)
+                message = message.copy(
+                    options={**message.options, "debounce_keys": keys}
+                )
+            if debounce_delay is not None:
                 if delay is not None:
                     delay = max(delay, debounce_delay)
                 else:
@@ -113,14 +127,19 @@ class JobQueueManager:
             queue_messages[message.queue_name].append(
                 (redis_message_id, encoded_message)
             )
-            all_messages.append((fn.actor_name, message.encode()))
+            all_messages.append((fn.actor_name, encoded_message))
 
-        for queue_name, messages in queue_messages.items():
-            for batch in itertools.batched(messages, FLUSH_BATCH_SIZE):
-                await self._batch_hset_messages(redis, queue_name, batch)
-                await self._batch_rpush_queue(
-                    redis, queue_name, (message_id for message_id, _ in batch)
-                )
+        # Debounce keys must be registered before the messages can be consumed
+        await set_debounce_keys(redis, debounce_keys)
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for queue_name, messages in queue_messages.items():
+                for batch in itertools.batched(messages, FLUSH_BATCH_SIZE):
+                    await self._batch_hset_messages(pipe, queue_name, batch)
+                    await self._batch_rpush_queue(
+                        pipe, queue_name, (message_id for message_id, _ in batch)
+                    )
+            await pipe.execute()
 
         for actor_name, encoded_message in all_messages:
             log.debug(
@@ -131,13 +150,13 @@ class JobQueueManager:
 
     async def _batch_hset_messages(
         self,
-        redis: Redis,
+        pipe: RedisPipeline,
         queue_name: str,
         message_batch: Iterable[tuple[str, Any]],
     ) -> None:
         """Batch hset operations for message storage."""
         hash_key = f"dramatiq:{queue_name}.msgs"
-        await redis.hset(
+        await pipe.hset(
             hash_key,
             mapping={
                 message_id: encoded_message
@@ -146,11 +165,11 @@ class JobQueueManager:
         )
 
     async def _batch_rpush_queue(
-        self, redis: Redis, queue_name: str, message_ids: Iterable[str]
+        self, pipe: RedisPipeline, queue_name: str, message_ids: Iterable[str]
     ) -> None:
         """Batch rpush operations for queue entries."""
         queue_key = f"dramatiq:{queue_name}"
-        await redis.rpush(queue_key, *message_ids)
+        await pipe.rpush(queue_key, *message_ids)
 
     def reset(self) -> None:
         self._enqueued_jobs = []
@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.auth.middlewares import (
+    get_access_token_auth_subject,
+    get_access_token_kind,
+)
+from polar.auth.token_cache import TokenKind
+from polar.config import settings
+from polar.kit.crypto import get_token_hash
+from polar.kit.utils import utc_now
+from polar.models import Organization, OrganizationAccessToken
+from polar.oauth2.exceptions import InvalidTokenError
+from polar.postgres import AsyncSession
+from tests.fixtures.database import SaveFixture
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("spaire_oat_123", TokenKind.organization_access_token),
+        ("spaire_at_u_123", TokenKind.oauth2_token),
+        ("spaire_at_o_123", TokenKind.oauth2_token),
+        ("spaire_pat_123", TokenKind.personal_access_token),
+        ("legacy_token_123", None),
+    ],
+)
+def test_get_access_token_kind(value: str, expected: TokenKind | None) -> None:
+    assert get_access_token_kind(value) == expected
+
+
+@pytest.mark.asyncio
+class TestGetAccessTokenAuthSubject:
+    async def test_prefixed_token_single_lookup(
+        self,
+        mocker: MockerFixture,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        organization: Organization,
+    ) -> None:
+        organization_access_token = OrganizationAccessToken(
+            comment="Test",
+            token=get_token_hash("spaire_oat_123", secret=settings.SECRET),
+            organization=organization,
+            expires_at=utc_now() + timedelta(days=1),
+            scope="openid",
+        )
+        await save_fixture(organization_access_token)
+
+        get_oauth2_token_mock = mocker.patch(
+            "polar.auth.middlewares.get_oauth2_token", autospec=True
+        )
+
+        auth_subject = await get_access_token_auth_subject(session, "spaire_oat_123")
+
+        assert auth_subject.session == organization_access_token
+        get_oauth2_token_mock.assert_not_called()
+
+    async def test_prefixed_token_not_found(
+        self, mocker: MockerFixture, session: AsyncSession
+    ) -> None:
+        get_organization_access_token_mock = mocker.patch(
+            "polar.auth.middlewares.get_organization_access_token", autospec=True
+        )
+        get_oauth2_token_mock = mocker.patch(
+            "polar.auth.middlewares.get_oauth2_token", autospec=True
+        )
+
+        with pytest.raises(InvalidTokenError):
+            await get_access_token_auth_subject(session, "spaire_pat_123")
+
+        get_organization_access_token_mock.assert_not_called()
+        get_oauth2_token_mock.assert_not_called()
+
+    async def test_legacy_token(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        organization: Organization,
+    ) -> None:
+        organization_access_token = OrganizationAccessToken(
+            comment="Test",
+            token=get_token_hash("legacy_token_123", secret=settings.SECRET),
+            organization=organization,
+            expires_at=utc_now() + timedelta(days=1),
+            scope="openid",
+        )
+        await save_fixture(organization_access_token)
+
+        auth_subject = await get_access_token_auth_subject(session, "legacy_token_123")
+
+        assert auth_subject.session == organization_access_token
+
+    async def test_legacy_token_not_found(self, session: AsyncSession) -> None:
+        with pytest.raises(InvalidTokenError):
+            await get_access_token_auth_subject(session, "legacy_unknown")
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.auth import token_cache
+from polar.auth.token_cache import TokenKind
+from polar.config import settings
+from polar.kit.crypto import get_token_hash
+from polar.kit.utils import utc_now
+from polar.models import Organization, OrganizationAccessToken
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+from tests.fixtures.database import SaveFixture
+
+TOKEN = "legacy_token_123"
+
+
+async def _create_organization_access_token(
+    save_fixture: SaveFixture, organization: Organization
+) -> OrganizationAccessToken:
+    organization_access_token = OrganizationAccessToken(
+        comment="Test",
+        token=get_token_hash(TOKEN, secret=settings.SECRET),
+        organization=organization,
+        expires_at=utc_now() + timedelta(days=1),
+        scope="openid",
+    )
+    await save_fixture(organization_access_token)
+    return organization_access_token
+
+
+@pytest.mark.asyncio
+class TestRecordUsage:
+    async def test_coalesced_and_flushed(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        redis: Redis,
+        organization: Organization,
+    ) -> None:
+        organization_access_token = await _create_organization_access_token(
+            save_fixture, organization
+        )
+        assert organization_access_token.last_used_at is None
+
+        await token_cache.record_usage(
+            TokenKind.organization_access_token, organization_access_token.id
+        )
+        await token_cache.record_usage(
+            TokenKind.organization_access_token, organization_access_token.id
+        )
+        usages = await redis.hgetall(
+            f"auth:token_usage:{TokenKind.organization_access_token}"
+        )
+        assert len(usages) == 1
+
+        count = await token_cache.flush_usage(session, redis)
+        assert count == 1
+
+        await session.refresh(organization_access_token)
+        assert organization_access_token.last_used_at is not None
+        assert await token_cache.flush_usage(session, redis) == 0
+
+    async def test_flush_failure_keeps_usages(
+        self,
+        mocker: MockerFixture,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        redis: Redis,
+        organization: Organization,
+    ) -> None:
+        organization_access_token = await _create_organization_access_token(
+            save_fixture, organization
+        )
+        await token_cache.record_usage(
+            TokenKind.organization_access_token, organization_access_token.id
+        )
+
+        mocker.patch.object(session, "commit", side_effect=Exception("DB error"))
+        with pytest.raises(Exception, match="DB error"):
+            await token_cache.flush_usage(session, redis)
+
+        usages = await redis.hgetall(
+            f"auth:token_usage:{TokenKind.organization_access_token}"
+        )
+        assert list(usages) == [str(organization_access_token.id)]
@@ -6,7 +6,11 @@ from pytest_mock import MockerFixture
 
 from polar.benefit.grant.repository import BenefitGrantRepository
 from polar.benefit.grant.service import benefit_grant as benefit_grant_service
-from polar.benefit.strategies import BenefitActionRequiredError, BenefitServiceProtocol
+from polar.benefit.strategies import (
+    BenefitActionRequiredError,
+    BenefitRetriableError,
+    BenefitServiceProtocol,
+)
 from polar.models import (
     Benefit,
     BenefitGrant,
@@ -19,6 +23,7 @@ from polar.models import (
 from polar.models.member import MemberRole
 from polar.postgres import AsyncSession
 from polar.redis import Redis
+from polar.worker import JobQueueManager
 from tests.fixtures.database import SaveFixture
 from tests.fixtures.random_objects import (
     create_benefit_grant,
@@ -652,44 +657,133 @@ class TestEnqueueBenefitGrantUpdates:
         )
 
         enqueue_job_mock.assert_called_once_with(
-            "benefit.update",
-            benefit_grant_id=granted_grant.id,
+            "benefit.update_grants", benefit_id=benefit_organization.id
         )
 
-    async def test_required_update_revoked(
+
+@pytest.mark.asyncio
+class TestUpdateBenefitGrants:
+    async def test_chunks(
         self,
         mocker: MockerFixture,
         session: AsyncSession,
         redis: Redis,
         save_fixture: SaveFixture,
-        subscription: Subscription,
-        customer: Customer,
+        organization: Organization,
         benefit_organization: Benefit,
         benefit_organization_second: Benefit,
         benefit_strategy_mock: MagicMock,
     ) -> None:
-        revoked_grant = BenefitGrant(
-            subscription=subscription, customer=customer, benefit=benefit_organization
+        grants: list[BenefitGrant] = []
+        for i in range(3):
+            customer = await create_customer(
+                save_fixture,
+                organization=organization,
+                email=f"customer{i}@example.com",
+                stripe_customer_id=f"STRIPE_CUSTOMER_ID_{i}",
+            )
+            grants.append(
+                await create_benefit_grant(
+                    save_fixture, customer, benefit_organization, granted=True
+                )
+            )
+            await create_benefit_grant(
+                save_fixture, customer, benefit_organization, granted=False
+            )
+            await create_benefit_grant(
+                save_fixture, customer, benefit_organization_second, granted=True
+            )
+        grant_ids = sorted(grant.id for grant in grants)
+
+        enqueue_job_mock = mocker.patch("polar.benefit.grant.service.enqueue_job")
+        get_benefit_strategy_mock = mocker.patch(
+            "polar.benefit.grant.service.get_benefit_strategy",
+            return_value=benefit_strategy_mock,
         )
-        revoked_grant.set_revoked()
-        await save_fixture(revoked_grant)
 
-        other_benefit_grant = BenefitGrant(
-            subscription=subscription,
-            customer=customer,
-            benefit=benefit_organization_second,
+        first_chunk = await benefit_grant_service.update_benefit_grants(
+            session, redis, benefit_organization, limit=2
         )
-        other_benefit_grant.set_granted()
-        await save_fixture(other_benefit_grant)
+        assert first_chunk == grant_ids[:2]
 
+        second_chunk = await benefit_grant_service.update_benefit_grants(
+            session, redis, benefit_organization, after=first_chunk[-1], limit=2
+        )
+        assert second_chunk == grant_ids[2:]
+
+        assert benefit_strategy_mock.grant.call_count == 3
+        assert get_benefit_strategy_mock.call_count == 2
+        assert not any(
+            c.args[0] == "benefit.update" for c in enqueue_job_mock.call_args_list
+        )
+
+    async def test_isolated_failures(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        organization: Organization,
+        benefit_organization: Benefit,
+        benefit_strategy_mock: MagicMock,
+    ) -> None:
+        grants: list[BenefitGrant] = []
+        for i in range(3):
+            customer = await create_customer(
+                save_fixture,
+                organization=organization,
+                email=f"customer{i}@example.com",
+                stripe_customer_id=f"STRIPE_CUSTOMER_ID_{i}",
+            )
+            grants.append(
+                await create_benefit_grant(
+                    save_fixture,
+                    customer,
+                    benefit_organization,
+                    granted=True,
+                    properties={"external_id": "abc"},
+                )
+            )
+        first_id, retriable_id, failing_id = sorted(grant.id for grant in grants)
+        customer_grants = {grant.customer_id: grant.id for grant in grants}
+
+        async def _grant(
+            benefit: Benefit, customer: Customer, properties: Any, **kwargs: Any
+        ) -> Any:
+            grant_id = customer_grants[customer.id]
+            if grant_id == retriable_id:
+                raise BenefitRetriableError(10)
+            if grant_id == failing_id:
+                raise RuntimeError("Unexpected error")
+            return {"external_id": "xyz"}
+
+        benefit_strategy_mock.grant.side_effect = _grant
         enqueue_job_mock = mocker.patch("polar.benefit.grant.service.enqueue_job")
-        benefit_strategy_mock.requires_update.return_value = True
+        commit_spy = mocker.spy(session, "commit")
+        flush_spy = mocker.spy(JobQueueManager, "flush")
 
-        await benefit_grant_service.enqueue_benefit_grant_updates(
-            session, redis, benefit_organization, {}
+        grant_ids = await benefit_grant_service.update_benefit_grants(
+            session, redis, benefit_organization, limit=10
         )
+        assert grant_ids == [first_id, retriable_id, failing_id]
 
-        enqueue_job_mock.assert_not_called()
+        # Each grant is committed and its jobs enqueued on its own
+        assert commit_spy.call_count == 3
+        assert flush_spy.call_count == 3
+
+        enqueue_job_mock.assert_any_call(
+            "benefit.update", benefit_grant_id=retriable_id, delay=10_000
+        )
+        enqueue_job_mock.assert_any_call("benefit.update", benefit_grant_id=failing_id)
+        assert not any(
+            c.kwargs.get("benefit_grant_id") == first_id
+            for c in enqueue_job_mock.call_args_list
+        )
+
+        repository = BenefitGrantRepository.from_session(session)
+        updated_grant = await repository.get_by_id(first_id)
+        assert updated_grant is not None
+        assert cast(Any, updated_grant.properties) == {"external_id": "xyz"}
 
 
 @pytest.mark.asyncio
@@ -16,6 +16,7 @@ from polar.benefit.tasks import (  # type: ignore[attr-defined]
     benefit_grant_service,
     benefit_revoke,
     benefit_update,
+    benefit_update_grants,
 )
 from polar.models import Benefit, BenefitGrant, Customer, Subscription
 from polar.postgres import AsyncSession
@@ -258,6 +259,55 @@ class TestBenefitUpdate:
             await benefit_update(grant.id)
 
 
+@pytest.mark.asyncio
+class TestBenefitUpdateGrants:
+    async def test_not_existing_benefit(self, session: AsyncSession) -> None:
+        # then
+        session.expunge_all()
+
+        with pytest.raises(BenefitDoesNotExist):
+            await benefit_update_grants(uuid.uuid4())
+
+    @pytest.mark.parametrize(
+        ("grant_count", "expect_next_chunk"), [(2, True), (1, False), (0, False)]
+    )
+    async def test_chunk(
+        self,
+        grant_count: int,
+        expect_next_chunk: bool,
+        session: AsyncSession,
+        mocker: MockerFixture,
+        benefit_organization: Benefit,
+    ) -> None:
+        mocker.patch("polar.benefit.tasks.settings.BENEFIT_GRANT_UPDATE_CHUNK_SIZE", 2)
+        grant_ids = [uuid.uuid4() for _ in range(grant_count)]
+        update_benefit_grants_mock = mocker.patch.object(
+            benefit_grant_service,
+            "update_benefit_grants",
+            spec=BenefitGrantService.update_benefit_grants,
+            return_value=grant_ids,
+        )
+        enqueue_job_mock = mocker.patch("polar.benefit.tasks.enqueue_job")
+        after = uuid.uuid4()
+
+        # then
+        session.expunge_all()
+
+        await benefit_update_grants(benefit_organization.id, after)
+
+        update_benefit_grants_mock.assert_called_once()
+        assert update_benefit_grants_mock.call_args.kwargs["after"] == after
+        assert update_benefit_grants_mock.call_args.kwargs["limit"] == 2
+        if expect_next_chunk:
+            enqueue_job_mock.assert_called_once_with(
+                "benefit.update_grants",
+                benefit_id=benefit_organization.id,
+                after=grant_ids[-1],
+            )
+        else:
+            enqueue_job_mock.assert_not_called()
+
+
 @pytest.mark.asyncio
 class TestBenefitDelete:
     async def test_soft_deleted_benefit(
@@ -3061,6 +3061,28 @@ class TestUpdate:
         assert checkout.customer_billing_address is not None
         assert checkout.customer_billing_address.country == "FR"
 
+    async def test_cached_calculate_tax(
+        self,
+        session: AsyncSession,
+        calculate_tax_mock: AsyncMock,
+        checkout_one_time_fixed: Checkout,
+    ) -> None:
+        for update in [
+            CheckoutUpdate(
+                customer_billing_address=AddressInput.model_validate({"country": "FR"})
+            ),
+            CheckoutUpdate(customer_name="Customer Name"),
+            CheckoutUpdate(
+                customer_billing_address=AddressInput.model_validate({"country": "DE"})
+            ),
+        ]:
+            checkout = await checkout_service.update(
+                session, checkout_one_time_fixed, update
+            )
+            assert checkout.tax_amount == 0
+
+        assert calculate_tax_mock.call_count == 2
+
     async def test_ignore_email_update_if_customer_set(
         self,
         session: AsyncSession,
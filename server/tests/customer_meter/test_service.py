@@ -4,7 +4,9 @@ from decimal import Decimal
 
 import pytest
 import pytest_asyncio
+from pytest_mock import MockerFixture
 
+from polar.customer_meter.repository import CustomerMeterRepository
 from polar.customer_meter.service import customer_meter as customer_meter_service
 from polar.event.repository import EventRepository
 from polar.event.system import SystemEvent
@@ -303,6 +305,178 @@ class TestUpdateCustomerMeter:
 
         assert updated is False
 
+    async def test_existing_customer_meter_incremental(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        customer: Customer,
+        events: list[Event],
+        meter: Meter,
+    ) -> None:
+        # Units are deliberately off, to check that only new events are folded in
+        customer_meter = CustomerMeter(
+            customer=customer,
+            meter=meter,
+            last_balanced_event=events[2],
+            last_balanced_at=events[2].ingested_at + timedelta(minutes=1),
+            consumed_units=Decimal(100),
+            credited_units=5,
+            balance=Decimal(-95),
+            activated_at=utc_now(),
+        )
+        await save_fixture(customer_meter)
+
+        (
+            updated_customer_meter,
+            updated,
+        ) = await customer_meter_service.update_customer_meter(session, customer, meter)
+
+        assert updated_customer_meter is not None
+        assert customer_meter.consumed_units == Decimal(110)
+        assert customer_meter.credited_units == Decimal(15)
+        assert customer_meter.balance == Decimal(-95)
+        assert updated_customer_meter.last_balanced_event == events[-3]
+        assert updated_customer_meter.last_balanced_at is not None
+        assert updated_customer_meter.last_balanced_at > events[2].ingested_at
+
+        assert updated is True
+
+    async def test_existing_customer_meter_incremental_unsettled(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        customer: Customer,
+        events: list[Event],
+        meter: Meter,
+    ) -> None:
+        # Balanced right after its last event: events ingested before it may have
+        # been committed after the balance, so the meter is fully recomputed.
+        customer_meter = CustomerMeter(
+            customer=customer,
+            meter=meter,
+            last_balanced_event=events[2],
+            last_balanced_at=events[2].ingested_at + timedelta(seconds=1),
+            consumed_units=Decimal(100),
+            credited_units=5,
+            balance=Decimal(-95),
+            activated_at=utc_now(),
+        )
+        await save_fixture(customer_meter)
+
+        (
+            updated_customer_meter,
+            updated,
+        ) = await customer_meter_service.update_customer_meter(session, customer, meter)
+
+        assert updated_customer_meter is not None
+        assert customer_meter.consumed_units == Decimal(20)
+        assert customer_meter.credited_units == Decimal(10)
+        assert customer_meter.balance == Decimal(-10)
+
+        assert updated is True
+
+    async def test_existing_customer_meter_incremental_disabled(
+        self,
+        mocker: MockerFixture,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        customer: Customer,
+        events: list[Event],
+        meter: Meter,
+    ) -> None:
+        mocker.patch(
+            "polar.customer_meter.service.settings.CUSTOMER_METER_INCREMENTAL_BALANCE",
+            False,
+        )
+        customer_meter = CustomerMeter(
+            customer=customer,
+            meter=meter,
+            last_balanced_event=events[2],
+            consumed_units=Decimal(100),
+            credited_units=5,
+            balance=Decimal(-95),
+            activated_at=utc_now(),
+        )
+        await save_fixture(customer_meter)
+
+        (
+            updated_customer_meter,
+            updated,
+        ) = await customer_meter_service.update_customer_meter(session, customer, meter)
+
+        assert updated_customer_meter is not None
+        assert customer_meter.consumed_units == Decimal(20)
+        assert customer_meter.credited_units == Decimal(10)
+        assert customer_meter.balance == Decimal(-10)
+
+        assert updated is True
+
+    async def test_existing_customer_meter_non_summable_full_recompute(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        customer: Customer,
+        organization: Organization,
+    ) -> None:
+        max_meter = await create_meter(
+            save_fixture,
+            id=generate_uuid(),
+            name="Max Tokens",
+            filter=Filter(
+                conjunction=FilterConjunction.and_,
+                clauses=[
+                    FilterClause(
+                        property="model", operator=FilterOperator.eq, value="lite"
+                    )
+                ],
+            ),
+            aggregation=PropertyAggregation(
+                func=AggregationFunction.max, property="tokens"
+            ),
+            organization=organization,
+        )
+        timestamp = utc_now()
+        events = [
+            await create_event(
+                save_fixture,
+                timestamp=timestamp + timedelta(seconds=1),
+                organization=organization,
+                customer=customer,
+                metadata={"tokens": 30, "model": "lite"},
+            ),
+            await create_event(
+                save_fixture,
+                timestamp=timestamp + timedelta(seconds=2),
+                organization=organization,
+                customer=customer,
+                metadata={"tokens": 10, "model": "lite"},
+            ),
+        ]
+        customer_meter = CustomerMeter(
+            customer=customer,
+            meter=max_meter,
+            last_balanced_event=events[0],
+            consumed_units=Decimal(30),
+            credited_units=0,
+            balance=Decimal(-30),
+            activated_at=utc_now(),
+        )
+        await save_fixture(customer_meter)
+
+        (
+            updated_customer_meter,
+            updated,
+        ) = await customer_meter_service.update_customer_meter(
+            session, customer, max_meter
+        )
+
+        assert updated_customer_meter is not None
+        assert customer_meter.consumed_units == Decimal(30)
+        assert customer_meter.balance == Decimal(-30)
+        assert updated_customer_meter.last_balanced_event == events[-1]
+
+        assert updated is True
+
     async def test_event_reset_last(
         self,
         save_fixture: SaveFixture,
@@ -1129,6 +1303,207 @@ class TestUpdateCustomer:
         assert customer_meter.consumed_units > 0
 
 
+@pytest.mark.asyncio
+class TestUpdateCustomers:
+    async def test_no_customers(self, session: AsyncSession) -> None:
+        await customer_meter_service.update_customers(session, [])
+
+    async def test_multiple_customers(
+        self,
+        session: AsyncSession,
+        customer: Customer,
+        customer_with_external_id: Customer,
+        events: list[Event],
+        events_for_external_customer: list[Event],
+        meter: Meter,
+    ) -> None:
+        await customer_meter_service.update_customers(
+            session, [customer, customer_with_external_id]
+        )
+
+        repository = CustomerMeterRepository.from_session(session)
+
+        customer_meter = await repository.get_by_customer_and_meter(
+            customer.id, meter.id
+        )
+        assert customer_meter is not None
+        assert customer_meter.activated_at is not None
+        assert customer_meter.consumed_units == Decimal(20)
+        assert customer_meter.credited_units == 10
+        assert customer_meter.balance == Decimal(-10)
+        assert customer_meter.last_balanced_event_id == events[-3].id
+
+        external_customer_meter = await repository.get_by_customer_and_meter(
+            customer_with_external_id.id, meter.id
+        )
+        assert external_customer_meter is not None
+        assert external_customer_meter.consumed_units == Decimal(40)
+        assert external_customer_meter.credited_units == 50
+        assert external_customer_meter.balance == Decimal(10)
+        assert (
+            external_customer_meter.last_balanced_event_id
+            == events_for_external_customer[-1].id
+        )
+
+    async def test_external_customer_id_event(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        customer_with_external_id: Customer,
+        meter: Meter,
+    ) -> None:
+        event = await create_event(
+            save_fixture,
+            organization=customer_with_external_id.organization,
+            external_customer_id=customer_with_external_id.external_id,
+            metadata={"tokens": 12, "model": "lite"},
+        )
+
+        await customer_meter_service.update_customers(
+            session, [customer_with_external_id]
+        )
+
+        repository = CustomerMeterRepository.from_session(session)
+        customer_meter = await repository.get_by_customer_and_meter(
+            customer_with_external_id.id, meter.id
+        )
+        assert customer_meter is not None
+        assert customer_meter.consumed_units == Decimal(12)
+        assert customer_meter.last_balanced_event_id == event.id
+
+    async def test_not_activated_customer_meter(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        customer: Customer,
+        events: list[Event],
+        meter: Meter,
+    ) -> None:
+        customer_meter = CustomerMeter(
+            customer=customer,
+            meter=meter,
+            consumed_units=Decimal(0),
+            credited_units=0,
+            balance=Decimal(0),
+        )
+        await save_fixture(customer_meter)
+
+        await customer_meter_service.update_customers(session, [customer])
+
+        assert customer_meter.consumed_units == Decimal(0)
+        assert customer_meter.last_balanced_event_id is None
+
+    async def test_no_new_event(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        customer: Customer,
+        events: list[Event],
+        meter: Meter,
+    ) -> None:
+        customer_meter = CustomerMeter(
+            customer=customer,
+            meter=meter,
+            last_balanced_event=events[-3],
+            consumed_units=Decimal(20),
+            credited_units=10,
+            balance=Decimal(-10),
+            activated_at=utc_now(),
+        )
+        await save_fixture(customer_meter)
+
+        await customer_meter_service.update_customers(session, [customer])
+
+        assert customer_meter.consumed_units == Decimal(20)
+        assert customer_meter.last_balanced_event_id == events[-3].id
+
+    async def test_incremental(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        customer: Customer,
+        customer_with_external_id: Customer,
+        events: list[Event],
+        events_for_external_customer: list[Event],
+        meter: Meter,
+    ) -> None:
+        # Units are deliberately off, to check that only new events are folded in
+        customer_meter = CustomerMeter(
+            customer=customer,
+            meter=meter,
+            last_balanced_event=events[2],
+            last_balanced_at=events[2].ingested_at + timedelta(minutes=1),
+            consumed_units=Decimal(100),
+            credited_units=5,
+            balance=Decimal(-95),
+            activated_at=utc_now(),
+        )
+        await save_fixture(customer_meter)
+
+        locked_customer_ids = await customer_meter_service.update_customers(
+            session, [customer, customer_with_external_id]
+        )
+
+        assert locked_customer_ids == set()
+
+        assert customer_meter.consumed_units == Decimal(110)
+        assert customer_meter.credited_units == 15
+        assert customer_meter.balance == Decimal(-95)
+        assert customer_meter.last_balanced_event_id == events[-3].id
+
+        repository = CustomerMeterRepository.from_session(session)
+        external_customer_meter = await repository.get_by_customer_and_meter(
+            customer_with_external_id.id, meter.id
+        )
+        assert external_customer_meter is not None
+        assert external_customer_meter.consumed_units == Decimal(40)
+        assert external_customer_meter.credited_units == 50
+        assert external_customer_meter.balance == Decimal(10)
+
+    async def test_locked_customer_meter(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        mocker: MockerFixture,
+        customer: Customer,
+        customer_with_external_id: Customer,
+        events: list[Event],
+        events_for_external_customer: list[Event],
+        meter: Meter,
+    ) -> None:
+        customer_meter = CustomerMeter(
+            customer=customer,
+            meter=meter,
+            consumed_units=Decimal(0),
+            credited_units=0,
+            balance=Decimal(0),
+            activated_at=utc_now(),
+        )
+        await save_fixture(customer_meter)
+
+        # Simulate the customer meter being locked by another transaction
+        mocker.patch.object(
+            CustomerMeterRepository,
+            "get_all_by_customers_and_meters_for_update",
+            return_value=[],
+        )
+
+        locked_customer_ids = await customer_meter_service.update_customers(
+            session, [customer, customer_with_external_id]
+        )
+
+        assert locked_customer_ids == {customer.id}
+        assert customer_meter.consumed_units == Decimal(0)
+        assert customer_meter.last_balanced_event_id is None
+
+        repository = CustomerMeterRepository.from_session(session)
+        external_customer_meter = await repository.get_by_customer_and_meter(
+            customer_with_external_id.id, meter.id
+        )
+        assert external_customer_meter is not None
+        assert external_customer_meter.consumed_units == Decimal(40)
+
+
 @pytest.mark.asyncio
 class TestBulkEventProcessing:
     async def test_process_50k_events(
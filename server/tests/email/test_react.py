@@ -0,0 +1,91 @@
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+
+from polar.email.react import EmailRendererError, EmailRendererPool
+
+# Stand-in for the renderer binary serve mode: echoes the template and props
+FAKE_RENDERER = f"""#!{sys.executable}
+import json
+import os
+import sys
+import time
+
+for line in sys.stdin:
+    request = json.loads(line)
+    template = request["template"]
+    if template == "error":
+        response = {{"id": request["id"], "error": "Unknown template"}}
+    else:
+        if template == "slow":
+            time.sleep(5)
+        html = f"<p>{{template}} {{request['props']['name']}} {{os.getpid()}}</p>"
+        response = {{"id": request["id"], "html": html}}
+    sys.stdout.write(json.dumps(response) + "\\n")
+    sys.stdout.flush()
+"""
+
+
+@pytest.fixture
+def binary_path(tmp_path: Path) -> Path:
+    path = tmp_path / "react-email"
+    path.write_text(FAKE_RENDERER)
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return path
+
+
+def _get_pid(html: str) -> str:
+    return html.removesuffix("</p>").rsplit(" ", 1)[1]
+
+
+@pytest.mark.asyncio
+class TestEmailRendererPool:
+    async def test_render(self, binary_path: Path) -> None:
+        pool = EmailRendererPool(binary_path=binary_path, size=2)
+        try:
+            html = await pool.render("welcome", '{"name": "Alice"}')
+            assert html.startswith("<p>welcome Alice ")
+        finally:
+            await pool.close()
+
+    async def test_render_error(self, binary_path: Path) -> None:
+        pool = EmailRendererPool(binary_path=binary_path, size=1)
+        try:
+            with pytest.raises(EmailRendererError, match="Unknown template"):
+                await pool.render("error", '{"name": "Alice"}')
+            # The process is still usable
+            assert await pool.render("welcome", '{"name": "Bob"}')
+        finally:
+            await pool.close()
+
+    async def test_timeout_restarts_process(self, binary_path: Path) -> None:
+        pool = EmailRendererPool(
+            binary_path=binary_path, size=1, concurrency_per_process=1, timeout=0.5
+        )
+        try:
+            first_pid = _get_pid(await pool.render("welcome", '{"name": "Alice"}'))
+            with pytest.raises(EmailRendererError, match="timed out"):
+                await pool.render("slow", '{"name": "Alice"}')
+            second_pid = _get_pid(await pool.render("welcome", '{"name": "Alice"}'))
+            assert first_pid != second_pid
+        finally:
+            await pool.close()
+
+    async def test_recycle_process(self, binary_path: Path) -> None:
+        pool = EmailRendererPool(
+            binary_path=binary_path,
+            size=1,
+            concurrency_per_process=1,
+            max_renders_per_process=2,
+        )
+        try:
+            pids = [
+                _get_pid(await pool.render("welcome", '{"name": "Alice"}'))
+                for _ in range(3)
+            ]
+            assert pids[0] == pids[1]
+            assert pids[1] != pids[2]
+        finally:
+            await pool.close()
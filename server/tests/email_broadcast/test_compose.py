@@ -7,6 +7,8 @@ light dark`) that invites the mail client's own dark-mode recolouring. The
 lock is enforced at send time so those keep working without a re-save.
 """
 
+import pytest
+
 from polar.email.compose import (
     finalize_email_html,
     force_light_color_scheme,
@@ -41,8 +43,8 @@ CURRENT_DOC = """<!DOCTYPE html>
 </head><body>ok</body></html>"""
 
 
-def finalize(html: str) -> str:
-    return finalize_email_html(
+async def finalize(html: str) -> str:
+    return await finalize_email_html(
         html,
         unsubscribe_url="https://unsub.example",
         organization_name="Org",
@@ -80,17 +82,18 @@ class TestForceLightColorScheme:
         assert "body{margin:0}" in out
 
 
+@pytest.mark.asyncio
 class TestFinalizeEmailHtml:
-    def test_full_document_is_locked_and_unsubscribe_filled(self) -> None:
-        out = finalize(STALE_DOC)
+    async def test_full_document_is_locked_and_unsubscribe_filled(self) -> None:
+        out = await finalize(STALE_DOC)
         assert is_full_html_document(out)
         assert "https://unsub.example" in out
         assert "{{unsubscribe_url}}" not in out
         assert 'content="light dark"' not in out
         assert "color-scheme:only light" in out
 
-    def test_fragment_still_gets_wrapped(self) -> None:
-        out = finalize("<h2>Hi</h2><p>fragment body</p>")
+    async def test_fragment_still_gets_wrapped(self) -> None:
+        out = await finalize("<h2>Hi</h2><p>fragment body</p>")
         # Wrapped in the marketing template → a full document around the
         # fragment, with the unsubscribe link included by the wrapper.
         assert is_full_html_document(out)
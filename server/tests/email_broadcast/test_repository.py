@@ -0,0 +1,128 @@
+from collections import Counter
+from uuid import UUID
+
+import pytest
+from sqlalchemy import Select, select
+
+from polar.email_broadcast.repository import EmailBroadcastRepository
+from polar.models import Organization
+from polar.models.email_broadcast import EmailBroadcast, EmailBroadcastStatus
+from polar.models.email_broadcast_send import (
+    EmailBroadcastSend,
+    EmailBroadcastSendStatus,
+)
+from polar.models.email_subscriber import EmailSubscriber, EmailSubscriberStatus
+from polar.postgres import AsyncSession
+from tests.fixtures.database import SaveFixture
+
+
+async def _create_audience(
+    save_fixture: SaveFixture, organization: Organization, count: int
+) -> EmailBroadcast:
+    broadcast = EmailBroadcast(
+        organization_id=organization.id,
+        subject="Hello",
+        sender_name="Sender",
+        status=EmailBroadcastStatus.draft,
+    )
+    await save_fixture(broadcast)
+    for i in range(count):
+        await save_fixture(
+            EmailSubscriber(
+                organization_id=organization.id,
+                email=f"subscriber{i}@example.com",
+                status=EmailSubscriberStatus.active,
+            )
+        )
+    # Not part of the audience
+    await save_fixture(
+        EmailSubscriber(
+            organization_id=organization.id,
+            email="unsubscribed@example.com",
+            status=EmailSubscriberStatus.unsubscribed,
+        )
+    )
+    return broadcast
+
+
+def _active_audience(organization: Organization) -> Select[tuple[UUID]]:
+    return select(EmailSubscriber.id).where(
+        EmailSubscriber.organization_id == organization.id,
+        EmailSubscriber.status == EmailSubscriberStatus.active,
+    )
+
+
+async def _get_sends(
+    session: AsyncSession, broadcast: EmailBroadcast
+) -> list[EmailBroadcastSend]:
+    result = await session.execute(
+        select(EmailBroadcastSend).where(
+            EmailBroadcastSend.broadcast_id == broadcast.id
+        )
+    )
+    return list(result.scalars().all())
+
+
+@pytest.mark.asyncio
+class TestCreateSendsFromAudience:
+    async def test_basic(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        organization: Organization,
+    ) -> None:
+        broadcast = await _create_audience(save_fixture, organization, 5)
+        repository = EmailBroadcastRepository.from_session(session)
+
+        count = await repository.create_sends_from_audience(
+            broadcast.id, _active_audience(organization)
+        )
+
+        assert count == 5
+        sends = await _get_sends(session, broadcast)
+        assert len(sends) == 5
+        assert all(send.status == EmailBroadcastSendStatus.pending for send in sends)
+        assert all(send.variant is None for send in sends)
+
+        # Materializing again doesn't duplicate rows
+        count = await repository.create_sends_from_audience(
+            broadcast.id, _active_audience(organization)
+        )
+        assert count == 5
+
+    async def test_ab_slice(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        organization: Organization,
+    ) -> None:
+        broadcast = await _create_audience(save_fixture, organization, 10)
+        repository = EmailBroadcastRepository.from_session(session)
+
+        count = await repository.create_sends_from_audience(
+            broadcast.id, _active_audience(organization), ab_slice_pct=40
+        )
+
+        assert count == 10
+        variants = Counter(
+            send.variant for send in await _get_sends(session, broadcast)
+        )
+        assert variants == {"a": 2, "b": 2, None: 6}
+
+    async def test_ab_slice_minimum(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        organization: Organization,
+    ) -> None:
+        broadcast = await _create_audience(save_fixture, organization, 3)
+        repository = EmailBroadcastRepository.from_session(session)
+
+        await repository.create_sends_from_audience(
+            broadcast.id, _active_audience(organization), ab_slice_pct=1
+        )
+
+        variants = Counter(
+            send.variant for send in await _get_sends(session, broadcast)
+        )
+        assert variants == {"a": 1, "b": 1, None: 1}
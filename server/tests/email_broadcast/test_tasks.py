@@ -0,0 +1,127 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.email_broadcast.tasks import send_emails
+from polar.email_sequence.custom_fields import set_field
+from polar.models import Organization
+from polar.models.email_broadcast import EmailBroadcast, EmailBroadcastStatus
+from polar.models.email_broadcast_send import (
+    EmailBroadcastSend,
+    EmailBroadcastSendStatus,
+)
+from polar.models.email_subscriber import EmailSubscriber
+from polar.postgres import AsyncSession
+from tests.fixtures.database import SaveFixture
+
+
+async def _create_broadcast(
+    save_fixture: SaveFixture, organization: Organization, recipients: int
+) -> tuple[EmailBroadcast, list[EmailBroadcastSend]]:
+    broadcast = EmailBroadcast(
+        organization_id=organization.id,
+        subject="Hello {{custom.plan}}",
+        sender_name="Sender",
+        content_html="<p>Hello</p>",
+        status=EmailBroadcastStatus.sending,
+        total_recipients=recipients,
+    )
+    await save_fixture(broadcast)
+    sends: list[EmailBroadcastSend] = []
+    for i in range(recipients):
+        subscriber = EmailSubscriber(
+            organization_id=organization.id, email=f"subscriber{i}@example.com"
+        )
+        await save_fixture(subscriber)
+        send = EmailBroadcastSend(
+            broadcast_id=broadcast.id,
+            subscriber_id=subscriber.id,
+            status=EmailBroadcastSendStatus.pending,
+        )
+        await save_fixture(send)
+        sends.append(send)
+    return broadcast, sends
+
+
+@pytest.mark.asyncio
+class TestSendEmails:
+    async def test_chunked(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        organization: Organization,
+    ) -> None:
+        mocker.patch("polar.email_broadcast.tasks.SEND_CHUNK_SIZE", 2)
+        email_sender_mock = mocker.patch(
+            "polar.email_broadcast.tasks.email_sender.send", return_value="re_123"
+        )
+        broadcast, sends = await _create_broadcast(save_fixture, organization, 5)
+        await set_field(session, sends[0].subscriber_id, "plan", "pro")
+        commit_spy = mocker.spy(session, "commit")
+
+        await send_emails(broadcast.id)
+
+        assert email_sender_mock.call_count == 5
+        subjects = {
+            call.kwargs["to_email_addr"]: call.kwargs["subject"]
+            for call in email_sender_mock.call_args_list
+        }
+        assert subjects["subscriber0@example.com"] == "Hello pro"
+        # One commit per chunk
+        assert commit_spy.call_count == 3
+
+        for send in sends:
+            await session.refresh(send)
+            assert send.status == EmailBroadcastSendStatus.sent
+            assert send.resend_email_id == "re_123"
+        await session.refresh(broadcast)
+        assert broadcast.status == EmailBroadcastStatus.sent
+
+    async def test_send_failure(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        organization: Organization,
+    ) -> None:
+        mocker.patch(
+            "polar.email_broadcast.tasks.email_sender.send",
+            side_effect=[Exception("Resend error"), "re_123"],
+        )
+        broadcast, sends = await _create_broadcast(save_fixture, organization, 2)
+
+        await send_emails(broadcast.id)
+
+        statuses = set()
+        for send in sends:
+            await session.refresh(send)
+            statuses.add(send.status)
+        assert statuses == {
+            EmailBroadcastSendStatus.failed,
+            EmailBroadcastSendStatus.sent,
+        }
+        await session.refresh(broadcast)
+        assert broadcast.status == EmailBroadcastStatus.sent
+
+    async def test_rendered_through_renderer_pool(
+        self,
+        mocker: MockerFixture,
+        save_fixture: SaveFixture,
+        organization: Organization,
+    ) -> None:
+        render_sync_mock = mocker.patch("polar.email.react.render_email_template")
+        render_mock = mocker.patch(
+            "polar.email.compose.render_email_template_async",
+            return_value="<html>Wrapped</html>",
+        )
+        email_sender_mock = mocker.patch(
+            "polar.email_broadcast.tasks.email_sender.send", return_value="re_123"
+        )
+        broadcast, _ = await _create_broadcast(save_fixture, organization, 2)
+
+        await send_emails(broadcast.id)
+
+        assert render_mock.await_count == 2
+        render_sync_mock.assert_not_called()
+        for call in email_sender_mock.call_args_list:
+            assert call.kwargs["html_content"] == "<html>Wrapped</html>"
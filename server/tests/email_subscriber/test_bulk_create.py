@@ -0,0 +1,96 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.email_subscriber.repository import EmailSubscriberRepository
+from polar.email_subscriber.service import email_subscriber as email_subscriber_service
+from polar.models import Organization
+from polar.models.email_subscriber import (
+    EmailSubscriber,
+    EmailSubscriberSource,
+    EmailSubscriberStatus,
+)
+from polar.postgres import AsyncSession
+from tests.fixtures.database import SaveFixture
+
+
+@pytest.fixture(autouse=True)
+def require_under_limit_mock(mocker: MockerFixture) -> None:
+    mocker.patch(
+        "polar.email_subscriber.service.entitlements_service.require_under_limit"
+    )
+
+
+@pytest.mark.asyncio
+class TestBulkCreate:
+    async def test_classification(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        organization: Organization,
+    ) -> None:
+        active = EmailSubscriber(
+            organization_id=organization.id,
+            email="active@example.com",
+            name="Active",
+            status=EmailSubscriberStatus.active,
+        )
+        unsubscribed = EmailSubscriber(
+            organization_id=organization.id,
+            email="unsubscribed@example.com",
+            status=EmailSubscriberStatus.unsubscribed,
+        )
+        nameless = EmailSubscriber(
+            organization_id=organization.id,
+            email="nameless@example.com",
+            status=EmailSubscriberStatus.active,
+        )
+        for subscriber in (active, unsubscribed, nameless):
+            await save_fixture(subscriber)
+
+        rows = iter(
+            [
+                ("New@Example.com", "New"),
+                ("new@example.com", None),
+                ("not-an-email", None),
+                ("active@example.com", "Other"),
+                ("unsubscribed@example.com", None),
+                ("nameless@example.com", "Backfilled"),
+            ]
+        )
+        counts = await email_subscriber_service.bulk_create(
+            session,
+            organization_id=organization.id,
+            rows=rows,
+            import_source="test.csv",
+        )
+
+        assert counts == {"created": 1, "updated": 2, "skipped": 3}
+
+        repository = EmailSubscriberRepository.from_session(session)
+        matches = await repository.get_import_matches(
+            ["new@example.com"], organization.id
+        )
+        new = await session.get(EmailSubscriber, matches["new@example.com"].id)
+        assert new is not None
+        assert new.name == "New"
+        assert new.status == EmailSubscriberStatus.active
+        assert new.source == EmailSubscriberSource.import_
+        assert new.import_source == "test.csv"
+
+        await session.refresh(unsubscribed)
+        assert unsubscribed.status == EmailSubscriberStatus.active
+        assert unsubscribed.unsubscribed_at is None
+
+        await session.refresh(nameless)
+        assert nameless.name == "Backfilled"
+
+        await session.refresh(active)
+        assert active.name == "Active"
+
+    async def test_empty(
+        self, session: AsyncSession, organization: Organization
+    ) -> None:
+        counts = await email_subscriber_service.bulk_create(
+            session, organization_id=organization.id, rows=[("", None)]
+        )
+        assert counts == {"created": 0, "updated": 0, "skipped": 1}
@@ -0,0 +1,42 @@
+import io
+
+import pytest
+from fastapi import HTTPException
+
+from polar.email_subscriber.endpoints import _iter_csv_lines
+
+
+class TestIterCSVLines:
+    def test_utf8_with_bom(self) -> None:
+        file = io.BytesIO("\ufeffemail,name\r\nzoe@example.com,Zoë\r\n".encode())
+
+        assert list(_iter_csv_lines(file)) == [
+            "email,name\r\n",
+            "zoe@example.com,Zoë\r\n",
+        ]
+
+    def test_cp1252_fallback(self) -> None:
+        file = io.BytesIO(
+            "email,name\r\nzoe@example.com,Zoë\r\nchloe@example.com,Chloé\r\n".encode(
+                "cp1252"
+            )
+        )
+
+        assert list(_iter_csv_lines(file)) == [
+            "email,name\r\n",
+            "zoe@example.com,Zoë\r\n",
+            "chloe@example.com,Chloé\r\n",
+        ]
+
+    def test_size_limit_without_known_size(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr("polar.email_subscriber.endpoints._CSV_MAX_BYTES", 32)
+        file = io.BytesIO(b"email\r\n" + b"subscriber@example.com\r\n" * 2)
+
+        lines = _iter_csv_lines(file)
+        assert next(lines) == "email\r\n"
+        assert next(lines) == "subscriber@example.com\r\n"
+        with pytest.raises(HTTPException) as e:
+            next(lines)
+        assert e.value.status_code == 413
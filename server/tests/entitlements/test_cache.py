@@ -0,0 +1,78 @@
+from uuid import uuid4
+
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.entitlements.cache import TierCache
+from polar.entitlements.service import entitlements
+from polar.entitlements.tiers import TierKey
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+
+
+@pytest.mark.asyncio
+class TestTierCache:
+    async def test_miss_then_hit(self) -> None:
+        cache = TierCache()
+        organization_id = uuid4()
+
+        assert await cache.get(organization_id) is None
+        await cache.set(organization_id, TierKey.studio)
+        assert await cache.get(organization_id) == TierKey.studio
+
+    async def test_redis_layer(self, redis: Redis) -> None:
+        organization_id = uuid4()
+        await TierCache().set(organization_id, TierKey.scale)
+
+        # Another process: empty in-process layer, shared Redis
+        other_cache = TierCache()
+        assert await other_cache.get(organization_id) == TierKey.scale
+
+    async def test_local_expiration(self, redis: Redis) -> None:
+        cache = TierCache(local_ttl=-1)
+        organization_id = uuid4()
+        await cache.set(organization_id, TierKey.starter)
+        await redis.delete(f"entitlements:tier:{organization_id}")
+
+        assert await cache.get(organization_id) is None
+
+    async def test_local_maxsize(self, redis: Redis) -> None:
+        cache = TierCache(local_maxsize=1)
+        first, second = uuid4(), uuid4()
+        await cache.set(first, TierKey.starter)
+        await cache.set(second, TierKey.studio)
+        await redis.flushall()
+
+        assert await cache.get(first) is None
+        assert await cache.get(second) == TierKey.studio
+
+    async def test_invalidate(self) -> None:
+        cache = TierCache()
+        organization_id = uuid4()
+        await cache.set(organization_id, TierKey.studio)
+
+        await cache.invalidate(organization_id)
+
+        assert await cache.get(organization_id) is None
+
+
+@pytest.mark.asyncio
+class TestGetTierCached:
+    async def test_cached(self, mocker: MockerFixture, session: AsyncSession) -> None:
+        mocker.patch(
+            "polar.entitlements.service.settings.ENTITLEMENTS_TIER_CACHE_ENABLED", True
+        )
+        mocker.patch("polar.platform.service.settings.PLATFORM_ORG_ID", uuid4())
+        resolve_mock = mocker.patch.object(
+            entitlements, "_resolve_tier", return_value=TierKey.studio
+        )
+        organization_id = uuid4()
+
+        assert await entitlements.get_tier(session, organization_id) == TierKey.studio
+        assert await entitlements.get_tier(session, organization_id) == TierKey.studio
+        assert resolve_mock.call_count == 1
+
+        await entitlements.invalidate_tier(organization_id)
+        resolve_mock.return_value = TierKey.inactive
+        assert await entitlements.get_tier(session, organization_id) == TierKey.inactive
+        assert resolve_mock.call_count == 2
@@ -667,6 +667,92 @@ class TestIngest:
             completed_child.id,
         }
 
+    @pytest.mark.auth(AuthSubjectFixture(subject="organization"))
+    async def test_parent_previous_batch(
+        self,
+        save_fixture: SaveFixture,
+        enqueue_events_mock: AsyncMock,
+        session: AsyncSession,
+        auth_subject: AuthSubject[Organization],
+        organization: Organization,
+    ) -> None:
+        root = await create_event(save_fixture, organization=organization)
+        parent = await create_event(
+            save_fixture,
+            organization=organization,
+            external_id="parent-event-456",
+            parent_id=root.id,
+        )
+        parent.root_id = root.id
+        await save_fixture(parent)
+
+        ingest = EventsIngest(
+            events=[
+                EventCreateExternalCustomer(
+                    name="by_external_id",
+                    external_customer_id="test-customer-123",
+                    parent_id="parent-event-456",
+                ),
+                EventCreateExternalCustomer(
+                    name="by_id",
+                    external_customer_id="test-customer-123",
+                    parent_id=str(root.id),
+                ),
+            ]
+        )
+
+        await event_service.ingest(session, auth_subject, ingest)
+
+        event_repository = EventRepository.from_session(session)
+        events = await event_repository.get_all_by_organization(organization.id)
+
+        by_external_id = next(e for e in events if e.name == "by_external_id")
+        assert by_external_id.parent_id == parent.id
+        assert by_external_id.root_id == root.id
+
+        by_id = next(e for e in events if e.name == "by_id")
+        assert by_id.parent_id == root.id
+        assert by_id.root_id == root.id
+
+    @pytest.mark.auth(AuthSubjectFixture(subject="organization"))
+    async def test_parent_not_found(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        auth_subject: AuthSubject[Organization],
+        organization_second: Organization,
+    ) -> None:
+        await create_event(
+            save_fixture,
+            organization=organization_second,
+            external_id="other-organization-event",
+        )
+
+        ingest = EventsIngest(
+            events=[
+                EventCreateExternalCustomer(
+                    name="test",
+                    external_customer_id="test-customer-123",
+                    parent_id="unknown-event",
+                ),
+                EventCreateExternalCustomer(
+                    name="test",
+                    external_customer_id="test-customer-123",
+                    parent_id="other-organization-event",
+                ),
+            ]
+        )
+
+        with pytest.raises(SpaireRequestValidationError) as e:
+            await event_service.ingest(session, auth_subject, ingest)
+
+        errors = e.value.errors()
+        assert len(errors) == 2
+        assert [error["loc"] for error in errors] == [
+            ("body", "events", 0, "parent_id"),
+            ("body", "events", 1, "parent_id"),
+        ]
+
     @pytest.mark.auth(AuthSubjectFixture(subject="organization"))
     async def test_ingest_with_member_id(
         self,
@@ -1326,8 +1412,10 @@ class TestIngested:
 
         enqueue_job_mock.assert_has_calls(
             [
-                call("customer_meter.update_customer", customer.id),
-                call("customer_meter.update_customer", customer_second.id),
+                call(
+                    "customer_meter.update_customers",
+                    sorted([customer.id, customer_second.id]),
+                ),
             ],
             any_order=True,
         )
@@ -0,0 +1,99 @@
+import asyncio
+from typing import Any
+
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.eventstream.hub import EventStreamHub, get_eventstream_hub
+from polar.redis import Redis
+
+
+async def _wait_subscribed() -> None:
+    # Let the hub listener register the channels
+    await asyncio.sleep(0.1)
+
+
+@pytest.mark.asyncio
+class TestEventStreamHub:
+    async def test_fan_out(self, redis: Redis) -> None:
+        hub = EventStreamHub(redis)
+
+        async with hub.subscribe(["org:1", "user:1"]) as subscription_1:
+            async with hub.subscribe(["org:1"]) as subscription_2:
+                await _wait_subscribed()
+                assert hub.channels == {"org:1", "user:1"}
+
+                await redis.publish("org:1", "message")
+                await redis.publish("user:1", "user_message")
+
+                assert await subscription_1.get(timeout=1.0) == "message"
+                assert await subscription_1.get(timeout=1.0) == "user_message"
+                assert await subscription_2.get(timeout=1.0) == "message"
+                assert await subscription_2.get(timeout=0.1) is None
+
+            assert hub.channels == {"org:1", "user:1"}
+
+        assert hub.channels == set()
+        assert hub._listener is None
+
+    async def test_unsubscribe_channel(self, redis: Redis) -> None:
+        hub = EventStreamHub(redis)
+
+        async with hub.subscribe(["org:1"]) as subscription:
+            async with hub.subscribe(["org:2"]):
+                await _wait_subscribed()
+            assert hub.channels == {"org:1"}
+
+            await redis.publish("org:2", "ignored")
+            await redis.publish("org:1", "message")
+
+            assert await subscription.get(timeout=1.0) == "message"
+
+    async def test_slow_consumer_dropped(self, redis: Redis) -> None:
+        hub = EventStreamHub(redis, buffer_size=2)
+
+        async with hub.subscribe(["org:1"]) as slow_subscription:
+            async with hub.subscribe(["org:1"]) as subscription:
+                await _wait_subscribed()
+
+                for i in range(3):
+                    await redis.publish("org:1", f"message_{i}")
+                    assert (
+                        await subscription.get(timeout=1.0) == f"message_{i}".encode()
+                    )
+
+                assert slow_subscription.dropped is True
+                assert await slow_subscription.get(timeout=1.0) is None
+
+                assert subscription.dropped is False
+
+    async def test_reconnect_after_error(
+        self, redis: Redis, mocker: MockerFixture
+    ) -> None:
+        hub = EventStreamHub(redis, reconnect_delay=0.01)
+
+        pubsub = redis.pubsub
+        calls = 0
+
+        def failing_pubsub(**kwargs: Any) -> Any:
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise RuntimeError("Unexpected error")
+            return pubsub(**kwargs)
+
+        mocker.patch.object(redis, "pubsub", side_effect=failing_pubsub)
+
+        async with hub.subscribe(["org:1"]) as subscription:
+            await _wait_subscribed()
+            assert calls == 2
+
+            await redis.publish("org:1", "message")
+
+            assert await subscription.get(timeout=1.0) == "message"
+
+
+@pytest.mark.asyncio
+async def test_get_eventstream_hub(redis: Redis) -> None:
+    hub = get_eventstream_hub(redis)
+    assert get_eventstream_hub(redis) is hub
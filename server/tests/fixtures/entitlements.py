@@ -0,0 +1,16 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.entitlements.cache import tier_cache
+
+
+@pytest.fixture(autouse=True)
+def patch_entitlements_tier_cache(mocker: MockerFixture) -> None:
+    """
+    Tests change platform subscriptions through fixtures, bypassing the
+    invalidation paths: disable the tier cache unless a test opts in.
+    """
+    mocker.patch(
+        "polar.entitlements.service.settings.ENTITLEMENTS_TIER_CACHE_ENABLED", False
+    )
+    tier_cache.clear_local()
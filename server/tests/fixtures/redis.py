@@ -10,7 +10,7 @@ from polar.redis import Redis
 
 @pytest_asyncio.fixture(autouse=True)
 async def redis() -> AsyncIterator[Redis]:
-    yield FakeAsyncRedis()
+    yield FakeAsyncRedis(decode_responses=True)
 
 
 @pytest.fixture(autouse=True)
@@ -20,3 +20,14 @@ def patch_webhook_eventstream_redis(mocker: MockerFixture, redis: Redis) -> None
         "polar.webhook.eventstream._get_check_redis",
         return_value=redis,
     )
+
+
+@pytest.fixture(autouse=True)
+def patch_app_redis(mocker: MockerFixture, redis: Redis) -> None:
+    """Ensure the process-wide caches use fakeredis instead of a real connection."""
+    mocker.patch("polar.redis._app_redis", redis)
+
+
+@pytest.fixture(autouse=True)
+def patch_auth_token_cache_usage(mocker: MockerFixture) -> None:
+    mocker.patch.dict("polar.auth.token_cache._last_recorded", clear=True)
@@ -0,0 +1,227 @@
+from uuid import UUID
+
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.benefit.strategies.license_keys.schemas import (
+    BenefitLicenseKeysCreateProperties,
+)
+from polar.exceptions import BadRequest
+from polar.license_key import counters
+from polar.license_key.repository import LicenseKeyRepository
+from polar.license_key.schemas import LicenseKeyValidate
+from polar.license_key.service import license_key as license_key_service
+from polar.models import Customer, LicenseKey, Organization, Product
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+from tests.fixtures.database import SaveFixture
+from tests.fixtures.license_key import TestLicenseKey
+
+
+async def _create_license_key(
+    session: AsyncSession,
+    redis: Redis,
+    save_fixture: SaveFixture,
+    *,
+    organization: Organization,
+    product: Product,
+    customer: Customer,
+    limit_usage: int | None = None,
+) -> LicenseKey:
+    _, granted = await TestLicenseKey.create_benefit_and_grant(
+        session,
+        redis,
+        save_fixture,
+        customer=customer,
+        organization=organization,
+        product=product,
+        properties=BenefitLicenseKeysCreateProperties(
+            prefix="testing", limit_usage=limit_usage
+        ),
+    )
+    repository = LicenseKeyRepository.from_session(session)
+    license_key = await repository.get_by_id(
+        UUID(granted["license_key_id"]), options=repository.get_eager_options()
+    )
+    assert license_key is not None
+    return license_key
+
+
+@pytest.mark.asyncio
+class TestValidate:
+    async def test_buffers_counters(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        organization: Organization,
+        product: Product,
+        customer: Customer,
+    ) -> None:
+        license_key = await _create_license_key(
+            session,
+            redis,
+            save_fixture,
+            organization=organization,
+            product=product,
+            customer=customer,
+        )
+
+        for _ in range(3):
+            validated = await license_key_service.validate(
+                session,
+                redis,
+                license_key=license_key,
+                validate=LicenseKeyValidate(
+                    key=license_key.key,
+                    organization_id=organization.id,
+                    increment_usage=2,
+                ),
+            )
+
+        assert validated.validations == 3
+        assert validated.usage == 6
+        assert validated.last_validated_at is not None
+        # Nothing is written to the row until the counters are flushed
+        assert license_key not in session.dirty
+
+        assert await counters.flush(session, redis) == 1
+        await session.refresh(license_key)
+        assert license_key.validations == 3
+        assert license_key.usage == 6
+        assert license_key.last_validated_at is not None
+
+        assert await counters.flush(session, redis) == 0
+
+    async def test_limit_usage(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        organization: Organization,
+        product: Product,
+        customer: Customer,
+    ) -> None:
+        license_key = await _create_license_key(
+            session,
+            redis,
+            save_fixture,
+            organization=organization,
+            product=product,
+            customer=customer,
+            limit_usage=5,
+        )
+        validate = LicenseKeyValidate(
+            key=license_key.key, organization_id=organization.id, increment_usage=2
+        )
+
+        await license_key_service.validate(
+            session, redis, license_key=license_key, validate=validate
+        )
+        await license_key_service.validate(
+            session, redis, license_key=license_key, validate=validate
+        )
+
+        with pytest.raises(BadRequest, match="only has 1 more usages"):
+            await license_key_service.validate(
+                session, redis, license_key=license_key, validate=validate
+            )
+
+        await counters.flush(session, redis)
+        await session.refresh(license_key)
+        assert license_key.usage == 4
+        assert license_key.validations == 2
+
+    async def test_negative_increment(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        organization: Organization,
+        product: Product,
+        customer: Customer,
+    ) -> None:
+        license_key = await _create_license_key(
+            session,
+            redis,
+            save_fixture,
+            organization=organization,
+            product=product,
+            customer=customer,
+            limit_usage=5,
+        )
+
+        for increment_usage in (5, -3, 3):
+            validated = await license_key_service.validate(
+                session,
+                redis,
+                license_key=license_key,
+                validate=LicenseKeyValidate(
+                    key=license_key.key,
+                    organization_id=organization.id,
+                    increment_usage=increment_usage,
+                ),
+            )
+        assert validated.usage == 5
+
+        with pytest.raises(BadRequest, match="only has 0 more usages"):
+            await license_key_service.validate(
+                session,
+                redis,
+                license_key=license_key,
+                validate=LicenseKeyValidate(
+                    key=license_key.key,
+                    organization_id=organization.id,
+                    increment_usage=1,
+                ),
+            )
+
+        await counters.flush(session, redis)
+        await session.refresh(license_key)
+        assert license_key.usage == 5
+        assert license_key.validations == 3
+
+    async def test_flush_failure_keeps_counters(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        save_fixture: SaveFixture,
+        organization: Organization,
+        product: Product,
+        customer: Customer,
+    ) -> None:
+        license_key = await _create_license_key(
+            session,
+            redis,
+            save_fixture,
+            organization=organization,
+            product=product,
+            customer=customer,
+            limit_usage=5,
+        )
+        validate = LicenseKeyValidate(
+            key=license_key.key, organization_id=organization.id, increment_usage=2
+        )
+        for _ in range(2):
+            await license_key_service.validate(
+                session, redis, license_key=license_key, validate=validate
+            )
+
+        connection_mock = mocker.patch.object(
+            session, "connection", side_effect=Exception("DB error")
+        )
+        with pytest.raises(Exception, match="DB error"):
+            await counters.flush(session, redis)
+        mocker.stop(connection_mock)
+
+        # The counters are still pending, and still count towards the limit
+        with pytest.raises(BadRequest, match="only has 1 more usages"):
+            await license_key_service.validate(
+                session, redis, license_key=license_key, validate=validate
+            )
+
+        assert await counters.flush(session, redis) == 1
+        await session.refresh(license_key)
+        assert license_key.usage == 4
+        assert license_key.validations == 2
@@ -0,0 +1,189 @@
+import uuid
+from datetime import timedelta
+
+import pytest
+
+from polar.event.system import SystemEvent
+from polar.kit.utils import utc_now
+from polar.meter.aggregation import (
+    Aggregation,
+    AggregationFunction,
+    CountAggregation,
+    PropertyAggregation,
+)
+from polar.meter.filter import Filter, FilterClause, FilterConjunction, FilterOperator
+from polar.meter.matcher import (
+    MeterMatcher,
+    get_meter_matcher,
+    invalidate_meter_matcher,
+)
+from polar.models import Event, Meter
+from polar.models.event import EventSource
+
+
+def _meter(filter: Filter, aggregation: Aggregation | None = None) -> Meter:
+    return Meter(
+        id=uuid.uuid4(),
+        name="Meter",
+        filter=filter,
+        aggregation=aggregation or CountAggregation(),
+        organization_id=uuid.uuid4(),
+    )
+
+
+def _event(
+    name: str = "test",
+    source: EventSource = EventSource.user,
+    metadata: dict[str, object] | None = None,
+) -> Event:
+    return Event(
+        id=uuid.uuid4(),
+        name=name,
+        source=source,
+        timestamp=utc_now(),
+        organization_id=uuid.uuid4(),
+        user_metadata=metadata or {},
+    )
+
+
+FILTERS = [
+    Filter(conjunction=FilterConjunction.and_, clauses=[]),
+    Filter(
+        conjunction=FilterConjunction.and_,
+        clauses=[
+            FilterClause(property="name", operator=FilterOperator.eq, value="test"),
+            FilterClause(property="category", operator=FilterOperator.eq, value="api"),
+        ],
+    ),
+    Filter(
+        conjunction=FilterConjunction.or_,
+        clauses=[
+            FilterClause(property="name", operator=FilterOperator.eq, value="other"),
+            FilterClause(property="amount", operator=FilterOperator.gte, value=100),
+        ],
+    ),
+    Filter(
+        conjunction=FilterConjunction.and_,
+        clauses=[
+            FilterClause(property="name", operator=FilterOperator.like, value="es"),
+            Filter(
+                conjunction=FilterConjunction.or_,
+                clauses=[
+                    FilterClause(
+                        property="_llm.model", operator=FilterOperator.eq, value="gpt-4"
+                    ),
+                    FilterClause(
+                        property="category",
+                        operator=FilterOperator.not_like,
+                        value="api",
+                    ),
+                ],
+            ),
+        ],
+    ),
+    Filter(
+        conjunction=FilterConjunction.and_,
+        clauses=[
+            FilterClause(property="name", operator=FilterOperator.gte, value=1),
+        ],
+    ),
+    Filter(
+        conjunction=FilterConjunction.and_,
+        clauses=[
+            FilterClause(property="amount", operator=FilterOperator.gt, value="100"),
+        ],
+    ),
+]
+
+EVENTS = [
+    _event(),
+    _event(metadata={"category": "api"}),
+    _event(metadata={"category": "web", "amount": 150}),
+    _event(name="other", metadata={"amount": 50}),
+    _event(metadata={"_llm": {"model": "gpt-4"}, "category": "api"}),
+    _event(metadata={"amount": "invalid"}),
+]
+
+
+class TestMeterMatcher:
+    @pytest.mark.parametrize("filter", FILTERS)
+    @pytest.mark.parametrize(
+        "aggregation",
+        [
+            CountAggregation(),
+            PropertyAggregation(func=AggregationFunction.sum, property="amount"),
+            PropertyAggregation(func=AggregationFunction.max, property="timestamp"),
+        ],
+    )
+    def test_parity(self, filter: Filter, aggregation: Aggregation) -> None:
+        meter = _meter(filter, aggregation)
+        matcher = MeterMatcher([meter])
+
+        for event in EVENTS:
+            expected = meter.filter.matches(event) and meter.aggregation.matches(event)
+            assert (meter.id in matcher.match(event)) is expected
+
+    def test_multiple_meters(self) -> None:
+        meters = [_meter(filter) for filter in FILTERS]
+        matcher = MeterMatcher(meters)
+
+        for event in EVENTS:
+            assert set(matcher.match(event)) == {
+                meter.id for meter in meters if meter.filter.matches(event)
+            }
+
+    @pytest.mark.parametrize(
+        "name", [SystemEvent.meter_credited, SystemEvent.meter_reset]
+    )
+    def test_system_events(self, name: SystemEvent) -> None:
+        meter = _meter(
+            Filter(
+                conjunction=FilterConjunction.and_,
+                clauses=[
+                    FilterClause(
+                        property="name", operator=FilterOperator.eq, value="test"
+                    )
+                ],
+            )
+        )
+        other_meter = _meter(FILTERS[1])
+        matcher = MeterMatcher([meter, other_meter])
+
+        event = _event(
+            name=name,
+            source=EventSource.system,
+            metadata={"meter_id": str(meter.id)},
+        )
+        assert matcher.match(event) == [meter.id]
+
+        user_event = _event(name=name, metadata={"meter_id": str(meter.id)})
+        assert matcher.match(user_event) == []
+
+
+class TestGetMeterMatcher:
+    def test_cached(self) -> None:
+        organization_id = uuid.uuid4()
+        meters = [_meter(filter) for filter in FILTERS]
+
+        matcher = get_meter_matcher(organization_id, meters)
+        assert get_meter_matcher(organization_id, meters) is matcher
+
+    def test_meters_changed(self) -> None:
+        organization_id = uuid.uuid4()
+        meters = [_meter(filter) for filter in FILTERS]
+
+        matcher = get_meter_matcher(organization_id, meters)
+        assert get_meter_matcher(organization_id, meters[1:]) is not matcher
+
+        meters[0].modified_at = utc_now() + timedelta(seconds=1)
+        updated_matcher = get_meter_matcher(organization_id, meters)
+        assert updated_matcher is not matcher
+        assert get_meter_matcher(organization_id, meters) is updated_matcher
+
+    def test_invalidate(self) -> None:
+        organization_id = uuid.uuid4()
+        meters = [_meter(filter) for filter in FILTERS]
+
+        matcher = get_meter_matcher(organization_id, meters)
+        invalidate_meter_matcher(organization_id)
+        assert get_meter_matcher(organization_id, meters) is not matcher
@@ -2,7 +2,7 @@ import uuid
 from datetime import timedelta
 from decimal import Decimal
 from typing import Literal
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, call
 from zoneinfo import ZoneInfo
 
 import pytest
@@ -39,6 +39,8 @@ from polar.models.billing_entry import BillingEntryDirection
 from polar.models.customer_seat import SeatStatus
 from polar.models.event import EventSource
 from polar.postgres import AsyncSession
+from polar.redis import Redis
+from polar.worker import JobQueueManager
 from tests.fixtures.auth import AuthSubjectFixture
 from tests.fixtures.database import SaveFixture
 from tests.fixtures.random_objects import (
@@ -1094,12 +1096,13 @@ class TestCreateBillingEntries:
         enqueue_job_mock: AsyncMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         customer: Customer,
         events: list[Event],
         meter: Meter,
         product_metered_unit: Product,
     ) -> None:
-        entries = await meter_service.create_billing_entries(session, meter)
+        entries = await meter_service.create_billing_entries(session, redis, meter)
 
         assert len(entries) == 0
         assert meter.last_billed_event == events[-3]
@@ -1111,13 +1114,14 @@ class TestCreateBillingEntries:
         enqueue_job_mock: AsyncMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         customer: Customer,
         events: list[Event],
         meter: Meter,
         product_metered_unit: Product,
         metered_subscription: Subscription,
     ) -> None:
-        entries = await meter_service.create_billing_entries(session, meter)
+        entries = await meter_service.create_billing_entries(session, redis, meter)
 
         assert len(entries) == 5
         for entry in entries:
@@ -1140,6 +1144,7 @@ class TestCreateBillingEntries:
         enqueue_job_mock: AsyncMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         customer: Customer,
         events: list[Event],
         meter: Meter,
@@ -1147,7 +1152,7 @@ class TestCreateBillingEntries:
         metered_subscription: Subscription,
     ) -> None:
         meter.last_billed_event = events[1]
-        entries = await meter_service.create_billing_entries(session, meter)
+        entries = await meter_service.create_billing_entries(session, redis, meter)
 
         assert len(entries) == 3
         for entry in entries:
@@ -1165,11 +1170,43 @@ class TestCreateBillingEntries:
             "subscription.update_meters", metered_subscription.id
         )
 
+    async def test_chunked(
+        self,
+        mocker: MockerFixture,
+        enqueue_job_mock: AsyncMock,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        redis: Redis,
+        customer: Customer,
+        events: list[Event],
+        meter: Meter,
+        product_metered_unit: Product,
+        metered_subscription: Subscription,
+    ) -> None:
+        mocker.patch("polar.meter.service.BILLING_ENTRIES_CHUNK_SIZE", 2)
+        commit_spy = mocker.spy(session, "commit")
+        flush_spy = mocker.spy(JobQueueManager, "flush")
+
+        entries = await meter_service.create_billing_entries(session, redis, meter)
+
+        assert len(entries) == 5
+        assert [entry.event for entry in entries] == events[:5]
+        assert meter.last_billed_event == events[-3]
+        assert commit_spy.call_count == 3
+
+        # Each chunk enqueues the meters update and flushes it with its commit
+        assert flush_spy.call_count == 3
+        assert (
+            enqueue_job_mock.call_args_list
+            == [call("subscription.update_meters", metered_subscription.id)] * 3
+        )
+
     async def test_external_customer_id_resolved_to_customer(
         self,
         enqueue_job_mock: AsyncMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
         organization: Organization,
     ) -> None:
         """Test that events with only external_customer_id are billed when customer exists."""
@@ -1225,7 +1262,7 @@ class TestCreateBillingEntries:
         )
         await save_fixture(meter_event)
 
-        entries = await meter_service.create_billing_entries(session, meter)
+        entries = await meter_service.create_billing_entries(session, redis, meter)
 
         assert len(entries) == 1
         assert entries[0].customer == customer
@@ -1239,6 +1276,7 @@ class TestCreateBillingEntriesWithSeats:
         enqueue_job_mock: AsyncMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
     ) -> None:
         seat_org = await create_organization(
             save_fixture, feature_settings={"seat_based_pricing_enabled": True}
@@ -1320,7 +1358,7 @@ class TestCreateBillingEntriesWithSeats:
         ]
         await event_service._create_meter_events(session, events)
 
-        entries = await meter_service.create_billing_entries(session, meter)
+        entries = await meter_service.create_billing_entries(session, redis, meter)
 
         assert len(entries) == 2
         for entry in entries:
@@ -1339,6 +1377,7 @@ class TestCreateBillingEntriesWithSeats:
         enqueue_job_mock: AsyncMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
     ) -> None:
         seat_org = await create_organization(
             save_fixture, feature_settings={"seat_based_pricing_enabled": True}
@@ -1410,7 +1449,7 @@ class TestCreateBillingEntriesWithSeats:
         ]
         await event_service._create_meter_events(session, events)
 
-        entries = await meter_service.create_billing_entries(session, meter)
+        entries = await meter_service.create_billing_entries(session, redis, meter)
 
         assert len(entries) == 0
         enqueue_job_mock.assert_not_called()
@@ -1420,6 +1459,7 @@ class TestCreateBillingEntriesWithSeats:
         enqueue_job_mock: AsyncMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
     ) -> None:
         seat_org = await create_organization(
             save_fixture, feature_settings={"seat_based_pricing_enabled": True}
@@ -1529,7 +1569,7 @@ class TestCreateBillingEntriesWithSeats:
         ]
         await event_service._create_meter_events(session, events)
 
-        entries = await meter_service.create_billing_entries(session, meter)
+        entries = await meter_service.create_billing_entries(session, redis, meter)
 
         assert len(entries) == 3
         for entry in entries:
@@ -1548,6 +1588,7 @@ class TestCreateBillingEntriesWithSeats:
         enqueue_job_mock: AsyncMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
+        redis: Redis,
     ) -> None:
         seat_org = await create_organization(
             save_fixture, feature_settings={"seat_based_pricing_enabled": True}
@@ -1651,7 +1692,7 @@ class TestCreateBillingEntriesWithSeats:
         ]
         await event_service._create_meter_events(session, events)
 
-        entries = await meter_service.create_billing_entries(session, meter)
+        entries = await meter_service.create_billing_entries(session, redis, meter)
 
         assert len(entries) == 3
         for entry in entries:
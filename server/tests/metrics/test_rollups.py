@@ -0,0 +1,334 @@
+from datetime import UTC, date, datetime
+from decimal import Decimal
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+import pytest
+from sqlalchemy import select
+
+from polar.auth.models import AuthSubject
+from polar.config import settings
+from polar.enums import SubscriptionRecurringInterval
+from polar.kit.time_queries import TimeInterval
+from polar.metrics import rollups
+from polar.metrics.schemas import MetricsResponse
+from polar.metrics.service import metrics as metrics_service
+from polar.models import (
+    Customer,
+    MetricsRollup,
+    MetricsRollupSource,
+    Organization,
+    Product,
+)
+from polar.models.order import OrderStatus
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+from tests.fixtures.auth import AuthSubjectFixture
+from tests.fixtures.database import SaveFixture
+from tests.fixtures.random_objects import create_event, create_order, create_product
+
+METRICS = [
+    "orders",
+    "revenue",
+    "net_revenue",
+    "cumulative_revenue",
+    "average_order_value",
+    "one_time_products",
+    "costs",
+    "cumulative_costs",
+]
+NOW = datetime(2024, 6, 15, 12, tzinfo=UTC)
+
+
+async def _create_products(
+    save_fixture: SaveFixture, organization: Organization
+) -> tuple[Product, Product]:
+    one_time_product = await create_product(
+        save_fixture,
+        organization=organization,
+        recurring_interval=None,
+        prices=[(100_00, "usd")],
+    )
+    monthly_product = await create_product(
+        save_fixture,
+        organization=organization,
+        recurring_interval=SubscriptionRecurringInterval.month,
+        prices=[(100_00, "usd")],
+    )
+    return one_time_product, monthly_product
+
+
+async def _create_cost_event(
+    save_fixture: SaveFixture,
+    organization: Organization,
+    customer: Customer,
+    timestamp: datetime,
+    amount: float,
+) -> None:
+    await create_event(
+        save_fixture,
+        timestamp=timestamp,
+        organization=organization,
+        customer=customer,
+        metadata={"_cost": {"amount": amount, "currency": "usd"}},
+    )
+
+
+@pytest.mark.asyncio
+class TestRefresh:
+    async def test_full(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        redis: Redis,
+        customer: Customer,
+        organization: Organization,
+    ) -> None:
+        one_time_product, monthly_product = await _create_products(
+            save_fixture, organization
+        )
+        for product, created_at, status in [
+            (
+                one_time_product,
+                datetime(2024, 1, 1, 10, 5, tzinfo=UTC),
+                OrderStatus.paid,
+            ),
+            (
+                one_time_product,
+                datetime(2024, 1, 1, 10, 55, tzinfo=UTC),
+                OrderStatus.paid,
+            ),
+            (
+                one_time_product,
+                datetime(2024, 1, 1, 10, 30, tzinfo=UTC),
+                OrderStatus.pending,
+            ),
+            (
+                monthly_product,
+                datetime(2024, 1, 1, 11, 0, tzinfo=UTC),
+                OrderStatus.paid,
+            ),
+        ]:
+            await create_order(
+                save_fixture,
+                customer=customer,
+                product=product,
+                status=status,
+                subtotal_amount=100_00,
+                created_at=created_at,
+            )
+        await _create_cost_event(
+            save_fixture, organization, customer, datetime(2024, 1, 2, tzinfo=UTC), 0.5
+        )
+
+        watermark = await rollups.refresh(session, redis)
+        assert await rollups.get_watermark(redis) is None
+
+        result = await session.execute(
+            select(MetricsRollup).order_by(MetricsRollup.source, MetricsRollup.hour)
+        )
+        rows = result.scalars().all()
+        orders_rows = [r for r in rows if r.source == MetricsRollupSource.orders]
+        assert [(r.hour, r.product_id, r.orders, r.revenue) for r in orders_rows] == [
+            (datetime(2024, 1, 1, 10, tzinfo=UTC), one_time_product.id, 2, 200_00),
+            (datetime(2024, 1, 1, 11, tzinfo=UTC), monthly_product.id, 1, 100_00),
+        ]
+        events_rows = [r for r in rows if r.source == MetricsRollupSource.events]
+        assert [(r.hour, r.costs) for r in events_rows] == [
+            (datetime(2024, 1, 2, tzinfo=UTC), Decimal("0.5"))
+        ]
+
+        await rollups.set_watermark(redis, watermark)
+        assert await rollups.get_watermark(redis) == watermark
+
+    async def test_incremental_events(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        redis: Redis,
+        customer: Customer,
+        organization: Organization,
+    ) -> None:
+        timestamp = datetime(2024, 1, 2, 8, 30, tzinfo=UTC)
+        await _create_cost_event(save_fixture, organization, customer, timestamp, 0.5)
+        await rollups.set_watermark(redis, await rollups.refresh(session, redis))
+
+        # Ingested after the refresh, with a past timestamp
+        await _create_cost_event(save_fixture, organization, customer, timestamp, 0.25)
+        await rollups.refresh(session, redis)
+
+        result = await session.execute(
+            select(MetricsRollup.costs).where(
+                MetricsRollup.source == MetricsRollupSource.events
+            )
+        )
+        assert result.scalars().all() == [Decimal("0.75")]
+
+    async def test_incremental_orders(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        redis: Redis,
+        customer: Customer,
+        organization: Organization,
+    ) -> None:
+        one_time_product, _ = await _create_products(save_fixture, organization)
+        orders = [
+            await create_order(
+                save_fixture,
+                customer=customer,
+                product=one_time_product,
+                status=status,
+                subtotal_amount=100_00,
+                created_at=datetime(2024, 1, 1, 10, minute, tzinfo=UTC),
+            )
+            for minute, status in [(5, OrderStatus.paid), (30, OrderStatus.pending)]
+        ]
+        await rollups.set_watermark(redis, await rollups.refresh(session, redis))
+
+        # Paid after the refresh, long after its creation
+        orders[1].status = OrderStatus.paid
+        await save_fixture(orders[1])
+        await rollups.refresh(session, redis)
+
+        result = await session.execute(
+            select(MetricsRollup.orders, MetricsRollup.revenue).where(
+                MetricsRollup.source == MetricsRollupSource.orders
+            )
+        )
+        assert result.tuples().all() == [(2, 200_00)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.auth(AuthSubjectFixture(subject="organization"))
+class TestGetMetrics:
+    async def _get_metrics(
+        self,
+        session: AsyncSession,
+        auth_subject: AuthSubject[Organization],
+        *,
+        interval: TimeInterval = TimeInterval.day,
+        timezone: str = "UTC",
+    ) -> MetricsResponse:
+        return await metrics_service.get_metrics(
+            session,
+            auth_subject,
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 6, 15),
+            timezone=ZoneInfo(timezone),
+            interval=interval,
+            metrics=METRICS,
+            now=NOW,
+        )
+
+    async def _create_fixtures(
+        self,
+        save_fixture: SaveFixture,
+        customer: Customer,
+        organization: Organization,
+    ) -> tuple[Product, Product]:
+        one_time_product, monthly_product = await _create_products(
+            save_fixture, organization
+        )
+        for product, created_at in [
+            (one_time_product, datetime(2023, 12, 31, 23, tzinfo=UTC)),
+            (one_time_product, datetime(2024, 1, 1, 10, tzinfo=UTC)),
+            (monthly_product, datetime(2024, 2, 29, 23, 30, tzinfo=UTC)),
+            (one_time_product, datetime(2024, 6, 1, 0, 15, tzinfo=UTC)),
+            # Current day, read from the orders
+            (monthly_product, datetime(2024, 6, 15, 9, tzinfo=UTC)),
+        ]:
+            await create_order(
+                save_fixture,
+                customer=customer,
+                product=product,
+                subtotal_amount=100_00,
+                created_at=created_at,
+            )
+        for timestamp, amount in [
+            (datetime(2024, 1, 1, 5, tzinfo=UTC), 0.5),
+            (datetime(2024, 3, 31, 22, tzinfo=UTC), 0.125),
+            (datetime(2024, 6, 15, 8, tzinfo=UTC), 1.0),
+        ]:
+            await _create_cost_event(
+                save_fixture, organization, customer, timestamp, amount
+            )
+        return one_time_product, monthly_product
+
+    @pytest.mark.parametrize(
+        "interval",
+        [TimeInterval.day, TimeInterval.week, TimeInterval.month, TimeInterval.year],
+    )
+    @pytest.mark.parametrize("timezone", ["UTC", "America/New_York"])
+    async def test_parity(
+        self,
+        interval: TimeInterval,
+        timezone: str,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        redis: Redis,
+        auth_subject: AuthSubject[Organization],
+        customer: Customer,
+        organization: Organization,
+    ) -> None:
+        await self._create_fixtures(save_fixture, customer, organization)
+
+        raw_response = await self._get_metrics(
+            session, auth_subject, interval=interval, timezone=timezone
+        )
+
+        await rollups.set_watermark(redis, await rollups.refresh(session, redis))
+        with patch.object(settings, "METRICS_ROLLUPS_ENABLED", True):
+            rollups_response = await self._get_metrics(
+                session, auth_subject, interval=interval, timezone=timezone
+            )
+
+        assert len(rollups_response.periods) == len(raw_response.periods)
+        for rollups_period, raw_period in zip(
+            rollups_response.periods, raw_response.periods
+        ):
+            assert rollups_period.model_dump() == raw_period.model_dump()
+        assert rollups_response.totals == raw_response.totals
+
+    @pytest.mark.parametrize(
+        ("timezone", "fresh", "expected_orders"),
+        [
+            # Served by the rollups, missing the order created after the refresh
+            ("UTC", True, 4),
+            ("UTC", False, 5),
+            # Not a whole number of hours from UTC, also includes the 2023 order
+            ("Asia/Kolkata", True, 6),
+        ],
+    )
+    async def test_serving(
+        self,
+        timezone: str,
+        fresh: bool,
+        expected_orders: int,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        redis: Redis,
+        auth_subject: AuthSubject[Organization],
+        customer: Customer,
+        organization: Organization,
+    ) -> None:
+        one_time_product, _ = await self._create_fixtures(
+            save_fixture, customer, organization
+        )
+        watermark = await rollups.refresh(session, redis)
+        if fresh:
+            await rollups.set_watermark(redis, watermark)
+
+        # Created after the refresh, so only visible reading the orders
+        await create_order(
+            save_fixture,
+            customer=customer,
+            product=one_time_product,
+            subtotal_amount=100_00,
+            created_at=datetime(2024, 3, 1, 12, tzinfo=UTC),
+        )
+
+        with patch.object(settings, "METRICS_ROLLUPS_ENABLED", True):
+            response = await self._get_metrics(session, auth_subject, timezone=timezone)
+
+        assert response.totals.orders == expected_orders
@@ -1,5 +1,9 @@
-from datetime import UTC, date, datetime
-from typing import NotRequired, TypedDict
+import asyncio
+import time
+from collections.abc import Callable
+from datetime import UTC, date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, NotRequired, TypedDict
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -8,10 +12,13 @@ from apscheduler.util import ZoneInfo
 from sqlalchemy import select
 
 from polar.auth.models import AuthSubject
-from polar.config import settings
+from polar.config import MetricsSubscriptionsEngine, settings
 from polar.enums import SubscriptionRecurringInterval
 from polar.kit.time_queries import TimeInterval
-from polar.metrics.schemas import MetricsResponse
+from polar.metrics import cache as metrics_cache
+from polar.metrics.metrics import METRICS, METRICS_POST_COMPUTE, METRICS_SQL, MetaMetric
+from polar.metrics.schemas import MetricsPeriod, MetricsResponse
+from polar.metrics.service import _build_period
 from polar.metrics.service import metrics as metrics_service
 from polar.models import (
     Customer,
@@ -2693,3 +2700,366 @@ class TestTinybirdDualRead:
 
         tb_mock.assert_called_once()
         assert result.periods is not None
+
+    async def test_cancels_tinybird_on_pg_error(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        auth_subject: AuthSubject[User | Organization],
+        user_organization: UserOrganization,
+        organization: Organization,
+    ) -> None:
+        organization.feature_settings = {
+            **organization.feature_settings,
+            "tinybird_compare": True,
+        }
+        await save_fixture(organization)
+
+        tb_cancelled = asyncio.Event()
+
+        async def _get_metrics_from_tinybird(*args: Any, **kwargs: Any) -> None:
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                tb_cancelled.set()
+                raise
+
+        with (
+            patch.object(settings, "TINYBIRD_EVENTS_READ", True),
+            patch.object(
+                metrics_service,
+                "_get_metrics_from_tinybird",
+                _get_metrics_from_tinybird,
+            ),
+            patch.object(
+                metrics_service,
+                "_get_metrics_from_postgres",
+                AsyncMock(side_effect=Exception("Postgres error")),
+            ),
+        ):
+            with pytest.raises(Exception, match="Postgres error"):
+                await metrics_service.get_metrics(
+                    session,
+                    auth_subject,
+                    start_date=date(2024, 1, 1),
+                    end_date=date(2024, 1, 31),
+                    timezone=ZoneInfo("UTC"),
+                    interval=TimeInterval.month,
+                    organization_id=[organization.id],
+                )
+
+        await asyncio.wait_for(tb_cancelled.wait(), timeout=1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.auth(AuthSubjectFixture(subject="organization"))
+class TestMetricsCache:
+    async def _get_metrics(
+        self,
+        session: AsyncSession,
+        auth_subject: AuthSubject[Organization],
+        *,
+        end_date: date = date(2024, 1, 31),
+        now: datetime | None = None,
+    ) -> MetricsResponse:
+        return await metrics_service.get_metrics(
+            session,
+            auth_subject,
+            start_date=date(2024, 1, 1),
+            end_date=end_date,
+            timezone=ZoneInfo("UTC"),
+            interval=TimeInterval.day,
+            metrics=["orders", "revenue"],
+            now=now,
+        )
+
+    async def test_cached(
+        self,
+        session: AsyncSession,
+        auth_subject: AuthSubject[Organization],
+        fixtures: tuple[dict[str, Product], dict[str, Subscription], dict[str, Order]],
+    ) -> None:
+        pg_spy = AsyncMock(wraps=metrics_service._get_metrics_from_postgres)
+        with patch.object(metrics_service, "_get_metrics_from_postgres", pg_spy):
+            response = await self._get_metrics(session, auth_subject)
+            cached_response = await self._get_metrics(session, auth_subject)
+            await self._get_metrics(session, auth_subject, end_date=date(2024, 1, 30))
+
+        assert pg_spy.call_count == 2
+        assert cached_response == response
+        assert cached_response.totals.orders == 3
+
+    async def test_not_cached_with_now(
+        self,
+        session: AsyncSession,
+        auth_subject: AuthSubject[Organization],
+    ) -> None:
+        pg_spy = AsyncMock(wraps=metrics_service._get_metrics_from_postgres)
+        with patch.object(metrics_service, "_get_metrics_from_postgres", pg_spy):
+            for _ in range(2):
+                await self._get_metrics(
+                    session, auth_subject, now=datetime(2024, 2, 1, tzinfo=UTC)
+                )
+
+        assert pg_spy.call_count == 2
+
+    async def test_not_cached_on_tinybird_read_error(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        auth_subject: AuthSubject[Organization],
+        organization: Organization,
+    ) -> None:
+        organization.feature_settings = {
+            **organization.feature_settings,
+            "tinybird_read": True,
+            "tinybird_compare": False,
+        }
+        await save_fixture(organization)
+
+        tb_mock = AsyncMock(side_effect=Exception("Tinybird error"))
+        with (
+            patch.object(settings, "TINYBIRD_EVENTS_READ", True),
+            patch.object(metrics_service, "_get_metrics_from_tinybird", tb_mock),
+        ):
+            for _ in range(2):
+                await self._get_metrics(session, auth_subject)
+
+        assert tb_mock.call_count == 2
+
+    @pytest.mark.parametrize(
+        ("end_date", "expected_ttl"),
+        [
+            (date(2024, 1, 31), 3600),
+            (date.today() + timedelta(days=1), 60),
+        ],
+    )
+    def test_ttl(self, end_date: date, expected_ttl: int) -> None:
+        with (
+            patch.object(settings, "METRICS_CACHE_TTL_SECONDS", 60),
+            patch.object(settings, "METRICS_CACHE_HISTORICAL_TTL_SECONDS", 3600),
+        ):
+            assert metrics_cache.get_ttl(end_date, ZoneInfo("UTC")) == expected_ttl
+
+
+SWEEP_SUBSCRIPTIONS: dict[str, SubscriptionFixture] = {
+    "before_range": {
+        "started_at": date(2023, 6, 15),
+        "product": "monthly_subscription",
+    },
+    "ended_in_range": {
+        "started_at": date(2023, 11, 20),
+        "ended_at": date(2024, 3, 10),
+        "product": "yearly_subscription",
+    },
+    "ends_after_range": {
+        "started_at": date(2024, 2, 3),
+        "ends_at": date(2025, 2, 1),
+        "product": "monthly_subscription",
+    },
+    "same_period": {
+        "started_at": date(2024, 4, 2),
+        "ended_at": date(2024, 4, 20),
+        "product": "monthly_subscription",
+    },
+    "ended_before_range": {
+        "started_at": date(2023, 1, 1),
+        "ended_at": date(2023, 6, 1),
+        "product": "monthly_subscription",
+    },
+    "free": {
+        "started_at": date(2024, 5, 5),
+        "product": "free_subscription",
+    },
+}
+
+
+@pytest.mark.asyncio
+@pytest.mark.auth(AuthSubjectFixture(subject="organization"))
+class TestSubscriptionsEngine:
+    @pytest.mark.parametrize(
+        "interval",
+        [TimeInterval.day, TimeInterval.week, TimeInterval.month, TimeInterval.year],
+    )
+    async def test_sweep_parity(
+        self,
+        interval: TimeInterval,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        auth_subject: AuthSubject[Organization],
+        customer: Customer,
+        customer_second: Customer,
+        organization: Organization,
+    ) -> None:
+        products, _, _ = await _create_fixtures(
+            save_fixture,
+            customer,
+            organization,
+            PRODUCTS,
+            SWEEP_SUBSCRIPTIONS,
+            {},
+        )
+        # Overlapping subscriptions of another customer
+        for started_at, ended_at in [
+            (datetime(2024, 1, 10, tzinfo=UTC), datetime(2024, 5, 1, tzinfo=UTC)),
+            (datetime(2024, 3, 1, tzinfo=UTC), None),
+        ]:
+            await create_subscription(
+                save_fixture,
+                product=products["yearly_subscription"],
+                customer=customer_second,
+                status=SubscriptionStatus.active,
+                started_at=started_at,
+                ended_at=ended_at,
+            )
+
+        metrics = [
+            "active_subscriptions",
+            "committed_subscriptions",
+            "monthly_recurring_revenue",
+            "committed_monthly_recurring_revenue",
+            "new_subscriptions",
+            "average_revenue_per_user",
+        ]
+
+        async def _get_metrics() -> MetricsResponse:
+            return await metrics_service.get_metrics(
+                session,
+                auth_subject,
+                start_date=date(2024, 1, 1),
+                end_date=date(2024, 6, 30),
+                timezone=ZoneInfo("UTC"),
+                interval=interval,
+                metrics=metrics,
+                now=datetime(2024, 6, 15, tzinfo=UTC),
+            )
+
+        with patch.object(
+            settings,
+            "METRICS_SUBSCRIPTIONS_ENGINE",
+            MetricsSubscriptionsEngine.range_join,
+        ):
+            range_join_response = await _get_metrics()
+
+        with patch.object(
+            settings, "METRICS_SUBSCRIPTIONS_ENGINE", MetricsSubscriptionsEngine.sweep
+        ):
+            sweep_response = await _get_metrics()
+
+        assert len(sweep_response.periods) == len(range_join_response.periods)
+        for sweep_period, range_join_period in zip(
+            sweep_response.periods, range_join_response.periods
+        ):
+            assert sweep_period.model_dump() == range_join_period.model_dump()
+        assert sweep_response.totals == range_join_response.totals
+
+    async def test_compare(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        auth_subject: AuthSubject[Organization],
+        customer: Customer,
+        organization: Organization,
+    ) -> None:
+        await _create_fixtures(
+            save_fixture,
+            customer,
+            organization,
+            PRODUCTS,
+            SWEEP_SUBSCRIPTIONS,
+            {},
+        )
+
+        span_mock = MagicMock()
+        with (
+            patch.object(
+                settings,
+                "METRICS_SUBSCRIPTIONS_ENGINE",
+                MetricsSubscriptionsEngine.compare,
+            ),
+            patch("polar.metrics.service.logfire.span", span_mock),
+        ):
+            await metrics_service.get_metrics(
+                session,
+                auth_subject,
+                start_date=date(2024, 1, 1),
+                end_date=date(2024, 6, 30),
+                timezone=ZoneInfo("UTC"),
+                interval=TimeInterval.month,
+                metrics=["active_subscriptions", "monthly_recurring_revenue"],
+            )
+
+        comparison_calls = [
+            c
+            for c in span_mock.call_args_list
+            if c.args and c.args[0] == "metrics.subscriptions_engine.comparison"
+        ]
+        assert len(comparison_calls) == 1
+        assert comparison_calls[0].kwargs["has_diff"] is False
+
+
+def _build_period_with_validations(
+    period_dict: dict[str, Any],
+    meta_metrics: list[type[MetaMetric]],
+    requested_slugs: set[str],
+) -> MetricsPeriod:
+    """Previous implementation, validating the period for each meta metric."""
+    temp_period_dict = dict(period_dict)
+    for meta_metric in meta_metrics:
+        temp_period_dict[meta_metric.slug] = 0
+    for meta_metric in meta_metrics:
+        temp_period = MetricsPeriod.model_validate(temp_period_dict)
+        computed_value = meta_metric.compute_from_period(temp_period)
+        temp_period_dict[meta_metric.slug] = computed_value
+        period_dict[meta_metric.slug] = computed_value
+    return MetricsPeriod.model_validate(
+        {
+            k: v
+            for k, v in period_dict.items()
+            if k == "timestamp" or k in requested_slugs
+        }
+    )
+
+
+class TestBuildPeriod:
+    def _get_rows(self) -> list[dict[str, Any]]:
+        start = datetime(2024, 1, 1, tzinfo=UTC)
+        return [
+            {
+                "timestamp": start + timedelta(days=i),
+                **{
+                    metric.slug: (Decimal(i * 100 + j) / 8 if j % 2 else Decimal(i + j))
+                    for j, metric in enumerate(METRICS_SQL)
+                },
+            }
+            for i in range(366)
+        ]
+
+    def test_parity(self) -> None:
+        requested_slugs = {m.slug for m in METRICS}
+        for row in self._get_rows():
+            period = _build_period(
+                dict(row), list(METRICS_POST_COMPUTE), requested_slugs
+            )
+            reference = _build_period_with_validations(
+                dict(row), list(METRICS_POST_COMPUTE), requested_slugs
+            )
+            assert period.model_dump() == reference.model_dump()
+
+    def test_benchmark(self) -> None:
+        """366 daily periods with all the metrics: validate each period once."""
+        rows = self._get_rows()
+        requested_slugs = {m.slug for m in METRICS}
+
+        def _run(build: Callable[..., MetricsPeriod]) -> float:
+            start = time.perf_counter()
+            for row in rows:
+                build(dict(row), list(METRICS_POST_COMPUTE), requested_slugs)
+            return time.perf_counter() - start
+
+        # Best of a few runs, to smooth out noise
+        elapsed = min(_run(_build_period) for _ in range(3))
+        elapsed_with_validations = min(
+            _run(_build_period_with_validations) for _ in range(3)
+        )
+        assert elapsed < elapsed_with_validations
@@ -128,7 +128,8 @@ class TestPlatformConfirmationEmail:
         await save_fixture(order)
 
         render = mocker.patch(
-            "polar.order.service.render_email_template", return_value="<html></html>"
+            "polar.order.service.render_email_template_async",
+            return_value="<html></html>",
         )
         enqueue_email = mocker.patch("polar.order.service.enqueue_email")
         generate_invoice = mocker.patch.object(order_service, "generate_invoice")
@@ -165,7 +166,8 @@ class TestPlatformConfirmationEmail:
         await save_fixture(order)
 
         render = mocker.patch(
-            "polar.order.service.render_email_template", return_value="<html></html>"
+            "polar.order.service.render_email_template_async",
+            return_value="<html></html>",
         )
         enqueue_email = mocker.patch("polar.order.service.enqueue_email")
 
@@ -223,7 +225,8 @@ class TestPlatformConfirmationEmail:
         await save_fixture(order)
 
         render = mocker.patch(
-            "polar.order.service.render_email_template", return_value="<html></html>"
+            "polar.order.service.render_email_template_async",
+            return_value="<html></html>",
         )
         mocker.patch("polar.order.service.enqueue_email")
         mocker.patch.object(order_service, "generate_invoice")
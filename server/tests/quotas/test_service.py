@@ -393,6 +393,89 @@ class TestGetUsage:
         assert usage.used == 100
 
 
+@pytest.mark.asyncio
+class TestGetAllUsage:
+    async def test_matches_per_quota_usage(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+    ) -> None:
+        platform_org = await create_organization(save_fixture)
+        _patch_platform_org_id(mocker, platform_org.id)
+        _patch_starter_limits(
+            mocker, video_views_monthly=5000, video_hours_hosted=5, storage_gb=10
+        )
+        creator = await create_organization(save_fixture)
+        await _subscribe_to_tier(
+            save_fixture,
+            platform_org=platform_org,
+            creator=creator,
+            tier="starter",
+            monthly_cents=0,
+        )
+
+        for _ in range(3):
+            await create_event(
+                save_fixture,
+                organization=creator,
+                source=EventSource.system,
+                name="spaire.video.viewed",
+            )
+        await create_event(
+            save_fixture,
+            organization=creator,
+            source=EventSource.system,
+            name="spaire.video.uploaded",
+            metadata={"duration_seconds": 7200},
+        )
+        await create_event(
+            save_fixture,
+            organization=creator,
+            source=EventSource.system,
+            name="spaire.storage.bytes",
+            metadata={"bytes_delta": 3 * 1024**3},
+        )
+
+        all_usage = await quotas.get_all_usage(session, creator.id, cached=False)
+
+        assert set(all_usage) == set(QuotaKey)
+        for quota in QuotaKey:
+            assert all_usage[quota] == await quotas.get_usage(
+                session, creator.id, quota
+            )
+        assert all_usage[QuotaKey.video_views_monthly].used == 3
+        assert all_usage[QuotaKey.video_hours_hosted].used == 2
+
+    async def test_cached_snapshot(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+    ) -> None:
+        creator = await create_organization(save_fixture)
+        await create_event(
+            save_fixture,
+            organization=creator,
+            source=EventSource.system,
+            name="spaire.video.viewed",
+        )
+
+        first = await quotas.get_all_usage(session, creator.id)
+        await create_event(
+            save_fixture,
+            organization=creator,
+            source=EventSource.system,
+            name="spaire.video.viewed",
+        )
+
+        cached = await quotas.get_all_usage(session, creator.id)
+        assert cached[QuotaKey.video_views_monthly].used == 1
+        assert cached == first
+
+        fresh = await quotas.get_all_usage(session, creator.id, cached=False)
+        assert fresh[QuotaKey.video_views_monthly].used == 2
+
+
 @pytest.mark.asyncio
 class TestCheck:
     async def test_allows_when_under_limit(
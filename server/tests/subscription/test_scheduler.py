@@ -21,7 +21,7 @@ from polar.kit.utils import utc_now
 from polar.models import Organization, Product
 from polar.models.subscription import SubscriptionStatus
 from polar.postgres import AsyncSession
-from polar.subscription.scheduler import SubscriptionJobStore
+from polar.subscription.scheduler import DispatchPacer, SubscriptionJobStore
 from tests.fixtures.database import SaveFixture
 from tests.fixtures.random_objects import (
     create_active_subscription,
@@ -168,3 +168,72 @@ class TestSchedulerExcludesLegacyPlatformTrial:
         result = await session.execute(_base_statement())
         ids = {row.id for row in result.scalars().all()}
         assert sub.id in ids
+
+
+class TestDispatchPacer:
+    def test_unlimited(self) -> None:
+        pacer = DispatchPacer(0, 60)
+        assert pacer.capacity(1000.0) is None
+        assert pacer.book(3, 1000.0) == [None, None, None]
+
+    def test_spreads_slots(self) -> None:
+        pacer = DispatchPacer(10, 60)
+        assert pacer.capacity(1000.0) == 600
+        assert pacer.book(3, 1000.0) == [None, 100, 200]
+        # Next booking continues after the previous slots
+        assert pacer.book(2, 1000.0) == [300, 400]
+        assert pacer.capacity(1000.0) == 595
+
+    def test_fully_booked(self) -> None:
+        pacer = DispatchPacer(10, 60)
+        pacer.book(600, 1000.0)
+        assert pacer.capacity(1000.0) == 0
+        assert pacer.resume_at() == pytest.approx(1000.1)
+        assert pacer.capacity(1000.1) == 1
+
+
+@pytest.mark.asyncio
+class TestClaimStatement:
+    async def test_claims_due_subscriptions(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+    ) -> None:
+        mocker.patch.object(settings, "PLATFORM_ORG_ID", None)
+        organization, product = await _org_with_product(save_fixture)
+        customer = await create_customer(save_fixture, organization=organization)
+        now = utc_now()
+        due = [
+            await create_active_subscription(
+                save_fixture,
+                product=product,
+                customer=customer,
+                current_period_end=now - timedelta(hours=i + 1),
+            )
+            for i in range(3)
+        ]
+        not_due = await create_active_subscription(
+            save_fixture,
+            product=product,
+            customer=customer,
+            current_period_end=now + timedelta(days=1),
+        )
+
+        store = SubscriptionJobStore.__new__(SubscriptionJobStore)
+
+        result = await session.execute(store._get_claim_statement(now, 2))
+        first_chunk = set(result.scalars().all())
+        # Oldest due subscriptions are claimed first
+        assert first_chunk == {due[2].id, due[1].id}
+
+        result = await session.execute(store._get_claim_statement(now, 2))
+        assert set(result.scalars().all()) == {due[0].id}
+
+        result = await session.execute(store._get_claim_statement(now, 2))
+        assert result.scalars().all() == []
+
+        for subscription in [*due, not_due]:
+            await session.refresh(subscription)
+        assert all(s.scheduler_locked_at == now for s in due)
+        assert not_due.scheduler_locked_at is None
@@ -0,0 +1,88 @@
+import uuid
+from typing import Any
+
+import pytest
+
+from polar.enums import TaxBehavior, TaxProcessor
+from polar.kit.address import Address
+from polar.tax.calculation import TaxabilityReason, TaxCalculation, TaxCode
+from polar.tax.calculation import cache as tax_quote_cache
+from polar.tax.tax_id import TaxIDFormat
+
+IDENTIFIER = uuid.uuid4()
+
+
+def _get_key(**kwargs: Any) -> str:
+    return tax_quote_cache.get_key(
+        **{
+            "identifier": IDENTIFIER,
+            "processors": [TaxProcessor.stripe],
+            "currency": "usd",
+            "amount": 1000,
+            "tax_behavior": TaxBehavior.exclusive,
+            "tax_code": TaxCode.general_electronically_supplied_services,
+            "address": Address.model_validate(
+                {"country": "FR", "postal_code": "75001", "city": "Paris"}
+            ),
+            "tax_ids": [("FR61954506077", TaxIDFormat.eu_vat)],
+            "customer_exempt": False,
+            **kwargs,
+        }
+    )
+
+
+class TestGetKey:
+    def test_normalized(self) -> None:
+        assert _get_key() == _get_key(
+            currency="USD",
+            address=Address.model_validate(
+                {"country": "FR", "postal_code": " 75001", "city": "paris "}
+            ),
+            tax_ids=[("fr61954506077", TaxIDFormat.eu_vat)],
+        )
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {"identifier": uuid.uuid4()},
+            {"processors": [TaxProcessor.numeral]},
+            {"amount": 1001},
+            {"tax_behavior": TaxBehavior.inclusive},
+            {"address": Address.model_validate({"country": "DE"})},
+            {"tax_ids": []},
+            {"customer_exempt": True},
+        ],
+    )
+    def test_different(self, kwargs: dict[str, Any]) -> None:
+        assert _get_key() != _get_key(**kwargs)
+
+
+@pytest.mark.asyncio
+class TestQuote:
+    async def test_round_trip(self) -> None:
+        key = _get_key()
+        calculation: TaxCalculation = {
+            "processor_id": "TAX_PROCESSOR_ID",
+            "amount": 200,
+            "currency": "usd",
+            "tax_behavior": TaxBehavior.exclusive,
+            "taxability_reason": TaxabilityReason.standard_rated,
+            "tax_rate": {
+                "rate_type": "percentage",
+                "basis_points": 2000,
+                "amount": None,
+                "amount_currency": None,
+                "display_name": "VAT",
+                "country": "FR",
+                "state": None,
+            },
+        }
+
+        assert await tax_quote_cache.get_quote(key) is None
+
+        await tax_quote_cache.set_quote(key, calculation, TaxProcessor.stripe)
+
+        assert await tax_quote_cache.get_quote(key) == (
+            calculation,
+            TaxProcessor.stripe,
+        )
@@ -0,0 +1,137 @@
+import asyncio
+import uuid
+from typing import Any, cast
+from unittest.mock import patch
+
+import pytest
+
+from polar.config import settings
+from polar.enums import TaxBehavior, TaxProcessor
+from polar.kit.address import Address, CountryAlpha2
+from polar.tax.calculation import (
+    InvalidTaxIDError,
+    TaxCalculation,
+    TaxCalculationTechnicalError,
+    TaxCode,
+    calculate_hedged,
+)
+from polar.tax.calculation.base import TaxServiceProtocol
+
+
+class TaxServiceStub:
+    def __init__(
+        self,
+        processor_id: str,
+        *,
+        delay: float = 0,
+        error: Exception | None = None,
+    ) -> None:
+        self.processor_id = processor_id
+        self.delay = delay
+        self.error = error
+        self.called = False
+        self.cancelled = False
+
+    async def calculate(self, *args: Any, **kwargs: Any) -> TaxCalculation:
+        self.called = True
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return {
+            "processor_id": self.processor_id,
+            "amount": 100,
+            "currency": "usd",
+            "tax_behavior": TaxBehavior.exclusive,
+            "taxability_reason": None,
+            "tax_rate": None,
+        }
+
+
+async def _calculate(
+    stripe: TaxServiceStub,
+    numeral: TaxServiceStub,
+    hedge_delay: float | None = None,
+) -> tuple[TaxCalculation, TaxProcessor]:
+    with patch.object(settings, "TAX_CALCULATION_HEDGE_DELAY_SECONDS", hedge_delay):
+        return await calculate_hedged(
+            [
+                (TaxProcessor.stripe, cast(TaxServiceProtocol, stripe)),
+                (TaxProcessor.numeral, cast(TaxServiceProtocol, numeral)),
+            ],
+            identifier=uuid.uuid4(),
+            currency="usd",
+            amount=1000,
+            tax_behavior=TaxBehavior.exclusive,
+            tax_code=TaxCode.general_electronically_supplied_services,
+            address=Address(country=CountryAlpha2("FR")),
+            tax_ids=[],
+            customer_exempt=False,
+        )
+
+
+@pytest.mark.asyncio
+class TestCalculateHedged:
+    async def test_primary(self) -> None:
+        stripe = TaxServiceStub("STRIPE", delay=0.05)
+        numeral = TaxServiceStub("NUMERAL")
+
+        calculation, processor = await _calculate(stripe, numeral)
+
+        assert processor == TaxProcessor.stripe
+        assert calculation["processor_id"] == "STRIPE"
+        assert numeral.called is False
+
+    async def test_technical_error_fallback(self) -> None:
+        stripe = TaxServiceStub("STRIPE", error=TaxCalculationTechnicalError())
+        numeral = TaxServiceStub("NUMERAL")
+
+        calculation, processor = await _calculate(stripe, numeral)
+
+        assert processor == TaxProcessor.numeral
+        assert calculation["processor_id"] == "NUMERAL"
+
+    async def test_logical_error(self) -> None:
+        stripe = TaxServiceStub("STRIPE", error=InvalidTaxIDError())
+        numeral = TaxServiceStub("NUMERAL")
+
+        with pytest.raises(InvalidTaxIDError):
+            await _calculate(stripe, numeral)
+
+        assert numeral.called is False
+
+    async def test_all_failed(self) -> None:
+        stripe = TaxServiceStub("STRIPE", error=TaxCalculationTechnicalError())
+        numeral = TaxServiceStub("NUMERAL", error=TaxCalculationTechnicalError())
+
+        with pytest.raises(TaxCalculationTechnicalError):
+            await _calculate(stripe, numeral, hedge_delay=0.01)
+
+    async def test_hedged(self) -> None:
+        stripe = TaxServiceStub("STRIPE", delay=10)
+        numeral = TaxServiceStub("NUMERAL")
+
+        calculation, processor = await asyncio.wait_for(
+            _calculate(stripe, numeral, hedge_delay=0.01), timeout=1
+        )
+
+        assert processor == TaxProcessor.numeral
+        assert calculation["processor_id"] == "NUMERAL"
+        await asyncio.sleep(0)
+        assert stripe.cancelled is True
+
+    async def test_hedged_primary_first(self) -> None:
+        stripe = TaxServiceStub("STRIPE", delay=0.05)
+        numeral = TaxServiceStub("NUMERAL", delay=10)
+
+        calculation, processor = await asyncio.wait_for(
+            _calculate(stripe, numeral, hedge_delay=0.01), timeout=1
+        )
+
+        assert processor == TaxProcessor.stripe
+        assert calculation["processor_id"] == "STRIPE"
+        await asyncio.sleep(0)
+        assert numeral.cancelled is True
@@ -0,0 +1,99 @@
+import uuid
+from datetime import timedelta
+
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.kit.utils import utc_now
+from polar.models import WebhookEvent
+from polar.models.webhook_endpoint import WebhookEventType
+from polar.redis import Redis
+from polar.webhook import delivery_queue
+
+
+def _events(count: int, endpoint_id: uuid.UUID | None = None) -> list[WebhookEvent]:
+    endpoint_id = endpoint_id or uuid.uuid4()
+    now = utc_now()
+    return [
+        WebhookEvent(
+            id=uuid.uuid4(),
+            created_at=now + timedelta(seconds=i),
+            webhook_endpoint_id=endpoint_id,
+            type=WebhookEventType.customer_created,
+            payload="{}",
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+class TestDeliveryQueue:
+    async def test_in_order(self, redis: Redis) -> None:
+        first, second, third = _events(3)
+        endpoint_id = first.webhook_endpoint_id
+
+        assert await delivery_queue.acquire(redis, first) is True
+        assert await delivery_queue.acquire(redis, third) is False
+        assert await delivery_queue.acquire(redis, second) is False
+        assert await delivery_queue.get_pending_endpoints(redis) == [endpoint_id]
+
+        assert await delivery_queue.release(redis, endpoint_id, first.id) == [second.id]
+        # Third is not its turn, even if dispatched
+        assert await delivery_queue.acquire(redis, third) is False
+        assert await delivery_queue.acquire(redis, second) is True
+
+        assert await delivery_queue.release(redis, endpoint_id, second.id) == [third.id]
+        assert await delivery_queue.acquire(redis, third) is True
+        assert await delivery_queue.get_pending_endpoints(redis) == []
+
+        assert await delivery_queue.release(redis, endpoint_id, third.id) == []
+
+    async def test_duplicate_in_flight(self, redis: Redis) -> None:
+        (event,) = _events(1)
+
+        assert await delivery_queue.acquire(redis, event) is True
+        assert await delivery_queue.acquire(redis, event) is False
+
+    async def test_release_skipped_event(self, redis: Redis) -> None:
+        first, second, third = _events(3)
+        endpoint_id = first.webhook_endpoint_id
+
+        assert await delivery_queue.acquire(redis, first) is True
+        assert await delivery_queue.acquire(redis, second) is False
+        assert await delivery_queue.acquire(redis, third) is False
+
+        # Second is removed without being delivered, e.g. archived
+        await delivery_queue.release(redis, endpoint_id, second.id)
+        assert await delivery_queue.release(redis, endpoint_id, first.id) == [third.id]
+
+    async def test_expired_lease(self, mocker: MockerFixture, redis: Redis) -> None:
+        mocker.patch(
+            "polar.webhook.delivery_queue.settings.WEBHOOK_DELIVERY_LEASE_SECONDS", -1
+        )
+        first, second = _events(2)
+
+        assert await delivery_queue.acquire(redis, first) is True
+        # First's worker died: its slot is reclaimed
+        assert await delivery_queue.acquire(redis, second) is True
+
+    async def test_concurrency(self, mocker: MockerFixture, redis: Redis) -> None:
+        first, second, third = _events(3)
+        endpoint_id = first.webhook_endpoint_id
+        mocker.patch(
+            "polar.webhook.delivery_queue.settings.WEBHOOK_ENDPOINT_DELIVERY_CONCURRENCY",
+            {endpoint_id: 2},
+        )
+
+        assert await delivery_queue.acquire(redis, first) is True
+        assert await delivery_queue.acquire(redis, second) is True
+        assert await delivery_queue.acquire(redis, third) is False
+
+        assert await delivery_queue.release(redis, endpoint_id, second.id) == [third.id]
+        assert await delivery_queue.acquire(redis, third) is True
+
+    async def test_endpoints_isolated(self, redis: Redis) -> None:
+        (event,) = _events(1)
+        (other_event,) = _events(1)
+
+        assert await delivery_queue.acquire(redis, event) is True
+        assert await delivery_queue.acquire(redis, other_event) is True
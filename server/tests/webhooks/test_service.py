@@ -13,7 +13,6 @@ from polar.kit.utils import utc_now
 from polar.models import (
     Organization,
     Product,
-    WebhookDelivery,
     WebhookEndpoint,
     WebhookEvent,
 )
@@ -210,139 +209,3 @@ class TestOnEventSuccess:
             CheckoutEvent.webhook_event_delivered,
             {"status": checkout.status},
         )
-
-
-@pytest.mark.asyncio
-class TestIsLatestEvent:
-    async def test_single_event(
-        self,
-        session: AsyncSession,
-        save_fixture: SaveFixture,
-        webhook_endpoint_organization: WebhookEndpoint,
-    ) -> None:
-        event = WebhookEvent(
-            webhook_endpoint=webhook_endpoint_organization,
-            succeeded=False,
-            type=WebhookEventType.checkout_updated,
-            payload="{}",
-        )
-        await save_fixture(event)
-
-        assert await webhook_service.is_latest_event(session, event) is True
-
-    async def test_delivered_previous_event(
-        self,
-        session: AsyncSession,
-        save_fixture: SaveFixture,
-        webhook_endpoint_organization: WebhookEndpoint,
-    ) -> None:
-        delivered_event = WebhookEvent(
-            webhook_endpoint=webhook_endpoint_organization,
-            succeeded=True,
-            last_http_code=200,
-            type=WebhookEventType.checkout_updated,
-            payload="{}",
-        )
-        await save_fixture(delivered_event)
-        await save_fixture(
-            WebhookDelivery(
-                webhook_event=delivered_event,
-                webhook_endpoint=webhook_endpoint_organization,
-                succeeded=True,
-                http_code=200,
-            )
-        )
-
-        event = WebhookEvent(
-            webhook_endpoint=webhook_endpoint_organization,
-            succeeded=False,
-            type=WebhookEventType.checkout_updated,
-            payload="{}",
-        )
-        await save_fixture(event)
-
-        assert await webhook_service.is_latest_event(session, event) is True
-
-    async def test_delivered_previous_event_no_http_code(
-        self,
-        session: AsyncSession,
-        save_fixture: SaveFixture,
-        webhook_endpoint_organization: WebhookEndpoint,
-    ) -> None:
-        delivered_event = WebhookEvent(
-            webhook_endpoint=webhook_endpoint_organization,
-            succeeded=False,
-            last_http_code=None,
-            type=WebhookEventType.checkout_updated,
-            payload="{}",
-        )
-        await save_fixture(delivered_event)
-        await save_fixture(
-            WebhookDelivery(
-                webhook_event=delivered_event,
-                webhook_endpoint=webhook_endpoint_organization,
-                succeeded=False,
-                http_code=None,
-            )
-        )
-
-        event = WebhookEvent(
-            webhook_endpoint=webhook_endpoint_organization,
-            succeeded=False,
-            type=WebhookEventType.checkout_updated,
-            payload="{}",
-        )
-        await save_fixture(event)
-
-        assert await webhook_service.is_latest_event(session, event) is True
-
-    async def test_undelivered_previous_event(
-        self,
-        session: AsyncSession,
-        save_fixture: SaveFixture,
-        webhook_endpoint_organization: WebhookEndpoint,
-    ) -> None:
-        previous_event = WebhookEvent(
-            webhook_endpoint=webhook_endpoint_organization,
-            succeeded=False,
-            last_http_code=None,
-            type=WebhookEventType.checkout_updated,
-            payload="{}",
-        )
-        await save_fixture(previous_event)
-
-        event = WebhookEvent(
-            webhook_endpoint=webhook_endpoint_organization,
-            succeeded=False,
-            type=WebhookEventType.checkout_updated,
-            payload="{}",
-        )
-        await save_fixture(event)
-
-        assert await webhook_service.is_latest_event(session, event) is False
-
-    async def test_undelivered_previous_event_old(
-        self,
-        session: AsyncSession,
-        save_fixture: SaveFixture,
-        webhook_endpoint_organization: WebhookEndpoint,
-    ) -> None:
-        previous_event = WebhookEvent(
-            created_at=utc_now().replace(year=2000),
-            webhook_endpoint=webhook_endpoint_organization,
-            succeeded=False,
-            last_http_code=None,
-            type=WebhookEventType.checkout_updated,
-            payload="{}",
-        )
-        await save_fixture(previous_event)
-
-        event = WebhookEvent(
-            webhook_endpoint=webhook_endpoint_organization,
-            succeeded=False,
-            type=WebhookEventType.checkout_updated,
-            payload="{}",
-        )
-        await save_fixture(event)
-
-        assert await webhook_service.is_latest_event(session, event) is True
@@ -222,6 +222,48 @@ async def test_webhook_delivery_http_error(
         assert delivery.response == "ERROR"
 
 
+@pytest.mark.asyncio
+async def test_webhook_delivery_max_attempts_across_messages(
+    mocker: MockerFixture,
+    session: AsyncSession,
+    save_fixture: SaveFixture,
+    respx_mock: respx.MockRouter,
+    organization: Organization,
+    current_message: dramatiq.MessageProxy,
+) -> None:
+    tasks_enqueue_job_mock = mocker.patch("polar.webhook.tasks.enqueue_job")
+    respx_mock.post("https://example.com/hook").mock(
+        return_value=httpx.Response(500, text="Internal Error")
+    )
+
+    endpoint = WebhookEndpoint(
+        url="https://example.com/hook",
+        format=WebhookFormat.raw,
+        organization_id=organization.id,
+        secret="mysecret",
+    )
+    await save_fixture(endpoint)
+
+    # Attempted by earlier messages, e.g. before waiting for its turn
+    event = WebhookEvent(
+        webhook_endpoint_id=endpoint.id,
+        type=WebhookEventType.customer_created,
+        payload='{"foo":"bar"}',
+        delivery_attempts=settings.WEBHOOK_MAX_RETRIES,
+    )
+    await save_fixture(event)
+
+    # First attempt of this message, but the last one of the event
+    current_message.options["max_retries"] = settings.WEBHOOK_MAX_RETRIES
+    await _webhook_event_send(session=session, webhook_event_id=event.id)
+
+    assert event.delivery_attempts == settings.WEBHOOK_MAX_RETRIES + 1
+    assert event.succeeded is False
+    tasks_enqueue_job_mock.assert_any_call(
+        "webhook_event.failed", webhook_event_id=event.id
+    )
+
+
 @pytest.mark.asyncio
 async def test_webhook_standard_webhooks_compatible(
     session: AsyncSession,
@@ -255,3 +297,48 @@ async def test_webhook_standard_webhooks_compatible(
     request = route_mock.calls.last.request
     w = StandardWebhook(secret.encode("utf-8"))
     assert w.verify(request.content, cast(dict[str, str], request.headers)) is not None
+
+
+@pytest.mark.asyncio
+async def test_webhook_delivery_releases_transaction_during_request(
+    mocker: MockerFixture,
+    session: AsyncSession,
+    save_fixture: SaveFixture,
+    respx_mock: respx.MockRouter,
+    organization: Organization,
+) -> None:
+    commit_spy = mocker.spy(session, "commit")
+    commits_before_request: list[int] = []
+
+    def _respond(request: httpx.Request) -> httpx.Response:
+        commits_before_request.append(commit_spy.call_count)
+        return httpx.Response(200)
+
+    respx_mock.post("https://example.com/hook").mock(side_effect=_respond)
+
+    endpoint = WebhookEndpoint(
+        url="https://example.com/hook",
+        format=WebhookFormat.raw,
+        organization_id=organization.id,
+        secret="mysecret",
+    )
+    await save_fixture(endpoint)
+
+    event = WebhookEvent(
+        webhook_endpoint_id=endpoint.id,
+        type=WebhookEventType.customer_created,
+        payload='{"foo":"bar"}',
+    )
+    await save_fixture(event)
+
+    await _webhook_event_send(session=session, webhook_event_id=event.id)
+
+    # The transaction is committed before the request, and the outcome after
+    assert commits_before_request == [1]
+    assert commit_spy.call_count == 2
+
+    delivery_repository = WebhookDeliveryRepository.from_session(session)
+    deliveries = await delivery_repository.get_all_by_event(event.id)
+    assert len(deliveries) == 1
+    assert deliveries[0].succeeded is True
+    assert event.succeeded is True
@@ -0,0 +1,139 @@
+import dramatiq
+import pytest
+from dramatiq.brokers.stub import StubBroker
+from dramatiq.middleware import SkipMessage
+from fakeredis import FakeRedis
+
+from polar.worker._debounce import (
+    DEBOUNCE_KEY_PREFIX,
+    DebounceMiddleware,
+    get_debounced_keys,
+    now_timestamp,
+)
+
+
+@pytest.fixture
+def redis() -> FakeRedis:
+    return FakeRedis()
+
+
+@pytest.fixture
+def middleware(redis: FakeRedis) -> DebounceMiddleware:
+    return DebounceMiddleware(redis.connection_pool)
+
+
+@pytest.fixture
+def broker(middleware: DebounceMiddleware) -> StubBroker:
+    broker = StubBroker()
+    broker.add_middleware(middleware)
+
+    @dramatiq.actor(
+        actor_name="test.debounced_items",
+        broker=broker,
+        debounce_keys=lambda values: [f"test.debounced_items:{v}" for v in values],
+        debounce_max_threshold=60,
+    )
+    def debounced_items_actor(values: list[int]) -> None: ...
+
+    return broker
+
+
+def _key(value: int) -> str:
+    return f"{DEBOUNCE_KEY_PREFIX}test.debounced_items:{value}"
+
+
+def _get_message(broker: StubBroker, values: list[int]) -> dramatiq.MessageProxy:
+    actor = broker.get_actor("test.debounced_items")
+    message = actor.message_with_options(
+        args=(values,), debounce_keys=[_key(value) for value in values]
+    )
+    return dramatiq.MessageProxy(message)
+
+
+class TestDebounceKeys:
+    def test_partially_owned(
+        self, redis: FakeRedis, middleware: DebounceMiddleware, broker: StubBroker
+    ) -> None:
+        message = _get_message(broker, [1, 2, 3, 4])
+        redis.hset(
+            _key(1),
+            mapping={
+                "message_id": message.message_id,
+                "enqueue_timestamp": now_timestamp(),
+                "executed": 0,
+            },
+        )
+        redis.hset(
+            _key(2),
+            mapping={
+                "message_id": "OTHER_MESSAGE_ID",
+                "enqueue_timestamp": now_timestamp(),
+                "executed": 0,
+            },
+        )
+        redis.hset(
+            _key(3),
+            mapping={"message_id": message.message_id, "executed": 1},
+        )
+        redis.hset(
+            _key(4),
+            mapping={
+                "message_id": "OTHER_MESSAGE_ID",
+                "enqueue_timestamp": now_timestamp() - 120,
+                "executed": 0,
+            },
+        )
+
+        middleware.before_process_message(broker, message)
+
+        assert get_debounced_keys(message) == [
+            "test.debounced_items:1",
+            "test.debounced_items:4",
+        ]
+
+        middleware.after_process_message(broker, message)
+
+        assert redis.hget(_key(1), "executed") == b"1"
+        assert redis.hget(_key(2), "executed") == b"0"
+        # Executed past the max threshold: still owned by the other message
+        assert redis.hget(_key(4), "executed") == b"0"
+        assert int(redis.hget(_key(4), "enqueue_timestamp") or 0) >= (
+            now_timestamp() - 1
+        )
+
+    def test_owned_by_others(
+        self, redis: FakeRedis, middleware: DebounceMiddleware, broker: StubBroker
+    ) -> None:
+        message = _get_message(broker, [1, 2])
+        for value in (1, 2):
+            redis.hset(
+                _key(value),
+                mapping={
+                    "message_id": "OTHER_MESSAGE_ID",
+                    "enqueue_timestamp": now_timestamp(),
+                    "executed": 0,
+                },
+            )
+
+        with pytest.raises(SkipMessage):
+            middleware.before_process_message(broker, message)
+
+    def test_reenqueued_while_processing(
+        self, redis: FakeRedis, middleware: DebounceMiddleware, broker: StubBroker
+    ) -> None:
+        message = _get_message(broker, [1])
+
+        middleware.before_process_message(broker, message)
+
+        redis.hset(
+            _key(1),
+            mapping={
+                "message_id": "OTHER_MESSAGE_ID",
+                "enqueue_timestamp": now_timestamp(),
+                "executed": 0,
+            },
+        )
+
+        middleware.after_process_message(broker, message)
+
+        assert redis.hget(_key(1), "executed") == b"0"
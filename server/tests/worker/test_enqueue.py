@@ -0,0 +1,146 @@
+import json
+from typing import Any
+
+import dramatiq
+import pytest
+from dramatiq.brokers.stub import StubBroker
+from fakeredis import FakeAsyncRedis
+
+from polar.worker._debounce import DEBOUNCE_KEY_PREFIX
+from polar.worker._enqueue import JobQueueManager
+
+
+class _DebounceOptionsMiddleware(dramatiq.Middleware):
+    @property
+    def actor_options(self) -> set[str]:
+        return {
+            "debounce_key",
+            "debounce_keys",
+            "debounce_min_threshold",
+            "debounce_max_threshold",
+        }
+
+
+@pytest.fixture
+def redis() -> FakeAsyncRedis:
+    return FakeAsyncRedis(decode_responses=True)
+
+
+@pytest.fixture
+def broker() -> StubBroker:
+    broker = StubBroker()
+    broker.add_middleware(_DebounceOptionsMiddleware())
+
+    @dramatiq.actor(actor_name="test.default", broker=broker)
+    def default_actor(value: int) -> None: ...
+
+    @dramatiq.actor(actor_name="test.other", broker=broker, queue_name="other")
+    def other_actor(value: int) -> None: ...
+
+    @dramatiq.actor(
+        actor_name="test.debounced",
+        broker=broker,
+        debounce_key=lambda value: f"test.debounced:{value}",
+        debounce_min_threshold=10,
+    )
+    def debounced_actor(value: int) -> None: ...
+
+    @dramatiq.actor(
+        actor_name="test.debounced_items",
+        broker=broker,
+        debounce_keys=lambda values: [f"test.debounced_items:{v}" for v in values],
+        debounce_min_threshold=10,
+    )
+    def debounced_items_actor(values: list[int]) -> None: ...
+
+    return broker
+
+
+async def _get_messages(redis: FakeAsyncRedis, queue_name: str) -> list[Any]:
+    message_ids = await redis.lrange(f"dramatiq:{queue_name}", 0, -1)
+    encoded_messages = await redis.hmget(f"dramatiq:{queue_name}.msgs", message_ids)
+    return [json.loads(encoded_message) for encoded_message in encoded_messages]
+
+
+@pytest.mark.asyncio
+class TestFlush:
+    async def test_empty(self, broker: StubBroker, redis: FakeAsyncRedis) -> None:
+        manager = JobQueueManager()
+        await manager.flush(broker, redis)
+
+        assert await redis.keys("*") == []
+
+    async def test_multiple_queues(
+        self, broker: StubBroker, redis: FakeAsyncRedis
+    ) -> None:
+        manager = JobQueueManager()
+        for value in range(120):
+            manager.enqueue_job("test.default", value)
+        manager.enqueue_job("test.other", 1)
+        manager.enqueue_job("test.other", 2, delay=1000)
+
+        await manager.flush(broker, redis)
+
+        default_messages = await _get_messages(redis, "default")
+        assert [message["args"] for message in default_messages] == [
+            [value] for value in range(120)
+        ]
+
+        other_messages = await _get_messages(redis, "other")
+        assert [message["args"] for message in other_messages] == [[1]]
+
+        delayed_messages = await _get_messages(redis, "other.DQ")
+        assert [message["args"] for message in delayed_messages] == [[2]]
+        assert "eta" in delayed_messages[0]["options"]
+
+    async def test_debounce(self, broker: StubBroker, redis: FakeAsyncRedis) -> None:
+        manager = JobQueueManager()
+        manager.enqueue_job("test.debounced", 1)
+        manager.enqueue_job("test.debounced", 2)
+        manager.enqueue_job("test.debounced", 1)
+
+        await manager.flush(broker, redis)
+
+        messages = await _get_messages(redis, "default.DQ")
+        assert len(messages) == 3
+        for message in messages:
+            value = message["args"][0]
+            assert message["options"]["debounce_key"] == (
+                f"{DEBOUNCE_KEY_PREFIX}test.debounced:{value}"
+            )
+            assert "eta" in message["options"]
+
+        # Last enqueued message owns the key
+        debounce_data = await redis.hgetall(f"{DEBOUNCE_KEY_PREFIX}test.debounced:1")
+        assert debounce_data["message_id"] == messages[2]["message_id"]
+        assert debounce_data["executed"] == "0"
+        assert "enqueue_timestamp" in debounce_data
+
+        debounce_data = await redis.hgetall(f"{DEBOUNCE_KEY_PREFIX}test.debounced:2")
+        assert debounce_data["message_id"] == messages[1]["message_id"]
+
+    async def test_debounce_keys(
+        self, broker: StubBroker, redis: FakeAsyncRedis
+    ) -> None:
+        manager = JobQueueManager()
+        manager.enqueue_job("test.debounced_items", [1, 2])
+        manager.enqueue_job("test.debounced_items", [2, 3])
+
+        await manager.flush(broker, redis)
+
+        messages = await _get_messages(redis, "default.DQ")
+        assert len(messages) == 2
+        for message in messages:
+            assert message["options"]["debounce_keys"] == [
+                f"{DEBOUNCE_KEY_PREFIX}test.debounced_items:{value}"
+                for value in message["args"][0]
+            ]
+            assert "eta" in message["options"]
+
+        # Each item is owned by the last message it was enqueued in
+        for value, message in ((1, messages[0]), (2, messages[1]), (3, messages[1])):
+            debounce_data = await redis.hgetall(
+                f"{DEBOUNCE_KEY_PREFIX}test.debounced_items:{value}"
+            )
+            assert debounce_data["message_id"] == message["message_id"]
+            assert debounce_data["executed"] == "0"